@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""The file block cache.
+
+The file block cache is a read-through cache of the blocks of a single
+file, which is shared by the hashers, the signature scanner and the parsers
+that process the file. This prevents the content of a file being read,
+and for storage media images decompressed, multiple times.
+"""
+
+import collections
+import os
+
+
+class FileBlockCache(object):
+  """Class that implements a least recently used (LRU) file block cache.
+
+  The cache can update hashers incrementally. The blocks are passed to
+  the hashers in order, as they are read through the cache, so that blocks
+  that were already read by another consumer do not need to be read again
+  to calculate the digest hashes.
+  """
+
+  # The default block size, which is 64 KiB.
+  DEFAULT_BLOCK_SIZE = 64 * 1024
+
+  # The default maximum size of the cached blocks, which is 16 MiB.
+  DEFAULT_MAXIMUM_CACHE_SIZE = 16 * 1024 * 1024
+
+  def __init__(
+      self, file_object, block_size=DEFAULT_BLOCK_SIZE,
+      maximum_cache_size=DEFAULT_MAXIMUM_CACHE_SIZE):
+    """Initializes the file block cache.
+
+    Args:
+      file_object: the file-like object (instance of dfvfs.FileIO) of which
+                   to cache the blocks. The file-like object is owned by
+                   the cache and closed when the cache is closed.
+      block_size: optional size of a block in bytes.
+      maximum_cache_size: optional maximum size of the cached blocks in bytes.
+    """
+    super(FileBlockCache, self).__init__()
+    self._block_size = block_size
+    self._blocks = collections.OrderedDict()
+    self._file_object = file_object
+    self._file_size = file_object.get_size()
+    self._hasher_objects = None
+    self._hasher_offset = 0
+    self._maximum_number_of_blocks = max(1, maximum_cache_size // block_size)
+
+    self.number_of_block_reads = 0
+    self.number_of_bytes_read = 0
+    self.number_of_cache_hits = 0
+
+  @property
+  def size(self):
+    """The size of the file."""
+    return self._file_size
+
+  def _UpdateHashers(self, block_offset, data):
+    """Updates the hashers with a block if it is the next block to hash.
+
+    Args:
+      block_offset: the offset of the block.
+      data: a binary string containing the data of the block.
+    """
+    if self._hasher_objects is None or block_offset != self._hasher_offset:
+      return
+
+    for hasher in self._hasher_objects:
+      hasher.Update(data)
+
+    self._hasher_offset += len(data)
+
+  def Close(self):
+    """Closes the cache and the file-like object."""
+    self._blocks = collections.OrderedDict()
+    self._hasher_objects = None
+
+    if self._file_object:
+      self._file_object.close()
+      self._file_object = None
+
+  def GetBlock(self, block_offset):
+    """Retrieves a block.
+
+    Args:
+      block_offset: the offset of the block, which must be a multiple of
+                    the block size.
+
+    Returns:
+      A binary string containing the data of the block, which is smaller
+      than the block size for the last block of the file.
+
+    Raises:
+      IOError: if the block cannot be read.
+    """
+    data = self._blocks.pop(block_offset, None)
+    if data is None:
+      self._file_object.seek(block_offset, os.SEEK_SET)
+      data = self._file_object.read(self._block_size)
+      self.number_of_block_reads += 1
+
+      if len(self._blocks) >= self._maximum_number_of_blocks:
+        self._blocks.popitem(last=False)
+
+      self._UpdateHashers(block_offset, data)
+
+    else:
+      self.number_of_cache_hits += 1
+
+    # Re-insert the block to mark it as the most recently used.
+    self._blocks[block_offset] = data
+    return data
+
+  def GetDigestHashes(self):
+    """Retrieves the digest hashes of the file.
+
+    The blocks that have not been passed to the hashers yet are read through
+    the cache.
+
+    Returns:
+      A dictionary mapping hasher names to the digest calculated by that
+      hasher.
+
+    Raises:
+      RuntimeError: if the hashers were not started.
+    """
+    if self._hasher_objects is None:
+      raise RuntimeError(u'Hashers not started.')
+
+    while self._hasher_offset < self._file_size:
+      block_offset = self._hasher_offset
+      data = self._blocks.get(block_offset, None)
+      if data is None:
+        # Reading the block updates the hashers.
+        data = self.GetBlock(block_offset)
+      else:
+        self._UpdateHashers(block_offset, data)
+
+      if not data:
+        break
+
+    digests = {}
+    for hasher in self._hasher_objects:
+      digests[hasher.NAME] = hasher.GetStringDigest()
+
+    self._hasher_objects = None
+    return digests
+
+  def Read(self, offset, size):
+    """Reads data.
+
+    Args:
+      offset: the offset of the data.
+      size: the size of the data.
+
+    Returns:
+      A binary string containing the data read.
+
+    Raises:
+      IOError: if the data cannot be read.
+    """
+    if offset >= self._file_size or size <= 0:
+      return b''
+
+    size = min(size, self._file_size - offset)
+
+    data_segments = []
+    block_offset = offset - (offset % self._block_size)
+    data_offset = offset - block_offset
+    while size > 0:
+      data = self.GetBlock(block_offset)
+      if data_offset >= len(data):
+        break
+
+      data_segment = data[data_offset:data_offset + size]
+      data_segments.append(data_segment)
+      size -= len(data_segment)
+
+      block_offset += self._block_size
+      data_offset = 0
+
+    data = b''.join(data_segments)
+    self.number_of_bytes_read += len(data)
+    return data
+
+  def RewindFileObject(self):
+    """Seeks the file-like object to the start of the file.
+
+    The file-like object can be shared with other consumers, e.g. through
+    the dfVFS resolver context, that do not seek before reading.
+    """
+    if self._file_object:
+      self._file_object.seek(0, os.SEEK_SET)
+
+  def StartHashers(self, hasher_objects):
+    """Starts updating hashers with the blocks that are read.
+
+    Args:
+      hasher_objects: a list of hasher objects (instances of BaseHasher).
+    """
+    self._hasher_objects = hasher_objects
+    self._hasher_offset = 0
+
+
+class FileBlockCacheFileObject(object):
+  """Class that implements a file-like object that reads from a block cache.
+
+  Every consumer of the file block cache uses its own file-like object, since
+  the current offset is maintained per file-like object. Closing the file-like
+  object does not close the file block cache.
+  """
+
+  # Note: that the following functions do not follow the style guide
+  # because they are part of the file-like object interface.
+
+  def __init__(self, file_block_cache):
+    """Initializes the file-like object.
+
+    Args:
+      file_block_cache: the file block cache (instance of FileBlockCache).
+    """
+    super(FileBlockCacheFileObject, self).__init__()
+    self._current_offset = 0
+    self._file_block_cache = file_block_cache
+
+  def close(self):
+    """Closes the file-like object."""
+    self._file_block_cache = None
+
+  def get_offset(self):
+    """Returns the current offset into the file-like object.
+
+    Raises:
+      IOError: if the file-like object has been closed.
+    """
+    if not self._file_block_cache:
+      raise IOError(u'Not opened.')
+
+    return self._current_offset
+
+  def get_size(self):
+    """Returns the size of the file-like object.
+
+    Raises:
+      IOError: if the file-like object has been closed.
+    """
+    if not self._file_block_cache:
+      raise IOError(u'Not opened.')
+
+    return self._file_block_cache.size
+
+  def read(self, size=None):
+    """Reads a byte string from the file-like object at the current offset.
+
+    Args:
+      size: Optional integer value containing the number of bytes to read.
+            Default is all remaining data (None).
+
+    Returns:
+      A byte string containing the data read.
+
+    Raises:
+      IOError: if the file-like object has been closed or the read failed.
+    """
+    if not self._file_block_cache:
+      raise IOError(u'Not opened.')
+
+    if size is None:
+      size = self._file_block_cache.size - self._current_offset
+
+    data = self._file_block_cache.Read(self._current_offset, size)
+    self._current_offset += len(data)
+    return data
+
+  def seek(self, offset, whence=os.SEEK_SET):
+    """Seeks an offset within the file-like object.
+
+    Args:
+      offset: The offset to seek.
+      whence: Optional value that indicates whether offset is an absolute
+              or relative position within the file. Default is SEEK_SET.
+
+    Raises:
+      IOError: if the file-like object has been closed or the seek failed.
+    """
+    if not self._file_block_cache:
+      raise IOError(u'Not opened.')
+
+    if whence == os.SEEK_CUR:
+      offset += self._current_offset
+    elif whence == os.SEEK_END:
+      offset += self._file_block_cache.size
+    elif whence != os.SEEK_SET:
+      raise IOError(u'Unsupported whence.')
+
+    if offset < 0:
+      raise IOError(u'Invalid offset value less than zero.')
+
+    self._current_offset = offset
+
+  # Pythonesque alias for get_offset().
+  def tell(self):
+    """Returns the current offset into the file-like object."""
+    return self.get_offset()
@@ -0,0 +1,137 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests the file block cache."""
+
+import hashlib
+import io
+import os
+import unittest
+
+from plaso.engine import block_cache
+from plaso.engine import test_lib
+from plaso.hashers import manager as hashers_manager
+
+
+class TestFileObject(io.BytesIO):
+  """Class that implements a file-like object for testing."""
+
+  def __init__(self, data):
+    """Initializes the file-like object.
+
+    Args:
+      data: a binary string containing the data of the file.
+    """
+    super(TestFileObject, self).__init__(data)
+    self._size = len(data)
+
+  def get_size(self):
+    """Returns the size of the file-like object."""
+    return self._size
+
+
+class FileBlockCacheTest(test_lib.EngineTestCase):
+  """Tests the file block cache."""
+
+  _TEST_DATA = b''.join([chr(index % 251) for index in range(1000)])
+
+  def testGetBlock(self):
+    """Tests the GetBlock function."""
+    file_object = TestFileObject(self._TEST_DATA)
+    test_cache = block_cache.FileBlockCache(
+        file_object, block_size=100, maximum_cache_size=300)
+
+    self.assertEqual(test_cache.GetBlock(0), self._TEST_DATA[0:100])
+    self.assertEqual(test_cache.GetBlock(100), self._TEST_DATA[100:200])
+    self.assertEqual(test_cache.GetBlock(0), self._TEST_DATA[0:100])
+    self.assertEqual(test_cache.number_of_block_reads, 2)
+    self.assertEqual(test_cache.number_of_cache_hits, 1)
+
+    # The least recently used block at offset 100 is evicted.
+    test_cache.GetBlock(200)
+    test_cache.GetBlock(300)
+    test_cache.GetBlock(0)
+    self.assertEqual(test_cache.number_of_block_reads, 4)
+    self.assertEqual(test_cache.number_of_cache_hits, 2)
+
+    test_cache.GetBlock(100)
+    self.assertEqual(test_cache.number_of_block_reads, 5)
+
+    test_cache.Close()
+    self.assertTrue(file_object.closed)
+
+  def testRead(self):
+    """Tests the Read function."""
+    file_object = TestFileObject(self._TEST_DATA)
+    test_cache = block_cache.FileBlockCache(file_object, block_size=100)
+
+    self.assertEqual(test_cache.size, 1000)
+    self.assertEqual(test_cache.Read(50, 200), self._TEST_DATA[50:250])
+    self.assertEqual(test_cache.Read(950, 200), self._TEST_DATA[950:])
+    self.assertEqual(test_cache.Read(1000, 10), b'')
+    self.assertEqual(test_cache.number_of_block_reads, 4)
+
+    test_cache.Close()
+
+  def testDigestHashes(self):
+    """Tests the StartHashers and GetDigestHashes functions."""
+    file_object = TestFileObject(self._TEST_DATA)
+    test_cache = block_cache.FileBlockCache(file_object, block_size=100)
+
+    with self.assertRaises(RuntimeError):
+      test_cache.GetDigestHashes()
+
+    hasher_objects = hashers_manager.HashersManager.GetHasherObjects(
+        [u'md5', u'sha256'])
+    test_cache.StartHashers(hasher_objects)
+
+    # Blocks that are read before the digest hashes are requested are only
+    # read once.
+    test_cache.Read(0, 250)
+    digests = test_cache.GetDigestHashes()
+
+    self.assertEqual(
+        digests[u'md5'], hashlib.md5(self._TEST_DATA).hexdigest())
+    self.assertEqual(
+        digests[u'sha256'], hashlib.sha256(self._TEST_DATA).hexdigest())
+    self.assertEqual(test_cache.number_of_block_reads, 10)
+
+    test_cache.Close()
+
+
+class FileBlockCacheFileObjectTest(test_lib.EngineTestCase):
+  """Tests the file block cache file-like object."""
+
+  _TEST_DATA = b''.join([chr(index % 251) for index in range(1000)])
+
+  def testReadAndSeek(self):
+    """Tests the read and seek functions."""
+    file_object = TestFileObject(self._TEST_DATA)
+    test_cache = block_cache.FileBlockCache(file_object, block_size=100)
+
+    test_file_object = block_cache.FileBlockCacheFileObject(test_cache)
+    self.assertEqual(test_file_object.get_size(), 1000)
+
+    self.assertEqual(test_file_object.read(150), self._TEST_DATA[0:150])
+    self.assertEqual(test_file_object.tell(), 150)
+
+    test_file_object.seek(-100, os.SEEK_END)
+    self.assertEqual(test_file_object.read(), self._TEST_DATA[900:])
+
+    test_file_object.seek(-50, os.SEEK_CUR)
+    self.assertEqual(test_file_object.get_offset(), 950)
+
+    with self.assertRaises(IOError):
+      test_file_object.seek(-1, os.SEEK_SET)
+
+    # Closing the file-like object does not close the file block cache.
+    test_file_object.close()
+    self.assertFalse(file_object.closed)
+
+    with self.assertRaises(IOError):
+      test_file_object.read(1)
+
+    test_cache.Close()
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -27,12 +27,15 @@ class BaseEngine(object):
       storage_queue: the storage queue object (instance of Queue).
       parse_error_queue: the parser error queue object (instance of Queue).
     """
+    self._block_cache_size = None
     self._collection_queue = collection_queue
     self._enable_debug_output = False
     self._enable_profiling = False
     self._event_queue_producer = queue.ItemQueueProducer(storage_queue)
     self._filter_object = None
+    self._enable_parsers_profiling = False
     self._mount_path = None
+    self._number_of_profiled_slowest_files = 0
     self._parse_error_queue = parse_error_queue
     self._parse_error_queue_producer = queue.ItemQueueProducer(
         parse_error_queue)
@@ -148,6 +151,16 @@ class BaseEngine(object):
     preprocess_manager.PreprocessPluginsManager.RunPlugins(
         platform, searcher, self.knowledge_base)
 
+  def SetBlockCacheSize(self, block_cache_size):
+    """Sets the maximum size of the file block cache of the workers.
+
+    Args:
+      block_cache_size: integer value containing the maximum size of the
+                        cached blocks of a file in bytes, where 0 disables
+                        the file block cache.
+    """
+    self._block_cache_size = block_cache_size
+
   def SetEnableDebugOutput(self, enable_debug_output):
     """Enables or disables debug output.
 
@@ -186,6 +199,22 @@ class BaseEngine(object):
     """
     self._mount_path = mount_path
 
+  def SetParsersProfiling(
+      self, enable_parsers_profiling, number_of_slowest_files=0):
+    """Enables or disables profiling of the parsers and plugins.
+
+    Args:
+      enable_parsers_profiling: boolean value to indicate if the time spent
+                                by the parsers and plugins should be
+                                profiled.
+      number_of_slowest_files: optional number of files that took the longest
+                               to process of which cProfile statistics
+                               should be kept. The default is 0, which
+                               disables cProfile.
+    """
+    self._enable_parsers_profiling = enable_parsers_profiling
+    self._number_of_profiled_slowest_files = number_of_slowest_files
+
   def SetProcessArchiveFiles(self, process_archive_files):
     """Sets the process archive files mode.
 
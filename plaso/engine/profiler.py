@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""The parsers and plugins profile."""
+
+import bisect
+import json
+
+
+class ParsersProfile(object):
+  """Class that contains the profile of the parsers and plugins.
+
+  The profile contains per parser chain, e.g. "sqlite/chrome_history",
+  the number of times the parser or plugin was run, the wall-clock and CPU
+  time it spent, and the number of events it produced and bytes it read.
+  The values of a parser chain include those of the plugins in the chain,
+  e.g. the values of "sqlite" include those of "sqlite/chrome_history".
+
+  The profile also contains the files that took the longest to process,
+  optionally with their cProfile statistics.
+  """
+
+  # The indexes of the values of a parser chain.
+  _NUMBER_OF_CALLS = 0
+  _WALL_TIME = 1
+  _CPU_TIME = 2
+  _NUMBER_OF_EVENTS = 3
+  _NUMBER_OF_BYTES_READ = 4
+
+  def __init__(self, maximum_number_of_slowest_files=0):
+    """Initializes the parsers profile object.
+
+    Args:
+      maximum_number_of_slowest_files: Optional maximum number of files that
+                                       took the longest to process that are
+                                       kept. The default is 0.
+    """
+    super(ParsersProfile, self).__init__()
+    self.maximum_number_of_slowest_files = maximum_number_of_slowest_files
+    self.parser_chains = {}
+    # A list of the slowest files, sorted by wall-clock time, containing
+    # tuples of the wall-clock time, display name and profile statistics.
+    self.slowest_files = []
+
+  def AddFileTiming(self, wall_time, display_name, profile_statistics=None):
+    """Adds the time spent processing a file.
+
+    Only the files that took the longest to process are kept.
+
+    Args:
+      wall_time: the wall-clock time in seconds spent processing the file.
+      display_name: the display name of the file.
+      profile_statistics: Optional string containing the cProfile statistics
+                          of processing the file. The default is None.
+    """
+    if not self.IsSlowFile(wall_time):
+      return
+
+    bisect.insort(
+        self.slowest_files, (wall_time, display_name, profile_statistics))
+    if len(self.slowest_files) > self.maximum_number_of_slowest_files:
+      del self.slowest_files[0]
+
+  def AddParserChainTiming(
+      self, parser_chain, wall_time, cpu_time, number_of_events,
+      number_of_bytes_read, number_of_calls=1):
+    """Adds the values of running a parser or plugin.
+
+    Args:
+      parser_chain: the parser chain of the parser or plugin.
+      wall_time: the wall-clock time in seconds.
+      cpu_time: the CPU time in seconds.
+      number_of_events: the number of events produced.
+      number_of_bytes_read: the number of bytes read.
+      number_of_calls: Optional number of times the parser or plugin was run.
+                       The default is 1.
+    """
+    values = self.parser_chains.get(parser_chain, None)
+    if values is None:
+      values = [0, 0.0, 0.0, 0, 0]
+      self.parser_chains[parser_chain] = values
+
+    values[self._NUMBER_OF_CALLS] += number_of_calls
+    values[self._WALL_TIME] += wall_time
+    values[self._CPU_TIME] += cpu_time
+    values[self._NUMBER_OF_EVENTS] += number_of_events
+    values[self._NUMBER_OF_BYTES_READ] += number_of_bytes_read
+
+  def GetParserChainTimings(self):
+    """Retrieves the values of the parser chains.
+
+    Yields:
+      A tuple of the parser chain, number of calls, wall-clock time, CPU time,
+      number of events and number of bytes read, sorted by wall-clock time
+      with the slowest parser chain first.
+    """
+    for parser_chain, values in sorted(
+        self.parser_chains.iteritems(),
+        key=lambda item: item[1][self._WALL_TIME], reverse=True):
+      yield tuple([parser_chain] + values)
+
+  def IsSlowFile(self, wall_time):
+    """Determines if a file is one of the files that took the longest.
+
+    Args:
+      wall_time: the wall-clock time in seconds spent processing the file.
+
+    Returns:
+      A boolean value indicating the file would be kept as one of the files
+      that took the longest to process.
+    """
+    if not self.maximum_number_of_slowest_files:
+      return False
+
+    return (
+        len(self.slowest_files) < self.maximum_number_of_slowest_files or
+        wall_time > self.slowest_files[0][0])
+
+  def Merge(self, parsers_profile):
+    """Merges the values of another parsers profile.
+
+    Args:
+      parsers_profile: the other parsers profile (instance of ParsersProfile).
+    """
+    for parser_chain, values in parsers_profile.parser_chains.iteritems():
+      self.AddParserChainTiming(
+          parser_chain, values[self._WALL_TIME], values[self._CPU_TIME],
+          values[self._NUMBER_OF_EVENTS], values[self._NUMBER_OF_BYTES_READ],
+          number_of_calls=values[self._NUMBER_OF_CALLS])
+
+    self.maximum_number_of_slowest_files = max(
+        self.maximum_number_of_slowest_files,
+        parsers_profile.maximum_number_of_slowest_files)
+
+    for wall_time, display_name, profile_statistics in (
+        parsers_profile.slowest_files):
+      self.AddFileTiming(
+          wall_time, display_name, profile_statistics=profile_statistics)
+
+  @classmethod
+  def ReadSerialized(cls, json_string):
+    """Reads a parsers profile from serialized form.
+
+    Args:
+      json_string: a JSON string containing the serialized form.
+
+    Returns:
+      A parsers profile (instance of ParsersProfile).
+    """
+    json_dict = json.loads(json_string)
+
+    parsers_profile = cls(maximum_number_of_slowest_files=json_dict.get(
+        u'maximum_number_of_slowest_files', 0))
+    parsers_profile.parser_chains = json_dict.get(u'parser_chains', {})
+    parsers_profile.slowest_files = sorted(
+        tuple(values) for values in json_dict.get(u'slowest_files', []))
+    return parsers_profile
+
+  @classmethod
+  def WriteSerialized(cls, parsers_profile):
+    """Writes a parsers profile to serialized form.
+
+    Args:
+      parsers_profile: the parsers profile (instance of ParsersProfile).
+
+    Returns:
+      A JSON string containing the serialized form.
+    """
+    return json.dumps({
+        u'maximum_number_of_slowest_files': (
+            parsers_profile.maximum_number_of_slowest_files),
+        u'parser_chains': parsers_profile.parser_chains,
+        u'slowest_files': parsers_profile.slowest_files})
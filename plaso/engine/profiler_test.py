@@ -0,0 +1,93 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests the parsers and plugins profile."""
+
+import unittest
+
+from plaso.engine import profiler
+
+
+class ParsersProfileTest(unittest.TestCase):
+  """Tests the parsers and plugins profile."""
+
+  def testAddParserChainTiming(self):
+    """Tests the AddParserChainTiming function."""
+    parsers_profile = profiler.ParsersProfile()
+    parsers_profile.AddParserChainTiming(u'sqlite', 3.0, 2.0, 12, 8192)
+    parsers_profile.AddParserChainTiming(
+        u'sqlite/chrome_history', 2.0, 1.5, 10, 4096)
+    parsers_profile.AddParserChainTiming(u'sqlite', 1.0, 0.5, 1, 1024)
+
+    expected_timings = [
+        (u'sqlite', 2, 4.0, 2.5, 13, 9216),
+        (u'sqlite/chrome_history', 1, 2.0, 1.5, 10, 4096)]
+    self.assertEqual(
+        list(parsers_profile.GetParserChainTimings()), expected_timings)
+
+  def testAddFileTiming(self):
+    """Tests the AddFileTiming and IsSlowFile functions."""
+    parsers_profile = profiler.ParsersProfile()
+    self.assertFalse(parsers_profile.IsSlowFile(10.0))
+
+    parsers_profile.AddFileTiming(10.0, u'/tmp/test1')
+    self.assertEqual(parsers_profile.slowest_files, [])
+
+    parsers_profile = profiler.ParsersProfile(
+        maximum_number_of_slowest_files=2)
+    for wall_time, display_name in [
+        (1.0, u'/tmp/test1'), (3.0, u'/tmp/test2'), (2.0, u'/tmp/test3')]:
+      parsers_profile.AddFileTiming(
+          wall_time, display_name, profile_statistics=u'statistics')
+
+    self.assertFalse(parsers_profile.IsSlowFile(1.5))
+    self.assertTrue(parsers_profile.IsSlowFile(2.5))
+
+    expected_slowest_files = [
+        (2.0, u'/tmp/test3', u'statistics'),
+        (3.0, u'/tmp/test2', u'statistics')]
+    self.assertEqual(parsers_profile.slowest_files, expected_slowest_files)
+
+  def testMerge(self):
+    """Tests the Merge function."""
+    parsers_profile = profiler.ParsersProfile()
+    parsers_profile.AddParserChainTiming(u'winreg', 1.0, 1.0, 5, 2048)
+
+    other_parsers_profile = profiler.ParsersProfile(
+        maximum_number_of_slowest_files=1)
+    other_parsers_profile.AddParserChainTiming(u'winreg', 2.0, 1.0, 3, 1024)
+    other_parsers_profile.AddParserChainTiming(u'filestat', 0.5, 0.5, 1, 0)
+    other_parsers_profile.AddFileTiming(4.0, u'/tmp/NTUSER.DAT')
+
+    parsers_profile.Merge(other_parsers_profile)
+
+    expected_timings = [
+        (u'winreg', 2, 3.0, 2.0, 8, 3072),
+        (u'filestat', 1, 0.5, 0.5, 1, 0)]
+    self.assertEqual(
+        list(parsers_profile.GetParserChainTimings()), expected_timings)
+    self.assertEqual(parsers_profile.maximum_number_of_slowest_files, 1)
+    self.assertEqual(
+        parsers_profile.slowest_files, [(4.0, u'/tmp/NTUSER.DAT', None)])
+
+  def testReadWriteSerialized(self):
+    """Tests the ReadSerialized and WriteSerialized functions."""
+    parsers_profile = profiler.ParsersProfile(
+        maximum_number_of_slowest_files=1)
+    parsers_profile.AddParserChainTiming(
+        u'sqlite/chrome_history', 2.0, 1.5, 10, 4096)
+    parsers_profile.AddFileTiming(
+        4.0, u'/tmp/History', profile_statistics=u'statistics')
+
+    json_string = profiler.ParsersProfile.WriteSerialized(parsers_profile)
+    read_parsers_profile = profiler.ParsersProfile.ReadSerialized(json_string)
+
+    self.assertEqual(read_parsers_profile.maximum_number_of_slowest_files, 1)
+    self.assertEqual(
+        list(read_parsers_profile.GetParserChainTimings()),
+        list(parsers_profile.GetParserChainTimings()))
+    self.assertEqual(
+        read_parsers_profile.slowest_files, parsers_profile.slowest_files)
+
+
+if __name__ == '__main__':
+  unittest.main()
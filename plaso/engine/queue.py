@@ -167,6 +167,19 @@ class ItemQueueProducer(QueueProducer):
     """Flushes the queue callback for the QueueFull exception."""
     return
 
+  def Flush(self):
+    """Flushes the items buffered by the producer onto the queue."""
+    return
+
+  def FlushAgedItems(self):
+    """Flushes the buffered items that exceed the maximum age onto the queue.
+
+    This function is called by consumers that produce items while they are
+    idle, so that buffered items are not held back until the next item is
+    produced.
+    """
+    return
+
   def ProduceItem(self, item):
     """Produces an item onto the queue.
 
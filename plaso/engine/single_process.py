@@ -152,6 +152,9 @@ class SingleProcessEngine(engine.BaseEngine):
         self._parse_error_queue_producer, parser_mediator,
         resolver_context=resolver_context)
 
+    if self._block_cache_size is not None:
+      extraction_worker.SetBlockCacheSize(self._block_cache_size)
+
     extraction_worker.SetEnableDebugOutput(self._enable_debug_output)
 
     # TODO: move profiler in separate object.
@@ -159,6 +162,10 @@ class SingleProcessEngine(engine.BaseEngine):
         self._enable_profiling,
         profiling_sample_rate=self._profiling_sample_rate)
 
+    extraction_worker.SetParsersProfiling(
+        self._enable_parsers_profiling,
+        number_of_slowest_files=self._number_of_profiled_slowest_files)
+
     if self._process_archive_files:
       extraction_worker.SetProcessArchiveFiles(self._process_archive_files)
 
@@ -1,13 +1,18 @@
 # -*- coding: utf-8 -*-
 """The event extraction worker."""
 
+import cProfile
+import io
 import logging
 import os
+import pstats
+import time
 
 from dfvfs.analyzer import analyzer
 from dfvfs.lib import definitions as dfvfs_definitions
 from dfvfs.path import factory as path_spec_factory
 from dfvfs.resolver import resolver as path_spec_resolver
+from dfvfs.serializer import json_serializer as dfvfs_json_serializer
 
 try:
   from guppy import hpy
@@ -16,7 +21,9 @@ except ImportError:
 
 import pysigscan
 
+from plaso.engine import block_cache
 from plaso.engine import collector
+from plaso.engine import profiler
 from plaso.engine import queue
 from plaso.lib import errors
 from plaso.hashers import manager as hashers_manager
@@ -36,6 +43,9 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
 
   DEFAULT_HASH_READ_SIZE = 4096
 
+  # The number of lines of cProfile statistics kept per file.
+  _PROFILE_STATISTICS_NUMBER_OF_LINES = 25
+
   def __init__(
       self, identifier, process_queue, event_queue_producer,
       parse_error_queue_producer, parser_mediator, resolver_context=None):
@@ -54,7 +64,10 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
                         The default is None.
     """
     super(BaseEventExtractionWorker, self).__init__(process_queue)
+    self._block_cache_size = (
+        block_cache.FileBlockCache.DEFAULT_MAXIMUM_CACHE_SIZE)
     self._enable_debug_output = False
+    self._file_block_cache = None
     self._hasher_names = None
     self._identifier = identifier
     self._file_scanner = None
@@ -71,11 +84,18 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     self._parse_error_queue_producer = parse_error_queue_producer
 
     # Attributes that contain the current status of the worker.
+    self._current_path_spec = None
     self._current_working_file = u''
     self._is_running = False
+    self._number_of_bytes_read = 0
+    self._number_of_files = 0
+    self._parser_times = {}
+    self._status_update_callback = None
 
     # Attributes for profiling.
     self._enable_profiling = False
+    self._parsers_profile = None
+    self._profile_slowest_files = False
     self._heapy = None
     self._profiling_sample = 0
     self._profiling_sample_rate = 1000
@@ -84,6 +104,70 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
   def _ConsumeItem(self, path_spec):
     """Consumes an item callback for ConsumeItems.
 
+    Args:
+      path_spec: a path specification (instance of dfvfs.PathSpec).
+    """
+    # The path specification is part of the status, so that it can be
+    # processed again if the worker fails.
+    self._current_path_spec = path_spec
+    self._UpdateStatus()
+    try:
+      if self._parsers_profile:
+        self._ProfilePathSpec(path_spec)
+      else:
+        self._ProcessPathSpec(path_spec)
+    finally:
+      self._current_path_spec = None
+      self._number_of_files += 1
+      self._UpdateStatus()
+
+      # The worker can be idle until the next item is consumed, hence
+      # the event objects buffered by the producer are not held back.
+      self._event_queue_producer.FlushAgedItems()
+
+  def _ProfilePathSpec(self, path_spec):
+    """Processes a path specification and profiles the time it takes.
+
+    Args:
+      path_spec: a path specification (instance of dfvfs.PathSpec).
+    """
+    if self._profile_slowest_files:
+      profile = cProfile.Profile()
+      profile.enable()
+    else:
+      profile = None
+
+    start_time = time.time()
+    try:
+      self._ProcessPathSpec(path_spec)
+
+    finally:
+      wall_time = time.time() - start_time
+      if profile:
+        profile.disable()
+
+      if self._parsers_profile.IsSlowFile(wall_time):
+        # Formatting the statistics is expensive, hence it is only done
+        # for the files that took the longest to process.
+        profile_statistics = None
+        if profile:
+          output_stream = io.BytesIO()
+          profile_stats = pstats.Stats(profile, stream=output_stream)
+          profile_stats.sort_stats(u'cumulative').print_stats(
+              self._PROFILE_STATISTICS_NUMBER_OF_LINES)
+          profile_statistics = output_stream.getvalue().decode(
+              u'utf-8', u'replace')
+
+        display_name = getattr(path_spec, u'location', None)
+        if not display_name:
+          display_name = path_spec.comparable
+
+        self._parsers_profile.AddFileTiming(
+            wall_time, display_name, profile_statistics=profile_statistics)
+
+  def _ProcessPathSpec(self, path_spec):
+    """Processes a path specification.
+
     Args:
       path_spec: a path specification (instance of dfvfs.PathSpec).
     """
@@ -95,22 +179,42 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
           path_spec.comparable))
       return
 
-    if self._hasher_names:
+    # The file block cache is shared by the hashers, the signature scanner
+    # and the parsers, so that the content of the file is read only once.
+    if self._block_cache_size and file_entry.IsFile():
+      self._file_block_cache = self._OpenFileBlockCache(file_entry)
+      self._parser_mediator.SetFileBlockCache(self._file_block_cache)
+
+    try:
+      if self._hasher_names:
+        try:
+          digests = self.HashFileEntry(file_entry)
+          if digests:
+            for hash_name, digest in digests.iteritems():
+              attribute_string = u'{0:s}_hash'.format(hash_name)
+              self._parser_mediator.AddEventAttribute(
+                  attribute_string, digest)
+        except IOError as exception:
+          logging.warning(
+              u'Unable to hash file: {0:s} with error: {1:s}'.format(
+                  path_spec.comparable, exception))
+
       try:
-        digests = self.HashFileEntry(file_entry)
-        if digests:
-          for hash_name, digest in digests.iteritems():
-            attribute_string = u'{0:s}_hash'.format(hash_name)
-            self._parser_mediator.AddEventAttribute(attribute_string, digest)
+        self.ParseFileEntry(file_entry)
       except IOError as exception:
-        logging.warning(u'Unable to hash file: {0:s} with error: {1:s}'.format(
-           path_spec.comparable, exception))
+        logging.warning(
+            u'Unable to parse file: {0:s} with error: {1:s}'.format(
+                path_spec.comparable, exception))
 
-    try:
-      self.ParseFileEntry(file_entry)
-    except IOError as exception:
-      logging.warning(u'Unable to parse file: {0:s} with error: {1:s}'.format(
-          path_spec.comparable, exception))
+    finally:
+      if self._file_block_cache:
+        # Only the data that was actually read through the file block cache
+        # is counted, not the size of the file.
+        self._number_of_bytes_read += (
+            self._file_block_cache.number_of_bytes_read)
+        self._parser_mediator.SetFileBlockCache(None)
+        self._file_block_cache.Close()
+        self._file_block_cache = None
 
   def _DebugParseFileEntry(self):
     """Callback for debugging file entry parsing failures."""
@@ -129,7 +233,11 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     parser_name_list = []
     scan_state = pysigscan.scan_state()
 
-    file_object = file_entry.GetFileObject()
+    if self._file_block_cache:
+      file_object = block_cache.FileBlockCacheFileObject(
+          self._file_block_cache)
+    else:
+      file_object = file_entry.GetFileObject()
     try:
       self._file_scanner.scan_file_object(scan_state, file_object)
     finally:
@@ -145,6 +253,35 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
 
     return parser_name_list
 
+  def _OpenFileBlockCache(self, file_entry):
+    """Opens a file block cache of a file entry.
+
+    Args:
+      file_entry: A file entry object (instance of dfvfs.FileEntry).
+
+    Returns:
+      A file block cache (instance of FileBlockCache) or None if the file
+      entry has no data that can be cached.
+    """
+    try:
+      file_object = file_entry.GetFileObject()
+    except IOError as exception:
+      logging.debug(u'Unable to open file: {0:s} with error: {1:s}'.format(
+          file_entry.path_spec.comparable, exception))
+      return
+
+    if not file_object:
+      return
+
+    try:
+      return block_cache.FileBlockCache(
+          file_object, maximum_cache_size=self._block_cache_size)
+    except IOError as exception:
+      file_object.close()
+      logging.debug(
+          u'Unable to determine size of file: {0:s} with error: {1:s}'.format(
+              file_entry.path_spec.comparable, exception))
+
   def _ParseFileEntryWithParser(self, parser_object, file_entry):
     """Parses a file entry with a specific parser.
 
@@ -162,6 +299,7 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
 
     reference_count = self._resolver_context.GetFileObjectReferenceCount(
         file_entry.path_spec)
+    start_time = time.time()
     try:
       parser_object.UpdateChainAndParse(self._parser_mediator)
 
@@ -195,6 +333,9 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
 
     finally:
       self._parser_mediator.SetFileEntry(None)
+      self._parser_times[parser_object.NAME] = (
+          self._parser_times.get(parser_object.NAME, 0.0) +
+          time.time() - start_time)
 
     if reference_count != self._resolver_context.GetFileObjectReferenceCount(
         file_entry.path_spec):
@@ -245,6 +386,13 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
         archive_path_spec = None
 
       if archive_path_spec and self._process_archive_files:
+        if self._file_block_cache:
+          # The file-like object of the archive file is shared through
+          # the resolver context with the file block cache. Since tarfile
+          # reads the archive from the current offset, rewind the file-like
+          # object before the archive file system is opened.
+          self._file_block_cache.RewindFileObject()
+
         try:
           file_system = path_spec_resolver.Resolver.OpenFileSystem(
               archive_path_spec, resolver_context=self._resolver_context)
@@ -311,6 +459,29 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
 
     return True
 
+  def _LogFileEntryAttributesCacheStatistics(self):
+    """Logs the statistics of the file entry attributes cache.
+
+    The time saved by the cache is estimated using the average time it took
+    to determine the attributes of a file entry.
+    """
+    number_of_cache_misses = (
+        self._parser_mediator.number_of_file_entry_attributes_cache_misses)
+    if not number_of_cache_misses:
+      return
+
+    number_of_cache_hits = (
+        self._parser_mediator.number_of_file_entry_attributes_cache_hits)
+    attributes_time = self._parser_mediator.file_entry_attributes_time
+
+    logging.debug((
+        u'Worker {0:d} file entry attributes determined: {1:d} times in '
+        u'{2:.3f} seconds, reused: {3:d} times, estimated time saved: '
+        u'{4:.3f} seconds.').format(
+            self._identifier, number_of_cache_misses, attributes_time,
+            number_of_cache_hits,
+            number_of_cache_hits * attributes_time / number_of_cache_misses))
+
   def _ProfilingStart(self):
     """Starts the profiling."""
     self._heapy.setrelheap()
@@ -338,13 +509,29 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     heap = self._heapy.heap()
     heap.dump(self._profiling_sample_file)
 
+  def _UpdateStatus(self):
+    """Passes the status to the status update callback, if set."""
+    if self._status_update_callback:
+      self._status_update_callback(self.GetStatus())
+
   def GetStatus(self):
     """Returns a status dictionary."""
+    path_spec = self._current_path_spec
+    if path_spec:
+      serializer = dfvfs_json_serializer.JsonPathSpecSerializer
+      path_spec_string = serializer.WriteSerialized(path_spec)
+    else:
+      path_spec_string = u''
+
     return {
         u'is_running': self._is_running,
         u'identifier': u'Worker_{0:d}'.format(self._identifier),
         u'current_file': self._current_working_file,
-        u'counter': self._parser_mediator.number_of_events}
+        u'current_path_spec': path_spec_string,
+        u'counter': self._parser_mediator.number_of_events,
+        u'number_of_bytes_read': self._number_of_bytes_read,
+        u'number_of_files': self._number_of_files,
+        u'parser_times': dict(self._parser_times)}
 
   def HashFileEntry(self, file_entry):
     """Produces a dictionary containing hash digests of the file entry content.
@@ -365,26 +552,35 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     hasher_objects = hashers_manager.HashersManager.GetHasherObjects(
         self._hasher_names)
 
-    file_object = file_entry.GetFileObject()
-    try:
-      file_object.seek(0, os.SEEK_SET)
+    if self._file_block_cache:
+      # The blocks that are read to calculate the digest hashes remain
+      # available in the cache for the signature scanner and the parsers.
+      self._file_block_cache.StartHashers(hasher_objects)
+      digests = self._file_block_cache.GetDigestHashes()
 
-      # We only do one read, then pass it to each of the hashers in turn.
-      data = file_object.read(self.DEFAULT_HASH_READ_SIZE)
-      while data:
-        for hasher in hasher_objects:
-          hasher.Update(data)
+    else:
+      file_object = file_entry.GetFileObject()
+      try:
+        file_object.seek(0, os.SEEK_SET)
+
+        # We only do one read, then pass it to each of the hashers in turn.
         data = file_object.read(self.DEFAULT_HASH_READ_SIZE)
+        while data:
+          for hasher in hasher_objects:
+            hasher.Update(data)
+          data = file_object.read(self.DEFAULT_HASH_READ_SIZE)
 
-      digests = {}
-      # Get the digest values for every active hasher.
-      for hasher in hasher_objects:
-        digests[hasher.NAME] = hasher.GetStringDigest()
-        logging.debug(
-            u'[HashFileEntry] Digest {0:s} calculated for {1:s}.'.format(
-                hasher.GetStringDigest(), file_entry.path_spec.comparable))
-    finally:
-      file_object.close()
+        digests = {}
+        # Get the digest values for every active hasher.
+        for hasher in hasher_objects:
+          digests[hasher.NAME] = hasher.GetStringDigest()
+      finally:
+        file_object.close()
+
+    for hasher_name, digest in digests.iteritems():
+      logging.debug(
+          u'[HashFileEntry] Digest {0:s} calculated for {1:s}.'.format(
+              hasher_name, file_entry.path_spec.comparable))
 
     if self._enable_profiling:
       self._ProfilingUpdate()
@@ -393,6 +589,16 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
         file_entry.path_spec.comparable))
     return digests
 
+  def SetBlockCacheSize(self, block_cache_size):
+    """Sets the maximum size of the file block cache.
+
+    Args:
+      block_cache_size: integer value containing the maximum size of the
+                        cached blocks of a file in bytes, where 0 disables
+                        the file block cache.
+    """
+    self._block_cache_size = block_cache_size
+
   def SetHashers(self, hasher_names_string):
     """Initializes the hasher objects.
 
@@ -492,21 +698,43 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     if self._enable_profiling:
       self._ProfilingUpdate()
 
-  def Run(self):
-    """Extracts event objects from file entries."""
+  def Run(self, path_specs=None):
+    """Extracts event objects from file entries.
+
+    Args:
+      path_specs: Optional list of path specifications (instances of
+                  dfvfs.PathSpec) to process before the path specifications
+                  on the queue, for example the path specification a failed
+                  worker was processing. The default is None.
+    """
     self._parser_mediator.ResetCounters()
 
     if self._enable_profiling:
       self._ProfilingStart()
 
     self._is_running = True
+    self._UpdateStatus()
 
     logging.info(
         u'Worker {0:d} (PID: {1:d}) started monitoring process queue.'.format(
             self._identifier, os.getpid()))
 
+    if path_specs:
+      for path_spec in path_specs:
+        self._ConsumeItem(path_spec)
+
     self.ConsumeItems()
 
+    # The parsers profile is merged by the storage writer.
+    if self._parsers_profile:
+      self._event_queue_producer.ProduceItem(self._parsers_profile)
+
+    # Make sure the event objects buffered by the producer are pushed onto
+    # the storage queue before the worker stops.
+    self._event_queue_producer.Flush()
+
+    self._LogFileEntryAttributesCacheStatistics()
+
     logging.info(
         u'Worker {0:d} (PID: {1:d}) stopped monitoring process queue.'.format(
             self._identifier, os.getpid()))
@@ -514,6 +742,7 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     self._current_working_file = u''
 
     self._is_running = False
+    self._UpdateStatus()
 
     if self._enable_profiling:
       self._ProfilingStop()
@@ -563,6 +792,28 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     """
     self._parser_mediator.SetMountPath(mount_path)
 
+  def SetParsersProfiling(
+      self, enable_parsers_profiling, number_of_slowest_files=0):
+    """Enables or disables profiling of the parsers and plugins.
+
+    Args:
+      enable_parsers_profiling: boolean value to indicate if the time spent
+                                by the parsers and plugins should be
+                                profiled.
+      number_of_slowest_files: optional number of files that took the longest
+                               to process of which cProfile statistics
+                               should be kept. The default is 0, which
+                               disables cProfile.
+    """
+    if enable_parsers_profiling or number_of_slowest_files:
+      self._parsers_profile = profiler.ParsersProfile(
+          maximum_number_of_slowest_files=number_of_slowest_files)
+    else:
+      self._parsers_profile = None
+
+    self._profile_slowest_files = bool(number_of_slowest_files)
+    self._parser_mediator.SetParsersProfile(self._parsers_profile)
+
   def SetProcessArchiveFiles(self, process_archive_files):
     """Sets the process archive files mode.
 
@@ -572,6 +823,18 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     """
     self._process_archive_files = process_archive_files
 
+  def SetStatusUpdateCallback(self, status_update_callback):
+    """Sets the status update callback.
+
+    The callback is passed the status dictionary when the worker starts and
+    stops and before and after it processes a path specification.
+
+    Args:
+      status_update_callback: the status update callback or None to disable
+                              status updates.
+    """
+    self._status_update_callback = status_update_callback
+
   def SetTextPrepend(self, text_prepend):
     """Sets the text prepend.
 
@@ -586,6 +849,10 @@ class BaseEventExtractionWorker(queue.ItemQueueConsumer):
     super(BaseEventExtractionWorker, self).SignalAbort()
     self._parser_mediator.SignalAbort()
 
+  def SignalStop(self):
+    """Signals the worker to stop after the current file entry."""
+    super(BaseEventExtractionWorker, self).SignalAbort()
+
   @classmethod
   def SupportsProfiling(cls):
     """Returns a boolean value to indicate if profiling is supported."""
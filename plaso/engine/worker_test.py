@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 """Tests the worker."""
 
+import hashlib
 import unittest
 
 from dfvfs.lib import definitions as dfvfs_definitions
@@ -191,6 +192,27 @@ class BaseEventExtractionWorkerTest(test_lib.EngineTestCase):
 
     extraction_worker.InitializeParserObjects()
 
+    source_path = self._GetTestFilePath([u'syslog'])
+    path_spec = path_spec_factory.Factory.NewPathSpec(
+        dfvfs_definitions.TYPE_INDICATOR_OS, location=source_path)
+
+    with open(source_path, 'rb') as file_object:
+      expected_digest = hashlib.md5(file_object.read()).hexdigest()
+
+    # The digest hash is calculated both with and without the file block cache.
+    for block_cache_size in [1024, 0]:
+      extraction_worker.SetBlockCacheSize(block_cache_size)
+
+      collection_queue.PushItem(path_spec)
+      extraction_worker.Run()
+
+      test_queue_consumer = test_lib.TestQueueConsumer(storage_queue)
+      test_queue_consumer.ConsumeItems()
+
+      self.assertEqual(test_queue_consumer.number_of_items, 16)
+      for event_object in test_queue_consumer.items:
+        self.assertEqual(event_object.md5_hash, expected_digest)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -13,6 +13,7 @@ to the description_long and description_short field.
 
 import logging
 import re
+import string
 
 from plaso.lib import errors
 
@@ -48,7 +49,123 @@ class EventFormatter(object):
   def __init__(self):
     """Initializes an event formatter object."""
     super(EventFormatter, self).__init__()
+    self._event_value_names = None
     self._format_string_attribute_names = None
+    self._required_event_value_names = None
+    self._unicode_format_strings = None
+
+  def _GetEventValues(self, event_object):
+    """Retrieves the event values that are used by the format strings.
+
+    Only the attributes that are referenced by the format strings are
+    retrieved, instead of all the attributes of the event object. If
+    an attribute that is required by the format strings is missing, all
+    the attributes are retrieved, so that the message string, that is
+    formatted instead, contains them.
+
+    Args:
+      event_object: the event object (instance of EventObject).
+
+    Returns:
+      A dictionary object containing the event (object) values.
+    """
+    if self._event_value_names is None:
+      self._event_value_names, self._required_event_value_names = (
+          self._GetEventValueNames())
+
+    # This is equivalent to GetValues of the event object.
+    attribute_values = event_object.__dict__
+    attribute_names = None
+
+    event_values = {}
+    for attribute_name in self._event_value_names:
+      if attribute_name in attribute_values:
+        event_values[attribute_name] = attribute_values[attribute_name]
+        continue
+
+      # Event objects read from storage can define attributes that are
+      # decoded when they are first accessed.
+      if attribute_names is None:
+        attribute_names = event_object.GetAttributes()
+
+      if attribute_name in attribute_names:
+        event_values[attribute_name] = getattr(event_object, attribute_name)
+
+    for attribute_name in self._required_event_value_names:
+      if attribute_name not in event_values:
+        return event_object.GetValues()
+
+    return event_values
+
+  def _GetEventValueNames(self):
+    """Retrieves the names of the event values used by the format strings.
+
+    Returns:
+      A tuple containing a list of the names of the event values that are
+      used by the format strings and a list of the names of the event values
+      that are required by the format strings.
+    """
+    event_value_names = self._ParseFormatStringAttributeNames(
+        [self.FORMAT_STRING, self.FORMAT_STRING_SHORT])
+    return event_value_names, event_value_names
+
+  def _GetUnicodeFormatStrings(self):
+    """Retrieves the format strings as Unicode strings.
+
+    Returns:
+      A tuple containing the Unicode format string and short format string.
+    """
+    if self._unicode_format_strings is None:
+      format_strings = []
+      for format_string in [self.FORMAT_STRING, self.FORMAT_STRING_SHORT]:
+        # Format strings that are not Unicode are converted when they are
+        # formatted, the first time.
+        if format_string and not isinstance(format_string, unicode):
+          logging.warning(u'Format string: {0:s} is non-Unicode.'.format(
+              format_string))
+          format_string = format_string.decode(u'utf-8', errors=u'ignore')
+
+        format_strings.append(format_string)
+
+      self._unicode_format_strings = tuple(format_strings)
+
+    return self._unicode_format_strings
+
+  def _ParseFormatStringAttributeNames(self, format_strings):
+    """Parses the attribute names in format strings.
+
+    Args:
+      format_strings: a list of format strings.
+
+    Returns:
+      A list containing the attribute names.
+    """
+    attribute_names = []
+    string_formatter = string.Formatter()
+    for format_string in format_strings:
+      if not format_string:
+        continue
+
+      try:
+        parsed_format_string = list(string_formatter.parse(format_string))
+      except ValueError:
+        continue
+
+      for _, field_name, _, _ in parsed_format_string:
+        if not field_name:
+          continue
+
+        # Only keep the attribute name of field names that refer to
+        # an attribute or item of an attribute, e.g. {name.attribute}.
+        attribute_name, _, _ = field_name.partition(u'.')
+        attribute_name, _, _ = attribute_name.partition(u'[')
+        if attribute_name.isdigit():
+          continue
+
+        if attribute_name not in attribute_names:
+          attribute_names.append(attribute_name)
+
+    return attribute_names
 
   def _FormatMessage(self, format_string, event_values):
     """Determines the formatted message string.
@@ -145,9 +262,10 @@ class EventFormatter(object):
       raise errors.WrongFormatter(u'Unsupported data type: {0:s}.'.format(
           event_object.data_type))
 
-    event_values = event_object.GetValues()
+    format_string, short_format_string = self._GetUnicodeFormatStrings()
+    event_values = self._GetEventValues(event_object)
     return self._FormatMessages(
-        self.FORMAT_STRING, self.FORMAT_STRING_SHORT, event_values)
+        format_string, short_format_string, event_values)
 
   def GetSources(self, event_object):
     """Determines the the short and long source for an event object.
@@ -239,6 +357,11 @@ class ConditionalEventFormatter(EventFormatter):
             u'Invalid short format string piece: [{0:s}] contains more '
             u'than 1 attribute name.').format(format_string_piece))
 
+    # The format strings are joined from the format string pieces once for
+    # every combination of pieces that is used and cached.
+    self._format_strings = {}
+    self._short_format_strings = {}
+
   def _ConditionalFormatMessages(self, event_values):
     """Determines the conditional formatted message strings.
 
@@ -250,30 +373,69 @@ class ConditionalEventFormatter(EventFormatter):
     """
     # Using getattr here to make sure the attribute is not set to None.
     # if A.b = None, hasattr(A, b) is True but getattr(A, b, None) is False.
-    string_pieces = []
+    map_indexes = []
     for map_index, attribute_name in enumerate(self._format_string_pieces_map):
-      if not attribute_name or attribute_name in event_values:
-        if attribute_name:
-          attribute = event_values.get(attribute_name, None)
-          # If an attribute is an int, yet has zero value we want to include
-          # that in the format string, since that is still potentially valid
-          # information. Otherwise we would like to skip it.
-          if type(attribute) not in (bool, int, long, float) and not attribute:
-            continue
-        string_pieces.append(self.FORMAT_STRING_PIECES[map_index])
-    format_string = unicode(self.FORMAT_STRING_SEPARATOR.join(string_pieces))
-
-    string_pieces = []
-    for map_index, attribute_name in enumerate(
-        self._format_string_short_pieces_map):
-      if not attribute_name or event_values.get(attribute_name, None):
-        string_pieces.append(self.FORMAT_STRING_SHORT_PIECES[map_index])
-    short_format_string = unicode(
-        self.FORMAT_STRING_SEPARATOR.join(string_pieces))
+      if attribute_name:
+        attribute = event_values.get(attribute_name, None)
+        # If an attribute is an int, yet has zero value we want to include
+        # that in the format string, since that is still potentially valid
+        # information. Otherwise we would like to skip it.
+        if type(attribute) not in (bool, int, long, float) and not attribute:
+          continue
+      map_indexes.append(map_index)
+
+    map_indexes = tuple(map_indexes)
+    format_string = self._format_strings.get(map_indexes, None)
+    if format_string is None:
+      format_string = unicode(self.FORMAT_STRING_SEPARATOR.join([
+          self.FORMAT_STRING_PIECES[map_index] for map_index in map_indexes]))
+      self._format_strings[map_indexes] = format_string
+
+    map_indexes = tuple([
+        map_index for map_index, attribute_name in enumerate(
+            self._format_string_short_pieces_map)
+        if not attribute_name or event_values.get(attribute_name, None)])
+    short_format_string = self._short_format_strings.get(map_indexes, None)
+    if short_format_string is None:
+      short_format_string = unicode(self.FORMAT_STRING_SEPARATOR.join([
+          self.FORMAT_STRING_SHORT_PIECES[map_index]
+          for map_index in map_indexes]))
+      self._short_format_strings[map_indexes] = short_format_string
 
     return self._FormatMessages(
         format_string, short_format_string, event_values)
 
+  def _GetEventValueNames(self):
+    """Retrieves the names of the event values used by the format strings.
+
+    The attribute name of a format string piece is not required, since
+    the piece is left out if the attribute is not set.
+
+    Returns:
+      A tuple containing a list of the names of the event values that are
+      used by the format strings and a list of the names of the event values
+      that are required by the format strings.
+    """
+    event_value_names = []
+    required_event_value_names = []
+    for format_string_pieces, format_string_pieces_map in [
+        (self.FORMAT_STRING_PIECES, self._format_string_pieces_map),
+        (self.FORMAT_STRING_SHORT_PIECES,
+         self._format_string_short_pieces_map)]:
+      for format_string_piece, piece_attribute_name in zip(
+          format_string_pieces, format_string_pieces_map):
+        attribute_names = self._ParseFormatStringAttributeNames(
+            [format_string_piece])
+        for attribute_name in attribute_names:
+          if attribute_name not in event_value_names:
+            event_value_names.append(attribute_name)
+
+          if (attribute_name != piece_attribute_name and
+              attribute_name not in required_event_value_names):
+            required_event_value_names.append(attribute_name)
+
+    return event_value_names, required_event_value_names
+
   def GetFormatStringAttributeNames(self):
     """Retrieves the attribute names in the format string.
 
@@ -309,5 +471,5 @@ class ConditionalEventFormatter(EventFormatter):
       raise errors.WrongFormatter(u'Unsupported data type: {0:s}.'.format(
           event_object.data_type))
 
-    event_values = event_object.GetValues()
+    event_values = self._GetEventValues(event_object)
     return self._ConditionalFormatMessages(event_values)
@@ -8,6 +8,7 @@ from plaso.formatters import interface
 from plaso.formatters import mediator
 from plaso.formatters import test_lib
 from plaso.lib import event_test
+from plaso.serializer import protobuf_serializer
 
 
 class BrokenConditionalEventFormatter(interface.ConditionalEventFormatter):
@@ -67,7 +68,26 @@ class EventFormatterTest(unittest.TestCase):
     attribute_names = event_formatter.GetFormatStringAttributeNames()
     self.assertEqual(sorted(attribute_names), expected_attribute_names)
 
-  # TODO: add test for GetMessages.
+  def testGetMessages(self):
+    """Tests the GetMessages function."""
+    formatter_mediator = mediator.FormatterMediator()
+    event_formatter = test_lib.TestEventFormatter()
+
+    event_object = event_test.TestEvent(1335791207939596, {
+        u'text': u'Reporter <CRON> PID: 8442 (pam_unix(cron:session)'})
+
+    message, message_short = event_formatter.GetMessages(
+        formatter_mediator, event_object)
+    self.assertEqual(message, event_object.text)
+    self.assertEqual(message_short, event_object.text)
+
+    # The message string contains the attribute values if the event object
+    # is missing required attributes.
+    event_formatter = WrongEventFormatter()
+    event_object.data_type = WrongEventFormatter.DATA_TYPE
+    message, _ = event_formatter.GetMessages(formatter_mediator, event_object)
+    self.assertIn(u'text: {0:s}'.format(event_object.text), message)
+
   # TODO: add test for GetSources.
 
 
@@ -111,6 +131,32 @@ class ConditionalEventFormatterTest(unittest.TestCase):
         formatter_mediator, self._event_object)
     self.assertEqual(message, expected_message)
 
+    self._event_object.optional = u'value'
+
+    expected_message = (
+        u'Description: this is beyond words Comment Value: 0x0c '
+        u'Optional: value Text: but we\'re still trying to say something '
+        u'about the event')
+
+    message, _ = event_formatter.GetMessages(
+        formatter_mediator, self._event_object)
+    self.assertEqual(message, expected_message)
+
+    # Test with attributes that are decoded when they are first accessed.
+    lazy_event_object = protobuf_serializer.ProtobufLazyEventObject()
+    lazy_event_object.data_type = u'test:event:conditional'
+    lazy_event_object.timestamp = 1335791207939596
+    lazy_event_object.numeric = 12
+    lazy_event_object.AddLazyAttribute(
+        u'description', unicode, u'this is beyond words')
+    lazy_event_object.AddLazyAttribute(u'optional', unicode, u'value')
+    lazy_event_object.text = (
+        u'but we\'re still trying to say something about the event')
+
+    message, _ = event_formatter.GetMessages(
+        formatter_mediator, lazy_event_object)
+    self.assertEqual(message, expected_message)
+
   # TODO: add test for GetSources.
 
 
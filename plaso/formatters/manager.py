@@ -66,6 +66,9 @@ class FormattersManager(object):
   def GetMessageStrings(cls, formatter_mediator, event_object):
     """Retrieves the formatted message strings for a specific event object.
 
+    The message strings are retrieved from the message cache of the formatter
+    mediator if available.
+
     Args:
       formatter_mediator: the formatter mediator object (instance of
                           FormatterMediator).
@@ -75,8 +78,14 @@ class FormattersManager(object):
       A list that contains both the longer and shorter version of the message
       string.
     """
-    formatter_object = cls.GetFormatterObject(event_object.data_type)
-    return formatter_object.GetMessages(formatter_mediator, event_object)
+    message_strings = formatter_mediator.GetCachedMessageStrings(event_object)
+    if message_strings is None:
+      formatter_object = cls.GetFormatterObject(event_object.data_type)
+      message_strings = formatter_object.GetMessages(
+          formatter_mediator, event_object)
+      formatter_mediator.CacheMessageStrings(event_object, message_strings)
+
+    return message_strings
 
   @classmethod
   def GetSourceStrings(cls, event_object):
@@ -93,6 +93,24 @@ class FormattersManagerTest(unittest.TestCase):
 
     manager.FormattersManager.DeregisterFormatter(test_lib.TestEventFormatter)
 
+  def testMessageStringsCache(self):
+    """Tests the GetMessageStrings function with a message cache."""
+    formatter_mediator = mediator.FormatterMediator()
+    formatter_mediator.SetMessageCacheSize(16)
+
+    event_object = self._event_objects[0]
+    event_object.store_number = 1
+    event_object.store_index = 0
+
+    message_strings = manager.FormattersManager.GetMessageStrings(
+        formatter_mediator, event_object)
+    self.assertEqual(formatter_mediator.number_of_message_cache_misses, 1)
+
+    cached_message_strings = manager.FormattersManager.GetMessageStrings(
+        formatter_mediator, event_object)
+    self.assertEqual(cached_message_strings, message_strings)
+    self.assertEqual(formatter_mediator.number_of_message_cache_hits, 1)
+
 
 if __name__ == '__main__':
   unittest.main()
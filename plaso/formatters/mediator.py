@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """The formatter mediator object."""
 
+import collections
 import os
 
 from plaso.formatters import winevt_rc
@@ -16,6 +17,12 @@ class FormatterMediator(object):
   # LCID 0x0409 is en-US.
   DEFAULT_LCID = 0x0409
 
+  # The names of the event object attributes that can be changed after
+  # the event object was read from storage, e.g. when the output event buffer
+  # merges duplicate event objects, and are part of the message cache key.
+  _MESSAGE_CACHE_KEY_ATTRIBUTE_NAMES = [
+      u'display_name', u'filename', u'inode', u'timestamp_desc']
+
   _WINEVT_RC_DATABASE = u'winevt-rc.db'
 
   def __init__(self, data_location=None):
@@ -29,8 +36,33 @@ class FormatterMediator(object):
     self._data_location = data_location
     self._language_identifier = self.DEFAULT_LANGUAGE_IDENTIFIER
     self._lcid = self.DEFAULT_LCID
+    self._maximum_message_cache_size = 0
+    self._message_cache = collections.OrderedDict()
     self._winevt_database_reader = None
 
+    self.number_of_message_cache_hits = 0
+    self.number_of_message_cache_misses = 0
+
+  def _GetMessageCacheKey(self, event_object):
+    """Retrieves the message cache key of an event object.
+
+    Args:
+      event_object: the event object (instance of EventObject).
+
+    Returns:
+      A tuple containing the message cache key or None if the event object
+      has no storage location and cannot be cached.
+    """
+    store_number = getattr(event_object, u'store_number', None)
+    store_index = getattr(event_object, u'store_index', None)
+    if store_number is None or store_index is None:
+      return
+
+    cache_key = [store_number, store_index]
+    for attribute_name in self._MESSAGE_CACHE_KEY_ATTRIBUTE_NAMES:
+      cache_key.append(getattr(event_object, attribute_name, None))
+    return tuple(cache_key)
+
   def _GetWinevtRcDatabaseReader(self):
     """Opens the Windows Event Log resource database reader.
 
@@ -55,6 +87,71 @@ class FormatterMediator(object):
     """The preferred Language Code identifier (LCID)."""
     return self._lcid
 
+  def CacheMessageStrings(self, event_object, message_strings):
+    """Caches the formatted message strings of an event object.
+
+    The least recently used message strings are removed from the cache
+    when the maximum cache size is reached.
+
+    Args:
+      event_object: the event object (instance of EventObject).
+      message_strings: a tuple containing the formatted message string and
+                       short message string.
+    """
+    if not self._maximum_message_cache_size:
+      return
+
+    cache_key = self._GetMessageCacheKey(event_object)
+    if cache_key is None:
+      return
+
+    if len(self._message_cache) >= self._maximum_message_cache_size:
+      self._message_cache.popitem(last=False)
+
+    self._message_cache[cache_key] = message_strings
+
+  def GetCachedMessageStrings(self, event_object):
+    """Retrieves the cached formatted message strings of an event object.
+
+    Args:
+      event_object: the event object (instance of EventObject).
+
+    Returns:
+      A tuple containing the formatted message string and short message
+      string or None if not cached.
+    """
+    if not self._maximum_message_cache_size:
+      return
+
+    cache_key = self._GetMessageCacheKey(event_object)
+    if cache_key is None:
+      return
+
+    message_strings = self._message_cache.pop(cache_key, None)
+    if message_strings is None:
+      self.number_of_message_cache_misses += 1
+      return
+
+    self.number_of_message_cache_hits += 1
+
+    # Re-insert the message strings to mark them as the most recently used.
+    self._message_cache[cache_key] = message_strings
+    return message_strings
+
+  def GetWindowsEventMessageCacheStatistics(self):
+    """Retrieves the Windows Event Log message strings cache statistics.
+
+    Returns:
+      A tuple containing the number of cache hits and misses of
+      the Windows Event Log resource database reader.
+    """
+    if not self._winevt_database_reader:
+      return 0, 0
+
+    return (
+        self._winevt_database_reader.number_of_cache_hits,
+        self._winevt_database_reader.number_of_cache_misses)
+
   def GetWindowsEventMessage(self, log_source, message_identifier):
     """Retrieves the message string for a specific Windows Event Log source.
 
@@ -99,3 +196,17 @@ class FormatterMediator(object):
           language_identifier))
     self._language_identifier = language_identifier
     self._lcid = values[0]
+
+    # The Windows Event Log message strings depend on the language.
+    self._message_cache = collections.OrderedDict()
+
+  def SetMessageCacheSize(self, maximum_message_cache_size):
+    """Sets the maximum size of the formatted message strings cache.
+
+    Args:
+      maximum_message_cache_size: the maximum number of event objects of which
+                                  the formatted message strings are cached,
+                                  where 0 disables the cache.
+    """
+    self._maximum_message_cache_size = maximum_message_cache_size
+    self._message_cache = collections.OrderedDict()
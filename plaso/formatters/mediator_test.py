@@ -5,6 +5,7 @@
 import unittest
 
 from plaso.formatters import mediator
+from plaso.lib import event
 
 
 class FormatterMediatorTest(unittest.TestCase):
@@ -15,6 +16,48 @@ class FormatterMediatorTest(unittest.TestCase):
     formatter_mediator = mediator.FormatterMediator()
     self.assertNotEqual(formatter_mediator, None)
 
+  def testMessageCache(self):
+    """Tests the CacheMessageStrings and GetCachedMessageStrings functions."""
+    formatter_mediator = mediator.FormatterMediator()
+
+    event_objects = []
+    for store_index in range(3):
+      event_object = event.EventObject()
+      event_object.store_number = 1
+      event_object.store_index = store_index
+      event_objects.append(event_object)
+
+    message_strings = (u'message', u'short message')
+
+    # The message cache is disabled by default.
+    formatter_mediator.CacheMessageStrings(event_objects[0], message_strings)
+    self.assertIsNone(
+        formatter_mediator.GetCachedMessageStrings(event_objects[0]))
+
+    formatter_mediator.SetMessageCacheSize(2)
+    for event_object in event_objects:
+      formatter_mediator.CacheMessageStrings(event_object, message_strings)
+
+    # The least recently used message strings are removed from the cache.
+    self.assertIsNone(
+        formatter_mediator.GetCachedMessageStrings(event_objects[0]))
+    self.assertEqual(
+        formatter_mediator.GetCachedMessageStrings(event_objects[2]),
+        message_strings)
+    self.assertEqual(formatter_mediator.number_of_message_cache_hits, 1)
+    self.assertEqual(formatter_mediator.number_of_message_cache_misses, 1)
+
+    # Changing an attribute that is merged by the output event buffer changes
+    # the message cache key.
+    event_objects[2].filename = u'/tmp/test'
+    self.assertIsNone(
+        formatter_mediator.GetCachedMessageStrings(event_objects[2]))
+
+    # Event objects that were not read from storage are not cached.
+    event_object = event.EventObject()
+    formatter_mediator.CacheMessageStrings(event_object, message_strings)
+    self.assertIsNone(formatter_mediator.GetCachedMessageStrings(event_object))
+
 
 if __name__ == '__main__':
   unittest.main()
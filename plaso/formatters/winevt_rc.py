@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 """Windows Event Log resources database reader."""
 
+import collections
 import re
 
 import sqlite3
@@ -12,13 +13,17 @@ class Sqlite3DatabaseFile(object):
 
   _HAS_TABLE_QUERY = (
       u'SELECT name FROM sqlite_master '
-      u'WHERE type = "table" AND name = "{0:s}"')
+      u'WHERE type = "table" AND name = ?')
+
+  _TABLE_NAMES_QUERY = (
+      u'SELECT name FROM sqlite_master WHERE type = "table"')
 
   def __init__(self):
     """Initializes the database file object."""
     super(Sqlite3DatabaseFile, self).__init__()
     self._connection = None
     self._cursor = None
+    self._table_names = None
     self.filename = None
     self.read_only = None
 
@@ -37,6 +42,7 @@ class Sqlite3DatabaseFile(object):
 
     self._connection = None
     self._cursor = None
+    self._table_names = None
     self.filename = None
     self.read_only = None
 
@@ -56,21 +62,29 @@ class Sqlite3DatabaseFile(object):
       raise RuntimeError(
           u'Cannot determine if table exists database not opened.')
 
-    sql_query = self._HAS_TABLE_QUERY.format(table_name)
+    # The tables of a read-only database are determined when it is opened.
+    if self._table_names is not None:
+      return table_name in self._table_names
 
-    self._cursor.execute(sql_query)
+    self._cursor.execute(self._HAS_TABLE_QUERY, (table_name, ))
     if self._cursor.fetchone():
       return True
 
     return False
 
-  def GetValues(self, table_names, column_names, condition):
+  def GetValues(self, table_names, column_names, condition, parameters=None):
     """Retrieves values from a table.
 
+    The values in the condition should be passed as parameters, so that
+    the query string is the same for every value and the prepared statement
+    is reused from the statement cache of the sqlite3 connection.
+
     Args:
       table_names: list of table names.
       column_names: list of column names.
       condition: string containing the condition.
+      parameters: optional tuple containing the values of the parameters,
+                  the question mark place holders, in the condition.
 
     Yields:
       A row object (instance of sqlite3.row).
@@ -87,7 +101,10 @@ class Sqlite3DatabaseFile(object):
     sql_query = u'SELECT {1:s} FROM {0:s}{2:s}'.format(
         u', '.join(table_names), u', '.join(column_names), condition)
 
-    self._cursor.execute(sql_query)
+    if parameters:
+      self._cursor.execute(sql_query, parameters)
+    else:
+      self._cursor.execute(sql_query)
 
     # TODO: have a look at https://docs.python.org/2/library/
     # sqlite3.html#sqlite3.Row.
@@ -128,6 +145,10 @@ class Sqlite3DatabaseFile(object):
     if not self._cursor:
       return False
 
+    if read_only:
+      self._cursor.execute(self._TABLE_NAMES_QUERY)
+      self._table_names = frozenset([row[0] for row in self._cursor])
+
     return True
 
 
@@ -167,11 +188,41 @@ class WinevtResourcesSqlite3DatabaseReader(Sqlite3DatabaseReader):
   # Message string specifiers that expand to a variable place holder.
   _PLACE_HOLDER_SPECIFIER_RE = re.compile(r'%([1-9][0-9]?)[!]?[s]?[!]?')
 
-  def __init__(self):
-    """Initializes the database reader object."""
+  # The default maximum number of cached message strings.
+  DEFAULT_MAXIMUM_CACHE_SIZE = 4096
+
+  def __init__(self, maximum_cache_size=DEFAULT_MAXIMUM_CACHE_SIZE):
+    """Initializes the database reader object.
+
+    Args:
+      maximum_cache_size: optional maximum number of cached message strings
+                          and message file keys.
+    """
     super(WinevtResourcesSqlite3DatabaseReader, self).__init__()
+    self._maximum_cache_size = maximum_cache_size
+    self._message_file_keys_cache = collections.OrderedDict()
+    self._message_strings_cache = collections.OrderedDict()
     self._string_format = u'wrc'
 
+    self.number_of_cache_hits = 0
+    self.number_of_cache_misses = 0
+
+  def _CacheValue(self, cache, key, value):
+    """Caches a value in a least recently used (LRU) cache.
+
+    Args:
+      cache: the cache (instance of collections.OrderedDict).
+      key: the key of the value.
+      value: the value, which can be None.
+    """
+    if not self._maximum_cache_size:
+      return
+
+    if len(cache) >= self._maximum_cache_size:
+      cache.popitem(last=False)
+
+    cache[key] = value
+
   def _GetEventLogProviderKey(self, log_source):
     """Retrieves the Event Log provider key.
 
@@ -186,10 +237,10 @@ class WinevtResourcesSqlite3DatabaseReader(Sqlite3DatabaseReader):
     """
     table_names = [u'event_log_providers']
     column_names = [u'event_log_provider_key']
-    condition = u'log_source == "{0:s}"'.format(log_source)
+    condition = u'log_source == ?'
 
     values_list = list(self._database_file.GetValues(
-        table_names, column_names, condition))
+        table_names, column_names, condition, parameters=(log_source, )))
 
     number_of_values = len(values_list)
     if number_of_values == 0:
@@ -222,10 +273,11 @@ class WinevtResourcesSqlite3DatabaseReader(Sqlite3DatabaseReader):
       return
 
     column_names = [u'message_string']
-    condition = u'message_identifier == "0x{0:08x}"'.format(message_identifier)
+    condition = u'message_identifier == ?'
+    parameters = (u'0x{0:08x}'.format(message_identifier), )
 
     values = list(self._database_file.GetValues(
-        [table_name], column_names, condition))
+        [table_name], column_names, condition, parameters=parameters))
 
     number_of_values = len(values)
     if number_of_values == 0:
@@ -247,11 +299,11 @@ class WinevtResourcesSqlite3DatabaseReader(Sqlite3DatabaseReader):
     """
     table_names = [u'message_file_per_event_log_provider']
     column_names = [u'message_file_key']
-    condition = u'event_log_provider_key == {0:d}'.format(
-        event_log_provider_key)
+    condition = u'event_log_provider_key == ?'
 
     generator = self._database_file.GetValues(
-        table_names, column_names, condition)
+        table_names, column_names, condition,
+        parameters=(event_log_provider_key, ))
 
     if generator:
       for values in generator:
@@ -289,9 +341,37 @@ class WinevtResourcesSqlite3DatabaseReader(Sqlite3DatabaseReader):
     return self._PLACE_HOLDER_SPECIFIER_RE.sub(
         place_holder_specifier_replacer, message_string)
 
+  def _GetMessageFileKeysOfLogSource(self, log_source):
+    """Retrieves the message file keys of a specific Event Log source.
+
+    Args:
+      log_source: the Event Log source.
+
+    Returns:
+      A tuple containing the message file keys or None if the Event Log
+      provider is not available.
+    """
+    if log_source in self._message_file_keys_cache:
+      message_file_keys = self._message_file_keys_cache.pop(log_source)
+
+    else:
+      event_log_provider_key = self._GetEventLogProviderKey(log_source)
+      if not event_log_provider_key:
+        message_file_keys = None
+      else:
+        message_file_keys = tuple(
+            self._GetMessageFileKeys(event_log_provider_key))
+
+    self._CacheValue(
+        self._message_file_keys_cache, log_source, message_file_keys)
+    return message_file_keys
+
   def GetMessage(self, log_source, lcid, message_identifier):
     """Retrieves a specific message for a specific Event Log source.
 
+    The reformatted message strings, including the message strings that are
+    not available, are cached.
+
     Args:
       log_source: the Event Log source.
       lcid: the language code identifier (LCID).
@@ -300,26 +380,28 @@ class WinevtResourcesSqlite3DatabaseReader(Sqlite3DatabaseReader):
     Returns:
       The message string or None if not available.
     """
-    event_log_provider_key = self._GetEventLogProviderKey(log_source)
-    if not event_log_provider_key:
-      return
+    cache_key = (log_source, lcid, message_identifier)
+    if cache_key in self._message_strings_cache:
+      self.number_of_cache_hits += 1
+      message_string = self._message_strings_cache.pop(cache_key)
+      self._message_strings_cache[cache_key] = message_string
+      return message_string
 
-    generator = self._GetMessageFileKeys(event_log_provider_key)
-    if not generator:
-      return
+    self.number_of_cache_misses += 1
 
-    # TODO: cache a number of message strings.
     message_string = None
-    for message_file_key in generator:
+    message_file_keys = self._GetMessageFileKeysOfLogSource(log_source)
+    for message_file_key in message_file_keys or []:
       message_string = self._GetMessage(
           message_file_key, lcid, message_identifier)
 
       if message_string:
         break
 
-    if self._string_format == u'wrc':
+    if message_file_keys is not None and self._string_format == u'wrc':
       message_string = self._ReformatMessageString(message_string)
 
+    self._CacheValue(self._message_strings_cache, cache_key, message_string)
     return message_string
 
   def GetMetadataAttribute(self, attribute_name):
@@ -371,6 +453,9 @@ class WinevtResourcesSqlite3DatabaseReader(Sqlite3DatabaseReader):
     if not super(WinevtResourcesSqlite3DatabaseReader, self).Open(filename):
       return False
 
+    self._message_file_keys_cache = collections.OrderedDict()
+    self._message_strings_cache = collections.OrderedDict()
+
     version = self.GetMetadataAttribute(u'version')
     if not version or version not in [u'20150315']:
       raise RuntimeError(u'Unsupported version: {0:s}'.format(version))
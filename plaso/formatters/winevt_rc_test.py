@@ -3,6 +3,9 @@
 """Tests for the Windows Event Log resources database reader."""
 
 import os
+import shutil
+import sqlite3
+import tempfile
 import unittest
 
 from plaso.formatters import winevt_rc
@@ -38,6 +41,67 @@ class WinevtResourcesSqlite3DatabaseReaderTest(unittest.TestCase):
 
     database_reader.Close()
 
+  def testGetMessageCache(self):
+    """Tests the GetMessage function with cached message strings."""
+    temporary_directory = tempfile.mkdtemp()
+    try:
+      database_path = os.path.join(temporary_directory, u'winevt-rc.db')
+
+      connection = sqlite3.connect(database_path)
+      connection.executescript((
+          u'CREATE TABLE metadata (name TEXT, value TEXT);'
+          u'INSERT INTO metadata VALUES ("version", "20150315");'
+          u'CREATE TABLE event_log_providers ('
+          u'event_log_provider_key INTEGER, log_source TEXT);'
+          u'INSERT INTO event_log_providers VALUES (1, "Test Source");'
+          u'CREATE TABLE message_file_per_event_log_provider ('
+          u'message_file_key INTEGER, event_log_provider_key INTEGER);'
+          u'INSERT INTO message_file_per_event_log_provider VALUES (1, 1);'
+          u'CREATE TABLE message_table_1_0x00000409 ('
+          u'message_identifier TEXT, message_string TEXT);'
+          u'INSERT INTO message_table_1_0x00000409 VALUES ('
+          u'"0x00000001", "Service %1 entered the %2 state.");'))
+      connection.commit()
+      connection.close()
+
+      database_reader = winevt_rc.WinevtResourcesSqlite3DatabaseReader(
+          maximum_cache_size=2)
+      database_reader.Open(database_path)
+
+      expected_message_string = u'Service {0:s} entered the {1:s} state.'
+
+      for _ in range(2):
+        message_string = database_reader.GetMessage(
+            u'Test Source', 0x00000409, 0x00000001)
+        self.assertEqual(message_string, expected_message_string)
+
+      self.assertEqual(database_reader.number_of_cache_hits, 1)
+      self.assertEqual(database_reader.number_of_cache_misses, 1)
+
+      # Message strings that are not available are cached as well.
+      for _ in range(2):
+        message_string = database_reader.GetMessage(
+            u'Test Source', 0x00000413, 0x00000001)
+        self.assertIsNone(message_string)
+
+      message_string = database_reader.GetMessage(
+          u'Bogus Source', 0x00000409, 0x00000001)
+      self.assertIsNone(message_string)
+
+      self.assertEqual(database_reader.number_of_cache_hits, 2)
+      self.assertEqual(database_reader.number_of_cache_misses, 3)
+
+      # The least recently used message string was removed from the cache.
+      message_string = database_reader.GetMessage(
+          u'Test Source', 0x00000409, 0x00000001)
+      self.assertEqual(message_string, expected_message_string)
+      self.assertEqual(database_reader.number_of_cache_misses, 4)
+
+      database_reader.Close()
+
+    finally:
+      shutil.rmtree(temporary_directory, True)
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -35,6 +35,9 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
   # Approximately 250 MB of queued items per worker.
   _DEFAULT_QUEUE_SIZE = 125000
 
+  # The interval in seconds in which the status of the workers is checked.
+  _DEFAULT_STATUS_INTERVAL = 10
+
   _EVENT_SERIALIZER_FORMAT_PROTO = u'proto'
   _EVENT_SERIALIZER_FORMAT_JSON = u'json'
 
@@ -52,15 +55,20 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
                      output writer.
     """
     super(ExtractionFrontend, self).__init__(input_reader, output_writer)
+    self._adaptive_workers = False
+    self._block_cache_size = None
     self._buffer_size = 0
     self._collection_process = None
     self._collector = None
     self._debug_mode = False
+    self._enable_parsers_profiling = False
     self._enable_profiling = False
     self._engine = None
     self._filter_expression = None
     self._filter_object = None
     self._mount_path = None
+    self._number_of_profiled_slowest_files = 0
+    self._number_of_storage_writers = 1
     self._number_of_worker_processes = 0
     self._old_preprocess = False
     self._operating_system = None
@@ -73,9 +81,12 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
     self._run_foreman = True
     self._single_process_mode = False
     self._show_worker_memory_information = False
+    self._status_file = None
+    self._status_interval = self._DEFAULT_STATUS_INTERVAL
     self._storage_file_path = None
     self._storage_serializer_format = self._EVENT_SERIALIZER_FORMAT_PROTO
     self._timezone = pytz.utc
+    self._use_shared_memory_queue = False
 
   def _CheckStorageFile(self, storage_file_path):
     """Checks if the storage file path is valid.
@@ -311,13 +322,29 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
 
     logging.info(u'Starting extraction in multi process mode.')
 
+    # The bypass storage writer writes to a single output module, hence it
+    # does not support multiple storage writers.
+    number_of_storage_writers = self._number_of_storage_writers
+    if self._output_module and number_of_storage_writers > 1:
+      logging.warning(
+          u'Multiple storage writers not supported with an output module.')
+      number_of_storage_writers = 1
+
     self._engine = multi_process.MultiProcessEngine(
-        maximum_number_of_queued_items=self._queue_size)
+        maximum_number_of_queued_items=self._queue_size,
+        number_of_storage_writers=number_of_storage_writers,
+        use_shared_memory_queue=self._use_shared_memory_queue)
+
+    if self._block_cache_size is not None:
+      self._engine.SetBlockCacheSize(self._block_cache_size)
 
     self._engine.SetEnableDebugOutput(self._debug_mode)
     self._engine.SetEnableProfiling(
         self._enable_profiling,
         profiling_sample_rate=self._profiling_sample_rate)
+    self._engine.SetParsersProfiling(
+        self._enable_parsers_profiling,
+        number_of_slowest_files=self._number_of_profiled_slowest_files)
     self._engine.SetProcessArchiveFiles(self._process_archive_files)
 
     if self._filter_object:
@@ -396,7 +423,10 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
           number_of_extraction_workers=self._number_of_worker_processes,
           have_collection_process=start_collection_process,
           have_foreman_process=self._run_foreman,
-          show_memory_usage=self._show_worker_memory_information)
+          show_memory_usage=self._show_worker_memory_information,
+          adaptive_workers=self._adaptive_workers,
+          status_file=self._status_file,
+          status_interval=self._status_interval)
 
     except KeyboardInterrupt:
       self._CleanUpAfterAbort()
@@ -441,10 +471,16 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
       options: the command line arguments (instance of argparse.Namespace).
     """
     self._engine = single_process.SingleProcessEngine(self._queue_size)
+    if self._block_cache_size is not None:
+      self._engine.SetBlockCacheSize(self._block_cache_size)
+
     self._engine.SetEnableDebugOutput(self._debug_mode)
     self._engine.SetEnableProfiling(
         self._enable_profiling,
         profiling_sample_rate=self._profiling_sample_rate)
+    self._engine.SetParsersProfiling(
+        self._enable_parsers_profiling,
+        number_of_slowest_files=self._number_of_profiled_slowest_files)
     self._engine.SetProcessArchiveFiles(self._process_archive_files)
 
     if self._filter_object:
@@ -548,6 +584,19 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
             u'Enable debug mode. Intended for troubleshooting parsing '
             u'issues.'))
 
+    argument_group.add_argument(
+        '--status_interval', '--status-interval', dest='status_interval',
+        action='store', default=None, help=(
+            u'The interval in seconds in which the status of the worker '
+            u'processes is checked (defaults to {0:d}).').format(
+                self._DEFAULT_STATUS_INTERVAL))
+
+    argument_group.add_argument(
+        '--status_file', '--status-file', dest='status_file', action='store',
+        default=None, help=(
+            u'Path of a file to which the status of the worker processes is '
+            u'written in JSON every status interval, for monitoring.'))
+
   def AddPerformanceOptions(self, argument_group):
     """Adds the performance options to the argument group.
 
@@ -560,12 +609,55 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
         action='store', default=0,
         help=u'The buffer size for the output (defaults to 196MiB).')
 
+    argument_group.add_argument(
+        '--adaptive_workers', '--adaptive-workers', dest='adaptive_workers',
+        action='store_true', default=False, help=(
+            u'Let the foreman grow and shrink the number of worker processes '
+            u'based on the number of queued items and the CPU usage of '
+            u'the workers.'))
+
+    argument_group.add_argument(
+        '--block_cache_size', '--block-cache-size', dest='block_cache_size',
+        action='store', default=None, help=(
+            u'The maximum size in bytes of the blocks of a file that are '
+            u'cached while the file is hashed and parsed, where 0 disables '
+            u'the block cache (defaults to 16MiB).'))
+
     argument_group.add_argument(
         '--queue_size', '--queue-size', dest='queue_size', action='store',
         default=0, help=(
             u'The maximum number of queued items per worker '
             u'(defaults to {0:d})').format(self._DEFAULT_QUEUE_SIZE))
 
+    argument_group.add_argument(
+        '--shared_memory_queue', '--shared-memory-queue',
+        dest='shared_memory_queue', action='store_true', default=False, help=(
+            u'Use queues backed by a shared memory ring buffer instead of '
+            u'multiprocessing queues to transfer the path specifications and '
+            u'event objects between the processes.'))
+
+    argument_group.add_argument(
+        '--storage_writers', '--storage-writers', dest='storage_writers',
+        action='store', default=None, help=(
+            u'The number of storage writer processes (defaults to 1). Every '
+            u'storage writer writes a shard of the storage file, the shards '
+            u'are added to the storage file when extraction is completed.'))
+
+    argument_group.add_argument(
+        '--profile_parsers', '--profile-parsers',
+        dest='enable_parsers_profiling', action='store_true', default=False,
+        help=(
+            u'Enable profiling of the parsers and plugins. The time spent, '
+            u'number of events produced and bytes read per parser chain are '
+            u'stored in the storage file, use pinfo to report them.'))
+
+    argument_group.add_argument(
+        '--profile_slowest_files', '--profile-slowest-files',
+        dest='profile_slowest_files', action='store', default=None, help=(
+            u'The number of files that took the longest to process to keep '
+            u'per worker together with their cProfile statistics, requires '
+            u'--profile_parsers (defaults to 0).'))
+
     if worker.BaseEventExtractionWorker.SupportsProfiling():
       argument_group.add_argument(
           '--profile', dest='enable_profiling', action='store_true',
@@ -616,6 +708,14 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
         raise errors.BadConfigOption(
             u'Invalid buffer size: {0:s}.'.format(self._buffer_size))
 
+    block_cache_size = getattr(options, 'block_cache_size', None)
+    if block_cache_size is not None:
+      try:
+        self._block_cache_size = int(block_cache_size, 10)
+      except ValueError:
+        raise errors.BadConfigOption(
+            u'Invalid block cache size: {0:s}.'.format(block_cache_size))
+
     queue_size = getattr(options, 'queue_size', None)
     if queue_size:
       try:
@@ -624,6 +724,39 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
         raise errors.BadConfigOption(
             u'Invalid queue size: {0:s}.'.format(queue_size))
 
+    storage_writers = getattr(options, 'storage_writers', None)
+    if storage_writers:
+      try:
+        self._number_of_storage_writers = int(storage_writers, 10)
+      except ValueError:
+        raise errors.BadConfigOption(
+            u'Invalid number of storage writers: {0:s}.'.format(
+                storage_writers))
+
+      if self._number_of_storage_writers < 1:
+        raise errors.BadConfigOption(
+            u'Invalid number of storage writers: {0:d}.'.format(
+                self._number_of_storage_writers))
+
+    self._use_shared_memory_queue = getattr(
+        options, 'shared_memory_queue', False)
+
+    self._adaptive_workers = getattr(options, 'adaptive_workers', False)
+
+    status_interval = getattr(options, 'status_interval', None)
+    if status_interval:
+      try:
+        self._status_interval = int(status_interval, 10)
+      except ValueError:
+        raise errors.BadConfigOption(
+            u'Invalid status interval: {0:s}.'.format(status_interval))
+
+      if self._status_interval < 1:
+        raise errors.BadConfigOption(
+            u'Invalid status interval: {0:d}.'.format(self._status_interval))
+
+    self._status_file = getattr(options, 'status_file', None)
+
     self._enable_profiling = getattr(options, 'enable_profiling', False)
 
     profile_sample_rate = getattr(options, 'profile_sample_rate', None)
@@ -634,6 +767,24 @@ class ExtractionFrontend(frontend.StorageMediaFrontend):
         raise errors.BadConfigOption(
             u'Invalid profile sample rate: {0:s}.'.format(profile_sample_rate))
 
+    self._enable_parsers_profiling = getattr(
+        options, 'enable_parsers_profiling', False)
+
+    profile_slowest_files = getattr(options, 'profile_slowest_files', None)
+    if profile_slowest_files:
+      try:
+        self._number_of_profiled_slowest_files = int(
+            profile_slowest_files, 10)
+      except ValueError:
+        raise errors.BadConfigOption(
+            u'Invalid number of profiled slowest files: {0:s}.'.format(
+                profile_slowest_files))
+
+      if self._number_of_profiled_slowest_files < 0:
+        raise errors.BadConfigOption(
+            u'Invalid number of profiled slowest files: {0:d}.'.format(
+                self._number_of_profiled_slowest_files))
+
     serializer_format = getattr(
         options, 'serializer_format', self._EVENT_SERIALIZER_FORMAT_PROTO)
     if serializer_format:
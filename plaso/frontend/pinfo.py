@@ -5,6 +5,7 @@
 import logging
 import pprint
 
+from plaso.engine import profiler
 from plaso.frontend import analysis_frontend
 from plaso.frontend import frontend
 from plaso.lib import timelib
@@ -71,6 +72,43 @@ class PinfoFrontend(analysis_frontend.AnalysisFrontend):
     lines_of_text.append(u'\t\tPlaso Storage Information')
     lines_of_text.append(u'-' * self._LINE_LENGTH)
 
+  def _AddParsersProfileInformation(self, lines_of_text, storage_file):
+    """Adds the lines of text that make up the parsers profile information.
+
+    Args:
+      lines_of_text: A list containing the lines of text.
+      storage_file: The storage file (instance of StorageFile).
+    """
+    parsers_profile = profiler.ParsersProfile()
+    for stored_parsers_profile in storage_file.GetParsersProfiles():
+      parsers_profile.Merge(stored_parsers_profile)
+
+    lines_of_text.append(u'')
+    lines_of_text.append(u'Parsers profile information:')
+    lines_of_text.append(
+        u'	Parser chain: calls, wall time, CPU time, events, bytes read')
+    for (parser_chain, number_of_calls, wall_time, cpu_time, number_of_events,
+         number_of_bytes_read) in parsers_profile.GetParserChainTimings():
+      lines_of_text.append((
+          u'	{0:s}: {1:d}, {2:.3f}s, {3:.3f}s, {4:d}, {5:d}').format(
+              parser_chain, number_of_calls, wall_time, cpu_time,
+              number_of_events, number_of_bytes_read))
+
+    if not parsers_profile.slowest_files:
+      return
+
+    lines_of_text.append(u'')
+    lines_of_text.append(u'Slowest files:')
+    for wall_time, display_name, profile_statistics in reversed(
+        parsers_profile.slowest_files):
+      lines_of_text.append(u'	{0:.3f}s: {1:s}'.format(wall_time, display_name))
+      if self._verbose and profile_statistics:
+        lines_of_text.append(profile_statistics)
+
+    if not self._verbose:
+      lines_of_text.append(
+          u'	Profile statistics omitted (to see use: --verbose)')
+
   def _AddStoreInformation(self, lines_of_text, store_information):
     """Adds the lines of text that make up the store information.
 
@@ -127,6 +165,9 @@ class PinfoFrontend(analysis_frontend.AnalysisFrontend):
     if store_information:
       self._AddStoreInformation(lines_of_text, store_information)
 
+    if last_entry and storage_file.HasParsersProfiles():
+      self._AddParsersProfileInformation(lines_of_text, storage_file)
+
     information = u'\n'.join(lines_of_text)
 
     if not self._verbose:
@@ -1,12 +1,17 @@
 # -*- coding: utf-8 -*-
 """The plasm front-end."""
 
+import array
+import collections
+import cPickle
+import gzip
 import hashlib
 import logging
+import marshal
 import operator
 import os
-import pickle
 import sets
+import struct
 import sys
 
 from plaso import filters
@@ -17,8 +22,6 @@ from plaso.lib import errors
 from plaso.lib import event
 from plaso.lib import storage
 from plaso.output import interface as output_interface
-from plaso.output import manager as output_manager
-from plaso.output import pstorage  # pylint: disable=unused-import
 
 
 class PlasmFrontend(analysis_frontend.AnalysisFrontend):
@@ -283,6 +286,14 @@ class GroupingEngine(object):
     # TODO(ojensen): make this smarter - for now, separates via time interval.
     time_interval = 1000000  # 1 second.
     groups = []
+
+    # The timestamps of all tagged events are retrieved at once, so that
+    # the event objects do not need to be read one by one.
+    all_locations = []
+    for locations in tags.itervalues():
+      all_locations.extend(locations)
+    timestamps = storage_file.GetTimestampsByLocation(all_locations)
+
     for tag in tags:
       if not quiet:
         sys.stdout.write(u'  proccessing tag "{0:s}"...\n'.format(tag))
@@ -290,12 +301,9 @@ class GroupingEngine(object):
       last_time = 0
       groups_in_tag = 0
       for location in locations:
-        store_number, store_index = location
-        # TODO(ojensen): getting higher number event_objects seems to be slow.
-        event_object = storage_file.GetEventObject(store_number, store_index)
-        if not hasattr(event_object, 'timestamp'):
+        timestamp = timestamps.get(location, None)
+        if timestamp is None:
           continue
-        timestamp = getattr(event_object, 'timestamp')
         if timestamp - last_time > time_interval:
           groups_in_tag += 1
           groups.append(type('obj', (object,), {
@@ -347,9 +355,122 @@ class GroupingEngine(object):
     storage_file.StoreGrouping(groups)
 
 
+class _EventWordsWriter(object):
+  """Class that writes the words of the event representations to a spool file.
+
+  The writer is used by the event buffer instead of an output module,
+  so that duplicate event objects are removed while the storage is read.
+  """
+
+  def __init__(self, clustering_engine, file_object, sketch):
+    """Initializes the event words writer.
+
+    Args:
+      clustering_engine: the clustering engine (instance of ClusteringEngine).
+      file_object: the file-like object of the spool file.
+      sketch: the word count sketch (instance of _WordCountSketch).
+    """
+    super(_EventWordsWriter, self).__init__()
+    self._clustering_engine = clustering_engine
+    self._file_object = file_object
+    self._sketch = sketch
+
+  def Close(self):
+    """Closes the output."""
+    return
+
+  def Open(self):
+    """Opens the output."""
+    return
+
+  def WriteEvent(self, event_object):
+    """Writes the words of the event object representation.
+
+    Args:
+      event_object: the event object (instance of EventObject).
+    """
+    words = self._clustering_engine.GetEventWords(event_object)
+    for word in words:
+      self._sketch.Add(word)
+
+    words_data = marshal.dumps(words)
+    self._file_object.write(struct.pack('<I', len(words_data)))
+    self._file_object.write(words_data)
+
+  def WriteFooter(self):
+    """Writes the footer to the output."""
+    return
+
+  def WriteHeader(self):
+    """Writes the header to the output."""
+    return
+
+
+class _WordCountSketch(object):
+  """Class that implements a count-min sketch of the number of words.
+
+  The sketch uses a fixed amount of memory. The estimated number of times
+  a word was added is never less than the actual number, hence words that
+  are estimated to be infrequent can be ignored.
+  """
+
+  # The number of rows of counters.
+  _DEPTH = 4
+
+  def __init__(self, width):
+    """Initializes the word count sketch.
+
+    Args:
+      width: the number of counters per row.
+    """
+    super(_WordCountSketch, self).__init__()
+    self._counters = array.array('L', [0]) * (self._DEPTH * width)
+    self._width = width
+
+  def _GetIndexes(self, word):
+    """Retrieves the indexes of the counters of a word.
+
+    Args:
+      word: the word.
+
+    Returns:
+      A list of the indexes of the counters, one per row.
+    """
+    first_hash = hash(word)
+    second_hash = hash((word, self._DEPTH)) | 1
+    return [
+        row * self._width + (first_hash + row * second_hash) % self._width
+        for row in range(self._DEPTH)]
+
+  def Add(self, word):
+    """Adds a word to the sketch.
+
+    Args:
+      word: the word.
+    """
+    for index in self._GetIndexes(word):
+      self._counters[index] += 1
+
+  def Estimate(self, word):
+    """Estimates the number of times a word was added to the sketch.
+
+    Args:
+      word: the word.
+
+    Returns:
+      The estimated number of times the word was added.
+    """
+    return min(self._counters[index] for index in self._GetIndexes(word))
+
+
 class ClusteringEngine(object):
   """Clusters events in a Plaso Store to assist Tag Input creation.
 
+  The storage is read once, the words of the event representations are
+  written to a spool file, which is used by the subsequent steps. The steps
+  keep a bounded amount of memory, since words and event type candidates
+  that are estimated to be infrequent by a count-min sketch are not counted.
+
   Most methods in this class are staticmethods, to avoid relying excessively on
   internal state, and to maintain a clear description of which method acts on
   what data.
@@ -379,25 +500,59 @@ class ClusteringEngine(object):
     self.vector_size = 20000
 
   @staticmethod
-  def HashFile(filename, block_size=2**20):
-    """Calculates an md5sum of a file from a given filename.
+  def GetCheckpointIdentifier(filename):
+    """Determines the identifier of the incremental progress files.
 
-    Returns an MD5 (hash) in ASCII characters, used for naming incremental
-    progress files that are written to disk.
+    The identifier is an MD5 (hash) of the path, size and modification time
+    of the file, which unlike a hash of the content does not require
+    the file to be read.
 
     Args:
-      filename: the file to be hashed.
-      block_size: (optional) block size.
+      filename: the filename of the Plaso storage file.
+
+    Returns:
+      The identifier in ASCII characters.
     """
+    stat_object = os.stat(filename)
     md5 = hashlib.md5()
-    with open(filename, 'rb') as f:
-      while True:
-        data = f.read(block_size)
-        if not data:
-          break
-        md5.update(data)
+    md5.update(u'{0:s}:{1:d}:{2:f}'.format(
+        os.path.abspath(filename), stat_object.st_size,
+        stat_object.st_mtime).encode(u'utf-8'))
     return md5.hexdigest()
 
+  @staticmethod
+  def ReadCheckpoint(filename):
+    """Reads the values of an incremental progress file.
+
+    Args:
+      filename: the filename of the incremental progress file.
+
+    Returns:
+      A tuple of the values or None if the file does not exist.
+    """
+    if not os.path.isfile(filename):
+      return
+
+    sys.stdout.write(u'Using previously calculated results.\n')
+    with open(filename, 'rb') as file_object:
+      return cPickle.load(file_object)
+
+  @staticmethod
+  def WriteCheckpoint(filename, values):
+    """Writes the values to an incremental progress file.
+
+    The values are written to a temporary file that is renamed when complete,
+    so that interrupted runs do not leave incomplete results.
+
+    Args:
+      filename: the filename of the incremental progress file.
+      values: a tuple of the values.
+    """
+    temporary_filename = u'{0:s}.tmp'.format(filename)
+    with open(temporary_filename, 'wb') as file_object:
+      cPickle.dump(values, file_object, cPickle.HIGHEST_PROTOCOL)
+    os.rename(temporary_filename, filename)
+
   @staticmethod
   def StringJoin(first, second):
     """Joins two strings together with a separator.
@@ -417,8 +572,8 @@ class ClusteringEngine(object):
     """Constructs a string fit to be hashed from an event_object attribute.
 
     Takes both the attribute's name and value, and produces a consistent string
-    representation. This string can then be hashed to produce a consistent
-    name/value hash (see hash_attr).
+    representation. This string is used as a word of the event
+    representation (see GetEventWords).
 
     Args:
       field_name: an event_object attribute name.
@@ -430,19 +585,6 @@ class ClusteringEngine(object):
       value = unicode(attribute)
     return ClusteringEngine.StringJoin(field_name, value)
 
-  @staticmethod
-  def HashAttr(field_name, attribute, vector_size):
-    """Consistently hashes an event_object attribute/value pair.
-
-    Uses pre_hash to generate a consistent string representation of the
-    attribute, and then hashes and mods it down to fit within the vector_size.
-
-    Args:
-      field_name: an event_object attribute name.
-      attribute: the corresponding event_object attribute.
-    """
-    return hash(ClusteringEngine.PreHash(field_name, attribute)) % vector_size
-
   @staticmethod
   def EventRepresentation(event_object, ignore, frequent_words=None):
     """Constructs a consistent representation of an event_object.
@@ -484,154 +626,128 @@ class ClusteringEngine(object):
           representation[field_name] = attribute
     return representation
 
-  def EventObjectRepresentationGenerator(self, filename, frequent_words=None):
-    """Yields event_representations.
-
-    Yields event_representations from a plaso store. Essentially it simply wraps
-    the EventObjectGenerator and yields event_representations of the resulting
-    event_objects. If frequent_words is set, the event representation will
-    exclude any attributes not listed in the frequent_words list.
+  def GetEventWords(self, event_object):
+    """Retrieves the words of the representation of an event_object.
 
     Args:
-      filename: a Plaso Store filename.
-      frequent_words: (optional) whitelist of attributes not to ignore.
+      event_object: a Plaso event_object.
+
+    Returns:
+      A sorted list of the words, where every word is the name and value
+      of an attribute (see PreHash).
     """
-    with SetupStorage(filename) as store:
-      for event_object in EventObjectGenerator(store):
-        if not self.ignore:
-          self.ignore = event_object.COMPARE_EXCLUDE.union(self.IGNORE_BASE)
-        yield ClusteringEngine.EventRepresentation(
-            event_object, self.ignore, frequent_words)
-
-  def NoDuplicates(self, dump_filename):
-    """Saves a de-duped Plaso Storage.
-
-    This goes through the Plaso storage file, and saves a new dump with
-    duplicates removed. The filename is '.[dump_hash]_dedup', and is returned
-    at the end of the function. Note that if this function is interrupted,
-    incomplete results are recorded and this file must be deleted or subsequent
-    runs will use this incomplete data.
+    if not self.ignore:
+      self.ignore = event_object.COMPARE_EXCLUDE.union(self.IGNORE_BASE)
+
+    representation = ClusteringEngine.EventRepresentation(
+        event_object, self.ignore)
+    return sorted(
+        ClusteringEngine.PreHash(field_name, attribute)
+        for field_name, attribute in representation.iteritems())
+
+  def EventWordsGenerator(self, words_filename):
+    """Yields the words of the event representations from a spool file.
 
     Args:
-      dump_filename: the filename of the Plaso Storage to be deduped.
+      words_filename: the filename of the spool file.
     """
-    sys.stdout.write(u'Removing duplicates...\n')
-    sys.stdout.flush()
-    # Whether these incremental files should remain a feature or not is still
-    # being decided. They're just here for now to make development faster.
-    nodup_filename = '.{}_dedup'.format(self.plaso_hash)
-    if os.path.isfile(nodup_filename):
-      sys.stdout.write(u'Using previously calculated results.\n')
-    else:
-      with SetupStorage(dump_filename) as store:
-        total_events = store.GetNumberOfEvents()
-        events_per_dot = operator.floordiv(total_events, 80)
-        # TODO: When storage refactor is done change this so that we do not
-        # always choose pstorage but whatever storage mechanism that was used
-        # to begin with (as in if the storage is SQLite then use SQLite for
-        # output).
-        formatter_cls = output_manager.OutputManager.GetOutputClass(u'pstorage')
-        store_dedup = open(nodup_filename, 'wb')
-        formatter = formatter_cls(
-            store, self._formatter_mediator, filehandle=store_dedup)
-
-        with output_interface.EventBuffer(
-            formatter, check_dedups=True) as output_buffer:
-          event_object = store.GetSortedEntry()
-          counter = 0
-          while event_object:
-            output_buffer.Append(event_object)
-            counter += 1
-            if counter % events_per_dot == 0:
-              sys.stdout.write(u'.')
-              sys.stdout.flush()
-            event_object = store.GetSortedEntry()
-      sys.stdout.write(u'\n')
-    return nodup_filename
-
-  def ConstructHashVector(self, nodup_filename, vector_size):
-    """Constructs the vector which tallies the hashes of attributes.
-
-    The purpose of this vector is to save memory. Since many attributes are
-    fairly unique, we first hash them and keep a count of how many times the
-    hash appears. Later when constructing our vocabulary, we can ignore any
-    attributes whose hash points to a value in this vector smaller than the
-    support threshold value, since we are guaranteed that it appears in the
-    data at most this tally number of times.
+    with gzip.open(words_filename, 'rb') as file_object:
+      while True:
+        size_data = file_object.read(4)
+        if len(size_data) != 4:
+          break
+
+        words_data_size = struct.unpack('<I', size_data)[0]
+        yield marshal.loads(file_object.read(words_data_size))
+
+  def ExtractEventWords(self, words_filename, sketch_filename, vector_size):
+    """Writes the words of the de-duplicated event representations.
+
+    This goes through the Plaso storage file once and writes the words of
+    the event representations, with duplicates removed, to a spool file.
+    The number of times the words appear is tallied in a count-min sketch.
 
     Args:
-      nodup_filename: the filename of a de-duplicated plaso storage file.
-      vector_size: size of this vector.
+      words_filename: the filename of the spool file.
+      sketch_filename: the filename of the sketch incremental progress file.
+      vector_size: the number of counters per row of the sketch.
+
+    Returns:
+      The word count sketch (instance of _WordCountSketch).
     """
-    sys.stdout.write(u'Constructing word vector...\n')
+    sys.stdout.write(u'Removing duplicates and constructing word vector...\n')
     sys.stdout.flush()
-    vector_filename = '.{0:s}_vector_{1:s}'.format(
-        self.plaso_hash, vector_size)
-    if os.path.isfile(vector_filename):
-      sys.stdout.write(u'Using previously calculated results.\n')
-      x = open(vector_filename, 'rb')
-      vector = pickle.load(x)
-      x.close()
+
+    checkpoint = self.ReadCheckpoint(sketch_filename)
+    if checkpoint and os.path.isfile(words_filename):
+      sketch, = checkpoint
+      return sketch
+
+    sketch = _WordCountSketch(vector_size)
+
+    if os.path.isfile(words_filename):
+      sys.stdout.write(u'Using previously extracted words.\n')
+      for words in self.EventWordsGenerator(words_filename):
+        for word in words:
+          sketch.Add(word)
+
     else:
-      vector = [0]*vector_size
-      for representation in self.EventObjectRepresentationGenerator(
-          nodup_filename):
-        for field_name, attribute in representation.iteritems():
-          index = ClusteringEngine.HashAttr(field_name, attribute, vector_size)
-          vector[index] += 1
-      x = open(vector_filename, 'wb')
-      pickle.dump(vector, x)
-      x.close()
-      sys.stdout.write(u'\n')
-    return vector
-
-  def FindFrequentWords(self, nodup_filename, threshold, vector=None):
+      temporary_filename = u'{0:s}.tmp'.format(words_filename)
+      with SetupStorage(self.target_filename) as store:
+        with gzip.open(temporary_filename, 'wb') as file_object:
+          words_writer = _EventWordsWriter(self, file_object, sketch)
+          with output_interface.EventBuffer(
+              words_writer, check_dedups=True) as output_buffer:
+            for event_object in EventObjectGenerator(store):
+              output_buffer.Append(event_object)
+
+      os.rename(temporary_filename, words_filename)
+
+    self.WriteCheckpoint(sketch_filename, (sketch, ))
+    sys.stdout.write(u'\n')
+    return sketch
+
+  def FindFrequentWords(self, words_filename, frequent_filename, threshold,
+                        sketch):
     """Constructs a list of attributes which appear "often".
 
-    This goes through a plaso store, and finds all name-attribute pairs which
-    appear no less than the support threshold value number of times. If
-    available it uses the hash vector in order to ignore attributes and save
-    memory.
+    This finds all name-attribute pairs which appear no less than the support
+    threshold value number of times. Only words that are estimated to appear
+    this number of times by the sketch are counted, in order to save memory.
 
     Args:
-      nodup_filename: the filename of a de-duplicated plaso storage file.
+      words_filename: the filename of the spool file.
+      frequent_filename: the filename of the incremental progress file.
       threshold: the support threshold value.
-      vector: (optional) vector of hash tallies.
-    """
-    if not vector:
-      vector = []
+      sketch: the word count sketch (instance of _WordCountSketch).
 
+    Returns:
+      A set of the frequent words.
+    """
     sys.stdout.write(u'Constructing 1-dense clusters... \n')
     sys.stdout.flush()
-    frequent_filename = '.{0:s}_freq_{1:s}'.format(
-        self.plaso_hash, str(threshold))
-    if os.path.isfile(frequent_filename):
-      sys.stdout.write(u'Using previously calculated results.\n')
-      x = open(frequent_filename, 'rb')
-      frequent_words = pickle.load(x)
-      x.close()
-    else:
-      word_count = {}
-      vector_size = len(vector)
-      for representation in self.EventObjectRepresentationGenerator(
-          nodup_filename):
-        for field_name, attribute in representation.iteritems():
-          word = ClusteringEngine.PreHash(field_name, attribute)
-          keep = vector[hash(word) % vector_size] > threshold
-          if not vector_size or keep:
-            if word in word_count:
-              word_count[word] += 1
-            else:
-              word_count[word] = 1
-      wordlist = [word for word in word_count if word_count[word] >= threshold]
-      frequent_words = sets.Set(wordlist)
-      x = open(frequent_filename, 'wb')
-      pickle.dump(frequent_words, x)
-      x.close()
-      sys.stdout.write(u'\n')
-    return frequent_words
-
-  def BuildEventTypes(self, nodup_filename, threshold, frequent_words):
+
+    checkpoint = self.ReadCheckpoint(frequent_filename)
+    if checkpoint:
+      wordlist, = checkpoint
+      return frozenset(wordlist)
+
+    word_count = collections.Counter()
+    for words in self.EventWordsGenerator(words_filename):
+      for word in words:
+        if sketch.Estimate(word) >= threshold:
+          word_count[word] += 1
+
+    wordlist = sorted(
+        word for word, count in word_count.iteritems() if count >= threshold)
+    del word_count
+
+    self.WriteCheckpoint(frequent_filename, (wordlist, ))
+    sys.stdout.write(u'\n')
+    return frozenset(wordlist)
+
+  def BuildEventTypes(
+      self, words_filename, eventtype_filename, threshold, frequent_words):
     """Builds out the event_types from the frequent attributes.
 
     This uses the frequent words set in order to ignore attributes from plaso
@@ -641,48 +757,53 @@ class ClusteringEngine(object):
     this is what we actually want is still under consideration. Returns the
     list of event types, as well as a reverse-lookup structure.
 
+    The number of times the candidates appear is first tallied in a count-min
+    sketch, so that only candidates that are estimated to appear no less than
+    the support threshold value number of times are counted and kept, in
+    order to save memory.
+
     Args:
-      nodup_filename: the filename of a de-duplicated plaso storage file.
+      words_filename: the filename of the spool file.
+      eventtype_filename: the filename of the incremental progress file.
       threshold: the support threshold value.
       frequent_words: the set of attributes not to ignore.
+
+    Returns:
+      A tuple of the list of event types and a dictionary of the index of
+      each event type.
     """
     sys.stdout.write(u'Calculating event type candidates...\n')
     sys.stdout.flush()
-    eventtype_filename = ".{0:s}_evtt_{1:s}".format(
-        self.plaso_hash, str(threshold))
-    if os.path.isfile(eventtype_filename):
-      sys.stdout.write(u'Using previously calculated results.\n')
-      x = open(eventtype_filename, 'rb')
-      evttypes = pickle.load(x)
-      evttype_indices = pickle.load(x)
-      x.close()
-    else:
-      evttype_candidates = {}
-      for representation in self.EventObjectRepresentationGenerator(
-          nodup_filename, frequent_words=frequent_words):
-        candidate = repr(representation)
-        if candidate in evttype_candidates:
-          evttype_candidates[candidate] += 1
-        else:
-          evttype_candidates[candidate] = 1
-      sys.stdout.write(u'\n')
-      # clean up memory a little
-      sys.stdout.write(u'Pruning event type candidates...')
-      sys.stdout.flush()
-      evttypes = []
-      evttype_indices = {}
-      for candidate, score in evttype_candidates.iteritems():
-        if score < threshold:
-          evttype_indices[candidate] = len(evttypes)
-          evttypes.append(candidate)
-      del evttype_candidates
-
-      # write everything out
-      x = open(eventtype_filename, 'wb')
-      pickle.dump(evttypes, x)
-      pickle.dump(evttype_indices, x)
-      x.close()
-      sys.stdout.write(u'\n')
+
+    checkpoint = self.ReadCheckpoint(eventtype_filename)
+    if checkpoint:
+      return checkpoint
+
+    sketch = _WordCountSketch(self.vector_size)
+    for words in self.EventWordsGenerator(words_filename):
+      sketch.Add(repr([word for word in words if word in frequent_words]))
+    sys.stdout.write(u'\n')
+
+    sys.stdout.write(u'Pruning event type candidates...')
+    sys.stdout.flush()
+    evttype_candidates = collections.Counter()
+    for words in self.EventWordsGenerator(words_filename):
+      candidate = repr([word for word in words if word in frequent_words])
+      if sketch.Estimate(candidate) >= threshold:
+        evttype_candidates[candidate] += 1
+    del sketch
+
+    evttypes = sorted(
+        candidate for candidate, score in evttype_candidates.iteritems()
+        if score >= threshold)
+    del evttype_candidates
+
+    evttype_indices = {}
+    for index, candidate in enumerate(evttypes):
+      evttype_indices[candidate] = index
+
+    self.WriteCheckpoint(eventtype_filename, (evttypes, evttype_indices))
+    sys.stdout.write(u'\n')
     return (evttypes, evttype_indices)
 
   def Run(self):
@@ -691,14 +812,22 @@ class ClusteringEngine(object):
     Future work includes the ability to parse multiple Plaso Store files at
     once. By default this will write incremental progress to dotfiles in the
     current directory."""
-    self.plaso_hash = ClusteringEngine.HashFile(self.target_filename)
-    self.nodup_filename = self.NoDuplicates(self.target_filename)
-    self.vector = self.ConstructHashVector(
-        self.nodup_filename, self.vector_size)
+    checkpoint_prefix = u'.{0:s}'.format(
+        ClusteringEngine.GetCheckpointIdentifier(self.target_filename))
+
+    self.words_filename = u'{0:s}_words'.format(checkpoint_prefix)
+    self.sketch = self.ExtractEventWords(
+        self.words_filename,
+        u'{0:s}_sketch_{1:d}'.format(checkpoint_prefix, self.vector_size),
+        self.vector_size)
     self.frequent_words = self.FindFrequentWords(
-        self.nodup_filename, self.threshold, self.vector)
+        self.words_filename,
+        u'{0:s}_freq_{1:d}'.format(checkpoint_prefix, self.threshold),
+        self.threshold, self.sketch)
     (self.event_types, self.event_type_indices) = self.BuildEventTypes(
-        self.nodup_filename, self.threshold, self.frequent_words)
+        self.words_filename,
+        u'{0:s}_evtt_{1:d}'.format(checkpoint_prefix, self.threshold),
+        self.threshold, self.frequent_words)
     # Next step, clustering the event types
 
     # TODO: implement clustering.
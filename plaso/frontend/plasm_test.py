@@ -1,6 +1,7 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import gzip
 import os
 import shutil
 import tempfile
@@ -68,6 +69,71 @@ class PlasmTest(test_lib.FrontendTestCase):
     """Cleans up the objects used throughout the test."""
     shutil.rmtree(self._temp_directory, True)
 
+  def testWordCountSketch(self):
+    """Tests the word count sketch."""
+    # A narrow sketch, so that the words share counters.
+    sketch = plasm._WordCountSketch(4)
+
+    words = [u'word{0:d}'.format(index) for index in range(32)]
+    for index, word in enumerate(words):
+      for _ in range(index):
+        sketch.Add(word)
+
+    for index, word in enumerate(words):
+      self.assertGreaterEqual(sketch.Estimate(word), index)
+
+  def testEventWordsGenerator(self):
+    """Tests the EventWordsGenerator function."""
+    clustering_engine = plasm.ClusteringEngine(
+        self._storage_filename, 2, 100)
+    words_filename = os.path.join(self._temp_directory, 'words')
+    sketch = plasm._WordCountSketch(1024)
+
+    event_objects = [
+        TestEvent(0), TestEvent(1000, stuff='dude'), TestEvent(2000)]
+
+    with gzip.open(words_filename, 'wb') as file_object:
+      words_writer = plasm._EventWordsWriter(
+          clustering_engine, file_object, sketch)
+      for event_object in event_objects:
+        words_writer.WriteEvent(event_object)
+
+    expected_words = [
+        clustering_engine.GetEventWords(event_object)
+        for event_object in event_objects]
+    self.assertEqual(expected_words[1], [u'stuff:||:dude'])
+
+    words = list(clustering_engine.EventWordsGenerator(words_filename))
+    self.assertEqual(words, expected_words)
+
+    self.assertEqual(sketch.Estimate(u'stuff:||:bar'), 2)
+
+  def testFindFrequentWordsAndBuildEventTypes(self):
+    """Tests the FindFrequentWords and BuildEventTypes functions."""
+    clustering_engine = plasm.ClusteringEngine(
+        self._storage_filename, 2, 100)
+    words_filename = os.path.join(self._temp_directory, 'words')
+
+    sketch = clustering_engine.ExtractEventWords(
+        words_filename, os.path.join(self._temp_directory, 'sketch'),
+        clustering_engine.vector_size)
+    self.assertEqual(len(list(
+        clustering_engine.EventWordsGenerator(words_filename))), 5)
+
+    frequent_words = clustering_engine.FindFrequentWords(
+        words_filename, os.path.join(self._temp_directory, 'frequent'), 2,
+        sketch)
+    self.assertEqual(frequent_words, frozenset([u'stuff:||:bar']))
+
+    event_types, event_type_indices = clustering_engine.BuildEventTypes(
+        words_filename, os.path.join(self._temp_directory, 'event_types'), 2,
+        frequent_words)
+
+    # The event type of the event with the infrequent word appears once.
+    expected_event_type = repr([u'stuff:||:bar'])
+    self.assertEqual(event_types, [expected_event_type])
+    self.assertEqual(event_type_indices, {expected_event_type: 0})
+
   def testTagParsing(self):
     """Test if plasm can parse Tagging Input files."""
     tags = plasm.ParseTaggingFile(self._tag_input_filename)
@@ -2,6 +2,7 @@
 """The psort front-end."""
 
 import collections
+import cPickle
 import datetime
 import multiprocessing
 import logging
@@ -35,6 +36,11 @@ import pytz
 class PsortFrontend(analysis_frontend.AnalysisFrontend):
   """Class that implements the psort front-end."""
 
+  # The maximum number of event objects of which the formatted message
+  # strings are cached, e.g. the message of an event object that was matched
+  # by the filter is reused by the output module.
+  _MESSAGE_CACHE_SIZE = 1024
+
   def __init__(self):
     """Initializes the front-end object."""
     input_reader = frontend.StdinFrontendInputReader()
@@ -46,6 +52,8 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
     self._filter_buffer = None
     self._filter_expression = None
     self._filter_object = None
+    self._number_of_merge_workers = 0
+    self._number_of_output_workers = 0
     self._output_filename = None
     self._output_format = None
     self._preferred_language = u'en-US'
@@ -77,6 +85,21 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
     for event_queue in event_queues:
       event_queue.ProduceItem(event_object)
 
+  def _SetStoreLimit(self, storage_file):
+    """Sets the limit of the stores used for returning data.
+
+    The stores and their entries are not limited by the filter expression
+    when a slice of events is output around the matching events, since
+    the events in the slice do not need to match the filter expression.
+
+    Args:
+      storage_file: The storage file object (instance of StorageFile).
+    """
+    if self._filter_buffer:
+      storage_file.SetStoreLimit()
+    else:
+      storage_file.SetStoreLimit(self._filter_object)
+
   def AddAnalysisPluginOptions(self, argument_group, plugin_names):
     """Adds the analysis plugin options to the argument group
 
@@ -234,6 +257,18 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
 
     self._preferred_language = getattr(options, u'preferred_language', u'en-US')
 
+    self._number_of_merge_workers = getattr(options, u'merge_workers', 0)
+    if self._number_of_merge_workers < 0:
+      raise errors.BadConfigOption(
+          u'Invalid number of merge workers: {0:d}.'.format(
+              self._number_of_merge_workers))
+
+    self._number_of_output_workers = getattr(options, u'workers', 0)
+    if self._number_of_output_workers < 0:
+      raise errors.BadConfigOption(
+          u'Invalid number of output workers: {0:d}.'.format(
+              self._number_of_output_workers))
+
   def ProcessStorage(self, options):
     """Open a storage file and processes the events within.
 
@@ -279,7 +314,8 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
               self._storage_file_path, exception))
 
     with storage_file:
-      storage_file.SetStoreLimit(self._filter_object)
+      self._SetStoreLimit(storage_file)
+      storage_file.SetMergeWorkers(self._number_of_merge_workers)
 
       if self._output_filename:
         output_stream = self._output_filename
@@ -294,6 +330,9 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
       except (KeyError, TypeError) as exception:
         raise RuntimeError(exception)
 
+      formatter_mediator.SetMessageCacheSize(self._MESSAGE_CACHE_SIZE)
+      pfilter.PlasoValueExpander.SetFormatterMediator(formatter_mediator)
+
       try:
         # TODO: move this into a factory function?
         output_module_class = output_manager.OutputManager.GetOutputClass(
@@ -310,6 +349,16 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
       if not output_module:
         raise RuntimeError(u'Missing output module.')
 
+      if self._number_of_output_workers:
+        if output_module.SUPPORTS_OUTPUT_WORKERS:
+          output_module = PsortOutputWorkerPool(
+              output_module, self._number_of_output_workers)
+        else:
+          logging.warning((
+              u'Output module: {0:s} does not support output workers, '
+              u'writing the events without workers.').format(
+                  self._output_format))
+
       if analysis_plugins:
         logging.info(u'Starting analysis plugins.')
         # Within all preprocessing objects, try to get the last one that has
@@ -396,6 +445,8 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
             filter_buffer=self._filter_buffer,
             analysis_queues=event_queue_producers)
 
+      pfilter.PlasoValueExpander.SetFormatterMediator(None)
+
       for information in storage_file.GetStorageInformation():
         if hasattr(information, u'counter'):
           counter[u'Stored Events'] += information.counter[u'total']
@@ -403,6 +454,12 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
       if not getattr(options, u'quiet', False):
         logging.info(u'Output processing is done.')
 
+      cache_hits, cache_misses = (
+          formatter_mediator.GetWindowsEventMessageCacheStatistics())
+      logging.debug((
+          u'Windows Event Log message strings cache hits: {0:d}, misses: '
+          u'{1:d}').format(cache_hits, cache_misses))
+
       # Get all reports and tags from analysis plugins.
       if analysis_plugins:
         logging.info(u'Processing data from analysis plugins.')
@@ -520,6 +577,119 @@ class PsortFrontend(analysis_frontend.AnalysisFrontend):
     return counter
 
 
+class PsortOutputWorkerPool(object):
+  """Class that implements a pool of output worker processes.
+
+  The pool is used by the output buffer instead of the output module.
+  The event objects are written in batches by the output module in
+  the output worker processes, which return the lines of every batch.
+  The lines are written in the order the batches were scheduled, hence
+  the output is the same as when the output module writes the event objects.
+
+  Only writing the event objects is done by the output workers. Filtering,
+  tagging and removing duplicates remain serial, since the slice buffer,
+  the limit, the analysis queues and the duplicate detection depend on
+  the outcome for the preceding event objects.
+  """
+
+  # The number of event objects in a batch.
+  _BATCH_SIZE = 1000
+
+  # The maximum number of pending batches per output worker, which bounds
+  # the number of event objects that are held in memory.
+  _MAXIMUM_PENDING_BATCHES_PER_WORKER = 2
+
+  def __init__(self, output_module, number_of_workers):
+    """Initializes the output worker pool.
+
+    Args:
+      output_module: the output module (instance of LogOutputFormatter).
+      number_of_workers: the number of output worker processes.
+    """
+    super(PsortOutputWorkerPool, self).__init__()
+    self._batch = []
+    self._maximum_number_of_pending_batches = (
+        number_of_workers * self._MAXIMUM_PENDING_BATCHES_PER_WORKER)
+    self._number_of_workers = number_of_workers
+    self._output_module = output_module
+    self._pending_batches = collections.deque()
+    self._pool = None
+
+  def _ScheduleBatch(self):
+    """Schedules the output workers to write the current batch."""
+    if not self._batch:
+      return
+
+    self._pending_batches.append(self._pool.apply_async(
+        _WriteEventObjectsBatch, (self._batch, )))
+    self._batch = []
+
+    while len(self._pending_batches) > self._maximum_number_of_pending_batches:
+      self._WriteBatch()
+
+  def _WriteBatch(self):
+    """Writes the lines of the first pending batch to the output."""
+    pending_batch = self._pending_batches.popleft()
+    for line in pending_batch.get():
+      self._output_module.filehandle.WriteLine(line)
+
+  def Close(self):
+    """Closes the output."""
+    if self._pool:
+      self._pool.terminate()
+      self._pool.join()
+      self._pool = None
+
+    self._output_module.Close()
+
+  def Open(self):
+    """Opens the output."""
+    self._output_module.Open()
+
+  def WriteEvent(self, event_object):
+    """Writes the event object to the output.
+
+    The event object is pickled when it is added to the batch, since
+    the event object can be changed after it was written, e.g. by
+    the front-end.
+
+    Args:
+      event_object: the event object (instance of EventObject).
+    """
+    self._batch.append(
+        cPickle.dumps(event_object, protocol=cPickle.HIGHEST_PROTOCOL))
+
+    if len(self._batch) >= self._BATCH_SIZE:
+      self._ScheduleBatch()
+
+  def WriteFooter(self):
+    """Writes the footer to the output."""
+    if self._pool:
+      self._ScheduleBatch()
+
+      while self._pending_batches:
+        self._WriteBatch()
+
+      self._pool.close()
+      self._pool.join()
+      self._pool = None
+
+    self._output_module.WriteFooter()
+
+  def WriteHeader(self):
+    """Writes the header to the output.
+
+    The output worker processes are started after the header is written,
+    so that they inherit the state the output module determined from
+    the storage, such as the hostnames.
+    """
+    self._output_module.WriteHeader()
+
+    self._pool = multiprocessing.Pool(
+        processes=self._number_of_workers,
+        initializer=_InitializeOutputWorker, initargs=(self._output_module, ))
+
+
 # TODO: Function: _ConsumeItem is not defined, inspect if we need to define it
 # or change the interface so that is not an abstract method.
 # TODO: Remove this after dfVFS integration.
@@ -575,3 +745,63 @@ class PsortAnalysisReportQueueConsumer(queue.ItemQueueConsumer):
           u'The report is stored inside the storage file and can be '
           u'viewed using pinfo [if unable to view please submit a '
           u'bug report https://github.com/log2timeline/plaso/issues')
+
+
+class _OutputWorkerFilehandle(object):
+  """Class that implements the filehandle of an output worker process.
+
+  The lines written to the filehandle are returned to the front-end,
+  which writes them to the output.
+  """
+
+  def __init__(self):
+    """Initializes the filehandle."""
+    super(_OutputWorkerFilehandle, self).__init__()
+    self.lines = []
+
+  def WriteLine(self, line):
+    """Writes a single line."""
+    self.lines.append(line)
+
+
+# The output module and filehandle of an output worker process.
+_output_worker_filehandle = None
+_output_worker_module = None
+
+
+def _InitializeOutputWorker(output_module):
+  """Initializes an output worker process.
+
+  Args:
+    output_module: the output module (instance of LogOutputFormatter).
+  """
+  # pylint: disable=global-statement
+  global _output_worker_filehandle
+  global _output_worker_module
+
+  # The inherited filehandle is kept, since the file object it contains
+  # would write its buffered data when it is closed.
+  _output_worker_filehandle = output_module.filehandle
+  _output_worker_module = output_module
+
+
+def _WriteEventObjectsBatch(serialized_event_objects):
+  """Writes a batch of event objects in an output worker process.
+
+  Args:
+    serialized_event_objects: a list of pickled event objects.
+
+  Returns:
+    A list of the lines written by the output module.
+  """
+  filehandle = _OutputWorkerFilehandle()
+  _output_worker_module.filehandle = filehandle
+
+  for serialized_event_object in serialized_event_objects:
+    event_object = cPickle.loads(serialized_event_object)
+    try:
+      _output_worker_module.WriteEvent(event_object)
+    except errors.WrongFormatter as exception:
+      logging.error(u'Unable to write event: {:s}'.format(exception))
+
+  return filehandle.lines
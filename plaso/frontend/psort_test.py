@@ -6,16 +6,19 @@ import io
 import os
 import unittest
 
+from plaso import filters
 from plaso.formatters import interface as formatters_interface
 from plaso.formatters import manager as formatters_manager
 from plaso.formatters import mediator as formatters_mediator
 from plaso.frontend import psort
 from plaso.frontend import test_lib
+from plaso.lib import bufferlib
 from plaso.lib import event
 from plaso.lib import pfilter
 from plaso.lib import storage
 from plaso.lib import timelib
 from plaso.output import interface as output_interface
+from plaso.output import l2t_csv
 
 
 class PsortTestEvent(event.EventObject):
@@ -136,7 +139,7 @@ class PsortFrontendTest(test_lib.FrontendTestCase):
       timestamp_list.append(event_object.timestamp)
       event_object = storage_file.GetSortedEntry()
 
-    self.assertEqual(len(timestamp_list), 8)
+    self.assertEqual(len(timestamp_list), 15)
     self.assertTrue(
         timestamp_list[0] >= self.first and timestamp_list[-1] <= self.last)
 
@@ -189,6 +192,94 @@ class PsortFrontendTest(test_lib.FrontendTestCase):
         u'date,time,timezone,MACB,source,sourcetype,type,user,host,short,desc,'
         u'version,filename,inode,notes,format,extra'))
 
+  def testOutputSlice(self):
+    """Tests that the slice around the matching event is output."""
+    events = []
+    for timestamp in range(1, 12):
+      event_object = PsortTestEvent(timestamp * 1000000)
+      if timestamp == 6:
+        event_object.parser = u'Match'
+      events.append(event_object)
+
+    output_fd = io.StringIO()
+
+    with test_lib.TempDirectory() as dirname:
+      temp_file = os.path.join(dirname, u'plaso.db')
+
+      pfilter.TimeRangeCache.ResetTimeConstraints()
+      storage_file = storage.StorageFile(temp_file, read_only=False)
+      storage_file.AddEventObjects(events)
+      storage_file.Close()
+
+      # pylint: disable=protected-access
+      self._front_end._filter_object = filters.GetFilter(
+          u'parser is \'Match\'')
+      self._front_end._filter_buffer = bufferlib.CircularBuffer(2)
+
+      with storage.StorageFile(temp_file) as storage_file:
+        self._front_end._SetStoreLimit(storage_file)
+
+        formatter = TestFormatter(
+            storage_file, self._formatter_mediator, filehandle=output_fd)
+        event_buffer = TestEventBuffer(
+            formatter, check_dedups=False, store=storage_file)
+
+        counter = self._front_end.ProcessOutput(
+            storage_file, event_buffer,
+            my_filter=self._front_end._filter_object,
+            filter_buffer=self._front_end._filter_buffer)
+
+    pfilter.TimeRangeCache.ResetTimeConstraints()
+
+    # The matching event and 2 events before and after it.
+    self.assertEqual(event_buffer.record_count, 5)
+    self.assertEqual(counter[u'Events Included'], 5)
+    self.assertEqual(counter[u'Events Added From Slice'], 4)
+    self.assertEqual(counter[u'Events Filtered Out'], 6)
+
+  def _WriteOutput(self, output_path, number_of_workers):
+    """Writes the events of the test storage file as l2tcsv.
+
+    Args:
+      output_path: the path of the output file.
+      number_of_workers: the number of output workers, where 0 represents
+                         the events are written without output workers.
+    """
+    pfilter.TimeRangeCache.ResetTimeConstraints()
+
+    with storage.StorageFile(self._test_file, read_only=True) as storage_file:
+      storage_file.SetStoreLimit()
+
+      output_module = l2t_csv.L2tCsvOutputFormatter(
+          storage_file, self._formatter_mediator, filehandle=output_path)
+      if number_of_workers:
+        output_module = psort.PsortOutputWorkerPool(
+            output_module, number_of_workers)
+        # Use small batches so that the output consists of multiple batches.
+        # pylint: disable=protected-access
+        output_module._BATCH_SIZE = 4
+
+      with output_interface.EventBuffer(output_module) as output_buffer:
+        self._front_end.ProcessOutput(storage_file, output_buffer)
+
+  def testOutputWorkers(self):
+    """Tests that the output of the output workers matches the serial output."""
+    with test_lib.TempDirectory() as dirname:
+      serial_output_path = os.path.join(dirname, u'serial.csv')
+      self._WriteOutput(serial_output_path, 0)
+
+      workers_output_path = os.path.join(dirname, u'workers.csv')
+      self._WriteOutput(workers_output_path, 2)
+
+      with open(serial_output_path, 'rb') as file_object:
+        serial_output = file_object.read()
+
+      with open(workers_output_path, 'rb') as file_object:
+        workers_output = file_object.read()
+
+    self.assertEqual(len(serial_output.split(b'\n')), 17)
+    self.assertEqual(workers_output, serial_output)
+
   # TODO: add bogus data location test.
 
 
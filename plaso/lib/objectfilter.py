@@ -147,6 +147,30 @@ class Filter(object):
   def Matches(self, obj):
     """Whether object obj matches this filter."""
 
+  def GetMatchCost(self):
+    """Retrieves the relative cost of matching an object against the filter.
+
+    The cost is used to evaluate the cheapest filters of a boolean operation
+    first.
+
+    Returns:
+      An integer containing the relative cost.
+    """
+    return 1
+
+  def GetMatchFunction(self):
+    """Retrieves a function that determines if an object matches the filter.
+
+    The function returns the same result as Matches but can be optimized
+    by the filter, for example to prevent evaluating the filter tree for
+    every object.
+
+    Returns:
+      A function that takes an object as argument and returns a boolean
+      value indicating if the object matches the filter.
+    """
+    return self.Matches
+
   def Filter(self, objects):
     """Returns a list of objects that pass the filter."""
     return filter(self.Matches, objects)
@@ -156,6 +180,20 @@ class Filter(object):
         self.__class__.__name__, ', '.join([str(arg) for arg in self.args]))
 
 
+def _GetChildMatchFunctions(child_filters):
+  """Retrieves the match functions of child filters, cheapest first.
+
+  Args:
+    child_filters: a list of filters (instances of Filter).
+
+  Returns:
+    A list of match functions.
+  """
+  child_filters = sorted(
+      child_filters, key=lambda child_filter: child_filter.GetMatchCost())
+  return [child_filter.GetMatchFunction() for child_filter in child_filters]
+
+
 class AndFilter(Filter):
   """Performs a boolean AND of the given Filter instances as arguments.
 
@@ -167,6 +205,28 @@ class AndFilter(Filter):
         return False
     return True
 
+  def GetMatchCost(self):
+    """Retrieves the relative cost of matching an object against the filter."""
+    return sum(child_filter.GetMatchCost() for child_filter in self.args)
+
+  def GetMatchFunction(self):
+    """Retrieves a function that determines if an object matches the filter."""
+    match_functions = _GetChildMatchFunctions(self.args)
+
+    if not match_functions:
+      return lambda unused_obj: True
+
+    if len(match_functions) == 1:
+      return match_functions[0]
+
+    def _Matches(obj):
+      for match_function in match_functions:
+        if not match_function(obj):
+          return False
+      return True
+
+    return _Matches
+
 
 class OrFilter(Filter):
   """Performs a boolean OR of the given Filter instances as arguments.
@@ -182,6 +242,52 @@ class OrFilter(Filter):
         return True
     return False
 
+  def GetMatchCost(self):
+    """Retrieves the relative cost of matching an object against the filter."""
+    return sum(child_filter.GetMatchCost() for child_filter in self.args)
+
+  def GetMatchFunction(self):
+    """Retrieves a function that determines if an object matches the filter."""
+    match_functions = _GetChildMatchFunctions(self.args)
+
+    if not match_functions:
+      return lambda unused_obj: True
+
+    if len(match_functions) == 1:
+      return match_functions[0]
+
+    def _Matches(obj):
+      for match_function in match_functions:
+        if match_function(obj):
+          return True
+      return False
+
+    return _Matches
+
+
+class CompiledFilter(Filter):
+  """Matches objects using the match function of another filter.
+
+  The match function of the filter is retrieved once, hence the filter tree
+  is not evaluated for every object that is matched.
+  """
+
+  def __init__(self, filter_object):
+    """Initializes the compiled filter.
+
+    Args:
+      filter_object: the filter to compile (instance of Filter).
+    """
+    super(CompiledFilter, self).__init__(arguments=[filter_object])
+    self._match_function = filter_object.GetMatchFunction()
+
+  def GetMatchFunction(self):
+    """Retrieves a function that determines if an object matches the filter."""
+    return self._match_function
+
+  def Matches(self, obj):
+    return self._match_function(obj)
+
 
 # pylint: disable=abstract-method
 class Operator(Filter):
@@ -192,6 +298,10 @@ class IdentityFilter(Operator):
   def Matches(self, _):
     return True
 
+  def GetMatchFunction(self):
+    """Retrieves a function that determines if an object matches the filter."""
+    return lambda unused_obj: True
+
 
 class UnaryOperator(Operator):
   """Base class for unary operators."""
@@ -226,14 +336,73 @@ class BinaryOperator(Operator):
 class GenericBinaryOperator(BinaryOperator):
   """Allows easy implementations of operators."""
 
+  # The relative cost of the operation.
+  OPERATION_COST = 1
+
   def __init__(self, **kwargs):
     super(GenericBinaryOperator, self).__init__(**kwargs)
     self.bool_value = True
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation.
+
+    Operators can override this function to provide a function that is
+    equivalent to Operation with the right operand, but that is cheaper
+    to call, for example by preprocessing the right operand once.
+
+    Returns:
+      A function that takes the expanded value as argument and returns
+      the result of the operation between the value and the right operand.
+    """
+    operation = self.Operation
+    right_operand = self.right_operand
+    return lambda value: operation(value, right_operand)
+
   def FlipBool(self):
     logging.debug(u'Negative matching.')
     self.bool_value = not self.bool_value
 
+  def GetMatchCost(self):
+    """Retrieves the relative cost of matching an object against the filter."""
+    return (
+        self.value_expander.GetExpandCost(self.left_operand) +
+        self.OPERATION_COST)
+
+  def GetMatchFunction(self):
+    """Retrieves a function that determines if an object matches the filter."""
+    bool_value = self.bool_value
+    operation_function = self._GetOperationFunction()
+
+    get_value = self.value_expander.GetValueFunction(self.left_operand)
+    if get_value:
+      def _MatchesValue(obj):
+        value = get_value(obj)
+        if value is not None:
+          try:
+            if operation_function(value):
+              return bool_value
+          except (ValueError, TypeError):
+            pass
+        return not bool_value
+
+      return _MatchesValue
+
+    expand = self.value_expander.Expand
+    path = self.left_operand
+    if isinstance(path, basestring):
+      path = path.split(self.value_expander.FIELD_SEPARATOR)
+
+    def _MatchesValues(obj):
+      for value in expand(obj, path):
+        try:
+          if operation_function(value):
+            return bool_value
+        except (ValueError, TypeError):
+          continue
+      return not bool_value
+
+    return _MatchesValues
+
   def Operation(self, x, y):
     """Performs the operation between two values."""
 
@@ -260,6 +429,11 @@ class GenericBinaryOperator(BinaryOperator):
 class Equals(GenericBinaryOperator):
   """Matches objects when the right operand equals the expanded value."""
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation."""
+    right_operand = self.right_operand
+    return lambda value: value == right_operand
+
   def Operation(self, x, y):
     return x == y
 
@@ -275,6 +449,11 @@ class NotEquals(Equals):
 class Less(GenericBinaryOperator):
   """Whether the expanded value >= right_operand."""
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation."""
+    right_operand = self.right_operand
+    return lambda value: value < right_operand
+
   def Operation(self, x, y):
     return x < y
 
@@ -282,6 +461,11 @@ class Less(GenericBinaryOperator):
 class LessEqual(GenericBinaryOperator):
   """Whether the expanded value <= right_operand."""
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation."""
+    right_operand = self.right_operand
+    return lambda value: value <= right_operand
+
   def Operation(self, x, y):
     return x <= y
 
@@ -289,6 +473,11 @@ class LessEqual(GenericBinaryOperator):
 class Greater(GenericBinaryOperator):
   """Whether the expanded value > right_operand."""
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation."""
+    right_operand = self.right_operand
+    return lambda value: value > right_operand
+
   def Operation(self, x, y):
     return x > y
 
@@ -296,6 +485,11 @@ class Greater(GenericBinaryOperator):
 class GreaterEqual(GenericBinaryOperator):
   """Whether the expanded value >= right_operand."""
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation."""
+    right_operand = self.right_operand
+    return lambda value: value >= right_operand
+
   def Operation(self, x, y):
     return x >= y
 
@@ -303,6 +497,21 @@ class GreaterEqual(GenericBinaryOperator):
 class Contains(GenericBinaryOperator):
   """Whether the right operand is contained in the value."""
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation."""
+    right_operand = self.right_operand
+    if not isinstance(right_operand, basestring):
+      return super(Contains, self)._GetOperationFunction()
+
+    lower_right_operand = right_operand.lower()
+
+    def _Contains(value):
+      if type(value) in (str, unicode):
+        return lower_right_operand in value.lower()
+      return right_operand in value
+
+    return _Contains
+
   def Operation(self, x, y):
     if type(x) in (str, unicode):
       return y.lower() in x.lower()
@@ -314,6 +523,39 @@ class InSet(GenericBinaryOperator):
   # TODO(user): Change to an N-ary Operator?
   """Whether all values are contained within the right operand."""
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation.
+
+    If the right operand is a collection of hashable values it is converted
+    into a frozenset, so that the membership test is a hash lookup.
+    """
+    right_operand = self.right_operand
+    if not isinstance(right_operand, (frozenset, list, set, tuple)):
+      return super(InSet, self)._GetOperationFunction()
+
+    try:
+      right_operand_set = frozenset(right_operand)
+    except TypeError:
+      return super(InSet, self)._GetOperationFunction()
+
+    operation = self.Operation
+
+    def _InSet(value):
+      try:
+        if value in right_operand_set:
+          return True
+      except TypeError:
+        pass
+
+      if isinstance(value, basestring):
+        return False
+
+      # The value might be an iterable of which all values need to be
+      # contained in the right operand.
+      return operation(value, right_operand)
+
+    return _InSet
+
   def Operation(self, x, y):
     """Whether x is fully contained in y."""
     if x in y:
@@ -337,6 +579,8 @@ class InSet(GenericBinaryOperator):
 class Regexp(GenericBinaryOperator):
   """Whether the value matches the regexp in the right operand."""
 
+  OPERATION_COST = 2
+
   def __init__(self, *children, **kwargs):
     super(Regexp, self).__init__(*children, **kwargs)
     # Note that right_operand is not necessarily a string.
@@ -348,6 +592,21 @@ class Regexp(GenericBinaryOperator):
       raise ValueError(u'Regular expression "{0!s}" is malformed.'.format(
           self.right_operand))
 
+  def _GetOperationFunction(self):
+    """Retrieves a function that performs the operation."""
+    search = self.compiled_re.search
+
+    def _Search(value):
+      if type(value) != unicode:
+        try:
+          value = utils.GetUnicodeString(value)
+        except TypeError:
+          return False
+
+      return search(value) is not None
+
+    return _Search
+
   def Operation(self, x, unused_y):
     try:
       if self.compiled_re.search(utils.GetUnicodeString(x)):
@@ -447,6 +706,12 @@ class Context(Operator):
           return True
     return False
 
+  def GetMatchCost(self):
+    """Retrieves the relative cost of matching an object against the filter."""
+    return (
+        self.value_expander.GetExpandCost(self.context) +
+        self.condition.GetMatchCost())
+
 
 OP2FN = {
     'equals': Equals,
@@ -500,6 +765,43 @@ class ValueExpander(object):
       for value in self.Expand(attr_value, path[1:]):
         yield value
 
+  def GetExpandCost(self, path):
+    """Retrieves the relative cost of expanding the values of a path.
+
+    Args:
+      path: a list of strings or a string containing the path.
+
+    Returns:
+      An integer containing the relative cost.
+    """
+    if isinstance(path, basestring):
+      path = path.split(self.FIELD_SEPARATOR)
+    return len(path)
+
+  def GetValueFunction(self, path):
+    """Retrieves a function that retrieves the value of a path in an object.
+
+    The function is equivalent to Expand for paths that consist of a single
+    attribute, without the overhead of a generator.
+
+    Args:
+      path: a list of strings or a string containing the path.
+
+    Returns:
+      A function that takes an object as argument and returns the value of
+      the path in the object or None if not available. None is returned
+      instead of a function if the path consists of multiple attributes.
+    """
+    if isinstance(path, basestring):
+      path = path.split(self.FIELD_SEPARATOR)
+
+    if len(path) != 1:
+      return
+
+    attr_name = self._GetAttributeName(path)
+    get_value = self._GetValue
+    return lambda obj: get_value(obj, attr_name)
+
   def Expand(self, obj, path):
     """Returns a list of all the values for the given path in the object obj.
 
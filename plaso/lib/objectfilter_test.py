@@ -180,11 +180,16 @@ class ObjectFilterTest(unittest.TestCase):
                   'value_expander': self.value_expander}
         ops = operator(**kwargs)
         self.assertEqual(test_unit[0], ops.Matches(self.file))
+        self.assertEqual(
+            test_unit[0], objectfilter.CompiledFilter(ops).Matches(self.file))
         if hasattr(ops, 'FlipBool'):
           ops.FlipBool()
           # TODO: why is there a print statement here?
           print u'Testing negative matching.'
           self.assertEqual(not test_unit[0], ops.Matches(self.file))
+          self.assertEqual(
+              not test_unit[0],
+              objectfilter.CompiledFilter(ops).Matches(self.file))
 
   def testExpand(self):
     # Case insensitivity.
@@ -332,6 +337,9 @@ class ObjectFilterTest(unittest.TestCase):
     filter_ = filter_.Compile(self.filter_imp)
     self.assertEqual(True, filter_.Matches(self.file))
 
+    compiled_filter = objectfilter.CompiledFilter(filter_)
+    self.assertEqual(True, compiled_filter.Matches(self.file))
+
   def testRegexpRaises(self):
     with self.assertRaises(ValueError):
       objectfilter.Regexp(
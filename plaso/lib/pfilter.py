@@ -71,10 +71,29 @@ class DictObject(object):
 class PlasoValueExpander(objectfilter.AttributeValueExpander):
   """An expander that gives values based on object attribute names."""
 
+  # The names of the attributes that are produced by the formatters if
+  # the event object does not define them.
+  _FORMATTED_ATTRIBUTE_NAMES = frozenset([
+      'message', 'source', 'source_long', 'source_short', 'sourcetype'])
+
+  # The formatter mediator that is shared by all the expanders.
+  _formatter_mediator = None
+
   def __init__(self):
     """Initialize an attribue value expander."""
     super(PlasoValueExpander, self).__init__()
 
+  @classmethod
+  def _GetFormatterMediator(cls):
+    """Retrieves the shared formatter mediator.
+
+    Returns:
+      The formatter mediator object (instance of FormatterMediator).
+    """
+    if cls._formatter_mediator is None:
+      cls._formatter_mediator = formatters_mediator.FormatterMediator()
+    return cls._formatter_mediator
+
   def _GetMessage(self, event_object):
     """Returns a properly formatted message string.
 
@@ -84,13 +103,10 @@ class PlasoValueExpander(objectfilter.AttributeValueExpander):
     Returns:
       A formatted message string.
     """
-    # TODO: move this somewhere where the mediator can be instantiated once.
-    formatter_mediator = formatters_mediator.FormatterMediator()
-
     result = u''
     try:
       result, _ = formatters_manager.FormattersManager.GetMessageStrings(
-          formatter_mediator, event_object)
+          self._GetFormatterMediator(), event_object)
     except KeyError as exception:
       logging.warning(u'Unable to correctly assemble event: {0:s}'.format(
           exception))
@@ -141,6 +157,71 @@ class PlasoValueExpander(objectfilter.AttributeValueExpander):
   def _GetAttributeName(self, path):
     return path[0].lower()
 
+  def GetExpandCost(self, path):
+    """Retrieves the relative cost of expanding the values of a path.
+
+    Args:
+      path: a list of strings or a string containing the path.
+
+    Returns:
+      An integer containing the relative cost.
+    """
+    cost = super(PlasoValueExpander, self).GetExpandCost(path)
+
+    if isinstance(path, basestring):
+      path = path.split(self.FIELD_SEPARATOR)
+
+    # The message and source strings are produced by the formatters.
+    if self._GetAttributeName(path) in self._FORMATTED_ATTRIBUTE_NAMES:
+      cost += 10
+    return cost
+
+  def GetValueFunction(self, path):
+    """Retrieves a function that retrieves the value of a path in an object.
+
+    Args:
+      path: a list of strings or a string containing the path.
+
+    Returns:
+      A function that takes an object as argument and returns the value of
+      the path in the object or None if not available. None is returned
+      instead of a function if the path consists of multiple attributes.
+    """
+    if isinstance(path, basestring):
+      path = path.split(self.FIELD_SEPARATOR)
+
+    if len(path) != 1:
+      return
+
+    attr_name = self._GetAttributeName(path)
+    if attr_name == 'tag' or attr_name in self._FORMATTED_ATTRIBUTE_NAMES:
+      return super(PlasoValueExpander, self).GetValueFunction(path)
+
+    # This is equivalent to _GetValue for the other attribute names.
+    def _GetAttributeValue(obj):
+      value = getattr(obj, attr_name, None)
+      if not value:
+        return
+      if isinstance(value, dict):
+        return DictObject(value)
+      return value
+
+    return _GetAttributeValue
+
+  @classmethod
+  def SetFormatterMediator(cls, formatter_mediator):
+    """Sets the formatter mediator that is shared by all the expanders.
+
+    Sharing the formatter mediator with the output module allows the message
+    strings that were formatted to match the filter to be cached.
+
+    Args:
+      formatter_mediator: the formatter mediator object (instance of
+                          FormatterMediator) or None to use a default
+                          formatter mediator.
+    """
+    cls._formatter_mediator = formatter_mediator
+
 
 class PlasoExpression(objectfilter.BasicExpression):
   """A Plaso specific expression."""
@@ -440,15 +521,202 @@ class TimeRangeCache(object):
       return last, first
 
 
-def GetMatcher(query, quiet=False):
-  """Return a filter match object for a given query."""
+def GetMatcher(query, quiet=False, compiled=True):
+  """Return a filter match object for a given query.
+
+  Args:
+    query: the filter query string.
+    quiet: optional boolean value to indicate a malformed query should not
+           be logged as an error. The default is False.
+    compiled: optional boolean value to indicate the filter tree should be
+              compiled into a single match function, which is considerably
+              faster than evaluating the filter tree for every event object.
+              The default is True.
+
+  Returns:
+    A filter object (instance of objectfilter.Filter) or None if the query
+    is malformed.
+  """
   matcher = None
   try:
     parser = BaseParser(query).Parse()
     matcher = parser.Compile(PlasoAttributeFilterImplementation)
+    if compiled:
+      matcher = objectfilter.CompiledFilter(matcher)
   except objectfilter.ParseError as exception:
     if not quiet:
       logging.error(u'Filter <{0:s}> malformed: {1:s}'.format(
           query, exception))
 
   return matcher
+
+
+# The names of the attributes that are stored in the store metadata, mapped
+# to the name of the corresponding store metadata value.
+_STORE_METADATA_VALUE_NAMES = {
+    'data_type': 'data_type',
+    'parser': 'parsers'}
+
+# The parser name that is stored in the store metadata for event objects
+# without a parser.
+_STORE_METADATA_UNKNOWN_PARSER = 'unknown_parser'
+
+
+def _GetAttributeMetadataMatchFunction(operator):
+  """Retrieves a store metadata match function for an attribute operator.
+
+  Args:
+    operator: the binary operator (instance of
+              objectfilter.GenericBinaryOperator).
+
+  Returns:
+    A function that takes the store metadata as argument and returns
+    a boolean value indicating if the store can contain event objects that
+    match the operator or None if the operator does not constrain the store
+    metadata.
+  """
+  left_operand = operator.left_operand
+  if not isinstance(left_operand, basestring):
+    return
+
+  attribute_name = left_operand.lower()
+
+  if attribute_name == 'timestamp':
+    return _GetTimestampMetadataMatchFunction(operator)
+
+  value_name = _STORE_METADATA_VALUE_NAMES.get(attribute_name, None)
+  if not value_name:
+    return
+
+  bool_value = operator.bool_value
+  # pylint: disable=protected-access
+  operation_function = operator._GetOperationFunction()
+  # pylint: enable=protected-access
+
+  # This is equivalent to the match function of the operator, for a single
+  # event object with the value.
+  def _MatchesValue(value):
+    if not value or value == _STORE_METADATA_UNKNOWN_PARSER:
+      return not bool_value
+    try:
+      return bool(operation_function(value)) == bool_value
+    except (ValueError, TypeError):
+      return not bool_value
+
+  def _MatchesMetadata(store_metadata):
+    values = store_metadata.get(value_name, None)
+    if values is None:
+      return True
+    for value in values:
+      if _MatchesValue(value):
+        return True
+    return False
+
+  return _MatchesMetadata
+
+
+def _GetTimestampMetadataMatchFunction(operator):
+  """Retrieves a store metadata match function for a timestamp operator.
+
+  Only the last timestamp of the store metadata range is used, since
+  the first timestamp of the range does not account for event objects with
+  a timestamp of 0 or less.
+
+  Args:
+    operator: the binary operator (instance of
+              objectfilter.GenericBinaryOperator).
+
+  Returns:
+    A function that takes the store metadata as argument and returns
+    a boolean value indicating if the store can contain event objects that
+    match the operator or None if the operator does not constrain the store
+    metadata.
+  """
+  if not operator.bool_value:
+    return
+
+  right_operand = operator.right_operand
+  if not isinstance(right_operand, DateCompareObject):
+    return
+
+  timestamp = right_operand.data
+
+  if isinstance(operator, objectfilter.Greater):
+    matches_last_timestamp = lambda last: last > timestamp
+  elif isinstance(operator, (objectfilter.Equals, objectfilter.GreaterEqual)):
+    matches_last_timestamp = lambda last: last >= timestamp
+  else:
+    return
+
+  def _MatchesMetadata(store_metadata):
+    time_range = store_metadata.get('range', None)
+    if not time_range or len(time_range) != 2:
+      return True
+    return matches_last_timestamp(time_range[1])
+
+  return _MatchesMetadata
+
+
+def _GetMetadataMatchFunction(filter_object):
+  """Retrieves a store metadata match function for a filter.
+
+  Args:
+    filter_object: the filter object (instance of objectfilter.Filter).
+
+  Returns:
+    A function that takes the store metadata as argument and returns
+    a boolean value indicating if the store can contain event objects that
+    match the filter or None if the filter does not constrain the store
+    metadata.
+  """
+  if isinstance(filter_object, objectfilter.CompiledFilter):
+    return _GetMetadataMatchFunction(filter_object.args[0])
+
+  if isinstance(filter_object, objectfilter.GenericBinaryOperator):
+    return _GetAttributeMetadataMatchFunction(filter_object)
+
+  if isinstance(filter_object, objectfilter.AndFilter):
+    match_functions = [
+        _GetMetadataMatchFunction(child_filter)
+        for child_filter in filter_object.args]
+    match_functions = [
+        match_function for match_function in match_functions
+        if match_function]
+    if not match_functions:
+      return
+
+    return lambda store_metadata: all(
+        match_function(store_metadata) for match_function in match_functions)
+
+  if isinstance(filter_object, objectfilter.OrFilter):
+    match_functions = [
+        _GetMetadataMatchFunction(child_filter)
+        for child_filter in filter_object.args]
+    # An empty OR filter matches every event object.
+    if not match_functions or None in match_functions:
+      return
+
+    return lambda store_metadata: any(
+        match_function(store_metadata) for match_function in match_functions)
+
+
+def GetStoreMetadataMatcher(filter_object):
+  """Retrieves a function that matches store metadata against a filter.
+
+  The function is used to determine which stores of a storage file can
+  contain event objects that match the filter, based on the data types,
+  parsers and time range in the metadata of the store, without reading
+  the event objects. Only the constraints of the filter on the data_type,
+  parser and timestamp attributes are evaluated, hence a store that
+  matches can still contain no matching event objects.
+
+  Args:
+    filter_object: the filter object (instance of objectfilter.Filter).
+
+  Returns:
+    A function that takes the store metadata (a dictionary) as argument and
+    returns a boolean value indicating if the store can contain event
+    objects that match the filter or None if the filter does not constrain
+    the store metadata.
+  """
+  return _GetMetadataMatchFunction(filter_object)
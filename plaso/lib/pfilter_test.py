@@ -43,6 +43,10 @@ class PFilterTest(unittest.TestCase):
 
     self.assertEqual(result, matcher.Matches(event_object))
 
+    # The compiled filter should match the same event objects.
+    compiled_matcher = objectfilter.CompiledFilter(matcher)
+    self.assertEqual(result, compiled_matcher.Matches(event_object))
+
   def setUp(self):
     """Set up the necessary variables used in tests."""
     self._pre = Empty()
@@ -155,6 +159,57 @@ class PFilterTest(unittest.TestCase):
         '\'bad, bad thing [\\sa-zA-Z\\.]+ evil\'')
     self._RunPlasoTest(event_object, query, True)
 
+  def testGetStoreMetadataMatcher(self):
+    """Tests the GetStoreMetadataMatcher function."""
+    winreg_metadata = {
+        'data_type': ['windows:registry:key_value'],
+        'parsers': ['winreg/winreg_default'],
+        'range': (1334940286000000, 1335966206929596)}
+    filestat_metadata = {
+        'data_type': ['fs:stat'],
+        'parsers': ['filestat'],
+        'range': (1238934459000000, 1238934459000000)}
+    mixed_metadata = {
+        'data_type': ['fs:stat', 'windows:registry:key_value'],
+        'parsers': ['filestat', 'winreg/winreg_default']}
+
+    matcher = pfilter.GetMatcher('parser contains \'winreg\'')
+    metadata_matcher = pfilter.GetStoreMetadataMatcher(matcher)
+    self.assertTrue(metadata_matcher(winreg_metadata))
+    self.assertFalse(metadata_matcher(filestat_metadata))
+    self.assertTrue(metadata_matcher(mixed_metadata))
+    # Stores without the metadata values are not filtered.
+    self.assertTrue(metadata_matcher({}))
+
+    matcher = pfilter.GetMatcher('parser not contains \'winreg\'')
+    metadata_matcher = pfilter.GetStoreMetadataMatcher(matcher)
+    self.assertFalse(metadata_matcher(winreg_metadata))
+    self.assertTrue(metadata_matcher(mixed_metadata))
+
+    matcher = pfilter.GetMatcher(
+        'data_type is \'fs:stat\' or parser is \'winreg/winreg_default\'')
+    metadata_matcher = pfilter.GetStoreMetadataMatcher(matcher)
+    self.assertTrue(metadata_matcher(winreg_metadata))
+    self.assertTrue(metadata_matcher(filestat_metadata))
+
+    matcher = pfilter.GetMatcher(
+        'data_type is \'fs:stat\' and date > \'2010-01-01 00:00:00\'')
+    metadata_matcher = pfilter.GetStoreMetadataMatcher(matcher)
+    self.assertFalse(metadata_matcher(winreg_metadata))
+    self.assertFalse(metadata_matcher(filestat_metadata))
+    self.assertTrue(metadata_matcher(mixed_metadata))
+
+    # Filters that contain other constraints in a boolean OR cannot be used
+    # to filter stores.
+    matcher = pfilter.GetMatcher(
+        'parser is \'filestat\' or filename contains \'evil\'')
+    self.assertIsNone(pfilter.GetStoreMetadataMatcher(matcher))
+
+    matcher = pfilter.GetMatcher('filename contains \'evil\'')
+    self.assertIsNone(pfilter.GetStoreMetadataMatcher(matcher))
+
+    pfilter.TimeRangeCache.ResetTimeConstraints()
+
 
 if __name__ == "__main__":
   unittest.main()
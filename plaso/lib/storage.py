@@ -2,18 +2,19 @@
 """The storage mechanism.
 
 The storage mechanism can be described as a collection of storage files
-that are stored together in a single ZIP compressed container.
+that are stored together in a single ZIP container.
 
 The storage file is essentially split up in two categories:
    +  A store file (further described below).
    +  Other files, these contain grouping information, tag, collection
       information or other metadata describing the content of the store files.
 
-The store itself is a collection of four files:
+The store itself is a collection of five files:
   plaso_meta.<store_number>
   plaso_proto.<store_number>
   plaso_index.<store_number>
   plaso_timestamps.<store_number>
+  plaso_attribute_index.<store_number>
 
 The plaso_proto file within each store contains several serialized EventObjects
 or events that are serialized (as a protobuf). All of the EventObjects within
@@ -59,6 +60,21 @@ The structure is:
 | timestamp | timestamp | ... |
 +-----------+-----------+-...-+
 
+  + plaso_attribute_index
+
+This file contains the data type and parser of every entry within the proto
+file. Each entry consists of two unsigned short integers ('<HH') that contain
+the index of the data type in the data_type list and the index of the parser
+in the parsers list of the plaso_meta file.
+
+The structure is:
++-----------+--------+-----------+--------+-...-+
+| data type | parser | data type | parser | ... |
++-----------+--------+-----------+--------+-...-+
+
+This is used for filtering on data type and parser, where the entries that
+cannot match the filter are skipped without unserializing the event objects.
+
 This is used for time based filtering, where if the 15th entry in this file is
 the first entry that is larger than the lower bound, then the index file is used
 to seek to the 15th entry inside the proto file.
@@ -70,6 +86,13 @@ The structure of a proto file is:
 | size |  protobuf (plaso_storage_proto) | size | proto...|
 +------+---------------------------------+------+------...+
 
+The plaso_proto, plaso_index and plaso_timestamps files are stored
+uncompressed (ZIP_STORED) inside the ZIP container. This allows them to be
+memory mapped and read at random offsets, so that an entry can be read
+directly instead of reading the stream up to the offset of the entry.
+Storage files that contain compressed (ZIP_DEFLATED) store files are still
+supported but do not benefit from the random access.
+
 For further details about the storage design see:
   http://plaso.kiddaland.net/developer/libraries/storage
 """
@@ -79,18 +102,27 @@ For further details about the storage design see:
 # other tools. This file will then contain the queueing mechanism and other
 # plaso specific mechanism, making it easier to import the storage library.
 
+import array
+import bisect
 import collections
 import construct
 import heapq
+import io
 import logging
+import mmap
+import multiprocessing
+import os
 # TODO: replace all instances of struct by construct!
 import struct
 import sys
+import time
 import zipfile
+import zlib
 
 from google.protobuf import message
 import yaml
 
+from plaso.engine import profiler
 from plaso.engine import queue
 from plaso.lib import errors
 from plaso.lib import event
@@ -181,11 +213,240 @@ class _EventTagIndexValue(object):
         tag_identifier, store_number=store_number, store_offset=store_offset)
 
 
+class _MemoryMappedStream(object):
+  """Class that implements a seekable stream of memory mapped data.
+
+  The stream provides a read-only file-like object view of the data of
+  an uncompressed (stored) ZIP member, which zipfile.ZipExtFile is unable
+  to seek.
+  """
+
+  def __init__(self, memory_map, data_offset, data_size):
+    """Initializes the memory mapped stream.
+
+    Args:
+      memory_map: the memory map of the storage file (instance of mmap.mmap).
+      data_offset: the offset of the stream data relative to the start of
+                   the storage file.
+      data_size: the size of the stream data.
+    """
+    super(_MemoryMappedStream, self).__init__()
+    self._current_offset = 0
+    self._data_offset = data_offset
+    self._data_size = data_size
+    self._memory_map = memory_map
+
+  def close(self):
+    """Closes the stream.
+
+    The memory map is owned by the storage file and is not closed.
+    """
+    self._memory_map = None
+
+  def read(self, size=None):
+    """Reads a byte string from the stream.
+
+    Args:
+      size: optional number of bytes to read, where None represents all
+            remaining data. The default is None.
+
+    Returns:
+      A byte string containing the data read.
+    """
+    if self._current_offset >= self._data_size:
+      return ''
+
+    if size is None or size < 0:
+      size = self._data_size - self._current_offset
+    else:
+      size = min(size, self._data_size - self._current_offset)
+
+    start_offset = self._data_offset + self._current_offset
+    self._current_offset += size
+    return self._memory_map[start_offset:start_offset + size]
+
+  def seek(self, offset, whence=os.SEEK_SET):
+    """Seeks an offset within the stream.
+
+    Args:
+      offset: the offset to seek.
+      whence: optional value that indicates whether offset is an absolute
+              or relative position within the stream. The default is
+              os.SEEK_SET.
+
+    Raises:
+      IOError: if the seek failed.
+    """
+    if whence == os.SEEK_CUR:
+      offset += self._current_offset
+    elif whence == os.SEEK_END:
+      offset += self._data_size
+    elif whence != os.SEEK_SET:
+      raise IOError(u'Unsupported whence.')
+
+    if offset < 0:
+      raise IOError(u'Invalid offset value out of bounds.')
+
+    self._current_offset = offset
+
+  def seekable(self):
+    """Determines if the stream is seekable."""
+    return True
+
+  def tell(self):
+    """Retrieves the current offset within the stream."""
+    return self._current_offset
+
+
+class _StoredStreamWriter(object):
+  """Class that implements a writer of an uncompressed (stored) ZIP member.
+
+  Unlike zipfile.ZipFile.writestr the data of the stream is written
+  incrementally, hence the data does not need to be kept in memory.
+  The implementation is similar to that of zipfile.ZipFile.write.
+  """
+
+  def __init__(self, zip_file, stream_name):
+    """Initializes the stored stream writer.
+
+    Args:
+      zip_file: the ZIP file (instance of zipfile.ZipFile).
+      stream_name: the name of the stream.
+    """
+    super(_StoredStreamWriter, self).__init__()
+    self._zip_file = zip_file
+    self._zip_info = None
+    self._stream_name = stream_name
+
+  def Close(self):
+    """Closes the stream and updates the ZIP local file header.
+
+    Raises:
+      IOError: if the stream was not opened or the stream data is too large.
+    """
+    if not self._zip_info:
+      raise IOError(u'Stream: {0:s} not opened.'.format(self._stream_name))
+
+    if self._zip_info.file_size > zipfile.ZIP64_LIMIT:
+      raise IOError(
+          u'Size of stream: {0:s} exceeds maximum.'.format(self._stream_name))
+
+    self._zip_info.compress_size = self._zip_info.file_size
+
+    # Seek backwards and write the file header which now includes
+    # the correct CRC and file sizes.
+    zip_file_object = self._zip_file.fp
+    end_of_stream_offset = zip_file_object.tell()
+    zip_file_object.seek(self._zip_info.header_offset, os.SEEK_SET)
+    zip_file_object.write(self._zip_info.FileHeader(False))
+    zip_file_object.seek(end_of_stream_offset, os.SEEK_SET)
+    zip_file_object.flush()
+
+    # pylint: disable=protected-access
+    self._zip_file.filelist.append(self._zip_info)
+    self._zip_file.NameToInfo[self._zip_info.filename] = self._zip_info
+    self._zip_info = None
+
+  def Open(self):
+    """Opens the stream and writes a preliminary ZIP local file header."""
+    zip_info = zipfile.ZipInfo(
+        filename=self._stream_name, date_time=time.localtime(time.time())[:6])
+    zip_info.compress_type = zipfile.ZIP_STORED
+    zip_info.external_attr = 0600 << 16
+    zip_info.header_offset = self._zip_file.fp.tell()
+
+    # The CRC and sizes are updated when the stream is closed.
+    zip_info.CRC = 0
+    zip_info.compress_size = 0
+    zip_info.file_size = 0
+
+    # pylint: disable=protected-access
+    self._zip_file._writecheck(zip_info)
+    self._zip_file._didModify = True
+
+    self._zip_file.fp.write(zip_info.FileHeader(False))
+    self._zip_info = zip_info
+
+  def Write(self, data):
+    """Writes data to the stream.
+
+    Args:
+      data: a byte string containing the data to write.
+
+    Raises:
+      IOError: if the stream was not opened.
+    """
+    if not self._zip_info:
+      raise IOError(u'Stream: {0:s} not opened.'.format(self._stream_name))
+
+    self._zip_info.CRC = zlib.crc32(data, self._zip_info.CRC) & 0xffffffff
+    self._zip_info.file_size += len(data)
+    self._zip_file.fp.write(data)
+
+
+class _MergeStore(object):
+  """Class that defines the state of a store that is merged by workers."""
+
+  def __init__(self, store_number, first_entry_index, end_entry_index):
+    """Initializes the merge store.
+
+    Args:
+      store_number: the store number.
+      first_entry_index: the index of the first entry to merge.
+      end_entry_index: the index after the last entry to merge.
+    """
+    super(_MergeStore, self).__init__()
+    self.end_entry_index = end_entry_index
+    self.event_objects = collections.deque()
+    self.next_batch_entry_index = first_entry_index
+    self.pending_batches = collections.deque()
+    self.store_number = store_number
+
+
 class StorageFile(object):
   """Class that defines the storage file."""
 
   _STREAM_DATA_SEGMENT_SIZE = 1024
 
+  # The size of the segments in which the proto stream data is written.
+  _STREAM_WRITE_SEGMENT_SIZE = 1024 * 1024
+
+  # The ZIP local file header, which precedes the data of a ZIP member.
+  _ZIP_LOCAL_FILE_HEADER_SIGNATURE = b'PK\x03\x04'
+  _ZIP_LOCAL_FILE_HEADER_STRUCT = struct.Struct('<4s2B4HL2L2H')
+
+  # The number of event objects a merge worker reads per batch.
+  _MERGE_BATCH_SIZE = 512
+
+  # The maximum number of batches per store that are read ahead by
+  # the merge workers.
+  _MERGE_MAXIMUM_PENDING_BATCHES = 2
+
+  # The array type code of a signed 64-bit integer, which is used to cache
+  # the timestamps of a store, if supported by the platform.
+  if array.array('l').itemsize == 8:
+    _TIMESTAMPS_ARRAY_TYPE_CODE = 'l'
+  else:
+    _TIMESTAMPS_ARRAY_TYPE_CODE = None
+
+  # The array type code of an unsigned 32-bit integer, which is used to read
+  # the attribute index and the offsets of a store, if supported by
+  # the platform.
+  if array.array('I').itemsize == 4:
+    _UINT32_ARRAY_TYPE_CODE = 'I'
+  else:
+    _UINT32_ARRAY_TYPE_CODE = None
+
+  # The prefixes of the streams that make up a store.
+  _STORE_STREAM_PREFIXES = [
+      'plaso_meta', 'plaso_proto', 'plaso_index', 'plaso_timestamps',
+      'plaso_attribute_index']
+
+  # The prefixes of the store streams that are stored uncompressed so they
+  # can be memory mapped.
+  _STORED_STREAM_PREFIXES = frozenset([
+      'plaso_index', 'plaso_proto', 'plaso_timestamps'])
+
   # Set the maximum buffer size to 196 MiB
   MAX_BUFFER_SIZE = 196 * 1024 * 1024
 
@@ -234,17 +495,28 @@ class StorageFile(object):
     self._buffer_first_timestamp = sys.maxint
     self._buffer_last_timestamp = 0
     self._buffer_size = 0
+    self._entry_index_ranges = {}
+    self._entry_masks = {}
     self._event_object_serializer = None
     self._event_serializer_format_string = u''
     self._event_tag_index = None
     self._file_open = False
     self._file_number = 1
     self._first_file_number = None
+    self._index_streams = {}
+    self._memory_map = None
     self._max_buffer_size = buffer_size or self.MAX_BUFFER_SIZE
+    self._merge_pool = None
+    self._merge_stores = None
+    self._number_of_merge_workers = 0
     self._output_file = output_file
+    self._parsers_profile = None
     self._pre_obj = pre_obj
+    self._proto_stream_offsets = {}
     self._proto_streams = {}
     self._read_only = None
+    self._store_attribute_filters = {}
+    self._timestamps = {}
     self._write_counter = 0
 
     self._analysis_report_serializer = (
@@ -356,43 +628,109 @@ class StorageFile(object):
     self.Close()
 
   def _BuildTagIndex(self):
-    """Builds the tag index that contains the offsets for each tag.
+    """Builds the tag index that contains the event tags for each identifier.
+
+    The event tags are read once and kept in memory. An event tag stored
+    in a later tagging stream contains the merged tag information of
+    the event tags stored before, hence it supersedes these.
+
+    The merged event tags are read from the most recent tag snapshot
+    stream, hence only the tagging streams stored after the snapshot,
+    if any, need to be read.
 
     Raises:
       IOError: if the stream cannot be opened.
     """
     self._event_tag_index = {}
 
+    tag_snapshot_number = 0
+    tag_stream_numbers = []
     for stream_name in self._GetStreamNames():
-      if not stream_name.startswith('plaso_tag_index.'):
+      if stream_name.startswith('plaso_tag_index.'):
+        stream_numbers = tag_stream_numbers
+      elif stream_name.startswith('plaso_tag_snapshot.'):
+        stream_numbers = None
+      else:
+        continue
+
+      _, _, stream_number = stream_name.rpartition('.')
+      try:
+        stream_number = int(stream_number, 10)
+      except ValueError:
+        # Ignore invalid tag stream names.
         continue
 
+      if stream_numbers is None:
+        tag_snapshot_number = max(tag_snapshot_number, stream_number)
+      else:
+        stream_numbers.append(stream_number)
+
+    if tag_snapshot_number:
+      stream_name = 'plaso_tag_snapshot.{0:06d}'.format(tag_snapshot_number)
       file_object = self._OpenStream(stream_name, 'r')
       if file_object is None:
         raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
 
-      _, _, store_number = stream_name.rpartition('.')
-      # TODO: catch exception.
-      store_number = int(store_number, 10)
+      event_tag = self._ReadEventTag(file_object)
+      while event_tag:
+        tag_identifier = self._GetEventTagIdentifier(event_tag)
+        self._event_tag_index[tag_identifier] = event_tag
+        event_tag = self._ReadEventTag(file_object)
 
+    for tag_stream_number in sorted(tag_stream_numbers):
+      if tag_stream_number <= tag_snapshot_number:
+        continue
+
+      stream_name = 'plaso_tag_index.{0:06d}'.format(tag_stream_number)
+      file_object = self._OpenStream(stream_name, 'r')
+      if file_object is None:
+        raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
+
+      tag_index_values = []
       while True:
         tag_index_value = _EventTagIndexValue.Read(
-            file_object, store_number)
+            file_object, tag_stream_number)
         if tag_index_value is None:
           break
 
-        self._event_tag_index[tag_index_value.identifier] = tag_index_value
+        tag_index_values.append(tag_index_value)
+
+      if not tag_index_values:
+        continue
+
+      stream_name = 'plaso_tagging.{0:06d}'.format(tag_stream_number)
+      file_object = self._OpenStream(stream_name, 'r')
+      if file_object is None:
+        raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
+
+      # Since zipfile.ZipExtFile is not seekable the tagging stream is read
+      # into memory once, instead of once for every event tag.
+      tag_file_object = io.BytesIO(file_object.read())
+
+      for tag_index_value in tag_index_values:
+        tag_file_object.seek(tag_index_value.store_offset, os.SEEK_SET)
+        event_tag = self._ReadEventTag(tag_file_object)
+        if event_tag is None:
+          logging.warning((
+              u'Unable to read event tag: {0:s} from stream: {1:s}').format(
+                  tag_index_value.identifier, stream_name))
+          continue
+
+        self._event_tag_index[tag_index_value.identifier] = event_tag
 
   def _FlushBuffer(self):
     """Flushes the buffered streams to disk."""
     if not self._buffer_size:
       return
 
+    data_types = list(self._count_data_type.viewkeys())
+    parsers = list(self._count_parser.viewkeys())
+
     yaml_dict = {
         'range': (self._buffer_first_timestamp, self._buffer_last_timestamp),
         'version': self.STORAGE_VERSION,
-        'data_type': list(self._count_data_type.viewkeys()),
-        'parsers': list(self._count_parser.viewkeys()),
+        'data_type': data_types,
+        'parsers': parsers,
         'count': len(self._buffer),
         'type_count': self._count_data_type.most_common()}
     self._count_data_type = collections.Counter()
@@ -401,21 +739,40 @@ class StorageFile(object):
     stream_name = 'plaso_meta.{0:06d}'.format(self._file_number)
     self._WriteStream(stream_name, yaml.safe_dump(yaml_dict))
 
-    ofs = 0
-    proto_str = []
-    index_str = []
-    timestamp_str = []
-    for _ in range(len(self._buffer)):
-      timestamp, entry = heapq.heappop(self._buffer)
-      # TODO: Instead of appending to an array
-      # which is not optimal (loads up the entire max file
-      # size into memory) Zipfile should be extended to
-      # allow appending to files (implement lock).
+    # The sorted entries are written directly to the proto stream, in
+    # segments, instead of building the entire stream in memory. The
+    # offsets and timestamps are stored in preallocated buffers, which are
+    # significantly smaller than the proto stream data.
+    number_of_entries = len(self._buffer)
+    index_data = bytearray(number_of_entries * 4)
+    timestamps_data = bytearray(number_of_entries * 8)
+
+    # The attribute index is only written if the indexes of the data types
+    # and parsers fit in an unsigned short integer.
+    if max(len(data_types), len(parsers)) <= 0xffff:
+      attribute_index_data = bytearray(number_of_entries * 4)
+      data_type_indexes = dict(
+          (data_type, index) for index, data_type in enumerate(data_types))
+      parser_indexes = dict(
+          (parser, index) for index, parser in enumerate(parsers))
+    else:
+      attribute_index_data = None
+
+    stream_name = 'plaso_proto.{0:06d}'.format(self._file_number)
+    proto_stream_writer = _StoredStreamWriter(self._zipfile, stream_name)
+    proto_stream_writer.Open()
+
+    entry_index = 0
+    proto_stream_offset = 0
+    proto_data_segment = []
+    proto_data_segment_size = 0
+    while self._buffer:
+      timestamp, entry, data_type, parser = heapq.heappop(self._buffer)
       try:
         # Appending a timestamp to the timestamp index, this is used during
         # time based filtering. If this is not done we would need to unserialize
         # all events to get the timestamp value which is really slow.
-        timestamp_str.append(struct.pack('<q', timestamp))
+        struct.pack_into('<q', timestamps_data, entry_index * 8, timestamp)
       except struct.error as exception:
         # TODO: Instead of just logging the error unserialize the event
         # and print out information from the event, eg. parser and path spec
@@ -425,19 +782,44 @@ class StorageFile(object):
             u'Unable to store event, not able to index timestamp value with '
             u'error: {0:s} [timestamp: {1:d}]').format(exception, timestamp))
         continue
-      index_str.append(struct.pack('<I', ofs))
+
+      struct.pack_into('<I', index_data, entry_index * 4, proto_stream_offset)
+      if attribute_index_data is not None:
+        struct.pack_into(
+            '<HH', attribute_index_data, entry_index * 4,
+            data_type_indexes[data_type], parser_indexes[parser])
+      entry_index += 1
+
       packed = struct.pack('<I', len(entry)) + entry
-      ofs += len(packed)
-      proto_str.append(packed)
+      proto_stream_offset += len(packed)
+      proto_data_segment.append(packed)
+      proto_data_segment_size += len(packed)
 
-    stream_name = 'plaso_index.{0:06d}'.format(self._file_number)
-    self._WriteStream(stream_name, ''.join(index_str))
+      if proto_data_segment_size >= self._STREAM_WRITE_SEGMENT_SIZE:
+        proto_stream_writer.Write(''.join(proto_data_segment))
+        proto_data_segment = []
+        proto_data_segment_size = 0
 
-    stream_name = 'plaso_proto.{0:06d}'.format(self._file_number)
-    self._WriteStream(stream_name, ''.join(proto_str))
+    if proto_data_segment:
+      proto_stream_writer.Write(''.join(proto_data_segment))
+
+    proto_stream_writer.Close()
+
+    if entry_index < number_of_entries:
+      del index_data[entry_index * 4:]
+      del timestamps_data[entry_index * 8:]
+      if attribute_index_data is not None:
+        del attribute_index_data[entry_index * 4:]
+
+    stream_name = 'plaso_index.{0:06d}'.format(self._file_number)
+    self._WriteStoredStream(stream_name, bytes(index_data))
 
     stream_name = 'plaso_timestamps.{0:06d}'.format(self._file_number)
-    self._WriteStream(stream_name, ''.join(timestamp_str))
+    self._WriteStoredStream(stream_name, bytes(timestamps_data))
+
+    if attribute_index_data is not None:
+      stream_name = 'plaso_attribute_index.{0:06d}'.format(self._file_number)
+      self._WriteStream(stream_name, bytes(attribute_index_data))
 
     self._file_number += 1
     self._buffer_size = 0
@@ -445,29 +827,44 @@ class StorageFile(object):
     self._buffer_first_timestamp = sys.maxint
     self._buffer_last_timestamp = 0
 
-  def _GetEventTagIndexValue(self, store_number, store_index, uuid):
-    """Retrieves an event tag index value.
+  def _CopyStream(self, file_object, stream_name):
+    """Copies the data of a stream of another storage file.
 
     Args:
-      store_number: the store number.
-      store_index: the store index.
-      uuid: the UUID string.
-
-    Returns:
-      An event tag index value (instance of _EventTagIndexValue).
+      file_object: the file-like object of the stream to copy.
+      stream_name: the name of the stream to write.
     """
-    if self._event_tag_index is None:
-      self._BuildTagIndex()
+    stream_prefix, _, _ = stream_name.partition('.')
+    if stream_prefix not in self._STORED_STREAM_PREFIXES:
+      self._WriteStream(stream_name, file_object.read())
+      return
 
-    # Try looking up event tag by numeric identifier.
-    tag_identifier = '{0:d}:{1:d}'.format(store_number, store_index)
-    tag_index_value = self._event_tag_index.get(tag_identifier, None)
+    # The uncompressed streams are copied in segments, instead of reading
+    # the entire stream into memory.
+    stream_writer = _StoredStreamWriter(self._zipfile, stream_name)
+    stream_writer.Open()
 
-    # Try looking up event tag by UUID.
-    if tag_index_value is None:
-      tag_index_value = self._event_tag_index.get(uuid, None)
+    stream_data = file_object.read(self._STREAM_WRITE_SEGMENT_SIZE)
+    while stream_data:
+      stream_writer.Write(stream_data)
+      stream_data = file_object.read(self._STREAM_WRITE_SEGMENT_SIZE)
 
-    return tag_index_value
+    stream_writer.Close()
+
+  def _GetEventTagIdentifier(self, event_tag):
+    """Retrieves the identifier of an event tag in the tag index.
+
+    Args:
+      event_tag: the event tag (instance of EventTag).
+
+    Returns:
+      The identifier string.
+    """
+    if getattr(event_tag, 'store_number', 0):
+      return '{0:d}:{1:d}'.format(
+          event_tag.store_number, getattr(event_tag, 'store_index', 0))
+
+    return getattr(event_tag, 'event_uuid', '0')
 
   def _GetStreamNames(self):
     """Retrieves a generator of the storage stream names."""
@@ -509,48 +906,37 @@ class StorageFile(object):
       file_object, last_entry_index = self._GetProtoStreamSeekOffset(
           stream_number, entry_index, stream_offset)
 
-    if (not last_entry_index and entry_index == -1 and
-        self._bound_first is not None):
-      # We only get here if the following conditions are met:
-      #   1. last_entry_index is not set (so this is the first read
-      #      from this file).
-      #   2. There is a lower bound (so we have a date filter).
-      #   3. The lower bound is higher than zero (basically set to a value).
-      #   4. We are accessing this function using 'get me the next entry' as an
-      #      opposed to the 'get me entry X', where we just want to server entry
-      #      X.
-      #
-      # The purpose: speed seeking into the storage file based on time. Instead
-      # of spending precious time reading through the storage file and
-      # deserializing protobufs just to compare timestamps we read a much
-      # 'cheaper' file, one that only contains timestamps to find the proper
-      # entry into the storage file. That way we'll get to the right place in
-      # the file and can start reading protobufs from the right location.
-
-      stream_name = 'plaso_timestamps.{0:06d}'.format(stream_number)
-
-      if stream_name in self._GetStreamNames():
-        timestamp_file_object = self._OpenStream(stream_name, 'r')
-        if timestamp_file_object is None:
-          raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
-
-        index = 0
-        timestamp_compare = 0
-        encountered_error = False
-        while timestamp_compare < self._bound_first:
-          timestamp_raw = timestamp_file_object.read(8)
-          if len(timestamp_raw) != 8:
-            encountered_error = True
-            break
-
-          timestamp_compare = struct.unpack('<q', timestamp_raw)[0]
-          index += 1
-
-        if encountered_error:
+    if entry_index == -1:
+      next_entry_index = last_entry_index
+      end_entry_index = None
+
+      if self._bound_first is not None:
+        # The purpose: speed seeking into the storage file based on time.
+        # Instead of spending precious time reading through the storage file
+        # and deserializing protobufs just to compare timestamps we use
+        # the much 'cheaper' timestamps of the store to determine the range of
+        # entries that are within the time bounds. That way we'll get to
+        # the right place in the file and can start reading protobufs from
+        # the right location, and stop reading as soon as the upper bound has
+        # been passed.
+        entry_index_range = self._GetEntryIndexRange(stream_number)
+        if entry_index_range is not None:
+          first_entry_index, end_entry_index = entry_index_range
+          next_entry_index = max(next_entry_index, first_entry_index)
+
+      # The entries that cannot match the filter are skipped in the same way.
+      entry_mask = self._GetEntryMask(stream_number)
+      if entry_mask is not None:
+        next_entry_index = entry_mask.find(b'\x01', next_entry_index)
+        if next_entry_index < 0:
           return None, None
 
+      if end_entry_index is not None and next_entry_index >= end_entry_index:
+        return None, None
+
+      if next_entry_index != last_entry_index:
         return self._GetEventObjectProtobufString(
-            stream_number, entry_index=index)
+            stream_number, entry_index=next_entry_index)
 
     size_data = file_object.read(4)
 
@@ -569,6 +955,83 @@ class StorageFile(object):
 
     return event_object_data, last_entry_index
 
+  def _GetEntryMask(self, stream_number):
+    """Retrieves the mask of the entries of a store that can match the filter.
+
+    Args:
+      stream_number: the number of the stream.
+
+    Returns:
+      A byte array (instance of bytearray) that contains 1 for every entry
+      that can match the filter and 0 otherwise or None if the entries are
+      not filtered.
+
+    Raises:
+      IOError: if the stream cannot be read.
+    """
+    if stream_number not in self._entry_masks:
+      entry_mask = None
+
+      attribute_filter = self._store_attribute_filters.get(stream_number, None)
+      if attribute_filter is not None:
+        stream_name = 'plaso_attribute_index.{0:06d}'.format(stream_number)
+        file_object = self._OpenStream(stream_name, 'r')
+        if file_object is not None:
+          attribute_index_data = file_object.read()
+          file_object.close()
+
+          number_of_entries = len(attribute_index_data) // 4
+          attribute_index_data = attribute_index_data[:number_of_entries * 4]
+
+          # Every entry is read as a single little-endian 32-bit integer that
+          # contains the data type index in the lower and the parser index in
+          # the upper 16 bits.
+          if self._UINT32_ARRAY_TYPE_CODE:
+            attribute_indexes = array.array(
+                self._UINT32_ARRAY_TYPE_CODE)
+            attribute_indexes.fromstring(attribute_index_data)
+
+            if sys.byteorder != 'little':
+              attribute_indexes.byteswap()
+
+          else:
+            attribute_indexes = struct.unpack(
+                '<{0:d}I'.format(number_of_entries), attribute_index_data)
+
+          entry_mask = bytearray(
+              map(attribute_filter.__contains__, attribute_indexes))
+
+      self._entry_masks[stream_number] = entry_mask
+
+    return self._entry_masks[stream_number]
+
+  def _GetEntryIndexRange(self, stream_number):
+    """Retrieves the range of entries of a store within the time bounds.
+
+    Args:
+      stream_number: the number of the stream.
+
+    Returns:
+      A tuple of the index of the first entry and the index after the last
+      entry that are within the time bounds or None if the store has no
+      timestamps stream.
+
+    Raises:
+      IOError: if the stream cannot be opened.
+    """
+    if stream_number not in self._entry_index_ranges:
+      timestamps = self._GetTimestamps(stream_number)
+      if timestamps is None:
+        entry_index_range = None
+      else:
+        entry_index_range = (
+            bisect.bisect_left(timestamps, self._bound_first),
+            bisect.bisect_right(timestamps, self._bound_last))
+
+      self._entry_index_ranges[stream_number] = entry_index_range
+
+    return self._entry_index_ranges[stream_number]
+
   def _GetEventGroupProto(self, file_object):
     """Return a single group entry."""
     unpacked = file_object.read(4)
@@ -629,10 +1092,28 @@ class StorageFile(object):
     Raises:
       IOError: if the stream cannot be opened.
     """
-    # Since zipfile.ZipExtFile is not seekable we need to close the stream
-    # and reopen it to fake a seek.
     if stream_number in self._proto_streams:
       previous_file_object, _ = self._proto_streams[stream_number]
+      if isinstance(previous_file_object, _MemoryMappedStream):
+        previous_file_object.seek(stream_offset, os.SEEK_SET)
+        self._proto_streams[stream_number] = (
+            previous_file_object, entry_index)
+        return self._proto_streams[stream_number]
+
+      # Since zipfile.ZipExtFile is not seekable we read forward upto
+      # the stream offset if the entry is after the current entry,
+      # otherwise we need to close the stream and reopen it to fake a seek.
+      _, last_entry_index = self._proto_streams[stream_number]
+      if entry_index >= last_entry_index:
+        current_stream_offset = self._GetProtoStreamOffset(
+            stream_number, last_entry_index)
+        if (current_stream_offset is not None and
+            current_stream_offset <= stream_offset):
+          _ = previous_file_object.read(stream_offset - current_stream_offset)
+          self._proto_streams[stream_number] = (
+              previous_file_object, entry_index)
+          return self._proto_streams[stream_number]
+
       del self._proto_streams[stream_number]
       previous_file_object.close()
 
@@ -641,9 +1122,12 @@ class StorageFile(object):
     if file_object is None:
       raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
 
-    # Since zipfile.ZipExtFile is not seekable we need to read upto
-    # the stream offset.
-    _ = file_object.read(stream_offset)
+    if isinstance(file_object, _MemoryMappedStream):
+      file_object.seek(stream_offset, os.SEEK_SET)
+    else:
+      # Since zipfile.ZipExtFile is not seekable we need to read upto
+      # the stream offset.
+      _ = file_object.read(stream_offset)
 
     self._proto_streams[stream_number] = (file_object, entry_index)
 
@@ -663,40 +1147,346 @@ class StorageFile(object):
     Raises:
       IOError: if the stream cannot be opened.
     """
-    # TODO: cache the index file object in the same way as the proto
-    # stream file objects.
-
-    # TODO: once cached use the last entry index to determine if the stream
-    # file object should be re-opened.
+    offsets = self._proto_stream_offsets.get(stream_number, None)
+    if offsets is not None:
+      if entry_index >= len(offsets):
+        return None
+      return offsets[entry_index]
 
-    stream_name = 'plaso_index.{0:06d}'.format(stream_number)
-    index_file_object = self._OpenStream(stream_name, 'r')
+    index_file_object = self._index_streams.get(stream_number, None)
     if index_file_object is None:
-      raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
+      stream_name = 'plaso_index.{0:06d}'.format(stream_number)
+      index_file_object = self._OpenStream(stream_name, 'r')
+      if index_file_object is None:
+        raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
 
-    # Since zipfile.ZipExtFile is not seekable we need to read upto
-    # the stream offset.
-    _ = index_file_object.read(entry_index * 4)
+    if isinstance(index_file_object, _MemoryMappedStream):
+      # The memory mapped index streams are cached since the offset of
+      # an entry can be read directly.
+      self._index_streams[stream_number] = index_file_object
+      index_file_object.seek(entry_index * 4, os.SEEK_SET)
+      index_data = index_file_object.read(4)
 
-    index_data = index_file_object.read(4)
+      if len(index_data) != 4:
+        return None
 
+      return struct.unpack('<I', index_data)[0]
+
+    # Since zipfile.ZipExtFile is not seekable the offsets are read once
+    # and cached as a compact array.
+    index_data = index_file_object.read()
     index_file_object.close()
 
-    if len(index_data) != 4:
+    number_of_entries = len(index_data) // 4
+    index_data = index_data[:number_of_entries * 4]
+
+    if self._UINT32_ARRAY_TYPE_CODE:
+      offsets = array.array(self._UINT32_ARRAY_TYPE_CODE)
+      offsets.fromstring(index_data)
+
+      if sys.byteorder != 'little':
+        offsets.byteswap()
+
+    else:
+      offsets = struct.unpack('<{0:d}I'.format(number_of_entries), index_data)
+
+    self._proto_stream_offsets[stream_number] = offsets
+
+    if entry_index >= number_of_entries:
       return None
+    return offsets[entry_index]
+
+  def _CloseMergeWorkers(self):
+    """Stops the merge worker processes."""
+    if self._merge_pool is not None:
+      self._merge_pool.terminate()
+      self._merge_pool.join()
+      self._merge_pool = None
+
+  def _CloseMemoryMap(self):
+    """Closes the memory map of the storage file."""
+    self._index_streams = {}
+    for stream_number, (file_object, _) in self._proto_streams.items():
+      if isinstance(file_object, _MemoryMappedStream):
+        del self._proto_streams[stream_number]
+
+    if self._memory_map is not None:
+      self._memory_map.close()
+      self._memory_map = None
+
+  def _GetMemoryMap(self, data_end_offset):
+    """Retrieves a read-only memory map of the storage file.
+
+    Args:
+      data_end_offset: the offset of the end of the data, relative to
+                       the start of the storage file, that needs to be
+                       accessible through the memory map.
+
+    Returns:
+      The memory map (instance of mmap.mmap) or None if the storage file
+      cannot be memory mapped.
+    """
+    if self._memory_map is not None:
+      if len(self._memory_map) >= data_end_offset:
+        return self._memory_map
+
+      # A stream that was written after the memory map was created requires
+      # the memory map to be re-created. The previous memory map is not closed
+      # since it can still be referenced by open streams, it is unmapped when
+      # it is no longer referenced.
+      self._memory_map = None
+
+    zip_file_object = self._zipfile.fp
+    if not hasattr(zip_file_object, 'fileno'):
+      return
+
+    try:
+      if not self._read_only:
+        zip_file_object.flush()
+      self._memory_map = mmap.mmap(
+          zip_file_object.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, EnvironmentError, ValueError) as exception:
+      logging.debug(
+          u'Unable to memory map storage file with error: {0:s}'.format(
+              exception))
+      self._memory_map = None
+      return
+
+    if len(self._memory_map) < data_end_offset:
+      return
+
+    return self._memory_map
+
+  def _GetMergeBatch(self, merge_store):
+    """Retrieves the next batch of event objects of a store from the workers.
+
+    Args:
+      merge_store: the merge store (instance of _MergeStore).
+    """
+    self._ScheduleMergeBatches(merge_store)
+
+    while not merge_store.event_objects and merge_store.pending_batches:
+      pending_batch = merge_store.pending_batches.popleft()
+      merge_store.event_objects.extend(pending_batch.get())
+
+      # Schedule a batch to replace the one that was retrieved.
+      self._ScheduleMergeBatches(merge_store)
+
+  def _GetSortedEntryFromMergeWorkers(self):
+    """Retrieves a sorted entry using the merge workers.
+
+    The event objects of every store are read and deserialized in batches
+    by the merge worker processes ahead of the merge. The merge itself only
+    compares the timestamps of the stores.
+
+    Returns:
+      An event object (instance of EventObject) or None if no more sorted
+      entries are available.
+
+    Raises:
+      IOError: if the stream cannot be opened.
+    """
+    if self._merge_stores is None:
+      self._merge_buffer = []
+      self._merge_stores = {}
+
+      self._merge_pool = multiprocessing.Pool(
+          processes=self._number_of_merge_workers,
+          initializer=_InitializeMergeWorker, initargs=(self._output_file,))
+
+      number_range = getattr(self, 'store_range', list(self.GetProtoNumbers()))
+      for store_number in number_range:
+        first_entry_index, end_entry_index = self._GetEntryIndexRange(
+            store_number)
+        if first_entry_index >= end_entry_index:
+          continue
+
+        merge_store = _MergeStore(
+            store_number, first_entry_index, end_entry_index)
+        self._merge_stores[store_number] = merge_store
+
+        self._GetMergeBatch(merge_store)
+
+      for merge_store in self._merge_stores.itervalues():
+        self._PushMergeStore(merge_store)
+
+    if not self._merge_buffer:
+      self._CloseMergeWorkers()
+      return
+
+    _, store_number = heapq.heappop(self._merge_buffer)
+    merge_store = self._merge_stores[store_number]
+
+    event_read = merge_store.event_objects.popleft()
+
+    if not merge_store.event_objects:
+      self._GetMergeBatch(merge_store)
+    self._PushMergeStore(merge_store)
+
+    event_read.tag = self._ReadEventTagByIdentifier(
+        event_read.store_number, event_read.store_index, event_read.uuid)
+
+    return event_read
+
+  def _PushMergeStore(self, merge_store):
+    """Pushes the next entry of a store onto the merge buffer.
+
+    The merge buffer is sorted by the timestamps of the store, hence
+    the event objects are not needed to merge the stores.
+
+    Args:
+      merge_store: the merge store (instance of _MergeStore).
+    """
+    if merge_store.event_objects:
+      timestamps = self._GetTimestamps(merge_store.store_number)
+      entry_index = merge_store.event_objects[0].store_index
+      heapq.heappush(self._merge_buffer, (
+          timestamps[entry_index], merge_store.store_number))
+
+  def _ScheduleMergeBatches(self, merge_store):
+    """Schedules the merge workers to read batches of a store.
+
+    Batches are scheduled until the maximum number of pending batches
+    of the store is reached, which bounds the number of event objects
+    that are read ahead.
+
+    Args:
+      merge_store: the merge store (instance of _MergeStore).
+    """
+    while (len(merge_store.pending_batches) <
+           self._MERGE_MAXIMUM_PENDING_BATCHES and
+           merge_store.next_batch_entry_index < merge_store.end_entry_index):
+      first_entry_index = merge_store.next_batch_entry_index
+      end_entry_index = min(
+          first_entry_index + self._MERGE_BATCH_SIZE,
+          merge_store.end_entry_index)
+      merge_store.next_batch_entry_index = end_entry_index
+
+      entry_mask = self._GetEntryMask(merge_store.store_number)
+      if entry_mask is not None:
+        entry_mask = entry_mask[first_entry_index:end_entry_index]
+        # Batches without entries that can match the filter are not read.
+        if b'\x01' not in entry_mask:
+          continue
+
+      merge_store.pending_batches.append(self._merge_pool.apply_async(
+          _ReadEventObjectsBatch,
+          (merge_store.store_number, first_entry_index, end_entry_index,
+           entry_mask)))
+
+  def _GetTimestamps(self, stream_number):
+    """Retrieves the timestamps of the entries of a store.
+
+    The timestamps are read once and cached as a compact array.
+
+    Args:
+      stream_number: the number of the stream.
+
+    Returns:
+      A sequence of the timestamps (instance of array.array or tuple) or None
+      if the store has no timestamps stream.
+
+    Raises:
+      IOError: if the stream cannot be read.
+    """
+    if stream_number not in self._timestamps:
+      stream_name = 'plaso_timestamps.{0:06d}'.format(stream_number)
+      file_object = self._OpenStream(stream_name, 'r')
+      if file_object is None:
+        return
+
+      timestamps_data = file_object.read()
+      file_object.close()
+
+      number_of_timestamps, remainder = divmod(len(timestamps_data), 8)
+      if remainder:
+        logging.warning(
+            u'Timestamps stream: {0:s} contains a truncated entry.'.format(
+                stream_name))
+        timestamps_data = timestamps_data[:number_of_timestamps * 8]
+
+      if self._TIMESTAMPS_ARRAY_TYPE_CODE:
+        timestamps = array.array(self._TIMESTAMPS_ARRAY_TYPE_CODE)
+        timestamps.fromstring(timestamps_data)
+
+        # The timestamps are stored in little-endian.
+        if sys.byteorder != 'little':
+          timestamps.byteswap()
+
+      else:
+        timestamps = struct.unpack(
+            '<{0:d}q'.format(number_of_timestamps), timestamps_data)
+
+      self._timestamps[stream_number] = timestamps
+
+    return self._timestamps[stream_number]
+
+  def _OpenMemoryMappedStream(self, stream_name):
+    """Opens a stream using the memory map of the storage file.
+
+    Args:
+      stream_name: the name of the stream.
+
+    Returns:
+      The stream file-like object (instance of _MemoryMappedStream) or None
+      if the stream is not stored uncompressed or cannot be memory mapped.
+    """
+    try:
+      zip_info = self._zipfile.getinfo(stream_name)
+    except KeyError:
+      return
 
-    return struct.unpack('<I', index_data)[0]
+    # Encrypted streams are not supported.
+    if (zip_info.compress_type != zipfile.ZIP_STORED or
+        zip_info.flag_bits & 0x0001):
+      return
+
+    header_size = self._ZIP_LOCAL_FILE_HEADER_STRUCT.size
+    memory_map = self._GetMemoryMap(zip_info.header_offset + header_size)
+    if memory_map is None:
+      return
+
+    file_header = self._ZIP_LOCAL_FILE_HEADER_STRUCT.unpack_from(
+        memory_map, zip_info.header_offset)
+    if file_header[0] != self._ZIP_LOCAL_FILE_HEADER_SIGNATURE:
+      logging.warning(
+          u'Invalid ZIP local file header signature of stream: {0:s}'.format(
+              stream_name))
+      return
+
+    # The last two values of the local file header are the size of
+    # the file name and the size of the extra field.
+    data_offset = (
+        zip_info.header_offset + header_size + file_header[10] +
+        file_header[11])
+
+    memory_map = self._GetMemoryMap(data_offset + zip_info.file_size)
+    if memory_map is None:
+      return
+
+    return _MemoryMappedStream(memory_map, data_offset, zip_info.file_size)
 
   def _OpenStream(self, stream_name, mode='r'):
     """Opens a stream.
 
+    Streams that are stored uncompressed are opened using the memory map
+    of the storage file, if possible, since these are seekable.
+
     Args:
       stream_name: the name of the stream.
       mode: the access mode. The default is read-only ('r').
 
     Returns:
-      The stream file-like object (instance of zipfile.ZipExtFile) or None.
+      The stream file-like object (instance of zipfile.ZipExtFile or
+      _MemoryMappedStream) or None.
     """
+    if mode == 'r':
+      stream_prefix, _, _ = stream_name.partition('.')
+      if stream_prefix in self._STORED_STREAM_PREFIXES:
+        file_object = self._OpenMemoryMappedStream(stream_name)
+        if file_object is not None:
+          return file_object
+
     try:
       return self._zipfile.open(stream_name, mode)
     except KeyError:
@@ -731,25 +1521,26 @@ class StorageFile(object):
       uuid: the UUID string.
 
     Returns:
-      The event tag (instance of EventTag).
+      The event tag (instance of EventTag) or None if the event is not tagged.
 
     Raises:
       IOError: if the stream cannot be opened.
     """
-    tag_index_value = self._GetEventTagIndexValue(
-        store_number, store_index, uuid)
-    if tag_index_value is None:
+    if self._event_tag_index is None:
+      self._BuildTagIndex()
+
+    if not self._event_tag_index:
       return
 
-    stream_name = 'plaso_tagging.{0:06d}'.format(tag_index_value.store_number)
-    tag_file_object = self._OpenStream(stream_name, 'r')
-    if tag_file_object is None:
-      raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
+    # Try looking up event tag by numeric identifier.
+    tag_identifier = '{0:d}:{1:d}'.format(store_number, store_index)
+    event_tag = self._event_tag_index.get(tag_identifier, None)
 
-    # Since zipfile.ZipExtFile is not seekable we need to read upto
-    # the store offset.
-    _ = tag_file_object.read(tag_index_value.store_offset)
-    return self._ReadEventTag(tag_file_object)
+    # Try looking up event tag by UUID.
+    if event_tag is None:
+      event_tag = self._event_tag_index.get(uuid, None)
+
+    return event_tag
 
   def _ReadStream(self, stream_name):
     """Reads the data in a stream.
@@ -781,8 +1572,10 @@ class StorageFile(object):
           json_serializer.JsonEventObjectSerializer)
       self._event_serializer_format_string = 'json'
     else:
+      # The event objects are decoded lazily since most attributes are
+      # not needed to sort and filter the event objects.
       self._event_object_serializer = (
-          protobuf_serializer.ProtobufEventObjectSerializer)
+          protobuf_serializer.ProtobufLazyEventObjectSerializer)
       self._event_serializer_format_string = 'proto'
 
   def _WritePreprocessObject(self, pre_obj):
@@ -814,6 +1607,31 @@ class StorageFile(object):
 
     self._WriteStream('information.dump', stream_data)
 
+  def _WriteParsersProfile(self, parsers_profile):
+    """Writes a parsers profile to the storage file.
+
+    Every parsers profile is written to a separate stream, hence the parsers
+    profiles of multiple runs that use the same storage file are kept.
+
+    Args:
+      parsers_profile: the parsers profile (instance of ParsersProfile).
+    """
+    profile_number = 1
+    for name in self._GetStreamNames():
+      if name.startswith('plaso_profile.'):
+        _, _, number_string = name.partition('.')
+        try:
+          number = int(number_string, 10)
+        except ValueError:
+          logging.error(u'Unable to read in profile number.')
+          number = 0
+        if number >= profile_number:
+          profile_number = number + 1
+
+    stream_name = 'plaso_profile.{0:06d}'.format(profile_number)
+    self._WriteStream(
+        stream_name, profiler.ParsersProfile.WriteSerialized(parsers_profile))
+
   def _WriteStream(self, stream_name, stream_data):
     """Write the data to a stream.
 
@@ -821,7 +1639,26 @@ class StorageFile(object):
       stream_name: the name of the stream.
       stream_data: the data of the steam.
     """
-    self._zipfile.writestr(stream_name, stream_data)
+    stream_prefix, _, _ = stream_name.partition('.')
+    if stream_prefix in self._STORED_STREAM_PREFIXES:
+      compress_type = zipfile.ZIP_STORED
+    else:
+      compress_type = zipfile.ZIP_DEFLATED
+
+    self._zipfile.writestr(
+        stream_name, stream_data, compress_type=compress_type)
+
+  def _WriteStoredStream(self, stream_name, stream_data):
+    """Write the data to an uncompressed (stored) stream.
+
+    Args:
+      stream_name: the name of the stream.
+      stream_data: a byte string containing the data of the stream.
+    """
+    stream_writer = _StoredStreamWriter(self._zipfile, stream_name)
+    stream_writer.Open()
+    stream_writer.Write(stream_data)
+    stream_writer.Close()
 
   def Close(self):
     """Closes the storage, flush the last buffer and closes the ZIP file."""
@@ -829,7 +1666,12 @@ class StorageFile(object):
       if not self._read_only and self._pre_obj:
         self._WritePreprocessObject(self._pre_obj)
 
+      if not self._read_only and self._parsers_profile:
+        self._WriteParsersProfile(self._parsers_profile)
+
       self._FlushBuffer()
+      self._CloseMergeWorkers()
+      self._CloseMemoryMap()
       self._zipfile.close()
       self._file_open = False
       if not self._read_only:
@@ -966,31 +1808,80 @@ class StorageFile(object):
 
     return information
 
-  def SetStoreLimit(self, unused_my_filter=None):
-    """Set a limit to the stores used for returning data."""
+  def SetStoreLimit(self, my_filter=None):
+    """Set a limit to the stores used for returning data.
+
+    The stores are limited by the time range of the filters and, if
+    a filter object is provided, by the data type, parser and timestamp
+    constraints of its filter expression. These constraints are also used
+    to skip entries of the stores that cannot match the filter expression,
+    without unserializing the event objects.
+
+    Args:
+      my_filter: optional filter object (instance of FilterObject).
+    """
     # Retrieve set first and last timestamps.
     self._bound_first, self._bound_last = pfilter.TimeRangeCache.GetTimeRange()
+    self._entry_index_ranges = {}
+    self._entry_masks = {}
+    self._store_attribute_filters = {}
 
     self.store_range = []
 
-    # TODO: Fetch a filter object from the filter query.
+    metadata_matcher = None
+    matcher = getattr(my_filter, 'matcher', None)
+    if matcher:
+      metadata_matcher = pfilter.GetStoreMetadataMatcher(matcher)
 
     for number in self.GetProtoNumbers():
-      # TODO: Read more criteria from here.
-      first, last = self.ReadMeta(number).get('range', (0, limit.MAX_INT64))
+      store_metadata = self.ReadMeta(number)
+      first, last = store_metadata.get('range', (0, limit.MAX_INT64))
       if last < first:
         logging.error(
             u'last: {0:d} first: {1:d} container: {2:d} (last < first)'.format(
                 last, first, number))
 
-      if first <= self._bound_last and self._bound_first <= last:
-        # TODO: Check at least parser and data_type (stored in metadata).
-        # Check whether these attributes exist in filter, if so use the filter
-        # to determine whether the stores should be included.
-        self.store_range.append(number)
-
-      else:
+      if first > self._bound_last or self._bound_first > last:
         logging.debug(u'Store [{0:d}] not used'.format(number))
+        continue
+
+      if metadata_matcher and not metadata_matcher(store_metadata):
+        logging.debug(u'Store [{0:d}] not used by filter'.format(number))
+        continue
+
+      self.store_range.append(number)
+
+      if metadata_matcher:
+        self._SetStoreAttributeFilter(number, store_metadata, metadata_matcher)
+
+  def _SetStoreAttributeFilter(self, number, store_metadata, metadata_matcher):
+    """Sets the attribute filter of a store.
+
+    The attribute filter contains the combinations of data type and parser
+    indexes, as stored in the attribute index stream, that can match
+    the filter. Every combination is stored as an integer that contains
+    the data type index in the lower and the parser index in the upper
+    16 bits. The attribute filter is not set if every combination can match
+    the filter.
+
+    Args:
+      number: the store number.
+      store_metadata: a dictionary containing the store metadata.
+      metadata_matcher: the store metadata match function of the filter.
+    """
+    data_types = store_metadata.get('data_type', None)
+    parsers = store_metadata.get('parsers', None)
+    if not data_types or not parsers:
+      return
+
+    attribute_filter = set()
+    for data_type_index, data_type in enumerate(data_types):
+      for parser_index, parser in enumerate(parsers):
+        if metadata_matcher({'data_type': [data_type], 'parsers': [parser]}):
+          attribute_filter.add(data_type_index | (parser_index << 16))
+
+    if len(attribute_filter) < len(data_types) * len(parsers):
+      self._store_attribute_filters[number] = frozenset(attribute_filter)
 
   def GetSortedEntry(self):
     """Return a sorted entry from the storage file.
@@ -1002,18 +1893,20 @@ class StorageFile(object):
       self._bound_first, self._bound_last = (
           pfilter.TimeRangeCache.GetTimeRange())
 
+    if self._number_of_merge_workers:
+      return self._GetSortedEntryFromMergeWorkers()
+
     if not hasattr(self, '_merge_buffer'):
       self._merge_buffer = []
       number_range = getattr(self, 'store_range', list(self.GetProtoNumbers()))
       for store_number in number_range:
         event_object = self.GetEventObject(store_number)
-        if not event_object:
-          return
-
-        while event_object.timestamp < self._bound_first:
+        while event_object and event_object.timestamp < self._bound_first:
           event_object = self.GetEventObject(store_number)
-          if not event_object:
-            return
+
+        # Stores without events within the time bounds are not merged.
+        if not event_object:
+          continue
 
         heapq.heappush(
             self._merge_buffer,
@@ -1042,6 +1935,38 @@ class StorageFile(object):
 
     return event_read
 
+  def SetMergeWorkers(self, number_of_workers):
+    """Sets the number of merge worker processes used by GetSortedEntry.
+
+    The merge workers read and deserialize the event objects of the stores
+    ahead of the merge. This is only supported by storage files that are
+    opened read-only by path and that contain timestamps streams for every
+    store, otherwise the stores are merged without workers.
+
+    Args:
+      number_of_workers: the number of merge worker processes, where 0
+                         represents that no merge workers are used.
+    """
+    if not number_of_workers:
+      self._number_of_merge_workers = 0
+      return
+
+    if not self._read_only or not isinstance(self._output_file, basestring):
+      logging.warning(
+          u'Merge workers not supported for writable or file-like object '
+          u'storage files.')
+      return
+
+    number_range = getattr(self, 'store_range', list(self.GetProtoNumbers()))
+    for store_number in number_range:
+      if self._GetTimestamps(store_number) is None:
+        logging.warning((
+            u'Merge workers not supported, store: {0:d} has no timestamps '
+            u'stream.').format(store_number))
+        return
+
+    self._number_of_merge_workers = number_of_workers
+
   def GetEventObject(self, stream_number, entry_index=-1):
     """Reads an event object from the store.
 
@@ -1069,6 +1994,58 @@ class StorageFile(object):
 
     return event_object
 
+  def GetEventObjectsByLocation(self, locations):
+    """Reads event objects by their location in the store.
+
+    The locations are read in order of store number and index, hence
+    every store is read in a single forward pass.
+
+    Args:
+      locations: an iterable of tuples of the store number and index.
+
+    Yields:
+      A tuple of the location and the event object (instance of EventObject)
+      or None if not able to read the event.
+    """
+    for location in sorted(set(locations)):
+      store_number, store_index = location
+      yield location, self.GetEventObject(store_number, entry_index=store_index)
+
+  def GetTimestampsByLocation(self, locations):
+    """Retrieves the timestamps of events by their location in the store.
+
+    The timestamps are read from the timestamps of the stores, hence
+    the event objects are only read if a store has no timestamps.
+
+    Args:
+      locations: an iterable of tuples of the store number and index.
+
+    Returns:
+      A dictionary containing the timestamp per location. Locations of
+      events that cannot be read are not included.
+    """
+    timestamps_per_location = {}
+    unresolved_locations = []
+    for location in locations:
+      if location in timestamps_per_location:
+        continue
+
+      store_number, store_index = location
+      timestamps = self._GetTimestamps(store_number)
+      if timestamps is None or not 0 <= store_index < len(timestamps):
+        unresolved_locations.append(location)
+        continue
+
+      timestamps_per_location[location] = timestamps[store_index]
+
+    for location, event_object in self.GetEventObjectsByLocation(
+        unresolved_locations):
+      timestamp = getattr(event_object, 'timestamp', None)
+      if timestamp is not None:
+        timestamps_per_location[location] = timestamp
+
+    return timestamps_per_location
+
   def GetEntries(self, number):
     """A generator to read all plaso_storage protobufs.
 
@@ -1150,55 +2127,145 @@ class StorageFile(object):
     """Return the current file number of the storage."""
     return self._file_number
 
-  def AddEventObject(self, event_object):
-    """Adds an event object to the storage.
+  def _AddSerializedEventObject(
+      self, timestamp, data_type, parser, plugin, event_object_data):
+    """Adds a serialized event object to the storage.
 
     Args:
-      event_object: an event object (instance of EventObject).
-
-    Raises:
-      IOError: When trying to write to a closed storage file.
+      timestamp: the timestamp of the event object.
+      data_type: the data type of the event object.
+      parser: the parser (chain) of the event object or None if not set.
+      plugin: the plugin of the event object or None if not set.
+      event_object_data: the serialized event object or None if the event
+                         object failed to serialize.
     """
-    if not self._file_open:
-      raise IOError(u'Trying to add an entry to a closed storage file.')
-
-    if event_object.timestamp > self._buffer_last_timestamp:
-      self._buffer_last_timestamp = event_object.timestamp
+    if timestamp > self._buffer_last_timestamp:
+      self._buffer_last_timestamp = timestamp
 
     # TODO: support negative timestamps.
-    if (event_object.timestamp < self._buffer_first_timestamp and
-        event_object.timestamp > 0):
-      self._buffer_first_timestamp = event_object.timestamp
+    if timestamp < self._buffer_first_timestamp and timestamp > 0:
+      self._buffer_first_timestamp = timestamp
 
-    attributes = event_object.GetValues()
     # Add values to counters.
     if self._pre_obj:
       self._pre_obj.counter['total'] += 1
-      self._pre_obj.counter[attributes.get('parser', 'N/A')] += 1
-      if 'plugin' in attributes:
-        self._pre_obj.plugin_counter[attributes.get('plugin', 'N/A')] += 1
+      if parser is None:
+        self._pre_obj.counter['N/A'] += 1
+      else:
+        self._pre_obj.counter[parser] += 1
+      if plugin is not None:
+        self._pre_obj.plugin_counter[plugin] += 1
 
     # Add to temporary counter.
-    self._count_data_type[event_object.data_type] += 1
-    parser = attributes.get('parser', 'unknown_parser')
+    self._count_data_type[data_type] += 1
+    if parser is None:
+      parser = 'unknown_parser'
     self._count_parser[parser] += 1
 
-    event_object_data = self._event_object_serializer.WriteSerialized(
-        event_object)
-
     # TODO: Re-think this approach with the re-design of the storage.
     # Check if the event object failed to serialize (none is returned).
     if event_object_data is None:
       return
 
     heapq.heappush(
-        self._buffer, (event_object.timestamp, event_object_data))
+        self._buffer, (timestamp, event_object_data, data_type, parser))
     self._buffer_size += len(event_object_data)
     self._write_counter += 1
 
     if self._buffer_size > self._max_buffer_size:
       self._FlushBuffer()
 
+  def AddParsersProfile(self, parsers_profile):
+    """Adds a parsers profile.
+
+    The parsers profiles that are added are merged and written to the storage
+    file when it is closed.
+
+    Args:
+      parsers_profile: the parsers profile (instance of ParsersProfile).
+
+    Raises:
+      IOError: if the storage file is read-only.
+    """
+    if self._read_only:
+      raise IOError(u'Unable to add parsers profile to read-only storage file.')
+
+    if not self._parsers_profile:
+      self._parsers_profile = profiler.ParsersProfile()
+    self._parsers_profile.Merge(parsers_profile)
+
+  def AddStores(self, storage_file_path):
+    """Adds the stores of another storage file.
+
+    The streams of the stores are copied and renumbered, hence the event
+    objects are not deserialized and sorted again. The counters of the last
+    preprocessing object of the other storage file are added to those of
+    the preprocessing object.
+
+    Args:
+      storage_file_path: the path of the other storage file.
+
+    Raises:
+      IOError: if the storage file is read-only or the other storage file
+               cannot be read.
+    """
+    if self._read_only:
+      raise IOError(u'Unable to add stores to read-only storage file.')
+
+    # The buffer is flushed first, so that the stores are numbered in
+    # the order they were added.
+    self._FlushBuffer()
+
+    other_storage_file = StorageFile(storage_file_path, read_only=True)
+
+    try:
+      # pylint: disable=protected-access
+      for store_number in other_storage_file.GetProtoNumbers():
+        for stream_prefix in self._STORE_STREAM_PREFIXES:
+          stream_name = '{0:s}.{1:06d}'.format(stream_prefix, store_number)
+          file_object = other_storage_file._OpenStream(stream_name, 'r')
+          if file_object is None:
+            continue
+
+          stream_name = '{0:s}.{1:06d}'.format(
+              stream_prefix, self._file_number)
+          self._CopyStream(file_object, stream_name)
+          file_object.close()
+
+        self._file_number += 1
+
+      if self._pre_obj:
+        for pre_obj in other_storage_file.GetStorageInformation()[-1:]:
+          self._pre_obj.counter.update(getattr(pre_obj, 'counter', {}))
+          self._pre_obj.plugin_counter.update(
+              getattr(pre_obj, 'plugin_counter', {}))
+
+      for parsers_profile in other_storage_file.GetParsersProfiles():
+        self.AddParsersProfile(parsers_profile)
+
+    finally:
+      other_storage_file.Close()
+
+  def AddEventObject(self, event_object):
+    """Adds an event object to the storage.
+
+    Args:
+      event_object: an event object (instance of EventObject).
+
+    Raises:
+      IOError: When trying to write to a closed storage file.
+    """
+    if not self._file_open:
+      raise IOError(u'Trying to add an entry to a closed storage file.')
+
+    event_object_data = self._event_object_serializer.WriteSerialized(
+        event_object)
+
+    self._AddSerializedEventObject(
+        event_object.timestamp, event_object.data_type,
+        getattr(event_object, 'parser', None),
+        getattr(event_object, 'plugin', None), event_object_data)
+
   def AddEventObjects(self, event_objects):
     """Adds an event objects to the storage.
 
@@ -1209,6 +2276,31 @@ class StorageFile(object):
     for event_object in event_objects:
       self.AddEventObject(event_object)
 
+  def AddSerializedEventObjects(self, serialized_event_object_batch):
+    """Adds a batch of serialized event objects to the storage.
+
+    The serialized event objects are buffered as-is, if the batch was
+    serialized in the format of the storage, without deserializing and
+    reserializing them.
+
+    Args:
+      serialized_event_object_batch: the batch of serialized event objects
+                                     (instance of SerializedEventObjectBatch).
+
+    Raises:
+      IOError: When trying to write to a closed storage file.
+    """
+    if not self._file_open:
+      raise IOError(u'Trying to add an entry to a closed storage file.')
+
+    if (serialized_event_object_batch.serializer_format ==
+        self._event_serializer_format_string):
+      for record in serialized_event_object_batch.GetRecords():
+        self._AddSerializedEventObject(*record)
+
+    else:
+      self.AddEventObjects(serialized_event_object_batch.GetEventObjects())
+
   def HasTagging(self):
     """Return a bool indicating whether or not a Tag file is stored."""
     for name in self._GetStreamNames():
@@ -1223,6 +2315,25 @@ class StorageFile(object):
         return True
     return False
 
+  def GetParsersProfiles(self):
+    """Retrieves the parsers profiles stored in the storage file.
+
+    Yields:
+      A parsers profile (instance of ParsersProfile).
+    """
+    for stream_name in sorted(self._GetStreamNames()):
+      if stream_name.startswith('plaso_profile.'):
+        stream_data = self._ReadStream(stream_name)
+        yield profiler.ParsersProfile.ReadSerialized(stream_data)
+
+  def HasParsersProfiles(self):
+    """Return a bool indicating whether or not a parsers profile is stored."""
+    for name in self._GetStreamNames():
+      if name.startswith('plaso_profile.'):
+        return True
+
+    return False
+
   def HasReports(self):
     """Return a bool indicating whether or not a Report file is stored."""
     for name in self._GetStreamNames():
@@ -1376,8 +2487,9 @@ class StorageFile(object):
         _, number = name.split('.')
         if int(number) >= tag_number:
           tag_number = int(number) + 1
-        if self._event_tag_index is None:
-          self._BuildTagIndex()
+
+    if self._event_tag_index is None:
+      self._BuildTagIndex()
 
     tag_packed = []
     tag_index = []
@@ -1388,31 +2500,19 @@ class StorageFile(object):
         for tag_entry in tag.tags:
           self._pre_obj.counter[tag_entry] += 1
 
-      if self._event_tag_index is not None:
-        tag_index_value = self._event_tag_index.get(tag.string_key, None)
-      else:
-        tag_index_value = None
+      tag_identifier = self._GetEventTagIdentifier(tag)
+      old_tag = self._event_tag_index.get(tag_identifier, None)
 
       # This particular event has already been tagged on a previous occasion,
       # we need to make sure we are appending to that particular tag.
-      if tag_index_value is not None:
-        stream_name = 'plaso_tagging.{0:06d}'.format(
-            tag_index_value.store_number)
-
-        tag_file_object = self._OpenStream(stream_name, 'r')
-        if tag_file_object is None:
-          raise IOError(u'Unable to open stream: {0:s}'.format(stream_name))
-
-        # Since zipfile.ZipExtFile is not seekable we need to read upto
-        # the store offset.
-        _ = tag_file_object.read(tag_index_value.store_offset)
-
-        old_tag = self._ReadEventTag(tag_file_object)
-
+      if old_tag is not None:
         # TODO: move the append functionality into EventTag.
         # Maybe name the function extend or update?
         if hasattr(old_tag, 'tags'):
-          tag.tags.extend(old_tag.tags)
+          if hasattr(tag, 'tags'):
+            tag.tags.extend(old_tag.tags)
+          else:
+            tag.tags = list(old_tag.tags)
 
         if hasattr(old_tag, 'comment'):
           if hasattr(tag, 'comment'):
@@ -1442,19 +2542,217 @@ class StorageFile(object):
       size += len(packed)
       tag_packed.append(packed)
 
+      # The merged event tag supersedes the previous one in the tag index.
+      # A copy is stored since the caller can still change the event tag.
+      self._event_tag_index[tag_identifier] = (
+          self._event_tag_serializer.ReadSerialized(serialized_event_tag))
+
+    if not tag_packed:
+      return
+
     stream_name = 'plaso_tag_index.{0:06d}'.format(tag_number)
     self._WriteStream(stream_name, ''.join(tag_index))
 
     stream_name = 'plaso_tagging.{0:06d}'.format(tag_number)
     self._WriteStream(stream_name, ''.join(tag_packed))
 
-    # TODO: Update the tags that have changed in the index instead
-    # of flushing the index.
+    # The snapshot contains the merged event tags of all the tagging streams
+    # stored so far, so that the tag index can be read from a single stream
+    # when the storage file is opened again. ZIP members cannot be removed
+    # in place, hence the superseded snapshot and tagging streams remain.
+    tag_snapshot_packed = []
+    for event_tag in self._event_tag_index.itervalues():
+      serialized_event_tag = self._event_tag_serializer.WriteSerialized(
+          event_tag)
+      tag_snapshot_packed.append(
+          struct.pack('<I', len(serialized_event_tag)) + serialized_event_tag)
+
+    stream_name = 'plaso_tag_snapshot.{0:06d}'.format(tag_number)
+    self._WriteStream(stream_name, ''.join(tag_snapshot_packed))
+
+
+# The storage file of a merge worker process.
+_merge_worker_storage_file = None
+
+
+def _InitializeMergeWorker(storage_file_path):
+  """Initializes a merge worker process.
+
+  Args:
+    storage_file_path: the path of the storage file.
+  """
+  # pylint: disable=global-statement
+  global _merge_worker_storage_file
+  _merge_worker_storage_file = StorageFile(storage_file_path, read_only=True)
+
+
+def _ReadEventObjectsBatch(
+    store_number, first_entry_index, end_entry_index, entry_mask=None):
+  """Reads a batch of event objects of a store in a merge worker process.
+
+  Args:
+    store_number: the store number.
+    first_entry_index: the index of the first entry to read.
+    end_entry_index: the index after the last entry to read.
+    entry_mask: optional byte array (instance of bytearray) that contains
+                1 for every entry of the batch that should be read and 0
+                otherwise. The default is None, which represents that every
+                entry is read.
+
+  Returns:
+    A list of event objects (instances of EventObject).
+  """
+  event_objects = []
+  for entry_index in xrange(first_entry_index, end_entry_index):
+    if entry_mask is not None and not entry_mask[
+        entry_index - first_entry_index]:
+      continue
+
+    event_object = _merge_worker_storage_file.GetEventObject(
+        store_number, entry_index=entry_index)
+    if not event_object:
+      break
+
+    event_objects.append(event_object)
+
+  return event_objects
+
+
+class SerializedEventObjectBatch(object):
+  """Class that defines a batch of serialized event objects.
+
+  The batch is used to transfer the event objects produced by an extraction
+  worker to the storage process. The event objects are serialized by the
+  worker and stored in the batch as length-prefixed records, which are
+  pickled as a single string. This way the storage process does not need to
+  unpickle and reserialize every individual event object.
+
+  A record consists of a header that contains the timestamp, the size of
+  the serialized event object and the sizes of the data type, parser and
+  plugin strings. The header is followed by the UTF-8 encoded strings and
+  the serialized event object.
+  """
+
+  _RECORD_HEADER_STRUCT = struct.Struct('<qIHHH')
+
+  def __init__(self, serializer_format='proto'):
+    """Initializes the batch.
+
+    Args:
+      serializer_format: optional string containing the format of
+                         the serialized event objects, either "proto" or
+                         "json". The default is proto.
+    """
+    super(SerializedEventObjectBatch, self).__init__()
+    self._records = []
+    self.data_size = 0
+    self.number_of_records = 0
+    self.serializer_format = serializer_format
+
+  def __getstate__(self):
+    """Retrieves the state of the batch for pickling.
+
+    Returns:
+      A dictionary containing the state of the batch.
+    """
+    return {
+        'data': b''.join(self._records),
+        'number_of_records': self.number_of_records,
+        'serializer_format': self.serializer_format}
+
+  def __setstate__(self, state):
+    """Sets the state of the batch after unpickling.
+
+    Args:
+      state: a dictionary containing the state of the batch.
+    """
+    self._records = [state['data']]
+    self.data_size = len(state['data'])
+    self.number_of_records = state['number_of_records']
+    self.serializer_format = state['serializer_format']
+
+  def AppendRecord(
+      self, timestamp, data_type, parser, plugin, event_object_data):
+    """Appends a serialized event object to the batch.
+
+    Args:
+      timestamp: the timestamp of the event object.
+      data_type: the data type of the event object.
+      parser: the parser (chain) of the event object or None if not set.
+      plugin: the plugin of the event object or None if not set.
+      event_object_data: the serialized event object.
+
+    Raises:
+      ValueError: if the record cannot be stored in the batch.
+    """
+    data_type = (data_type or u'').encode('utf-8')
+    parser = (parser or u'').encode('utf-8')
+    plugin = (plugin or u'').encode('utf-8')
+
+    try:
+      record_header = self._RECORD_HEADER_STRUCT.pack(
+          timestamp, len(event_object_data), len(data_type), len(parser),
+          len(plugin))
+    except struct.error as exception:
+      raise ValueError(
+          u'Unable to pack record header with error: {0:s}'.format(exception))
+
+    record = b''.join([
+        record_header, data_type, parser, plugin, event_object_data])
+
+    self._records.append(record)
+    self.data_size += len(record)
+    self.number_of_records += 1
+
+  def GetEventObjects(self):
+    """Retrieves the event objects stored in the batch.
+
+    Yields:
+      An event object (instance of EventObject).
+    """
+    if self.serializer_format == 'json':
+      serializer = json_serializer.JsonEventObjectSerializer
+    else:
+      serializer = protobuf_serializer.ProtobufEventObjectSerializer
+
+    for _, _, _, _, event_object_data in self.GetRecords():
+      yield serializer.ReadSerialized(event_object_data)
+
+  def GetRecords(self):
+    """Retrieves the records stored in the batch.
+
+    Yields:
+      A tuple of the timestamp, data type, parser, plugin and serialized
+      event object. The parser and plugin are None if not set.
+    """
+    data = b''.join(self._records)
+    data_offset = 0
+    while data_offset < len(data):
+      (timestamp, event_object_data_size, data_type_size, parser_size,
+       plugin_size) = self._RECORD_HEADER_STRUCT.unpack_from(data, data_offset)
+      data_offset += self._RECORD_HEADER_STRUCT.size
+
+      data_type = data[data_offset:data_offset + data_type_size]
+      data_offset += data_type_size
+
+      parser = data[data_offset:data_offset + parser_size] or None
+      data_offset += parser_size
 
-    # If we already built a list of tag in memory we need to clear that
-    # since the tags have changed.
-    if self._event_tag_index is not None:
-      del self._event_tag_index
+      plugin = data[data_offset:data_offset + plugin_size] or None
+      data_offset += plugin_size
+
+      event_object_data = data[
+          data_offset:data_offset + event_object_data_size]
+      data_offset += event_object_data_size
+
+      if parser is not None:
+        parser = parser.decode('utf-8')
+      if plugin is not None:
+        plugin = plugin.decode('utf-8')
+
+      yield (
+          timestamp, data_type.decode('utf-8'), parser, plugin,
+          event_object_data)
 
 
 class StorageFileWriter(queue.EventObjectQueueConsumer):
@@ -1475,22 +2773,93 @@ class StorageFileWriter(queue.EventObjectQueueConsumer):
     """
     super(StorageFileWriter, self).__init__(storage_queue)
     self._buffer_size = buffer_size
+    self._completed_event = multiprocessing.Event()
     self._output_file = output_file
     self._pre_obj = pre_obj
     self._serializer_format = serializer_format
+    self._shard_writers = []
     self._storage_file = None
 
   def _ConsumeEventObject(self, event_object, **unused_kwargs):
     """Consumes an event object callback for ConsumeEventObjects."""
-    self._storage_file.AddEventObject(event_object)
+    # The extraction workers of the multi-processing engine produce batches
+    # of serialized event objects.
+    if isinstance(event_object, SerializedEventObjectBatch):
+      self._storage_file.AddSerializedEventObjects(event_object)
+    elif isinstance(event_object, profiler.ParsersProfile):
+      self._storage_file.AddParsersProfile(event_object)
+    else:
+      self._storage_file.AddEventObject(event_object)
+
+  def _AddShardStores(self, shard_writer):
+    """Adds the stores of a shard file once its writer has completed.
+
+    Args:
+      shard_writer: the shard writer (instance of StorageFileWriter).
+    """
+    # pylint: disable=protected-access
+    shard_writer._completed_event.wait()
+
+    try:
+      self._storage_file.AddStores(shard_writer._output_file)
+    except (IOError, zipfile.BadZipfile) as exception:
+      logging.error(
+          u'Unable to add stores of shard file: {0:s} with error: {1:s}'.format(
+              shard_writer._output_file, exception))
+      return
+
+    os.remove(shard_writer._output_file)
+
+  def CreateShardWriters(self, storage_queues):
+    """Creates storage file writers that write shards of the storage file.
+
+    Every shard writer writes the event objects pushed on its storage queue
+    to a separate shard file. The stores of the shard files are added to
+    the storage file after the event objects pushed on the storage queue of
+    this writer are written.
+
+    Args:
+      storage_queues: a list of the storage queues (instances of Queue),
+                      one per shard.
+
+    Returns:
+      A list of the shard writers (instances of StorageFileWriter).
+
+    Raises:
+      IOError: if a shard file already exists.
+    """
+    shard_writers = []
+    for shard_number, storage_queue in enumerate(storage_queues):
+      shard_file_path = u'{0:s}.shard{1:d}'.format(
+          self._output_file, shard_number + 1)
+      if os.path.exists(shard_file_path):
+        raise IOError(
+            u'Shard file: {0:s} already exists.'.format(shard_file_path))
+
+      shard_writers.append(StorageFileWriter(
+          storage_queue, shard_file_path, buffer_size=self._buffer_size,
+          pre_obj=self._pre_obj, serializer_format=self._serializer_format))
+
+    self._shard_writers.extend(shard_writers)
+    return shard_writers
 
   def WriteEventObjects(self):
     """Writes the event objects that are pushed on the queue."""
-    self._storage_file = StorageFile(
-        self._output_file, buffer_size=self._buffer_size, pre_obj=self._pre_obj,
-        serializer_format=self._serializer_format)
-    self.ConsumeEventObjects()
-    self._storage_file.Close()
+    try:
+      self._storage_file = StorageFile(
+          self._output_file, buffer_size=self._buffer_size,
+          pre_obj=self._pre_obj, serializer_format=self._serializer_format)
+      self.ConsumeEventObjects()
+
+      for shard_writer in self._shard_writers:
+        self._AddShardStores(shard_writer)
+
+      self._storage_file.Close()
+
+    finally:
+      # The completed event signals the writer of the storage file that
+      # the shard file can be added, also if writing the shard failed.
+      self._completed_event.set()
 
 
 class BypassStorageWriter(queue.EventObjectQueueConsumer):
@@ -1516,6 +2885,15 @@ class BypassStorageWriter(queue.EventObjectQueueConsumer):
 
   def _ConsumeEventObject(self, event_object, **unused_kwargs):
     """Consumes an event object callback for ConsumeEventObjects."""
+    if isinstance(event_object, SerializedEventObjectBatch):
+      for batched_event_object in event_object.GetEventObjects():
+        self._ConsumeEventObject(batched_event_object)
+      return
+
+    # The parsers profile cannot be written by an output module.
+    if isinstance(event_object, profiler.ParsersProfile):
+      return
+
     # Set the store number and index to default values since they are not used.
     event_object.store_number = 1
     event_object.store_index = -1
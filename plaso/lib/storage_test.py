@@ -8,9 +8,11 @@ import shutil
 import unittest
 import zipfile
 
+from plaso.engine import profiler
 from plaso.engine import queue
 from plaso.events import text_events
 from plaso.events import windows_events
+from plaso.filters import eventfilter
 from plaso.formatters import manager as formatters_manager
 from plaso.formatters import mediator as formatters_mediator
 from plaso.lib import event
@@ -137,13 +139,105 @@ class StorageFileTest(unittest.TestCase):
       z_file = zipfile.ZipFile(temp_file, 'r', zipfile.ZIP_DEFLATED)
 
       expected_z_filename_list = [
-          'plaso_index.000001', 'plaso_meta.000001', 'plaso_proto.000001',
-          'plaso_timestamps.000001', 'serializer.txt']
+          'plaso_attribute_index.000001', 'plaso_index.000001',
+          'plaso_meta.000001', 'plaso_proto.000001', 'plaso_timestamps.000001',
+          'serializer.txt']
 
       z_filename_list = sorted(z_file.namelist())
-      self.assertEqual(len(z_filename_list), 5)
+      self.assertEqual(len(z_filename_list), 6)
       self.assertEqual(z_filename_list, expected_z_filename_list)
 
+  def testStorageWriterSerializedEventObjects(self):
+    """Test the storage writer with batches of serialized event objects."""
+    test_queue = multi_process.MultiProcessingQueue()
+    test_queue_producer = multi_process.MultiProcessEventObjectQueueProducer(
+        test_queue, maximum_batch_size=3)
+    test_queue_producer.ProduceItems(self._event_objects)
+    test_queue_producer.SignalEndOfInput()
+
+    with TempDirectory() as dirname:
+      temp_file = os.path.join(dirname, 'plaso.db')
+      storage_writer = storage.StorageFileWriter(test_queue, temp_file)
+      storage_writer.WriteEventObjects()
+
+      read_store = storage.StorageFile(temp_file, read_only=True)
+      event_objects = list(read_store.GetEntries(1))
+      read_store.Close()
+
+    timestamps = [event_object.timestamp for event_object in event_objects]
+    expected_timestamps = [
+        1238934459000000, 1334940286000000, 1334961526929596, 1335966206929596]
+    self.assertEqual(timestamps, expected_timestamps)
+
+    self.assertEqual(event_objects[0].text[0:10], u'This is a ')
+    self.assertEqual(event_objects[0].parser, u'UNKNOWN')
+
+  def testStorageWriterShards(self):
+    """Test the storage writer with a shard writer."""
+    test_queues = [
+        multi_process.MultiProcessingQueue(),
+        multi_process.MultiProcessingQueue()]
+    test_queue_producer = multi_process.MultiProcessEventObjectQueueProducer(
+        multi_process.MultiProcessRoundRobinQueue(test_queues),
+        maximum_batch_size=2)
+    test_queue_producer.ProduceItems(self._event_objects)
+    test_queue_producer.SignalEndOfInput()
+
+    with TempDirectory() as dirname:
+      temp_file = os.path.join(dirname, 'plaso.db')
+      storage_writer = storage.StorageFileWriter(
+          test_queues[0], temp_file, pre_obj=event.PreprocessObject())
+      shard_writers = storage_writer.CreateShardWriters(test_queues[1:])
+      self.assertEqual(len(shard_writers), 1)
+
+      # The storage writers are normally run in separate processes.
+      shard_writers[0].WriteEventObjects()
+      storage_writer.WriteEventObjects()
+
+      self.assertEqual(os.listdir(dirname), ['plaso.db'])
+
+      read_store = storage.StorageFile(temp_file, read_only=True)
+      self.assertEqual(list(read_store.GetProtoNumbers()), [1, 2])
+
+      read_store.SetStoreLimit()
+      timestamps = []
+      event_object = read_store.GetSortedEntry()
+      while event_object:
+        timestamps.append(event_object.timestamp)
+        event_object = read_store.GetSortedEntry()
+
+      pre_obj = read_store.GetStorageInformation()[-1]
+      read_store.Close()
+
+    expected_timestamps = [
+        1238934459000000, 1334940286000000, 1334961526929596, 1335966206929596]
+    self.assertEqual(timestamps, expected_timestamps)
+    self.assertEqual(pre_obj.counter['total'], 4)
+
+  def testParsersProfile(self):
+    """Test the AddParsersProfile and GetParsersProfiles functions."""
+    parsers_profile = profiler.ParsersProfile()
+    parsers_profile.AddParserChainTiming(
+        u'sqlite/chrome_history', 2.0, 1.5, 10, 4096)
+
+    with TempDirectory() as dirname:
+      temp_file = os.path.join(dirname, 'plaso.db')
+      store = storage.StorageFile(temp_file)
+      self.assertFalse(store.HasParsersProfiles())
+
+      store.AddParsersProfile(parsers_profile)
+      store.AddParsersProfile(parsers_profile)
+      store.Close()
+
+      read_store = storage.StorageFile(temp_file, read_only=True)
+      self.assertTrue(read_store.HasParsersProfiles())
+      parsers_profiles = list(read_store.GetParsersProfiles())
+      read_store.Close()
+
+    self.assertEqual(len(parsers_profiles), 1)
+    self.assertEqual(list(parsers_profiles[0].GetParserChainTimings()), [
+        (u'sqlite/chrome_history', 2, 4.0, 3.0, 20, 8192)])
+
   def testStorage(self):
     """Test the storage object."""
     event_objects = []
@@ -221,6 +315,20 @@ class StorageFileTest(unittest.TestCase):
         event_object = read_store.GetTaggedEvent(tag)
         tags.append(event_object)
 
+      # The tag index is read from the snapshot of the second round.
+      # pylint: disable=protected-access
+      stream_names = list(read_store._GetStreamNames())
+      self.assertIn('plaso_tag_snapshot.000001', stream_names)
+      self.assertIn('plaso_tag_snapshot.000002', stream_names)
+
+      # The tag index contains the merged event tag of the second round.
+      event_tag = read_store._ReadEventTagByIdentifier(1, 1, None)
+      self.assertEqual(event_tag.tags, [u'Interesting', u'Malware'])
+      self.assertEqual(event_tag.color, u'red')
+
+      event_tag = read_store._ReadEventTagByIdentifier(1, 3, None)
+      self.assertIsNone(event_tag)
+
       groups = list(read_store.GetGrouping())
       self.assertEqual(len(groups), 1)
       group_events = list(read_store.GetEventsFromGroup(groups[0]))
@@ -286,6 +394,174 @@ class StorageFileTest(unittest.TestCase):
 
     self.assertEqual(same_events, proto_group_events)
 
+  def testStoredStreams(self):
+    """Test the uncompressed stores and random access of event objects."""
+    with TempDirectory() as dirname:
+      temp_file = os.path.join(dirname, 'plaso.db')
+      store = storage.StorageFile(temp_file)
+      store.AddEventObjects(self._event_objects)
+      store.Close()
+
+      z_file = zipfile.ZipFile(temp_file, 'r')
+      self.assertIsNone(z_file.testzip())
+
+      for stream_name in [
+          'plaso_index.000001', 'plaso_proto.000001',
+          'plaso_timestamps.000001']:
+        zip_info = z_file.getinfo(stream_name)
+        self.assertEqual(zip_info.compress_type, zipfile.ZIP_STORED)
+
+      zip_info = z_file.getinfo('plaso_meta.000001')
+      self.assertEqual(zip_info.compress_type, zipfile.ZIP_DEFLATED)
+      z_file.close()
+
+      read_store = storage.StorageFile(temp_file, read_only=True)
+
+      # pylint: disable=protected-access
+      file_object = read_store._OpenStream('plaso_proto.000001')
+      self.assertIsInstance(file_object, storage._MemoryMappedStream)
+
+      event_object = read_store.GetEventObject(1, entry_index=3)
+      self.assertEqual(event_object.timestamp, 1335966206929596)
+      self.assertEqual(event_object.store_index, 3)
+
+      event_object = read_store.GetEventObject(1, entry_index=0)
+      self.assertEqual(event_object.timestamp, 1238934459000000)
+      self.assertEqual(event_object.store_index, 0)
+
+      # Read the next entry after a random access read.
+      event_object = read_store.GetEventObject(1)
+      self.assertEqual(event_object.timestamp, 1334940286000000)
+      self.assertEqual(event_object.store_index, 1)
+
+      event_object = read_store.GetEventObject(1, entry_index=4)
+      self.assertIsNone(event_object)
+
+      read_store.Close()
+
+  def testGetByLocation(self):
+    """Test the retrieval of events by location."""
+    with TempDirectory() as dirname:
+      temp_file = os.path.join(dirname, 'plaso.db')
+      store = storage.StorageFile(temp_file)
+      store.AddEventObjects(self._event_objects)
+      store.Close()
+
+      read_store = storage.StorageFile(temp_file, read_only=True)
+
+      locations = [(1, 3), (1, 0), (1, 3), (1, 4)]
+      event_objects = list(read_store.GetEventObjectsByLocation(locations))
+      self.assertEqual(len(event_objects), 3)
+
+      location, event_object = event_objects[0]
+      self.assertEqual(location, (1, 0))
+      self.assertEqual(event_object.timestamp, 1238934459000000)
+
+      location, event_object = event_objects[1]
+      self.assertEqual(location, (1, 3))
+      self.assertEqual(event_object.timestamp, 1335966206929596)
+
+      location, event_object = event_objects[2]
+      self.assertEqual(location, (1, 4))
+      self.assertIsNone(event_object)
+
+      timestamps = read_store.GetTimestampsByLocation(locations)
+      self.assertEqual(timestamps, {
+          (1, 0): 1238934459000000, (1, 3): 1335966206929596})
+
+      read_store.Close()
+
+  def _ReadSortedEntries(self, storage_file_path, filter_string, **kwargs):
+    """Reads the sorted entries that are not filtered by the store limit.
+
+    Args:
+      storage_file_path: the path of the storage file.
+      filter_string: the filter string.
+      kwargs: keyword arguments to pass to SetMergeWorkers.
+
+    Returns:
+      A tuple containing the store range and a list of tuples of
+      the timestamp, store number and store index of the entries.
+    """
+    # The time constraints of the filter are set when it is compiled.
+    pfilter.TimeRangeCache.ResetTimeConstraints()
+
+    filter_object = eventfilter.EventObjectFilter()
+    filter_object.CompileFilter(filter_string)
+
+    read_store = storage.StorageFile(storage_file_path, read_only=True)
+    read_store.SetStoreLimit(filter_object)
+    read_store.SetMergeWorkers(kwargs.get('number_of_workers', 0))
+
+    read_list = []
+    event_object = read_store.GetSortedEntry()
+    while event_object:
+      read_list.append((
+          event_object.timestamp, event_object.store_number,
+          event_object.store_index))
+      event_object = read_store.GetSortedEntry()
+
+    store_range = read_store.store_range
+    read_store.Close()
+
+    return store_range, read_list
+
+  def testSetStoreLimitFilter(self):
+    """Test that the filter constraints are applied to the stores."""
+    self._event_objects[0].parser = u'winreg'
+    self._event_objects[1].parser = u'winreg'
+    self._event_objects[2].parser = u'winreg'
+    self._event_objects[3].parser = u'text'
+
+    with TempDirectory() as dirname:
+      temp_file = os.path.join(dirname, 'plaso.db')
+
+      # Store 1 contains the text event object and 2 of the Windows Registry
+      # event objects, store 2 contains the other Windows Registry event
+      # object.
+      store = storage.StorageFile(temp_file)
+      store.AddEventObjects([
+          self._event_objects[0], self._event_objects[1],
+          self._event_objects[3]])
+      store.Close()
+
+      store = storage.StorageFile(temp_file)
+      store.AddEventObject(self._event_objects[2])
+      store.Close()
+
+      store_range, read_list = self._ReadSortedEntries(
+          temp_file, u'parser is \'text\'')
+      self.assertEqual(store_range, [1])
+      self.assertEqual(read_list, [(1238934459000000, 1, 0)])
+
+      expected_entries = [
+          (1334940286000000, 2, 0), (1334961526929596, 1, 1),
+          (1335966206929596, 1, 2)]
+
+      store_range, read_list = self._ReadSortedEntries(
+          temp_file, u'parser is \'winreg\'')
+      self.assertEqual(store_range, [1, 2])
+      self.assertEqual(read_list, expected_entries)
+
+      store_range, read_list = self._ReadSortedEntries(
+          temp_file, u'parser is \'winreg\'', number_of_workers=2)
+      self.assertEqual(read_list, expected_entries)
+
+      store_range, read_list = self._ReadSortedEntries(
+          temp_file, u'data_type is \'windows:registry:key_value\' and '
+          u'date > \'2012-04-25 00:00:00\'')
+      self.assertEqual(store_range, [1])
+      self.assertEqual(read_list, [(1335966206929596, 1, 2)])
+
+      # Filters that do not constrain the parser or data type read all
+      # the entries.
+      store_range, read_list = self._ReadSortedEntries(
+          temp_file, u'filename contains \'evil\'')
+      self.assertEqual(store_range, [1, 2])
+      self.assertEqual(len(read_list), 4)
+
+    pfilter.TimeRangeCache.ResetTimeConstraints()
+
 
 class StoreStorageTest(unittest.TestCase):
   """Test sorting storage file,"""
@@ -323,10 +599,74 @@ class StoreStorageTest(unittest.TestCase):
       event_object = store.GetSortedEntry()
 
     expected_timestamps = [
-        1344270407000000, 1392438730000000, 1427151678000000, 1451584472000000]
+        1343166324000000, 1344270407000000, 1392438730000000, 1418925272000000,
+        1427151678000000, 1427151678000123, 1451584472000000]
 
     self.assertEqual(read_list, expected_timestamps)
 
+  def testStorageSortMergeWorkers(self):
+    """Test the sorted entries read using merge workers."""
+    pfilter.TimeRangeCache.ResetTimeConstraints()
+    store = storage.StorageFile(self.test_file, read_only=True)
+    store.SetStoreLimit()
+
+    expected_entries = []
+    event_object = store.GetSortedEntry()
+    while event_object:
+      expected_entries.append((
+          event_object.timestamp, event_object.store_number,
+          event_object.store_index))
+      event_object = store.GetSortedEntry()
+
+    store.Close()
+
+    store = storage.StorageFile(self.test_file, read_only=True)
+    store.SetStoreLimit()
+    store.SetMergeWorkers(2)
+
+    read_list = []
+    event_object = store.GetSortedEntry()
+    while event_object:
+      read_list.append((
+          event_object.timestamp, event_object.store_number,
+          event_object.store_index))
+      event_object = store.GetSortedEntry()
+
+    store.Close()
+
+    self.assertEqual(len(read_list), 15)
+    self.assertEqual(read_list, expected_entries)
+
+  def testStorageSortTimeRange(self):
+    """Test that the time bounds are applied to the sorted entries."""
+    pfilter.TimeRangeCache.ResetTimeConstraints()
+    pfilter.TimeRangeCache.SetUpperTimestamp(1427151678000000)
+    pfilter.TimeRangeCache.SetLowerTimestamp(1390377241000000)
+    store = storage.StorageFile(self.test_file, read_only=True)
+    store.SetStoreLimit()
+
+    read_list = []
+    event_object = store.GetSortedEntry()
+    while event_object:
+      read_list.append((
+          event_object.timestamp, event_object.store_number,
+          event_object.store_index))
+      event_object = store.GetSortedEntry()
+
+    expected_entries = [
+        (1390377241000000, 3, 1), (1390377241000000, 4, 0),
+        (1390377272000000, 4, 1), (1392438730000000, 1, 2),
+        (1418925272000000, 5, 0), (1427151678000000, 5, 1)]
+
+    self.assertEqual(read_list, expected_entries)
+
+    # pylint: disable=protected-access
+    self.assertEqual(store._GetEntryIndexRange(1), (2, 3))
+    self.assertEqual(store._GetEntryIndexRange(2), (2, 2))
+
+    store.Close()
+    pfilter.TimeRangeCache.ResetTimeConstraints()
+
 
 if __name__ == '__main__':
   unittest.main()
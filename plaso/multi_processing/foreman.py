@@ -3,6 +3,7 @@
 
 import collections
 import logging
+import time
 
 from plaso.multi_processing import process_info
 
@@ -18,29 +19,62 @@ class Foreman(object):
     + Indications whether the worker is alive or not.
     + Memory consumption of the worker.
 
-  This information is gathered using both RPC calls to the worker
-  itself as well as data provided by the psutil library.
-
-  In the future the Foreman should be able to actively monitor
-  the health of the processes and terminate and restart processes
-  that are stuck.
+  This information is gathered using both the status board, on which
+  the workers report their status, as well as data provided by the psutil
+  library.
+
+  Workers that fail or are stuck are terminated. A worker is considered
+  stuck when it has not updated its status on the status board for multiple
+  status intervals. The path specification the worker was processing is
+  handed back, together with the name of the worker, to the restart worker
+  callback so that it can be processed by a new worker. A path specification
+  that causes workers to fail repeatedly is quarantined, as in it is no
+  longer handed back.
   """
 
   PROCESS_LABEL = collections.namedtuple('process_label', 'label pid process')
 
-  def __init__(self, show_memory_usage=False):
+  # The number of status intervals a worker can go without updating its
+  # status before it is considered stuck.
+  _MAXIMUM_NUMBER_OF_MISSED_STATUS_UPDATES = 3
+
+  def __init__(
+      self, maximum_number_of_crashes=3, restart_worker_callback=None,
+      show_memory_usage=False, status_board=None, status_interval=10):
     """Initialize the foreman process.
 
     Args:
+      maximum_number_of_crashes: Optional maximum number of times a path
+                                 specification can cause a worker to fail
+                                 before it is quarantined. The default is 3.
+      restart_worker_callback: Optional callback that is called when a worker
+                               failed. The callback is passed the name of
+                               the failed worker and the serialized path
+                               specification to process again, which is None
+                               if there is no such path specification.
+                               The default is None.
       show_memory_usage: Optional boolean value to indicate memory information
                          should be included in logging. The default is false.
+      status_board: Optional status board (instance of StatusBoard) on which
+                    the workers report their status. The default is None.
+      status_interval: Optional interval in seconds in which the workers
+                       update their status on the status board. The default
+                       is 10.
     """
     super(Foreman, self).__init__()
+    self._failed_pids = set()
     self._last_status_dict = {}
+    self._maximum_number_of_crashes = maximum_number_of_crashes
+    self._monitoring_start_times = {}
+    self._number_of_crashes = collections.Counter()
+    self._quarantined_path_specs = []
+    self._restart_worker_callback = restart_worker_callback
     self._process_information = process_info.ProcessInfo()
     self._process_labels = []
     self._processing_done = False
     self._show_memory_usage = show_memory_usage
+    self._status_board = status_board
+    self._status_interval = status_interval
 
   @property
   def labels(self):
@@ -52,6 +86,11 @@ class Foreman(object):
     """Return the number of processes in the watch list."""
     return len(self._process_labels)
 
+  @property
+  def quarantined_path_specs(self):
+    """Return a list of the quarantined serialized path specifications."""
+    return self._quarantined_path_specs
+
   def CheckStatus(self, label=None):
     """Checks status of either a single process or all from the watch list.
 
@@ -63,9 +102,29 @@ class Foreman(object):
       self._CheckStatus(label)
       return
 
-    for process_label in self._process_labels:
+    # Note that the list of labels is altered when a process is terminated
+    # or restarted hence we need to iterate over a copy.
+    for process_label in list(self._process_labels):
       self._CheckStatus(process_label)
 
+  def GetAverageCpuUsage(self):
+    """Return the average CPU usage percentage of the monitored processes.
+
+    Returns:
+      A floating point value containing the average CPU usage percentage or
+      None if not available.
+    """
+    cpu_usages = []
+    for process_label in self._process_labels:
+      cpu_percent = process_label.process.cpu_percent
+      if cpu_percent is not None:
+        cpu_usages.append(cpu_percent)
+
+    if not cpu_usages:
+      return
+
+    return float(sum(cpu_usages)) / len(cpu_usages)
+
   def GetLabel(self, name=None, pid=None):
     """Return a label if found using either name or PID value.
 
@@ -117,7 +176,12 @@ class Foreman(object):
       return
 
     if label not in self._process_labels:
+      # The CPU usage is determined relative to the previous time it was
+      # retrieved, hence the first value is retrieved when monitoring starts.
+      _ = label.process.cpu_percent
+
       self._process_labels.append(label)
+      self._monitoring_start_times[label.pid] = time.time()
 
   def StopMonitoringWorker(self, label=None, pid=None, name=None):
     """Stop monitoring a particular worker and remove it from monitor list.
@@ -145,6 +209,7 @@ class Foreman(object):
 
     index = self._process_labels.index(label)
     del self._process_labels[index]
+    self._monitoring_start_times.pop(label.pid, None)
     logging.info(
         u'{0:s} [{1:d}] has been removed from foreman monitoring.'.format(
             label.label, label.pid))
@@ -161,6 +226,78 @@ class Foreman(object):
     # returned.
     return True
 
+  def StopWorker(self, label):
+    """Stop monitoring a worker and signal it to stop processing.
+
+    The worker will stop after it has processed its current path
+    specification.
+
+    Args:
+      label: A process label (instance of PROCESS_LABEL).
+
+    Returns:
+      A boolean value indicating the worker was signaled to stop.
+    """
+    if label not in self._process_labels or not self._status_board:
+      return False
+
+    slot_index = self._status_board.GetSlotIndex(label.pid)
+    if slot_index is None:
+      return False
+
+    self.StopMonitoringWorker(label=label)
+    self._status_board.SignalStop(slot_index)
+    return True
+
+  def TerminateFailedWorker(self, label):
+    """Terminate a worker that failed and signal it should be restarted.
+
+    The path specification the worker was processing is handed to the
+    restarted worker. Since the worker flushes its aged event object
+    batches while it is still processing a file entry, events of that
+    file entry can already have been stored before the worker failed.
+    These are not discarded, hence the events of a requeued path
+    specification are stored at least once and can be stored twice.
+
+    Args:
+      label: A process label (instance of PROCESS_LABEL).
+    """
+    if label is None:
+      return
+
+    self._TerminateProcess(label)
+
+    # A failed worker is only restarted once.
+    if label.pid in self._failed_pids:
+      return
+    self._failed_pids.add(label.pid)
+
+    # The status on the status board contains the path specification
+    # the worker was processing when it failed.
+    status_dict = self._GetProcessStatus(label)
+    if not status_dict:
+      status_dict = self._last_status_dict.get(label.pid, {})
+    path_spec_string = status_dict.get(u'current_path_spec', None) or None
+
+    if path_spec_string:
+      self._number_of_crashes[path_spec_string] += 1
+      number_of_crashes = self._number_of_crashes[path_spec_string]
+
+      if path_spec_string in self._quarantined_path_specs:
+        path_spec_string = None
+
+      elif number_of_crashes >= self._maximum_number_of_crashes:
+        logging.error((
+            u'Process {0:s} [{1:d}] failed while processing: {2:s}. '
+            u'Quarantining the file after {3:d} failures.').format(
+                label.label, label.pid, status_dict.get(u'current_file', u''),
+                number_of_crashes))
+        self._quarantined_path_specs.append(path_spec_string)
+        path_spec_string = None
+
+    if self._restart_worker_callback:
+      self._restart_worker_callback(label.label, path_spec_string)
+
   def TerminateProcess(self, label=None, pid=None, name=None):
     """Terminate a process, even if it is not in the watch list.
 
@@ -206,9 +343,10 @@ class Foreman(object):
     or terminating a process that is alive and hanging, or not alive while
     it should be alive.
 
-    In the future this function will also be responsible for restarting
-    a worker, or signalling the engine that it needs to spin up a new worker
-    in the case of a worker dying or being in an effective zombie state.
+    A worker that is no longer alive or has not updated its status for
+    multiple status intervals while processing has not been marked as done
+    is considered failed, which signals the engine that it needs to spin up
+    a new worker.
 
     Args:
       label: A process label (instance of PROCESS_LABEL).
@@ -216,28 +354,40 @@ class Foreman(object):
     if label not in self._process_labels:
       return
 
+    has_completed = False
     process = label.process
 
     if process.IsAlive():
-      status_dict = process.GetProcessStatus()
-      if not status_dict and not self._processing_done:
-        logging.warning((
-            u'Unable to connect to RPC socket to: {0:s} at '
-            u'http://localhost:{1:d}').format(label.label, label.pid))
-
+      status_dict = self._GetProcessStatus(label)
       if status_dict:
         self._last_status_dict[label.pid] = status_dict
-        if status_dict.get(u'is_running', False):
-          self._LogWorkerInformation(label, status_dict)
-          if self._show_memory_usage:
-            self._LogMemoryUsage(label)
+
+      if not self._processing_done and self._IsStuck(label, status_dict):
+        logging.warning((
+            u'Process {0:s} [{1:d}] has not updated its status for more than '
+            u'{2:d} status intervals.').format(
+                label.label, label.pid,
+                self._MAXIMUM_NUMBER_OF_MISSED_STATUS_UPDATES))
+
+      elif not status_dict:
+        if not self._processing_done:
+          # The worker reports its status once it has started.
+          logging.warning(u'No status available of: {0:s} [{1:d}]'.format(
+              label.label, label.pid))
           return
 
-        else:
-          logging.info((
-              u'Process {0:s} [{1:d}] has complete its processing. '
-              u'Total of {2:d} events extracted').format(
-                  label.label, label.pid, status_dict.get(u'counter', 0)))
+      elif status_dict.get(u'is_running', False):
+        self._LogWorkerInformation(label, status_dict)
+        if self._show_memory_usage:
+          self._LogMemoryUsage(label)
+        return
+
+      else:
+        logging.info((
+            u'Process {0:s} [{1:d}] has complete its processing. '
+            u'Total of {2:d} events extracted').format(
+                label.label, label.pid, status_dict.get(u'counter', 0)))
+        has_completed = True
 
     else:
       logging.info(u'Process {0:s} [{1:d}] is not alive.'.format(
@@ -250,14 +400,62 @@ class Foreman(object):
       self.StopMonitoringWorker(label=label)
       return
 
-    # We need to terminate the process.
-    # TODO: Add a function to start a new instance of a worker instead of
-    # just removing and killing it.
+    if has_completed:
+      self._TerminateProcess(label)
+      return
+
+    # We need to terminate the process and have it replaced.
     logging.error((
         u'Process {0:s} [{1:d}] is not functioning when it should be. '
         u'Terminating it and removing from list.').format(
             label.label, label.pid))
-    self._TerminateProcess(label)
+    self.TerminateFailedWorker(label)
+
+  def _GetProcessStatus(self, label):
+    """Retrieves the status of a process from the status board.
+
+    Args:
+      label: A process label (instance of PROCESS_LABEL).
+
+    Returns:
+      A status dictionary or None if not available.
+    """
+    if not self._status_board:
+      return
+
+    slot_index = self._status_board.GetSlotIndex(label.pid)
+    if slot_index is None:
+      return
+
+    return self._status_board.GetStatus(slot_index)
+
+  def _IsStuck(self, label, status_dict):
+    """Determines if a process has not updated its status for too long.
+
+    A process that has not reported its status yet is considered stuck
+    if it has been monitored for too long.
+
+    Args:
+      label: A process label (instance of PROCESS_LABEL).
+      status_dict: The status dictionary of the process or None if not
+                   available.
+
+    Returns:
+      A boolean value indicating the process is stuck.
+    """
+    if not self._status_board or not self._status_interval:
+      return False
+
+    if status_dict:
+      last_update_time = status_dict.get(u'last_update_time', 0.0)
+    else:
+      last_update_time = self._monitoring_start_times.get(label.pid, None)
+      if last_update_time is None:
+        return False
+
+    maximum_age = (
+        self._MAXIMUM_NUMBER_OF_MISSED_STATUS_UPDATES * self._status_interval)
+    return time.time() - last_update_time > maximum_age
 
   def _LogMemoryUsage(self, label):
     """Logs memory information gathered from a process.
@@ -286,9 +484,11 @@ class Foreman(object):
     if status:
       # TODO: change file to "display name".
       logging.info((
-          u'{0:s} [{1:d}] - events extracted: {2:d} - file: {3:s} - running: '
-          u'{4!s} <{5:s}>').format(
+          u'{0:s} [{1:d}] - events extracted: {2:d} - files: {3:d} - bytes '
+          u'read: {4:d} - file: {5:s} - running: {6!s} <{7:s}>').format(
               label.label, label.pid, status.get(u'counter', -1),
+              status.get(u'number_of_files', 0),
+              status.get(u'number_of_bytes_read', 0),
               status.get(u'current_file', u''),
               status.get(u'is_running', False), label.process.status))
 
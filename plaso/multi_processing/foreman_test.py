@@ -0,0 +1,171 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests the foreman."""
+
+import os
+import time
+import unittest
+
+from plaso.multi_processing import foreman
+from plaso.multi_processing import process_info
+from plaso.multi_processing import status_board
+
+
+class TestProcessInfo(object):
+  """Class that implements a process information object for testing."""
+
+  def __init__(self, cpu_percent=None):
+    """Initializes the process information object.
+
+    Args:
+      cpu_percent: Optional CPU usage percentage. The default is None.
+    """
+    super(TestProcessInfo, self).__init__()
+    self.cpu_percent = cpu_percent
+    self.status = 'running'
+
+  def IsAlive(self):
+    """Return a boolean value indicating if the process is alive or not."""
+    return self.status != 'exited'
+
+  def TerminateProcess(self):
+    """Terminate the process."""
+    self.status = 'exited'
+
+
+class ForemanTest(unittest.TestCase):
+  """Tests the foreman."""
+
+  _PATH_SPEC_STRING = u'{"type_indicator": "OS", "location": "/tmp/test"}'
+
+  def _RestartWorker(self, worker_name, path_spec_string):
+    """Restart worker callback for testing."""
+    self._restarted_workers.append((worker_name, path_spec_string))
+
+  def setUp(self):
+    """Sets up the needed objects used throughout the test."""
+    self._restarted_workers = []
+
+  def testCheckStatus(self):
+    """Tests the CheckStatus function."""
+    test_status_board = status_board.StatusBoard(2)
+    test_status_board.UpdateStatus(1, {
+        u'current_path_spec': self._PATH_SPEC_STRING, u'is_running': True})
+
+    test_foreman = foreman.Foreman(
+        restart_worker_callback=self._RestartWorker,
+        status_board=test_status_board, status_interval=1)
+
+    running_label = test_foreman.PROCESS_LABEL(
+        u'Worker_0', os.getpid(), TestProcessInfo())
+    test_foreman.MonitorWorker(label=running_label)
+
+    # A worker that has not reported its status for too long is stuck.
+    stuck_label = test_foreman.PROCESS_LABEL(
+        u'Worker_1', os.getpid() + 1, TestProcessInfo())
+    test_foreman.MonitorWorker(label=stuck_label)
+    test_foreman._monitoring_start_times[stuck_label.pid] = time.time() - 60
+
+    test_foreman.CheckStatus()
+
+    self.assertEqual(test_foreman.labels, [running_label])
+    self.assertEqual(self._restarted_workers, [(u'Worker_1', None)])
+
+    # A worker that has not updated its status for too long is stuck.
+    test_foreman._status_interval = 0.01
+    time.sleep(0.05)
+
+    test_foreman.CheckStatus()
+
+    self.assertEqual(test_foreman.labels, [])
+    expected_restarted_workers = [
+        (u'Worker_1', None),
+        (u'Worker_0', self._PATH_SPEC_STRING)]
+    self.assertEqual(self._restarted_workers, expected_restarted_workers)
+
+    test_status_board.Close()
+
+  def testGetAverageCpuUsage(self):
+    """Tests the GetAverageCpuUsage function."""
+    test_foreman = foreman.Foreman()
+    self.assertIsNone(test_foreman.GetAverageCpuUsage())
+
+    for pid, cpu_percent in enumerate([10.0, 30.0, None]):
+      label = test_foreman.PROCESS_LABEL(
+          u'Worker_{0:d}'.format(pid), pid, TestProcessInfo(
+              cpu_percent=cpu_percent))
+      test_foreman.MonitorWorker(label=label)
+
+    self.assertEqual(test_foreman.GetAverageCpuUsage(), 20.0)
+
+  def testGetAverageCpuUsageWithProcessInformation(self):
+    """Tests the GetAverageCpuUsage function on process information."""
+    test_foreman = foreman.Foreman()
+
+    label = test_foreman.PROCESS_LABEL(
+        u'Worker_0', os.getpid(), process_info.ProcessInfo(pid=os.getpid()))
+    test_foreman.MonitorWorker(label=label)
+
+    start_time = time.time()
+    while time.time() - start_time < 0.1:
+      pass
+
+    # The CPU usage is retrieved without blocking.
+    start_time = time.time()
+    cpu_usage = test_foreman.GetAverageCpuUsage()
+    self.assertLess(time.time() - start_time, 0.05)
+
+    self.assertIsNotNone(cpu_usage)
+    self.assertGreater(cpu_usage, 0.0)
+
+  def testStopWorker(self):
+    """Tests the StopWorker function."""
+    test_status_board = status_board.StatusBoard(2)
+    test_status_board.UpdateStatus(1, {u'is_running': True})
+
+    test_foreman = foreman.Foreman(status_board=test_status_board)
+
+    label = test_foreman.PROCESS_LABEL(
+        u'Worker_0', os.getpid(), TestProcessInfo())
+    test_foreman.MonitorWorker(label=label)
+
+    self.assertTrue(test_foreman.StopWorker(label))
+    self.assertTrue(test_status_board.IsStopSignaled(1))
+    self.assertEqual(test_foreman.number_of_processes_in_watch_list, 0)
+
+    self.assertFalse(test_foreman.StopWorker(label))
+
+    test_status_board.Close()
+
+  def testTerminateFailedWorker(self):
+    """Tests the TerminateFailedWorker function."""
+    test_foreman = foreman.Foreman(
+        maximum_number_of_crashes=2,
+        restart_worker_callback=self._RestartWorker)
+
+    for pid in range(3):
+      label = test_foreman.PROCESS_LABEL(
+          u'Worker_{0:d}'.format(pid), pid, TestProcessInfo())
+      test_foreman.MonitorWorker(label=label)
+
+      test_foreman._last_status_dict[pid] = {
+          u'current_path_spec': self._PATH_SPEC_STRING}
+
+      test_foreman.TerminateFailedWorker(label)
+      # A failed worker is only restarted once.
+      test_foreman.TerminateFailedWorker(label)
+
+    self.assertEqual(test_foreman.number_of_processes_in_watch_list, 0)
+
+    expected_restarted_workers = [
+        (u'Worker_0', self._PATH_SPEC_STRING),
+        (u'Worker_1', None),
+        (u'Worker_2', None)]
+    self.assertEqual(self._restarted_workers, expected_restarted_workers)
+
+    self.assertEqual(
+        test_foreman.quarantined_path_specs, [self._PATH_SPEC_STRING])
+
+
+if __name__ == '__main__':
+  unittest.main()
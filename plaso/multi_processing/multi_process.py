@@ -2,23 +2,33 @@
 """The multi-process processing engine."""
 
 import ctypes
+import json
 import logging
 import multiprocessing
 import os
+import shutil
 import signal
 import sys
+import tempfile
 import threading
+import time
 
 from dfvfs.resolver import context
+from dfvfs.serializer import json_serializer as dfvfs_json_serializer
 
 from plaso.engine import collector
 from plaso.engine import engine
 from plaso.engine import queue
 from plaso.engine import worker
 from plaso.lib import errors
+from plaso.lib import event
+from plaso.lib import storage
 from plaso.multi_processing import foreman
 from plaso.multi_processing import rpc_proxy
+from plaso.multi_processing import shared_memory_queue
+from plaso.multi_processing import status_board
 from plaso.parsers import mediator as parsers_mediator
+from plaso.serializer import protobuf_serializer
 
 
 def SigKill(pid):
@@ -49,30 +59,90 @@ class MultiProcessEngine(engine.BaseEngine):
   _WORKER_PROCESSES_MINIMUM = 2
   _WORKER_PROCESSES_MAXIMUM = 15
 
-  def __init__(self, maximum_number_of_queued_items=0):
+  # The average CPU usage percentages of the worker processes above which
+  # the number of workers can be increased and below which it is decreased
+  # when the number of workers is adjusted.
+  _ADAPTIVE_CPU_USAGE_HIGH = 75.0
+  _ADAPTIVE_CPU_USAGE_LOW = 25.0
+
+  # The number of queued path specifications per worker process above which
+  # the number of workers can be increased.
+  _ADAPTIVE_QUEUED_ITEMS_PER_WORKER = 16
+
+  def __init__(
+      self, maximum_number_of_queued_items=0, number_of_storage_writers=1,
+      use_shared_memory_queue=False):
     """Initialize the multi-process engine object.
 
     Args:
       maximum_number_of_queued_items: The maximum number of queued items.
                                       The default is 0, which represents
                                       no limit.
+      number_of_storage_writers: Optional number of storage writer processes.
+                                 Every storage writer has its own storage
+                                 queue. The default is 1.
+      use_shared_memory_queue: Optional boolean value to indicate the queues
+                               should be shared memory queues instead of
+                               multiprocessing queues. The default is False.
     """
-    collection_queue = MultiProcessingQueue(
-        maximum_number_of_queued_items=maximum_number_of_queued_items)
-    storage_queue = MultiProcessingQueue(
+    if use_shared_memory_queue:
+      queue_class = shared_memory_queue.SharedMemoryQueue
+    else:
+      queue_class = MultiProcessingQueue
+
+    collection_queue = queue_class(
         maximum_number_of_queued_items=maximum_number_of_queued_items)
+
+    storage_queues = []
+    for _ in range(max(number_of_storage_writers, 1)):
+      storage_queues.append(queue_class(
+          maximum_number_of_queued_items=maximum_number_of_queued_items))
+
+    storage_queue = storage_queues[0]
+
+    # The parse error queue is currently not consumed, hence it is not
+    # backed by a fixed size shared memory ring buffer.
     parse_error_queue = MultiProcessingQueue(
         maximum_number_of_queued_items=maximum_number_of_queued_items)
 
     super(MultiProcessEngine, self).__init__(
         collection_queue, storage_queue, parse_error_queue)
 
+    # The extraction workers push the event objects onto the storage queue
+    # in batches of serialized event objects. If there are multiple storage
+    # writers the batches are distributed over their storage queues.
+    if len(storage_queues) > 1:
+      event_queue = MultiProcessRoundRobinQueue(storage_queues)
+    else:
+      event_queue = storage_queue
+
+    self._event_queue_producer = MultiProcessEventObjectQueueProducer(
+        event_queue)
+
     self._collection_process = None
     self._foreman_object = None
-    self._storage_process = None
+    self._shared_memory_queues = []
+    self._storage_processes = []
+    self._storage_queues = storage_queues
+
+    if use_shared_memory_queue:
+      self._shared_memory_queues = [collection_queue]
+      self._shared_memory_queues.extend(storage_queues)
 
     # TODO: turn into a process pool.
+    self._hasher_names_string = None
+    self._maximum_number_of_extraction_workers = 0
+    self._number_of_started_workers = 0
+    self._parser_filter_string = None
     self._worker_processes = {}
+    self._worker_temporary_directories = []
+
+    # The status board has a slot for every worker process, the names of
+    # the workers that were assigned a slot are stored per slot.
+    self._status_board = None
+    self._status_file = None
+    self._status_interval = None
+    self._status_slot_worker_names = []
 
     # Attributes for RPC proxy server thread.
     self._proxy_thread = None
@@ -187,6 +257,9 @@ class MultiProcessEngine(engine.BaseEngine):
         self._parse_error_queue_producer, parser_mediator,
         resolver_context=resolver_context)
 
+    if self._block_cache_size is not None:
+      extraction_worker.SetBlockCacheSize(self._block_cache_size)
+
     extraction_worker.SetEnableDebugOutput(self._enable_debug_output)
 
     # TODO: move profiler in separate object.
@@ -194,6 +267,10 @@ class MultiProcessEngine(engine.BaseEngine):
         self._enable_profiling,
         profiling_sample_rate=self._profiling_sample_rate)
 
+    extraction_worker.SetParsersProfiling(
+        self._enable_parsers_profiling,
+        number_of_slowest_files=self._number_of_profiled_slowest_files)
+
     if self._process_archive_files:
       extraction_worker.SetProcessArchiveFiles(self._process_archive_files)
 
@@ -208,16 +285,203 @@ class MultiProcessEngine(engine.BaseEngine):
 
     return extraction_worker
 
+  def _AdjustNumberOfExtractionWorkers(self):
+    """Grows or shrinks the number of extraction worker processes.
+
+    A worker is added when the workers are busy, as in their average CPU usage
+    is high, and path specifications are queued up. A worker is stopped when
+    the workers are mostly idle and the queue is nearly empty.
+    """
+    number_of_workers = self._foreman_object.number_of_processes_in_watch_list
+    average_cpu_usage = self._foreman_object.GetAverageCpuUsage()
+    if not number_of_workers or average_cpu_usage is None:
+      return
+
+    try:
+      number_of_queued_items = len(self._collection_queue)
+    except NotImplementedError:
+      # On Mac OS X because of broken sem_getvalue()
+      return
+
+    if (number_of_workers < self._maximum_number_of_extraction_workers and
+        average_cpu_usage >= self._ADAPTIVE_CPU_USAGE_HIGH and
+        number_of_queued_items > (
+            number_of_workers * self._ADAPTIVE_QUEUED_ITEMS_PER_WORKER)):
+      logging.info((
+          u'Adding a worker process: {0:d} items queued for {1:d} workers '
+          u'with an average CPU usage of {2:0.1f}%.').format(
+              number_of_queued_items, number_of_workers, average_cpu_usage))
+      self._StartExtractionWorkerProcess()
+
+    elif (number_of_workers > self._WORKER_PROCESSES_MINIMUM and
+          average_cpu_usage < self._ADAPTIVE_CPU_USAGE_LOW and
+          number_of_queued_items < number_of_workers):
+      worker_label = self._foreman_object.labels[-1]
+      logging.info((
+          u'Stopping worker process: {0:s} [{1:d}] {2:d} items queued for '
+          u'{3:d} workers with an average CPU usage of {4:0.1f}%.').format(
+              worker_label.label, worker_label.pid, number_of_queued_items,
+              number_of_workers, average_cpu_usage))
+      self._foreman_object.StopWorker(worker_label)
+
+  def _AllocateStatusSlot(self, worker_name):
+    """Allocates a slot on the status board for a worker process.
+
+    Args:
+      worker_name: the name of the worker process.
+
+    Returns:
+      An integer containing the index of the slot or None if no slot
+      is available.
+    """
+    if not self._status_board:
+      return
+
+    for slot_index, slot_worker_name in enumerate(
+        self._status_slot_worker_names):
+      process_obj = self._worker_processes.get(slot_worker_name, None)
+      if process_obj and process_obj.is_alive():
+        continue
+
+      self._status_board.ClearSlot(slot_index)
+      self._status_slot_worker_names[slot_index] = worker_name
+      return slot_index
+
+    logging.warning(
+        u'No status board slot available for worker process: {0:s}'.format(
+            worker_name))
+
+  def _RestartExtractionWorkerProcess(self, worker_name, path_spec_string):
+    """Starts an extraction worker process to replace a failed one.
+
+    This method is called by the foreman.
+
+    Args:
+      worker_name: the name of the failed worker process.
+      path_spec_string: the serialized path specification the failed worker
+                        was processing, which should be processed again, or
+                        None if not available.
+    """
+    path_specs = None
+    if path_spec_string:
+      serializer = dfvfs_json_serializer.JsonPathSpecSerializer
+      path_specs = [serializer.ReadSerialized(path_spec_string)]
+
+    logging.info(u'Starting a worker process to replace: {0:s}'.format(
+        worker_name))
+    self._StartExtractionWorkerProcess(path_specs=path_specs)
+
+  def _StartExtractionWorkerProcess(self, path_specs=None):
+    """Starts an extraction worker process.
+
+    Args:
+      path_specs: Optional list of path specifications (instances of
+                  dfvfs.PathSpec) the worker should process before the path
+                  specifications on the collection queue. The default is None.
+    """
+    worker_number = self._number_of_started_workers
+    self._number_of_started_workers += 1
+
+    extraction_worker = self.CreateExtractionWorker(worker_number)
+
+    worker_name = u'Worker_{0:d}'.format(worker_number)
+    status_slot_index = self._AllocateStatusSlot(worker_name)
+
+    # Every worker has its own temporary directory, so that temporary files
+    # of workers that are terminated can be removed, see
+    # _RemoveWorkerTemporaryDirectories.
+    temporary_directory = tempfile.mkdtemp(
+        prefix=u'plaso-{0:s}-'.format(worker_name))
+    self._worker_temporary_directories.append(temporary_directory)
+
+    # TODO: Test to see if a process pool can be a better choice.
+    worker_process = MultiProcessEventExtractionWorkerProcess(
+        extraction_worker, self._parser_filter_string,
+        self._hasher_names_string, path_specs=path_specs,
+        status_board=self._status_board, status_slot_index=status_slot_index,
+        status_interval=self._status_interval,
+        temporary_directory=temporary_directory, name=worker_name)
+    worker_process.start()
+
+    if self._foreman_object:
+      self._foreman_object.MonitorWorker(
+          pid=worker_process.pid, name=worker_name)
+
+    self._worker_processes[worker_name] = worker_process
+
+  def _RemoveWorkerTemporaryDirectories(self):
+    """Removes the temporary directories of the worker processes.
+
+    This method should only be called when the worker processes have
+    stopped, for example a temporary copy of a SQLite database remains in
+    the temporary directory of a worker that was terminated while parsing
+    the database.
+    """
+    for temporary_directory in self._worker_temporary_directories:
+      try:
+        shutil.rmtree(temporary_directory)
+      except OSError as exception:
+        logging.warning((
+            u'Unable to remove temporary directory: {0:s} with error: '
+            u'{1:s}').format(temporary_directory, exception))
+
+    self._worker_temporary_directories = []
+
+  def _WriteStatusFile(self):
+    """Writes the status of the worker processes to the status file.
+
+    The status file is a JSON file that is replaced on every update, so that
+    it can be read by monitoring tools at any time.
+    """
+    workers = []
+    for slot_index, worker_name in enumerate(self._status_slot_worker_names):
+      if not worker_name:
+        continue
+
+      worker_status = self._status_board.GetStatus(slot_index)
+      if worker_status:
+        worker_status[u'name'] = worker_name
+        workers.append(worker_status)
+
+    try:
+      number_of_queued_items = len(self._collection_queue)
+    except NotImplementedError:
+      # On Mac OS X because of broken sem_getvalue()
+      number_of_queued_items = None
+
+    status = {
+        u'time': time.time(),
+        u'number_of_queued_path_specs': number_of_queued_items,
+        u'workers': workers}
+
+    temporary_path = u'{0:s}.tmp'.format(self._status_file)
+    try:
+      with open(temporary_path, 'wb') as file_object:
+        json.dump(status, file_object, sort_keys=True)
+
+      # Note that on Windows rename fails if the file already exists.
+      if os.name != 'posix' and os.path.exists(self._status_file):
+        os.remove(self._status_file)
+      os.rename(temporary_path, self._status_file)
+
+    except (IOError, OSError) as exception:
+      logging.warning(
+          u'Unable to write status file: {0:s} with error: {1:s}'.format(
+              self._status_file, exception))
+
   def ProcessSource(
       self, collector_object, storage_writer, parser_filter_string=None,
       hasher_names_string=None, number_of_extraction_workers=0,
       have_collection_process=True, have_foreman_process=True,
-      show_memory_usage=False):
+      show_memory_usage=False, adaptive_workers=False, status_file=None,
+      status_interval=10):
     """Processes the source and extracts event objects.
 
     Args:
       collector_object: A collector object (instance of Collector).
       storage_writer: A storage writer object (instance of BaseStorageWriter).
+                      If the engine has multiple storage writers the storage
+                      writer must support creating shard writers.
       parser_filter_string: Optional parser filter string. The default is None.
       hasher_names_string: Optional comma separated string of names of
                            hashers to enable enable. The default is None.
@@ -234,17 +498,26 @@ class MultiProcessEngine(engine.BaseEngine):
                             is True.
       show_memory_usage: Optional boolean value to indicate memory information
                          should be included in logging. The default is False.
+      adaptive_workers: Optional boolean value to indicate the number of
+                        extraction worker processes should be adjusted while
+                        collection is ongoing. This requires a foreman
+                        process. The default is False.
+      status_file: Optional path of a file the status of the worker processes
+                   is written to in JSON, every status interval. The default
+                   is None.
+      status_interval: Optional interval in seconds in which the status of
+                       the worker processes is checked. The default is 10.
     """
     if number_of_extraction_workers < 1:
       # One worker for each "available" CPU (minus other processes).
       # The number here is derived from the fact that the engine starts up:
       #   + A collector process (optional).
-      #   + A storage process.
+      #   + One or more storage processes.
       #
       # If we want to utilize all CPUs on the system we therefore need to start
       # up workers that amounts to the total number of CPUs - the other
       # processes.
-      cpu_count = multiprocessing.cpu_count() - 2
+      cpu_count = multiprocessing.cpu_count() - 1 - len(self._storage_queues)
       if have_collection_process:
         cpu_count -= 1
 
@@ -256,37 +529,53 @@ class MultiProcessEngine(engine.BaseEngine):
 
       number_of_extraction_workers = cpu_count
 
+    self._maximum_number_of_extraction_workers = max(
+        number_of_extraction_workers, min(
+            multiprocessing.cpu_count(), self._WORKER_PROCESSES_MAXIMUM))
+
+    # Failed or stopped worker processes can still occupy a slot while
+    # the worker processes that replace them are started.
+    number_of_status_slots = 2 * self._maximum_number_of_extraction_workers
+    self._status_board = status_board.StatusBoard(number_of_status_slots)
+    self._status_file = status_file
+    self._status_interval = status_interval
+    self._status_slot_worker_names = [None] * number_of_status_slots
+
     if have_foreman_process:
       self._foreman_object = foreman.Foreman(
-          show_memory_usage=show_memory_usage)
+          restart_worker_callback=self._RestartExtractionWorkerProcess,
+          show_memory_usage=show_memory_usage,
+          status_board=self._status_board, status_interval=status_interval)
       self._StartRPCProxyServerThread(self._foreman_object)
 
-    self._storage_process = MultiProcessStorageProcess(
-        storage_writer, name='StorageProcess')
-    self._storage_process.start()
+    storage_writers = [storage_writer]
+    if len(self._storage_queues) > 1:
+      storage_writers.extend(
+          storage_writer.CreateShardWriters(self._storage_queues[1:]))
+
+    for writer_number, writer_object in enumerate(storage_writers):
+      if writer_number == 0:
+        process_name = u'StorageProcess'
+      else:
+        process_name = u'StorageProcess_{0:d}'.format(writer_number)
+
+      storage_process = MultiProcessStorageProcess(
+          writer_object, name=process_name)
+      storage_process.start()
+
+      self._storage_processes.append(storage_process)
 
     if have_collection_process:
       self._collection_process = MultiProcessCollectionProcess(
           collector_object, self._rpc_port_number, name='CollectionProcess')
       self._collection_process.start()
 
-    logging.info(u'Starting extraction worker processes.')
-    for worker_number in range(number_of_extraction_workers):
-      extraction_worker = self.CreateExtractionWorker(worker_number)
-
-      worker_name = u'Worker_{0:d}'.format(worker_number)
-
-      # TODO: Test to see if a process pool can be a better choice.
-      worker_process = MultiProcessEventExtractionWorkerProcess(
-          extraction_worker, parser_filter_string, hasher_names_string,
-          name=worker_name)
-      worker_process.start()
-
-      if self._foreman_object:
-        self._foreman_object.MonitorWorker(
-            pid=worker_process.pid, name=worker_name)
+    self._hasher_names_string = hasher_names_string
+    self._parser_filter_string = parser_filter_string
 
-      self._worker_processes[worker_name] = worker_process
+    logging.info(u'Starting extraction worker processes.')
+    for _ in range(number_of_extraction_workers):
+      self._StartExtractionWorkerProcess()
 
     logging.debug(u'Collection started.')
     if not self._collection_process:
@@ -294,12 +583,18 @@ class MultiProcessEngine(engine.BaseEngine):
 
     else:
       while self._collection_process.is_alive():
-        self._collection_process.join(timeout=10)
+        self._collection_process.join(timeout=status_interval)
+
+        if self._status_file:
+          self._WriteStatusFile()
 
         # Check the worker status regularly while collection is still ongoing.
         if self._foreman_object:
           self._foreman_object.CheckStatus()
 
+          if adaptive_workers:
+            self._AdjustNumberOfExtractionWorkers()
+
           # TODO: We get a signal when collection is done, which might happen
           # before the collection thread joins. Look at the option of speeding
           # up the process of the collector stopping by potentially killing it.
@@ -307,6 +602,16 @@ class MultiProcessEngine(engine.BaseEngine):
     logging.info(u'Collection stopped.')
 
     self._StopProcessing()
+    self._RemoveWorkerTemporaryDirectories()
+
+    if self._status_file:
+      self._WriteStatusFile()
+
+    self._status_board.Close()
+    self._status_board = None
+
+    for queue_object in self._shared_memory_queues:
+      queue_object.Close()
 
   def _StopProcessing(self):
     """Stops the foreman and worker processes."""
@@ -360,7 +665,9 @@ class MultiProcessEngine(engine.BaseEngine):
               u'Worker process: {0:s} already exited with code: '
               u'{1:d}.').format(process_name, process_obj.exitcode))
           process_obj.terminate()
-          self._foreman_object.TerminateProcess(label=worker_label)
+          self._foreman_object.TerminateFailedWorker(worker_label)
+          self._foreman_object.StopMonitoringWorker(label=worker_label)
+          del self._worker_processes[process_name]
 
         else:
           # Process is no longer alive, no need to monitor.
@@ -369,13 +676,18 @@ class MultiProcessEngine(engine.BaseEngine):
           del self._worker_processes[process_name]
 
     if self._foreman_object:
+      for path_spec_string in self._foreman_object.quarantined_path_specs:
+        logging.error(u'Quarantined path specification: {0:s}'.format(
+            path_spec_string))
+
       self._foreman_object = None
 
     logging.info(u'Extraction workers stopped.')
     self._event_queue_producer.SignalEndOfInput()
 
-    self._storage_process.join()
-    logging.info(u'Storage writer stopped.')
+    for storage_process in self._storage_processes:
+      storage_process.join()
+    logging.info(u'Storage writers stopped.')
 
   def _AbortNormal(self, timeout=None):
     """Abort in a normal way.
@@ -393,9 +705,10 @@ class MultiProcessEngine(engine.BaseEngine):
       for _, worker_process in self._worker_processes.iteritems():
         worker_process.SignalAbort()
 
-    logging.warning(u'Signaling storage process to abort.')
+    logging.warning(u'Signaling storage processes to abort.')
     self._event_queue_producer.SignalEndOfInput()
-    self._storage_process.SignalAbort()
+    for storage_process in self._storage_processes:
+      storage_process.SignalAbort()
 
     if self._collection_process:
       logging.warning(u'Waiting for collection process: {0:d}.'.format(
@@ -410,10 +723,10 @@ class MultiProcessEngine(engine.BaseEngine):
             worker_name, worker_process.pid))
         worker_process.join(timeout=timeout)
 
-    if self._storage_process:
+    for storage_process in self._storage_processes:
       logging.warning(u'Waiting for storage process: {0:d}.'.format(
-          self._collection_process.pid))
-      self._storage_process.join(timeout=timeout)
+          storage_process.pid))
+      storage_process.join(timeout=timeout)
 
   def _AbortTerminate(self):
     """Abort processing by sending SIGTERM or equivalent."""
@@ -429,10 +742,11 @@ class MultiProcessEngine(engine.BaseEngine):
               worker_name, worker_process.pid))
           worker_process.terminate()
 
-    if self._storage_process and self._storage_process.is_alive():
-      logging.warning(u'Terminating storage process: {0:d}.'.format(
-          self._storage_process.pid))
-      self._storage_process.terminate()
+    for storage_process in self._storage_processes:
+      if storage_process.is_alive():
+        logging.warning(u'Terminating storage process: {0:d}.'.format(
+            storage_process.pid))
+        storage_process.terminate()
 
   def _AbortKill(self):
     """Abort processing by sending SIGKILL or equivalent."""
@@ -448,10 +762,11 @@ class MultiProcessEngine(engine.BaseEngine):
               worker_name, worker_process.pid))
           SigKill(worker_process.pid)
 
-    if self._storage_process and self._storage_process.is_alive():
-      logging.warning(u'Killing storage process: {0:d}.'.format(
-          self._storage_process.pid))
-      SigKill(self._storage_process.pid)
+    for storage_process in self._storage_processes:
+      if storage_process.is_alive():
+        logging.warning(u'Killing storage process: {0:d}.'.format(
+            storage_process.pid))
+        SigKill(storage_process.pid)
 
   def SignalAbort(self):
     """Signals the engine to abort."""
@@ -463,6 +778,8 @@ class MultiProcessEngine(engine.BaseEngine):
     except KeyboardInterrupt:
       self._AbortKill()
 
+    self._RemoveWorkerTemporaryDirectories()
+
     # TODO: remove the need for this.
     # Sometimes the main process will be unresponsive.
     SigKill(os.getpid())
@@ -521,7 +838,9 @@ class MultiProcessEventExtractionWorkerProcess(multiprocessing.Process):
   """Class that defines a multi-processing event extraction worker process."""
 
   def __init__(self, extraction_worker, parser_filter_string,
-               hasher_names_string, **kwargs):
+               hasher_names_string, path_specs=None, status_board=None,
+               status_slot_index=None, status_interval=None,
+               temporary_directory=None, **kwargs):
     """Initializes the process object.
 
     Args:
@@ -530,74 +849,64 @@ class MultiProcessEventExtractionWorkerProcess(multiprocessing.Process):
       parser_filter_string: The parser filter string.
       hasher_names_string: Optional comma separated string of names of
                            hashers to enable enable. The default is None.
+      path_specs: Optional list of path specifications (instances of
+                  dfvfs.PathSpec) to process before the path specifications
+                  on the queue. The default is None.
+      status_board: Optional status board (instance of StatusBoard) the
+                    worker reports its status on. The default is None.
+      status_slot_index: Optional index of the slot of the worker on
+                         the status board. The default is None.
+      status_interval: Optional interval in seconds in which the worker
+                       updates its status, even if its status did not
+                       change. The default is None, which represents
+                       the status is only updated when it changes.
+      temporary_directory: Optional path of the directory in which the worker
+                           creates temporary files. The default is None,
+                           which represents the default temporary directory.
     """
     super(MultiProcessEventExtractionWorkerProcess, self).__init__(**kwargs)
     self._extraction_worker = extraction_worker
+    self._path_specs = path_specs
+    self._status_board = status_board
+    self._status_heartbeat_event = None
+    self._status_interval = status_interval
+    self._status_lock = None
+    self._status_slot_index = status_slot_index
+    self._temporary_directory = temporary_directory
 
     # TODO: clean this up with the implementation of a task based
     # multi-processing approach.
     self._parser_filter_string = parser_filter_string
     self._hasher_names_string = hasher_names_string
 
-    # Attributes for RPC proxy server thread.
-    self._proxy_thread = None
-    self._rpc_proxy_server = None
-
-  def _StartRPCProxyServerThread(self):
-    """Starts the RPC proxy server thread."""
-    if self._rpc_proxy_server or self._proxy_thread:
-      return
-
-    # Set up a simple XML RPC server for the worker for status indications.
-    # Since we don't know the worker's PID for now we'll set the initial port
-    # number to zero and then adjust it later.
-    self._rpc_proxy_server = rpc_proxy.StandardRpcProxyServer()
-
-    try:
-      # Note the proxy will adjust the port number if pid < 1024 and
-      # pid > 65535.
-      self._rpc_proxy_server.SetListeningPort(os.getpid())
-      self._rpc_proxy_server.Open()
-      self._rpc_proxy_server.RegisterFunction(
-          'status', self._extraction_worker.GetStatus)
+  def _StatusHeartbeat(self):
+    """Updates the status of the worker every status interval.
 
-      logging.debug(
-          u'Worker process: {0!s} monitor RPC server started'.format(
-              self._name))
-
-      self._proxy_thread = threading.Thread(
-          name='rpc_proxy', target=self._rpc_proxy_server.StartProxy)
-      self._proxy_thread.start()
-
-      logging.debug(
-          u'Worker process: {0!s} monitor thread started'.format(self._name))
-
-    except errors.ProxyFailedToStart as exception:
-      logging.error((
-          u'Unable to setup a RPC server for the worker: {0:d} [PID {1:d}] '
-          u'with error: {2:s}').format(
-              self._identity, os.getpid(), exception))
-
-  def _StopRPCProxyServerThread(self):
-    """Stops the RPC proxy server thread."""
-    if not self._rpc_proxy_server or not self._proxy_thread:
-      return
+    The status of a worker that waits on the queue or that is parsing
+    a large file does not change, hence the status is updated regularly
+    to indicate to the foreman that the worker is not stuck.
+    """
+    while not self._status_heartbeat_event.wait(self._status_interval):
+      # The lock is held while the status is retrieved, so that the status
+      # cannot overwrite a more recent status written by the worker.
+      with self._status_lock:
+        self._UpdateStatus(self._extraction_worker.GetStatus())
 
-    # Close the proxy, free up resources so we can shut down the thread.
-    self._rpc_proxy_server.Close()
+  def _UpdateStatus(self, status):
+    """Updates the status of the worker on the status board.
 
-    logging.debug(
-        u'Worker process: {0!s} monitor RPC server stopped'.format(
-            self._name))
+    This method is called by the extraction worker and the status heartbeat
+    thread.
 
-    if self._proxy_thread.isAlive():
-      self._proxy_thread.join()
+    Args:
+      status: the status dictionary.
+    """
+    # Only a single writer of the slot is allowed at a time.
+    with self._status_lock:
+      self._status_board.UpdateStatus(self._status_slot_index, status)
 
-    logging.debug(
-        u'Worker process: {0!s} monitor thread stopped'.format(self._name))
-
-    self._rpc_proxy_server = None
-    self._proxy_thread = None
+    if self._status_board.IsStopSignaled(self._status_slot_index):
+      self._extraction_worker.SignalStop()
 
   # This method part of the multiprocessing.Process interface hence its name
   # is not following the style guide.
@@ -608,6 +917,12 @@ class MultiProcessEventExtractionWorkerProcess(multiprocessing.Process):
     # when interrupted.
     signal.signal(signal.SIGINT, signal.SIG_IGN)
 
+    # The temporary files, such as copies of SQLite databases, are created
+    # in the temporary directory of the worker, which is removed by the engine
+    # when the worker has stopped.
+    if self._temporary_directory:
+      tempfile.tempdir = self._temporary_directory
+
     # We need to initialize the parser and hasher objects after the process
     # has forked otherwise on Windows the "fork" will fail with
     # a PickleError for Python modules that cannot be pickled.
@@ -616,16 +931,32 @@ class MultiProcessEventExtractionWorkerProcess(multiprocessing.Process):
     if self._hasher_names_string:
       self._extraction_worker.SetHashers(self._hasher_names_string)
 
+    status_heartbeat_thread = None
+    if self._status_board and self._status_slot_index is not None:
+      self._status_lock = threading.RLock()
+      self._extraction_worker.SetStatusUpdateCallback(self._UpdateStatus)
+
+      if self._status_interval:
+        self._status_heartbeat_event = threading.Event()
+        status_heartbeat_thread = threading.Thread(
+            name='status_heartbeat', target=self._StatusHeartbeat)
+        status_heartbeat_thread.daemon = True
+        status_heartbeat_thread.start()
+
     logging.debug(u'Worker process: {0!s} started'.format(self._name))
-    self._StartRPCProxyServerThread()
 
     logging.debug(u'Worker process: {0!s} extraction started'.format(
         self._name))
-    self._extraction_worker.Run()
+    try:
+      self._extraction_worker.Run(path_specs=self._path_specs)
+    finally:
+      if status_heartbeat_thread:
+        self._status_heartbeat_event.set()
+        status_heartbeat_thread.join()
+
     logging.debug(u'Worker process: {0!s} extraction stopped'.format(
         self._name))
 
-    self._StopRPCProxyServerThread()
     logging.debug(u'Worker process: {0!s} stopped'.format(self._name))
 
   def SignalAbort(self):
@@ -663,6 +994,146 @@ class MultiProcessStorageProcess(multiprocessing.Process):
     self._storage_writer.SignalAbort()
 
 
+class MultiProcessEventObjectQueueProducer(queue.ItemQueueProducer):
+  """Class that defines a multi-processing event object queue producer.
+
+  The producer serializes the event objects and pushes them onto the queue
+  in batches, instead of pickling and pushing every event object separately.
+  A batch is pushed when it contains the maximum number of event objects or
+  when the oldest event object in the batch exceeds the maximum batch age.
+  The age is checked when an event object is produced and when the worker
+  has consumed an item, see FlushAgedItems.
+  """
+
+  # The maximum number of event objects in a batch.
+  _MAXIMUM_BATCH_SIZE = 1000
+
+  # The maximum time in seconds an event object is kept in a batch.
+  _MAXIMUM_BATCH_AGE = 0.5
+
+  def __init__(
+      self, queue_object, maximum_batch_size=_MAXIMUM_BATCH_SIZE,
+      maximum_batch_age=_MAXIMUM_BATCH_AGE):
+    """Initializes the queue producer.
+
+    Args:
+      queue_object: the queue object (instance of Queue).
+      maximum_batch_size: optional maximum number of event objects in
+                          a batch.
+      maximum_batch_age: optional maximum time in seconds an event object
+                         is kept in a batch before the batch is pushed.
+    """
+    super(MultiProcessEventObjectQueueProducer, self).__init__(queue_object)
+    self._batch = None
+    self._batch_start_time = None
+    self._maximum_batch_age = maximum_batch_age
+    self._maximum_batch_size = maximum_batch_size
+    self._serializer = protobuf_serializer.ProtobufEventObjectSerializer
+
+  def Flush(self):
+    """Flushes the buffered event objects onto the queue."""
+    if not self._batch or not self._batch.number_of_records:
+      return
+
+    batch = self._batch
+    self._batch = None
+    self._batch_start_time = None
+
+    super(MultiProcessEventObjectQueueProducer, self).ProduceItem(batch)
+
+  def FlushAgedItems(self):
+    """Flushes the batch onto the queue if it exceeds the maximum age."""
+    if (self._batch_start_time is not None and
+        time.time() - self._batch_start_time >= self._maximum_batch_age):
+      self.Flush()
+
+  def ProduceItem(self, item):
+    """Produces an item onto the queue.
+
+    Args:
+      item: the item object, which is an event object (instance of
+            EventObject).
+    """
+    # Other items, such as the parsers profile, are pushed onto the queue
+    # as-is.
+    if not isinstance(item, event.EventObject):
+      super(MultiProcessEventObjectQueueProducer, self).ProduceItem(item)
+      return
+
+    event_object_data = self._serializer.WriteSerialized(item)
+
+    # Event objects that cannot be stored in a batch are pushed onto the queue
+    # as-is, so that the storage process handles them as before.
+    if event_object_data is None:
+      super(MultiProcessEventObjectQueueProducer, self).ProduceItem(item)
+      return
+
+    if not self._batch:
+      self._batch = storage.SerializedEventObjectBatch()
+      self._batch_start_time = time.time()
+
+    try:
+      self._batch.AppendRecord(
+          item.timestamp, item.data_type, getattr(item, u'parser', None),
+          getattr(item, u'plugin', None), event_object_data)
+    except (AttributeError, TypeError, ValueError):
+      super(MultiProcessEventObjectQueueProducer, self).ProduceItem(item)
+
+    if (self._batch.number_of_records >= self._maximum_batch_size or
+        time.time() - self._batch_start_time >= self._maximum_batch_age):
+      self.Flush()
+
+  def SignalEndOfInput(self):
+    """Signals the queue no input remains."""
+    self.Flush()
+    super(MultiProcessEventObjectQueueProducer, self).SignalEndOfInput()
+
+
+class MultiProcessRoundRobinQueue(queue.Queue):
+  """Class that defines a queue that distributes items over multiple queues.
+
+  Every item is pushed onto the next queue in turn and the end of input is
+  signaled on all queues. The items are popped off the individual queues.
+  """
+
+  def __init__(self, queue_objects):
+    """Initializes the round robin queue object.
+
+    Args:
+      queue_objects: a list of the queue objects (instances of Queue).
+    """
+    super(MultiProcessRoundRobinQueue, self).__init__()
+    self._next_queue_index = 0
+    self._queue_objects = queue_objects
+
+  def __len__(self):
+    """Returns the estimated current number of items in the queues."""
+    return sum(len(queue_object) for queue_object in self._queue_objects)
+
+  def IsEmpty(self):
+    """Determines if the queues are empty."""
+    return all(queue_object.IsEmpty() for queue_object in self._queue_objects)
+
+  def PushItem(self, item):
+    """Pushes an item onto the next queue."""
+    self._queue_objects[self._next_queue_index].PushItem(item)
+    self._next_queue_index = (
+        (self._next_queue_index + 1) % len(self._queue_objects))
+
+  def PopItem(self):
+    """Pops an item off the queue.
+
+    Raises:
+      RuntimeError: since items are popped off the individual queues.
+    """
+    raise RuntimeError(u'Unable to pop item off round robin queue.')
+
+  def SignalEndOfInput(self):
+    """Signals the queues no input remains."""
+    for queue_object in self._queue_objects:
+      queue_object.SignalEndOfInput()
+
+
 class MultiProcessingQueue(queue.Queue):
   """Class that defines the multi-processing queue."""
 
@@ -5,6 +5,9 @@
 import unittest
 
 from plaso.engine import test_lib
+from plaso.events import text_events
+from plaso.lib import storage
+from plaso.lib import timelib
 from plaso.multi_processing import multi_process
 
 
@@ -33,5 +36,113 @@ class MultiProcessingQueueTest(unittest.TestCase):
     self.assertEqual(test_queue_consumer.number_of_items, len(self._ITEMS))
 
 
+class MultiProcessRoundRobinQueueTest(unittest.TestCase):
+  """Tests the multi-processing round robin queue."""
+
+  def testPushItem(self):
+    """Tests the PushItem function."""
+    test_queues = [
+        multi_process.MultiProcessingQueue(),
+        multi_process.MultiProcessingQueue()]
+    test_queue = multi_process.MultiProcessRoundRobinQueue(test_queues)
+
+    for item in ['item1', 'item2', 'item3']:
+      test_queue.PushItem(item)
+
+    test_queue.SignalEndOfInput()
+
+    self.assertEqual(test_queues[0].PopItem(), 'item1')
+    self.assertEqual(test_queues[0].PopItem(), 'item3')
+    self.assertEqual(test_queues[1].PopItem(), 'item2')
+
+    for test_queue in test_queues:
+      test_queue_consumer = test_lib.TestQueueConsumer(test_queue)
+      test_queue_consumer.ConsumeItems()
+      self.assertEqual(test_queue_consumer.number_of_items, 0)
+
+
+class MultiProcessEventObjectQueueProducerTest(unittest.TestCase):
+  """Tests the multi-processing event object queue producer."""
+
+  def _CreateTestEventObjects(self):
+    """Creates the event objects for testing.
+
+    Returns:
+      A list of event objects (instances of EventObject).
+    """
+    event_objects = []
+    for index, time_string in enumerate([
+        u'2012-04-20 22:38:46.929596', u'2012-05-02 13:43:26.929596',
+        u'2009-04-05 12:27:39.000000']):
+      event_object = text_events.TextEvent(
+          timelib.Timestamp.CopyFromString(time_string), index,
+          {u'text': u'Test line {0:d}'.format(index)})
+      event_object.parser = u'test_parser'
+      event_objects.append(event_object)
+
+    return event_objects
+
+  def testFlushAgedItems(self):
+    """Tests the FlushAgedItems function."""
+    test_queue = multi_process.MultiProcessingQueue()
+    test_queue_producer = multi_process.MultiProcessEventObjectQueueProducer(
+        test_queue, maximum_batch_size=10, maximum_batch_age=60)
+
+    event_objects = self._CreateTestEventObjects()
+    test_queue_producer.ProduceItem(event_objects[0])
+    test_queue_producer.FlushAgedItems()
+
+    test_queue_producer.ProduceItem(event_objects[1])
+    test_queue_producer._batch_start_time -= 120
+    test_queue_producer.FlushAgedItems()
+
+    test_queue_producer.ProduceItem(event_objects[2])
+    test_queue_producer.SignalEndOfInput()
+
+    batches = []
+    item = test_queue.PopItem()
+    while isinstance(item, storage.SerializedEventObjectBatch):
+      batches.append(item)
+      item = test_queue.PopItem()
+
+    self.assertEqual(len(batches), 2)
+    self.assertEqual(batches[0].number_of_records, 2)
+    self.assertEqual(batches[1].number_of_records, 1)
+
+  def testProduceItem(self):
+    """Tests the ProduceItem function."""
+    test_queue = multi_process.MultiProcessingQueue()
+    test_queue_producer = multi_process.MultiProcessEventObjectQueueProducer(
+        test_queue, maximum_batch_size=2, maximum_batch_age=60)
+
+    event_objects = self._CreateTestEventObjects()
+    for event_object in event_objects:
+      test_queue_producer.ProduceItem(event_object)
+
+    test_queue_producer.SignalEndOfInput()
+
+    batches = []
+    item = test_queue.PopItem()
+    while isinstance(item, storage.SerializedEventObjectBatch):
+      batches.append(item)
+      item = test_queue.PopItem()
+
+    self.assertEqual(len(batches), 2)
+    self.assertEqual(batches[0].number_of_records, 2)
+    self.assertEqual(batches[1].number_of_records, 1)
+
+    records = list(batches[0].GetRecords())
+    timestamp, data_type, parser, plugin, _ = records[0]
+    self.assertEqual(timestamp, event_objects[0].timestamp)
+    self.assertEqual(data_type, u'text:entry')
+    self.assertEqual(parser, u'test_parser')
+    self.assertIsNone(plugin)
+
+    read_event_objects = list(batches[1].GetEventObjects())
+    self.assertEqual(len(read_event_objects), 1)
+    self.assertEqual(read_event_objects[0].timestamp, 1238934459000000)
+    self.assertEqual(read_event_objects[0].text, u'Test line 2')
+
+
 if __name__ == '__main__':
   unittest.main()
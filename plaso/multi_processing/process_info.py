@@ -3,12 +3,10 @@
 
 import collections
 import os
-import SocketServer
 
 import psutil
 
 from plaso.lib import timelib
-from plaso.multi_processing import rpc_proxy
 
 
 class ProcessInfo(object):
@@ -44,11 +42,6 @@ class ProcessInfo(object):
     else:
       self._psutil_pre_v2 = False
 
-    # TODO: Allow the client proxy object to determined at run time and not
-    # a fixed value as here.
-    self._rpc_client = rpc_proxy.StandardRpcProxyClient(self._pid)
-    self._rpc_client.Open()
-
   @property
   def pid(self):
     """Return the process ID (PID)."""
@@ -186,10 +179,17 @@ class ProcessInfo(object):
 
   @property
   def cpu_percent(self):
-    """Return back the percent of CPU processing this process consumes."""
+    """Return back the percent of CPU processing this process consumes.
+
+    The percentage is determined over the time since the previous call,
+    without blocking, hence the first call returns a meaningless 0.0.
+    """
     try:
-      return self._process.get_cpu_percent()
-    except psutil.NoSuchProcess:
+      if self._psutil_pre_v2:
+        return self._process.get_cpu_percent(interval=None)
+
+      return self._process.cpu_percent(interval=None)
+    except (psutil.AccessDenied, psutil.NoSuchProcess):
       return
 
   def GetMemoryInformation(self):
@@ -221,17 +221,6 @@ class ProcessInfo(object):
         getattr(external_information, 'data', 0),
         getattr(external_information, 'dirty', 0), percent)
 
-  def GetProcessStatus(self):
-    """Attempt to connect to process via RPC to gather status information."""
-    if self._rpc_client is None:
-      return
-    try:
-      status = self._rpc_client.GetData('status')
-      if isinstance(status, dict):
-        return status
-    except SocketServer.socket.error:
-      return
-
   def IsAlive(self):
     """Return a boolean value indicating if the process is alive or not."""
     return self._process.is_running()
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""The shared memory queue.
+
+The shared memory queue is a queue that can be shared between processes
+and that is backed by a ring buffer in a memory mapped file. Unlike
+the multiprocessing queue it does not need a feeder thread and a pipe to
+transfer the items, the items are pickled directly into the shared memory.
+
+The memory mapped file consists of a header:
++------+----------------+------+------------------+------------------+-----+
+| head | number of pops | tail | number of pushes | producer waiting | ... |
++------+----------------+------+------------------+------------------+-----+
+
+Where the header values are unsigned 64-bit integers ('<Q') and the header
+is followed by the ring buffer. Head and tail contain the offset of the first
+unread byte and the offset of the next byte to write, relative to the start
+of the ring buffer. The offsets are not wrapped, hence the number of bytes
+that are in use is tail - head.
+
+The head and number of pops are only written by the consumer that holds
+the read lock and the tail and number of pushes only by the producer that
+holds the write lock. Since these counters have a single writer and are
+naturally aligned, they can be read without additional locking. The producer
+waiting flag is set by a producer that waits for space in the ring buffer
+and cleared by the consumer that wakes it up.
+
+Every item is stored in the ring buffer as a record:
++------+-----------------+
+| size | pickled item    |
++------+-----------------+
+
+Where size is an unsigned 32-bit integer ('<I') that contains the size of
+the pickled item. A record wraps around the end of the ring buffer if needed.
+"""
+
+import cPickle
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import tempfile
+
+from plaso.engine import queue
+from plaso.lib import errors
+
+
+class SharedMemoryQueue(queue.Queue):
+  """Class that defines the shared memory queue."""
+
+  # The default size of the ring buffer, which is 16 MiB.
+  _DEFAULT_BUFFER_SIZE = 16 * 1024 * 1024
+
+  _HEADER_STRUCT = struct.Struct('<5Q')
+
+  # The head and number of pops are written by the consumer, the tail and
+  # number of pushes by the producer.
+  _CONSUMER_COUNTERS_OFFSET = 0
+  _PRODUCER_COUNTERS_OFFSET = 16
+  _PRODUCER_WAITING_OFFSET = 32
+
+  _COUNTERS_STRUCT = struct.Struct('<2Q')
+  _PRODUCER_WAITING_STRUCT = struct.Struct('<Q')
+
+  _RECORD_SIZE_STRUCT = struct.Struct('<I')
+
+  # The maximum time in seconds a producer waits for a consumer to signal
+  # that space in the ring buffer was freed, before checking again.
+  _PRODUCER_WAIT_TIMEOUT = 0.1
+
+  def __init__(self, maximum_number_of_queued_items=0, buffer_size=0):
+    """Initializes the shared memory queue object.
+
+    Args:
+      maximum_number_of_queued_items: The maximum number of queued items.
+                                      The default is 0, which represents
+                                      no limit.
+      buffer_size: Optional size of the ring buffer in bytes. The default is
+                   0, which represents the default size of 16 MiB.
+    """
+    super(SharedMemoryQueue, self).__init__()
+
+    # We need to check that we aren't asking for a bigger queue than the
+    # platform supports, which requires access to this protected member.
+    # pylint: disable=protected-access
+    queue_max_length = multiprocessing._multiprocessing.SemLock.SEM_VALUE_MAX
+    # pylint: enable=protected-access
+    if maximum_number_of_queued_items > queue_max_length:
+      logging.warn(
+          u'Maximum queue size requested ({0:d}) is larger than system '
+          u'supported maximum size. Setting queue size to maximum supported '
+          u'size, '
+          u'({1:d})'.format(maximum_number_of_queued_items, queue_max_length))
+      maximum_number_of_queued_items = queue_max_length
+
+    self._buffer_size = buffer_size or self._DEFAULT_BUFFER_SIZE
+    self._memory_map = None
+    self._path = None
+
+    # The read and write locks make sure only a single consumer reads and
+    # a single producer writes at a time. The items semaphore counts
+    # the records that can be read and the space semaphore is used to wake
+    # up a producer that is waiting for space in the ring buffer.
+    self._items_semaphore = multiprocessing.Semaphore(0)
+    self._read_lock = multiprocessing.Lock()
+    self._space_semaphore = multiprocessing.Semaphore(0)
+    self._write_lock = multiprocessing.Lock()
+
+    if maximum_number_of_queued_items:
+      self._slots_semaphore = multiprocessing.BoundedSemaphore(
+          maximum_number_of_queued_items)
+    else:
+      self._slots_semaphore = None
+
+    file_descriptor, self._path = tempfile.mkstemp(prefix=u'plaso-queue-')
+    file_object = os.fdopen(file_descriptor, 'w+b')
+    try:
+      # Truncate fills the file, including the header, with 0-byte values.
+      file_object.truncate(self._HEADER_STRUCT.size + self._buffer_size)
+      self._memory_map = mmap.mmap(
+          file_object.fileno(), self._HEADER_STRUCT.size + self._buffer_size)
+    finally:
+      file_object.close()
+
+    # On POSIX the file can be removed while mapped, which makes sure
+    # the file is cleaned up even if the processes are terminated. Since
+    # the processes are forked they inherit the memory map.
+    if os.name == 'posix':
+      os.remove(self._path)
+      self._path = None
+
+  def __getstate__(self):
+    """Retrieves the state of the queue for pickling.
+
+    The memory map cannot be pickled hence the path of the file is used to
+    map the file again when the queue is unpickled in another process.
+
+    Returns:
+      A dictionary containing the state of the queue.
+
+    Raises:
+      RuntimeError: if the file of the queue can no longer be opened.
+    """
+    if not self._path:
+      raise RuntimeError(u'Unable to pickle queue without a file.')
+
+    state = dict(self.__dict__)
+    state[u'_memory_map'] = None
+    return state
+
+  def __setstate__(self, state):
+    """Sets the state of the queue after unpickling.
+
+    Args:
+      state: a dictionary containing the state of the queue.
+    """
+    self.__dict__.update(state)
+
+    with open(self._path, 'r+b') as file_object:
+      self._memory_map = mmap.mmap(
+          file_object.fileno(), self._HEADER_STRUCT.size + self._buffer_size)
+
+  def _ReadHeader(self):
+    """Reads the header.
+
+    Returns:
+      A tuple containing the head, number of pops, tail, number of pushes
+      and producer waiting flag.
+    """
+    return self._HEADER_STRUCT.unpack_from(self._memory_map, 0)
+
+  def _ReadData(self, offset, size):
+    """Reads data from the ring buffer.
+
+    Args:
+      offset: the offset of the data relative to the start of the ring buffer,
+              which is wrapped around the end of the ring buffer.
+      size: the size of the data.
+
+    Returns:
+      A binary string containing the data.
+    """
+    offset = offset % self._buffer_size
+    data_offset = self._HEADER_STRUCT.size + offset
+
+    if offset + size <= self._buffer_size:
+      return self._memory_map[data_offset:data_offset + size]
+
+    first_size = self._buffer_size - offset
+    second_offset = self._HEADER_STRUCT.size
+    return b''.join([
+        self._memory_map[data_offset:data_offset + first_size],
+        self._memory_map[second_offset:second_offset + size - first_size]])
+
+  def _WriteConsumerCounters(self, head, number_of_pops):
+    """Writes the counters that are maintained by the consumer.
+
+    Args:
+      head: the offset of the first unread byte.
+      number_of_pops: the number of items popped off the queue.
+    """
+    self._COUNTERS_STRUCT.pack_into(
+        self._memory_map, self._CONSUMER_COUNTERS_OFFSET, head, number_of_pops)
+
+  def _WriteData(self, offset, data):
+    """Writes data to the ring buffer.
+
+    Args:
+      offset: the offset of the data relative to the start of the ring buffer,
+              which is wrapped around the end of the ring buffer.
+      data: a binary string containing the data.
+    """
+    offset = offset % self._buffer_size
+    data_offset = self._HEADER_STRUCT.size + offset
+    size = len(data)
+
+    if offset + size <= self._buffer_size:
+      self._memory_map[data_offset:data_offset + size] = data
+      return
+
+    first_size = self._buffer_size - offset
+    second_offset = self._HEADER_STRUCT.size
+    self._memory_map[data_offset:data_offset + first_size] = data[:first_size]
+    self._memory_map[second_offset:second_offset + size - first_size] = (
+        data[first_size:])
+
+  def _WriteProducerCounters(self, tail, number_of_pushes):
+    """Writes the counters that are maintained by the producer.
+
+    Args:
+      tail: the offset of the next byte to write.
+      number_of_pushes: the number of items pushed onto the queue.
+    """
+    self._COUNTERS_STRUCT.pack_into(
+        self._memory_map, self._PRODUCER_COUNTERS_OFFSET, tail,
+        number_of_pushes)
+
+  def _WriteProducerWaiting(self, producer_waiting):
+    """Writes the producer waiting flag.
+
+    Args:
+      producer_waiting: an integer containing 1 if a producer is waiting for
+                        space in the ring buffer or 0 if not.
+    """
+    self._PRODUCER_WAITING_STRUCT.pack_into(
+        self._memory_map, self._PRODUCER_WAITING_OFFSET, producer_waiting)
+
+  def __len__(self):
+    """Returns the estimated current number of items in the queue."""
+    _, number_of_pops, _, number_of_pushes, _ = self._ReadHeader()
+    return max(0, number_of_pushes - number_of_pops)
+
+  def Close(self):
+    """Closes the queue.
+
+    The queue can no longer be used by any of the processes after it has
+    been closed by the process that created it.
+    """
+    if self._memory_map:
+      self._memory_map.close()
+      self._memory_map = None
+
+    if self._path:
+      try:
+        os.remove(self._path)
+      except OSError as exception:
+        logging.warning(
+            u'Unable to remove queue file: {0:s} with error: {1:s}'.format(
+                self._path, exception))
+      self._path = None
+
+  def IsEmpty(self):
+    """Determines if the queue is empty."""
+    return len(self) == 0
+
+  def PushItem(self, item):
+    """Pushes an item onto the queue.
+
+    This function blocks while the queue is full.
+
+    Args:
+      item: the item object.
+
+    Raises:
+      ValueError: if the item is too large to store in the ring buffer.
+    """
+    data = cPickle.dumps(item, cPickle.HIGHEST_PROTOCOL)
+    record = b''.join([self._RECORD_SIZE_STRUCT.pack(len(data)), data])
+    record_size = len(record)
+
+    if record_size > self._buffer_size:
+      raise ValueError((
+          u'Item of size: {0:d} exceeds the size of the ring buffer: '
+          u'{1:d}.').format(record_size, self._buffer_size))
+
+    if self._slots_semaphore:
+      self._slots_semaphore.acquire()
+
+    self._write_lock.acquire()
+    try:
+      head, _, tail, number_of_pushes, _ = self._ReadHeader()
+      while self._buffer_size - (tail - head) < record_size:
+        # The consumer checks the producer waiting flag after it advanced
+        # the head. The head is read again after setting the flag and
+        # the wait has a timeout, in case the consumer missed the flag.
+        self._WriteProducerWaiting(1)
+        head, _, _, _, _ = self._ReadHeader()
+        if self._buffer_size - (tail - head) >= record_size:
+          break
+
+        self._space_semaphore.acquire(True, self._PRODUCER_WAIT_TIMEOUT)
+        head, _, _, _, _ = self._ReadHeader()
+
+      # The space between tail and head is only used by this producer.
+      self._WriteData(tail, record)
+      self._WriteProducerCounters(tail + record_size, number_of_pushes + 1)
+
+    finally:
+      self._write_lock.release()
+
+    self._items_semaphore.release()
+
+  def PopItem(self):
+    """Pops an item off the queue.
+
+    This function blocks while the queue is empty.
+
+    Raises:
+      QueueEmpty: when the queue is empty.
+    """
+    try:
+      self._items_semaphore.acquire()
+    except KeyboardInterrupt:
+      raise errors.QueueEmpty
+
+    self._read_lock.acquire()
+    try:
+      head, number_of_pops, _, _, _ = self._ReadHeader()
+
+      # The record at the head was completely written before the items
+      # semaphore was released and is only read by this consumer.
+      data = self._ReadData(head, self._RECORD_SIZE_STRUCT.size)
+      data_size = self._RECORD_SIZE_STRUCT.unpack(data)[0]
+      data = self._ReadData(head + self._RECORD_SIZE_STRUCT.size, data_size)
+
+      self._WriteConsumerCounters(
+          head + self._RECORD_SIZE_STRUCT.size + data_size, number_of_pops + 1)
+
+      # The producer waiting flag is read after the head was advanced,
+      # so that a waiting producer either sees the new head or is woken up.
+      producer_waiting = self._PRODUCER_WAITING_STRUCT.unpack_from(
+          self._memory_map, self._PRODUCER_WAITING_OFFSET)[0]
+      if producer_waiting:
+        self._WriteProducerWaiting(0)
+        self._space_semaphore.release()
+
+    finally:
+      self._read_lock.release()
+
+    if self._slots_semaphore:
+      self._slots_semaphore.release()
+
+    return cPickle.loads(data)
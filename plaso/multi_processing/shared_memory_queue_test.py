@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests the shared memory queue."""
+
+import multiprocessing
+import unittest
+
+from plaso.engine import queue
+from plaso.engine import test_lib
+from plaso.multi_processing import shared_memory_queue
+
+
+def _ConsumeItems(test_queue, result_queue):
+  """Consumes the items of a queue in a separate process.
+
+  Args:
+    test_queue: the queue object (instance of SharedMemoryQueue).
+    result_queue: the multiprocessing queue to push the consumed items onto.
+  """
+  test_queue_consumer = test_lib.TestQueueConsumer(test_queue)
+  test_queue_consumer.ConsumeItems()
+  result_queue.put(test_queue_consumer.items)
+
+
+class SharedMemoryQueueTest(unittest.TestCase):
+  """Tests the shared memory queue."""
+
+  _ITEMS = frozenset(['item1', 'item2', 'item3', 'item4'])
+
+  def testPushPopItem(self):
+    """Tests the PushItem and PopItem functions."""
+    test_queue = shared_memory_queue.SharedMemoryQueue()
+
+    for item in self._ITEMS:
+      test_queue.PushItem(item)
+
+    self.assertEqual(len(test_queue), len(self._ITEMS))
+    self.assertFalse(test_queue.IsEmpty())
+
+    test_queue.SignalEndOfInput()
+    test_queue_consumer = test_lib.TestQueueConsumer(test_queue)
+    test_queue_consumer.ConsumeItems()
+
+    self.assertEqual(test_queue_consumer.number_of_items, len(self._ITEMS))
+    self.assertEqual(set(test_queue_consumer.items), self._ITEMS)
+
+    # The end of input item is pushed back onto the queue by the consumer.
+    self.assertEqual(len(test_queue), 1)
+    item = test_queue.PopItem()
+    self.assertIsInstance(item, queue.QueueEndOfInput)
+    self.assertTrue(test_queue.IsEmpty())
+
+    test_queue.Close()
+
+  def testPushPopItemWrapAround(self):
+    """Tests the PushItem and PopItem functions with records that wrap."""
+    test_queue = shared_memory_queue.SharedMemoryQueue(buffer_size=100)
+
+    for index in range(50):
+      item = u'item{0:d}'.format(index) * (index % 3 + 1)
+      test_queue.PushItem(item)
+      self.assertEqual(test_queue.PopItem(), item)
+
+    self.assertTrue(test_queue.IsEmpty())
+
+    with self.assertRaises(ValueError):
+      test_queue.PushItem(u'X' * 100)
+
+    test_queue.Close()
+
+  def testMultipleConsumers(self):
+    """Tests consuming the items with multiple consumer processes."""
+    test_queue = shared_memory_queue.SharedMemoryQueue(
+        maximum_number_of_queued_items=10, buffer_size=512)
+    result_queue = multiprocessing.Queue()
+
+    consumer_processes = []
+    for _ in range(3):
+      consumer_process = multiprocessing.Process(
+          target=_ConsumeItems, args=(test_queue, result_queue))
+      consumer_process.start()
+      consumer_processes.append(consumer_process)
+
+    # The number of items exceeds the capacity of the queue, hence this
+    # blocks until the consumers have consumed the items.
+    expected_items = [u'item{0:d}'.format(index) for index in range(200)]
+    for item in expected_items:
+      test_queue.PushItem(item)
+
+    test_queue.SignalEndOfInput()
+
+    items = []
+    for _ in consumer_processes:
+      items.extend(result_queue.get())
+
+    for consumer_process in consumer_processes:
+      consumer_process.join()
+
+    self.assertEqual(sorted(items), sorted(expected_items))
+
+    test_queue.Close()
+
+
+if __name__ == '__main__':
+  unittest.main()
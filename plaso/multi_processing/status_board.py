@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""The shared memory status board.
+
+The status board is a table that can be shared between processes and that
+is backed by a memory mapped file. Every worker process writes its status
+into its own slot of the table and the foreman reads the status of all
+the workers without having to connect to them.
+
+Every slot has a fixed layout:
++-------------+----------+--------+--------------+-------------------+-----+
+| stop signal | sequence | values | current file | current path spec | ... |
++-------------+----------+--------+--------------+-------------------+-----+
++------------------------+--------------+
+| number of parser times | parser times |
++------------------------+--------------+
+
+Where the stop signal and sequence are unsigned 64-bit integers ('<Q').
+The values are the PID, the is running flag, the number of events, files
+and bytes read and the time of the last update. The current file and current
+path specification are UTF-8 encoded strings that are preceded by their size
+('<H') and padded to a fixed size. The parser times consist of the name of
+the parser, padded to a fixed size, and the time in seconds the parser spent
+parsing.
+
+The stop signal is only written by the foreman and all other values only by
+the worker that owns the slot. The worker increments the sequence before
+and after it writes the values, hence the sequence is odd while the values
+are being written. A reader retries if the sequence was odd or has changed
+while it read the values, so that the slots can be read without locking.
+"""
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+
+class StatusBoard(object):
+  """Class that defines the shared memory status board."""
+
+  _STOP_SIGNAL_OFFSET = 0
+  _SEQUENCE_OFFSET = 8
+  _VALUES_OFFSET = 16
+
+  _UINT64_STRUCT = struct.Struct('<Q')
+  _VALUES_STRUCT = struct.Struct('<5Qd')
+  _STRING_SIZE_STRUCT = struct.Struct('<H')
+  _PARSER_TIME_STRUCT = struct.Struct('<32sd')
+
+  _CURRENT_FILE_SIZE = 512
+  _CURRENT_PATH_SPEC_SIZE = 2048
+
+  # The maximum number of parsers of which the parser time is stored,
+  # the parsers that spent the most time are stored first.
+  _MAXIMUM_NUMBER_OF_PARSER_TIMES = 32
+
+  _CURRENT_FILE_OFFSET = _VALUES_OFFSET + _VALUES_STRUCT.size
+  _CURRENT_PATH_SPEC_OFFSET = (
+      _CURRENT_FILE_OFFSET + _STRING_SIZE_STRUCT.size + _CURRENT_FILE_SIZE)
+  _PARSER_TIMES_OFFSET = (
+      _CURRENT_PATH_SPEC_OFFSET + _STRING_SIZE_STRUCT.size +
+      _CURRENT_PATH_SPEC_SIZE)
+
+  _SLOT_SIZE = (
+      _PARSER_TIMES_OFFSET + _UINT64_STRUCT.size +
+      _MAXIMUM_NUMBER_OF_PARSER_TIMES * _PARSER_TIME_STRUCT.size)
+
+  # The maximum number of times a reader tries to read a slot that is
+  # being written.
+  _MAXIMUM_NUMBER_OF_READ_ATTEMPTS = 100
+
+  def __init__(self, number_of_slots):
+    """Initializes the status board object.
+
+    Args:
+      number_of_slots: the number of slots, one for every process that
+                       reports its status.
+    """
+    super(StatusBoard, self).__init__()
+    self._memory_map = None
+    self._number_of_slots = number_of_slots
+    self._path = None
+
+    file_descriptor, self._path = tempfile.mkstemp(prefix=u'plaso-status-')
+    file_object = os.fdopen(file_descriptor, 'w+b')
+    try:
+      # Truncate fills the file with 0-byte values, which represent
+      # empty slots.
+      file_object.truncate(self._number_of_slots * self._SLOT_SIZE)
+      self._memory_map = mmap.mmap(
+          file_object.fileno(), self._number_of_slots * self._SLOT_SIZE)
+    finally:
+      file_object.close()
+
+    # On POSIX the file can be removed while mapped, which makes sure
+    # the file is cleaned up even if the processes are terminated. Since
+    # the processes are forked they inherit the memory map.
+    if os.name == 'posix':
+      os.remove(self._path)
+      self._path = None
+
+  def __getstate__(self):
+    """Retrieves the state of the status board for pickling.
+
+    The memory map cannot be pickled hence the path of the file is used to
+    map the file again when the status board is unpickled in another process.
+
+    Returns:
+      A dictionary containing the state of the status board.
+
+    Raises:
+      RuntimeError: if the file of the status board can no longer be opened.
+    """
+    if not self._path:
+      raise RuntimeError(u'Unable to pickle status board without a file.')
+
+    state = dict(self.__dict__)
+    state[u'_memory_map'] = None
+    return state
+
+  def __setstate__(self, state):
+    """Sets the state of the status board after unpickling.
+
+    Args:
+      state: a dictionary containing the state of the status board.
+    """
+    self.__dict__.update(state)
+
+    with open(self._path, 'r+b') as file_object:
+      self._memory_map = mmap.mmap(
+          file_object.fileno(), self._number_of_slots * self._SLOT_SIZE)
+
+  @property
+  def number_of_slots(self):
+    """The number of slots."""
+    return self._number_of_slots
+
+  def _ReadString(self, offset):
+    """Reads a string.
+
+    Args:
+      offset: the offset of the string.
+
+    Returns:
+      A Unicode string containing the string.
+    """
+    string_size = self._STRING_SIZE_STRUCT.unpack_from(
+        self._memory_map, offset)[0]
+    offset += self._STRING_SIZE_STRUCT.size
+    return self._memory_map[offset:offset + string_size].decode(
+        u'utf-8', u'replace')
+
+  def _ReadUInt64(self, offset):
+    """Reads an unsigned 64-bit integer.
+
+    Args:
+      offset: the offset of the integer.
+
+    Returns:
+      An integer containing the value.
+    """
+    return self._UINT64_STRUCT.unpack_from(self._memory_map, offset)[0]
+
+  def _WriteString(self, offset, string, maximum_size):
+    """Writes a string.
+
+    Strings that exceed the maximum size are truncated.
+
+    Args:
+      offset: the offset of the string.
+      string: a Unicode string containing the string.
+      maximum_size: the maximum size of the UTF-8 encoded string.
+    """
+    byte_string = string.encode(u'utf-8')[:maximum_size]
+    self._STRING_SIZE_STRUCT.pack_into(
+        self._memory_map, offset, len(byte_string))
+    offset += self._STRING_SIZE_STRUCT.size
+    self._memory_map[offset:offset + len(byte_string)] = byte_string
+
+  def _WriteUInt64(self, offset, value):
+    """Writes an unsigned 64-bit integer.
+
+    Args:
+      offset: the offset of the integer.
+      value: an integer containing the value.
+    """
+    self._UINT64_STRUCT.pack_into(self._memory_map, offset, value)
+
+  def ClearSlot(self, slot_index):
+    """Clears a slot, before it is assigned to a process.
+
+    Args:
+      slot_index: the index of the slot.
+    """
+    slot_offset = slot_index * self._SLOT_SIZE
+    self._memory_map[slot_offset:slot_offset + self._SLOT_SIZE] = (
+        b'\x00' * self._SLOT_SIZE)
+
+  def Close(self):
+    """Closes the status board.
+
+    The status board can no longer be used by any of the processes after it
+    has been closed by the process that created it.
+    """
+    if self._memory_map:
+      self._memory_map.close()
+      self._memory_map = None
+
+    if self._path:
+      try:
+        os.remove(self._path)
+      except OSError as exception:
+        logging.warning(
+            u'Unable to remove status board file: {0:s} with error: '
+            u'{1:s}'.format(self._path, exception))
+      self._path = None
+
+  def GetSlotIndex(self, pid):
+    """Retrieves the index of the slot of a process.
+
+    Args:
+      pid: the process ID (PID) of the process.
+
+    Returns:
+      An integer containing the index of the slot or None if the process
+      has no slot.
+    """
+    for slot_index in range(self._number_of_slots):
+      offset = slot_index * self._SLOT_SIZE + self._VALUES_OFFSET
+      if self._ReadUInt64(offset) == pid:
+        return slot_index
+
+  def GetStatus(self, slot_index):
+    """Retrieves the status from a slot.
+
+    Args:
+      slot_index: the index of the slot.
+
+    Returns:
+      A status dictionary or None if the slot is empty or could not
+      be read.
+    """
+    slot_offset = slot_index * self._SLOT_SIZE
+
+    for _ in range(self._MAXIMUM_NUMBER_OF_READ_ATTEMPTS):
+      sequence = self._ReadUInt64(slot_offset + self._SEQUENCE_OFFSET)
+      if sequence % 2:
+        continue
+
+      (pid, is_running, number_of_events, number_of_files,
+       number_of_bytes_read, last_update_time) = (
+           self._VALUES_STRUCT.unpack_from(
+               self._memory_map, slot_offset + self._VALUES_OFFSET))
+
+      current_file = self._ReadString(slot_offset + self._CURRENT_FILE_OFFSET)
+      current_path_spec = self._ReadString(
+          slot_offset + self._CURRENT_PATH_SPEC_OFFSET)
+
+      offset = slot_offset + self._PARSER_TIMES_OFFSET
+      number_of_parser_times = min(
+          self._ReadUInt64(offset), self._MAXIMUM_NUMBER_OF_PARSER_TIMES)
+      offset += self._UINT64_STRUCT.size
+
+      parser_times = {}
+      for _ in range(number_of_parser_times):
+        parser_name, parser_time = self._PARSER_TIME_STRUCT.unpack_from(
+            self._memory_map, offset)
+        parser_name = parser_name.rstrip(b'\x00').decode(
+            u'utf-8', u'replace')
+        parser_times[parser_name] = parser_time
+        offset += self._PARSER_TIME_STRUCT.size
+
+      if sequence != self._ReadUInt64(slot_offset + self._SEQUENCE_OFFSET):
+        continue
+
+      if not pid:
+        return
+
+      return {
+          u'pid': pid,
+          u'is_running': bool(is_running),
+          u'counter': number_of_events,
+          u'number_of_files': number_of_files,
+          u'number_of_bytes_read': number_of_bytes_read,
+          u'last_update_time': last_update_time,
+          u'current_file': current_file,
+          u'current_path_spec': current_path_spec,
+          u'parser_times': parser_times}
+
+  def IsStopSignaled(self, slot_index):
+    """Determines if a process was signaled to stop.
+
+    Args:
+      slot_index: the index of the slot.
+
+    Returns:
+      A boolean value indicating the process was signaled to stop.
+    """
+    offset = slot_index * self._SLOT_SIZE + self._STOP_SIGNAL_OFFSET
+    return bool(self._ReadUInt64(offset))
+
+  def SignalStop(self, slot_index):
+    """Signals the process that owns a slot to stop.
+
+    Args:
+      slot_index: the index of the slot.
+    """
+    offset = slot_index * self._SLOT_SIZE + self._STOP_SIGNAL_OFFSET
+    self._WriteUInt64(offset, 1)
+
+  def UpdateStatus(self, slot_index, status):
+    """Updates the status in a slot.
+
+    This function must only be called by the process that owns the slot.
+
+    Args:
+      slot_index: the index of the slot.
+      status: the status dictionary.
+    """
+    slot_offset = slot_index * self._SLOT_SIZE
+
+    # The sequence is only written by the process that owns the slot.
+    sequence = self._ReadUInt64(slot_offset + self._SEQUENCE_OFFSET)
+    self._WriteUInt64(slot_offset + self._SEQUENCE_OFFSET, sequence + 1)
+
+    self._VALUES_STRUCT.pack_into(
+        self._memory_map, slot_offset + self._VALUES_OFFSET, os.getpid(),
+        int(status.get(u'is_running', False)), status.get(u'counter', 0),
+        status.get(u'number_of_files', 0),
+        status.get(u'number_of_bytes_read', 0), time.time())
+
+    self._WriteString(
+        slot_offset + self._CURRENT_FILE_OFFSET,
+        status.get(u'current_file', u''), self._CURRENT_FILE_SIZE)
+
+    # A truncated path specification cannot be read back, hence it is
+    # not stored.
+    current_path_spec = status.get(u'current_path_spec', u'')
+    if len(current_path_spec.encode(u'utf-8')) > self._CURRENT_PATH_SPEC_SIZE:
+      current_path_spec = u''
+
+    self._WriteString(
+        slot_offset + self._CURRENT_PATH_SPEC_OFFSET, current_path_spec,
+        self._CURRENT_PATH_SPEC_SIZE)
+
+    parser_times = sorted(
+        status.get(u'parser_times', {}).iteritems(),
+        key=lambda parser_time: parser_time[1], reverse=True)
+    parser_times = parser_times[:self._MAXIMUM_NUMBER_OF_PARSER_TIMES]
+
+    offset = slot_offset + self._PARSER_TIMES_OFFSET
+    self._WriteUInt64(offset, len(parser_times))
+    offset += self._UINT64_STRUCT.size
+
+    for parser_name, parser_time in parser_times:
+      self._PARSER_TIME_STRUCT.pack_into(
+          self._memory_map, offset, parser_name.encode(u'utf-8'), parser_time)
+      offset += self._PARSER_TIME_STRUCT.size
+
+    self._WriteUInt64(slot_offset + self._SEQUENCE_OFFSET, sequence + 2)
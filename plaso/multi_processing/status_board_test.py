@@ -0,0 +1,100 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Tests the shared memory status board."""
+
+import multiprocessing
+import os
+import unittest
+
+from plaso.multi_processing import status_board
+
+
+def _UpdateStatus(test_status_board, slot_index, status):
+  """Updates the status in a slot in a separate process.
+
+  Args:
+    test_status_board: the status board object (instance of StatusBoard).
+    slot_index: the index of the slot.
+    status: the status dictionary.
+  """
+  test_status_board.UpdateStatus(slot_index, status)
+
+
+class StatusBoardTest(unittest.TestCase):
+  """Tests the shared memory status board."""
+
+  _STATUS = {
+      u'is_running': True,
+      u'counter': 12,
+      u'number_of_files': 3,
+      u'number_of_bytes_read': 4096,
+      u'current_file': u'/tmp/test.txt',
+      u'current_path_spec': u'{"type_indicator": "OS"}',
+      u'parser_times': {u'filestat': 0.5, u'winreg': 1.25}}
+
+  def testUpdateGetStatus(self):
+    """Tests the UpdateStatus and GetStatus functions."""
+    test_status_board = status_board.StatusBoard(2)
+    self.assertEqual(test_status_board.number_of_slots, 2)
+
+    self.assertIsNone(test_status_board.GetStatus(0))
+    self.assertIsNone(test_status_board.GetSlotIndex(os.getpid()))
+
+    test_status_board.UpdateStatus(1, self._STATUS)
+
+    self.assertEqual(test_status_board.GetSlotIndex(os.getpid()), 1)
+
+    status = test_status_board.GetStatus(1)
+    self.assertEqual(status[u'pid'], os.getpid())
+    for key, value in self._STATUS.iteritems():
+      self.assertEqual(status[key], value)
+
+    test_status_board.ClearSlot(1)
+    self.assertIsNone(test_status_board.GetStatus(1))
+
+    test_status_board.Close()
+
+  def testUpdateStatusLongStrings(self):
+    """Tests the UpdateStatus function with strings that do not fit."""
+    test_status_board = status_board.StatusBoard(1)
+
+    status = dict(self._STATUS)
+    status[u'current_file'] = u'/tmp/{0:s}'.format(u'a' * 1024)
+    status[u'current_path_spec'] = u'b' * 4096
+    test_status_board.UpdateStatus(0, status)
+
+    status = test_status_board.GetStatus(0)
+    self.assertEqual(len(status[u'current_file']), 512)
+    self.assertEqual(status[u'current_path_spec'], u'')
+
+    test_status_board.Close()
+
+  def testSignalStop(self):
+    """Tests the SignalStop and IsStopSignaled functions."""
+    test_status_board = status_board.StatusBoard(2)
+
+    test_status_board.SignalStop(0)
+    self.assertTrue(test_status_board.IsStopSignaled(0))
+    self.assertFalse(test_status_board.IsStopSignaled(1))
+
+    test_status_board.Close()
+
+  def testUpdateStatusInProcess(self):
+    """Tests the UpdateStatus function in a separate process."""
+    test_status_board = status_board.StatusBoard(2)
+
+    process = multiprocessing.Process(
+        target=_UpdateStatus, args=(test_status_board, 0, self._STATUS))
+    process.start()
+    process.join()
+
+    status = test_status_board.GetStatus(0)
+    self.assertEqual(status[u'pid'], process.pid)
+    self.assertEqual(status[u'counter'], 12)
+    self.assertEqual(status[u'current_file'], u'/tmp/test.txt')
+
+    test_status_board.Close()
+
+
+if __name__ == '__main__':
+  unittest.main()
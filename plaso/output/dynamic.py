@@ -19,6 +19,8 @@ class DynamicOutput(interface.FileLogOutputFormatter):
   DESCRIPTION = (
       u'Dynamic selection of fields for a separated value output format.')
 
+  SUPPORTS_OUTPUT_WORKERS = True
+
   FORMAT_ATTRIBUTE_RE = re.compile('{([^}]+)}')
 
   # A dict containing mappings between "special" attributes and
@@ -195,7 +197,8 @@ class DynamicOutput(interface.FileLogOutputFormatter):
           u'Unable to find no event formatter for: {0:s}.'.format(
               event_object.data_type))
 
-    msg, _ = event_formatter.GetMessages(self._formatter_mediator, event_object)
+    msg, _ = formatters_manager.FormattersManager.GetMessageStrings(
+        self._formatter_mediator, event_object)
     return msg
 
   def ParseMessageShort(self, event_object):
@@ -215,7 +218,7 @@ class DynamicOutput(interface.FileLogOutputFormatter):
           u'Unable to find no event formatter for: {0:s}.'.format(
               event_object.data_type))
 
-    _, msg_short = event_formatter.GetMessages(
+    _, msg_short = formatters_manager.FormattersManager.GetMessageStrings(
         self._formatter_mediator, event_object)
     return msg_short
 
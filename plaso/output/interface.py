@@ -12,7 +12,9 @@ a human readable format for easy human consumption/analysis.
 """
 
 import abc
+import hashlib
 import logging
+import operator
 import sys
 
 from plaso.lib import errors
@@ -44,6 +46,12 @@ class LogOutputFormatter(object):
   NAME = u''
   DESCRIPTION = u''
 
+  # Value to indicate the output module can write event objects in output
+  # worker processes. This requires that the output module writes every event
+  # object as lines to the filehandle and that the output does not depend on
+  # the event objects that were written before.
+  SUPPORTS_OUTPUT_WORKERS = False
+
   def __init__(
       self, store, formatter_mediator, filehandle=sys.stdout, config=None,
       filter_use=None):
@@ -203,11 +211,25 @@ class FileLogOutputFormatter(LogOutputFormatter):
 
 
 class EventBuffer(object):
-  """Buffer class for EventObject output processing."""
+  """Buffer class for EventObject output processing.
+
+  Duplicate event objects are detected by a digest of the representation
+  of the attribute values that are compared by EventObject.EqualityString,
+  instead of the equality string itself.
+  """
 
   MERGE_ATTRIBUTES = ['inode', 'filename', 'display_name']
 
-  def __init__(self, formatter, check_dedups=True):
+  # The default maximum number of buffered event objects with the same
+  # timestamp.
+  DEFAULT_MAXIMUM_BUFFER_SIZE = 100000
+
+  # The maximum number of cached attribute values functions.
+  _MAXIMUM_NUMBER_OF_CACHED_ATTRIBUTE_NAMES = 1024
+
+  def __init__(
+      self, formatter, check_dedups=True,
+      maximum_buffer_size=DEFAULT_MAXIMUM_BUFFER_SIZE):
     """Initialize the EventBuffer.
 
     This class is used for buffering up events for duplicate removals
@@ -218,9 +240,16 @@ class EventBuffer(object):
       formatter: An OutputFormatter object.
       check_dedups: Optional boolean value indicating whether or not the buffer
                     should check and merge duplicate entries or not.
+      maximum_buffer_size: Optional maximum number of buffered event objects
+                           with the same timestamp. If the buffer is full it
+                           is flushed, hence duplicates of flushed event
+                           objects are no longer merged.
     """
     self._buffer_dict = {}
+    self._compare_attribute_values_functions = {}
     self._current_timestamp = 0
+    self._first_event_object = None
+    self._maximum_buffer_size = maximum_buffer_size
     self.duplicate_counter = 0
     self.check_dedups = check_dedups
 
@@ -228,6 +257,142 @@ class EventBuffer(object):
     self.formatter.Open()
     self.formatter.WriteHeader()
 
+  def _GetCompareAttributeValuesFunctions(self, event_object, attribute_names):
+    """Retrieves the functions that retrieve the attribute values to compare.
+
+    The functions are cached per event object class and set of attributes,
+    since most event objects of the same data type define the same
+    attributes.
+
+    Args:
+      event_object: The EventObject.
+      attribute_names: a set containing the names of the attributes of
+                       the event object.
+
+    Returns:
+      A tuple containing a binary string that identifies the attributes
+      to compare, a function that retrieves the attribute values to compare
+      and a function that retrieves the attribute values to compare for
+      file stat event objects.
+    """
+    attribute_names = frozenset(attribute_names)
+    cache_key = (event_object.__class__, attribute_names)
+
+    lookup_value = self._compare_attribute_values_functions.get(cache_key, None)
+    if lookup_value is None:
+      compare_attribute_names = sorted(attribute_names.difference(
+          event_object.COMPARE_EXCLUDE))
+
+      # The timestamp descriptions of file stat event objects are joined.
+      filestat_attribute_names = [
+          attribute_name for attribute_name in compare_attribute_names
+          if attribute_name != u'timestamp_desc']
+
+      # The attribute names are part of the digest, so that the values
+      # of different attributes are not compared.
+      names_string = u'|'.join(compare_attribute_names).encode(u'utf-8')
+      lookup_value = (
+          names_string,
+          self._GetAttributeValuesFunction(compare_attribute_names),
+          self._GetAttributeValuesFunction(filestat_attribute_names))
+
+      if (len(self._compare_attribute_values_functions) >=
+          self._MAXIMUM_NUMBER_OF_CACHED_ATTRIBUTE_NAMES):
+        self._compare_attribute_values_functions = {}
+      self._compare_attribute_values_functions[cache_key] = lookup_value
+
+    return lookup_value
+
+  def _GetAttributeValuesFunction(self, attribute_names):
+    """Retrieves a function that retrieves attribute values.
+
+    Args:
+      attribute_names: a list of attribute names.
+
+    Returns:
+      A function that takes the attribute values dictionary of an event
+      object as argument and returns a tuple of the values of the attributes.
+    """
+    if not attribute_names:
+      return lambda unused_attribute_values: ()
+
+    if len(attribute_names) == 1:
+      attribute_name = attribute_names[0]
+      return lambda attribute_values: (attribute_values[attribute_name], )
+
+    return operator.itemgetter(*attribute_names)
+
+  def _GetEventDigest(self, event_object):
+    """Retrieves the digest that identifies duplicate event objects.
+
+    Two event objects have the same digest if they have the same timestamp,
+    data type and values of the attributes that are compared by
+    EventObject.EqualityString.
+
+    Args:
+      event_object: The EventObject.
+
+    Returns:
+      A binary string containing the MD5 digest or None if the event object
+      should not be considered a duplicate of any other event object.
+    """
+    attribute_names = event_object.GetAttributes()
+    attribute_values = event_object.__dict__
+
+    # Event objects read from storage can define attributes that are decoded
+    # when they are first accessed, which are decoded to compare their values.
+    for attribute_name in attribute_names.difference(attribute_values):
+      getattr(event_object, attribute_name)
+
+    names_string, get_values, get_filestat_values = (
+        self._GetCompareAttributeValuesFunctions(
+            event_object, attribute_names))
+
+    # The attribute names are byte strings, which are compared faster
+    # to the keys of the attribute values dictionary than Unicode strings.
+    if attribute_values.get('parser', None) != u'filestat':
+      values = get_values(attribute_values)
+      inode = None
+
+    else:
+      inode = attribute_values.get('inode', None)
+      if inode is None:
+        return
+
+      values = get_filestat_values(attribute_values)
+
+    # The order of dictionaries and sets is not defined, hence their
+    # values are sorted.
+    value_types = map(type, values)
+    if dict in value_types or set in value_types:
+      values = list(values)
+      for index, value_type in enumerate(value_types):
+        if value_type is dict:
+          values[index] = sorted(values[index].items())
+        elif value_type is set:
+          values[index] = sorted(values[index])
+
+    digest = hashlib.md5(names_string)
+    digest.update(repr((
+        attribute_values.get('timestamp', None),
+        attribute_values.get('data_type', None), values, inode)))
+    return digest.digest()
+
+  def _AppendToBuffer(self, event_object):
+    """Appends an EventObject to the buffer and joins it with its duplicate.
+
+    Args:
+      event_object: The EventObject that is being added.
+    """
+    key = self._GetEventDigest(event_object)
+    if key is None:
+      # The identifier of the event object cannot be mistaken for a digest.
+      key = id(event_object)
+
+    elif key in self._buffer_dict:
+      self.JoinEvents(event_object, self._buffer_dict.pop(key))
+    self._buffer_dict[key] = event_object
+
   def Append(self, event_object):
     """Append an EventObject into the processing pipeline.
 
@@ -242,23 +407,38 @@ class EventBuffer(object):
       self._current_timestamp = event_object.timestamp
       self.Flush()
 
-    key = event_object.EqualityString()
-    if key in self._buffer_dict:
-      self.JoinEvents(event_object, self._buffer_dict.pop(key))
-    self._buffer_dict[key] = event_object
+      # Most event objects do not share their timestamp with another event
+      # object, hence the digest is only determined when another event object
+      # with the same timestamp is appended.
+      self._first_event_object = event_object
+      return
+
+    if len(self._buffer_dict) >= self._maximum_buffer_size:
+      self.Flush()
+
+    if self._first_event_object is not None:
+      self._AppendToBuffer(self._first_event_object)
+      self._first_event_object = None
+
+    self._AppendToBuffer(event_object)
 
   def Flush(self):
     """Flushes the buffer by sending records to a formatter and prints."""
-    if not self._buffer_dict:
+    event_objects = self._buffer_dict.values()
+    if self._first_event_object is not None:
+      event_objects.insert(0, self._first_event_object)
+
+    if not event_objects:
       return
 
-    for event_object in self._buffer_dict.values():
+    for event_object in event_objects:
       try:
         self.formatter.WriteEvent(event_object)
       except errors.WrongFormatter as exception:
         logging.error(u'Unable to write event: {:s}'.format(exception))
 
     self._buffer_dict = {}
+    self._first_event_object = None
 
   def JoinEvents(self, event_a, event_b):
     """Join this EventObject with another one."""
@@ -7,9 +7,11 @@ import sys
 import tempfile
 import unittest
 
+from plaso.lib import event
 from plaso.output import interface
 from plaso.output import manager
 from plaso.output import test_lib
+from plaso.serializer import protobuf_serializer
 
 
 class DummyEvent(object):
@@ -89,6 +91,30 @@ class TestOutput(interface.LogOutputFormatter):
 manager.OutputManager.RegisterOutput(TestOutput)
 
 
+class TestEventObjectsOutput(interface.LogOutputFormatter):
+  """Test output that stores the event objects that are written."""
+
+  def __init__(self, store, formatter_mediator):
+    """Initializes the log output formatter object.
+
+    Args:
+      store: A storage file object (instance of StorageFile) that defines
+             the storage.
+      formatter_mediator: the formatter mediator object (instance of
+                          FormatterMediator).
+    """
+    super(TestEventObjectsOutput, self).__init__(store, formatter_mediator)
+    self.event_objects = []
+
+  def WriteEventBody(self, event_object):
+    """Writes the body of an event object to the output.
+
+    Args:
+      event_object: the event object (instance of EventObject).
+    """
+    self.event_objects.append(event_object)
+
+
 class PlasoOutputUnitTest(test_lib.LogOutputFormatterTestCase):
   """The unit test for plaso output formatting."""
 
@@ -174,6 +200,110 @@ class EventBufferTest(test_lib.LogOutputFormatterTestCase):
       event_buffer.Append(DummyEvent(123457, u'Now is different'))
       CheckBufferLength(event_buffer, 1)
 
+  def _CreateEventObject(self, timestamp, filename, **kwargs):
+    """Creates an event object.
+
+    Args:
+      timestamp: the timestamp of the event object.
+      filename: the filename of the event object.
+      kwargs: the other attributes of the event object.
+
+    Returns:
+      An event object (instance of EventObject).
+    """
+    event_object = event.EventObject()
+    event_object.data_type = u'test:dedup'
+    event_object.timestamp = timestamp
+    event_object.timestamp_desc = u'Written Time'
+    event_object.filename = filename
+    event_object.text = u'Some text'
+    event_object.values = {u'b': 2, u'a': 1}
+    for attribute_name, attribute_value in kwargs.iteritems():
+      setattr(event_object, attribute_name, attribute_value)
+    return event_object
+
+  def testAppendDuplicates(self):
+    """Tests that the Append function joins duplicate event objects."""
+    formatter = TestEventObjectsOutput(None, self._formatter_mediator)
+    event_buffer = interface.EventBuffer(formatter)
+
+    event_buffer.Append(self._CreateEventObject(1, u'/tmp/a'))
+    event_buffer.Append(self._CreateEventObject(2, u'/tmp/a'))
+    # The order of the dictionary values does not affect the comparison.
+    event_object = self._CreateEventObject(2, u'/tmp/b')
+    event_object.values = {u'a': 1, u'b': 2}
+    event_buffer.Append(event_object)
+    event_buffer.Append(self._CreateEventObject(2, u'/tmp/c', text=u'Other'))
+
+    # The timestamp descriptions of file stat event objects are joined.
+    for timestamp_desc in [u'atime', u'mtime']:
+      event_buffer.Append(self._CreateEventObject(
+          3, u'/tmp/d', inode=15, parser=u'filestat',
+          timestamp_desc=timestamp_desc))
+
+    # File stat event objects without an inode are not joined.
+    for _ in range(2):
+      event_buffer.Append(self._CreateEventObject(
+          4, u'/tmp/e', parser=u'filestat'))
+
+    event_buffer.Flush()
+
+    self.assertEqual(event_buffer.duplicate_counter, 2)
+    self.assertEqual(len(formatter.event_objects), 6)
+
+    filenames = sorted([
+        event_object.filename for event_object in formatter.event_objects])
+    self.assertEqual(filenames, [
+        u'/tmp/a', u'/tmp/a;/tmp/b', u'/tmp/c', u'/tmp/d', u'/tmp/e',
+        u'/tmp/e'])
+
+    timestamp_descs = [
+        event_object.timestamp_desc for event_object in formatter.event_objects
+        if event_object.timestamp == 3]
+    self.assertEqual(timestamp_descs, [u'atime;mtime'])
+
+  def testAppendLazyAttributes(self):
+    """Tests that the Append function compares lazily decoded attributes."""
+    formatter = TestEventObjectsOutput(None, self._formatter_mediator)
+    event_buffer = interface.EventBuffer(formatter)
+
+    for filename, values in [
+        (u'/tmp/a', {u'a': 1}), (u'/tmp/b', {u'a': 1}),
+        (u'/tmp/c', {u'a': 2})]:
+      event_object = protobuf_serializer.ProtobufLazyEventObject()
+      event_object.data_type = u'test:dedup'
+      event_object.timestamp = 1
+      event_object.timestamp_desc = u'Written Time'
+      event_object.filename = filename
+      event_object.AddLazyAttribute(u'values', dict, values)
+
+      # The attribute can already be decoded, for example by a filter.
+      if filename == u'/tmp/a':
+        _ = event_object.values
+
+      event_buffer.Append(event_object)
+
+    event_buffer.Flush()
+
+    self.assertEqual(event_buffer.duplicate_counter, 1)
+
+    filenames = sorted([
+        event_object.filename for event_object in formatter.event_objects])
+    self.assertEqual(filenames, [u'/tmp/a;/tmp/b', u'/tmp/c'])
+
+  def testAppendMaximumBufferSize(self):
+    """Tests that the Append function flushes a full buffer."""
+    formatter = TestEventObjectsOutput(None, self._formatter_mediator)
+    event_buffer = interface.EventBuffer(formatter, maximum_buffer_size=2)
+
+    for filename in [u'/tmp/a', u'/tmp/b', u'/tmp/c']:
+      event_buffer.Append(self._CreateEventObject(
+          1, filename, text=filename))
+    self.assertEqual(len(formatter.event_objects), 2)
+
+    event_buffer.Flush()
+    self.assertEqual(len(formatter.event_objects), 3)
+
 
 class OutputFilehandleTest(unittest.TestCase):
   """Few unit tests for the OutputFilehandle."""
@@ -19,6 +19,8 @@ class L2tCsvOutputFormatter(interface.FileLogOutputFormatter):
   NAME = u'l2tcsv'
   DESCRIPTION = u'CSV format used by legacy log2timeline, with 17 fixed fields.'
 
+  SUPPORTS_OUTPUT_WORKERS = True
+
   def WriteEventBody(self, event_object):
     """Writes the body of an event object to the output.
 
@@ -44,7 +46,7 @@ class L2tCsvOutputFormatter(interface.FileLogOutputFormatter):
           u'Unable to find event formatter for: {0:s}.'.format(
               event_object.data_type))
 
-    msg, msg_short = event_formatter.GetMessages(
+    msg, msg_short = formatters_manager.FormattersManager.GetMessageStrings(
         self._formatter_mediator, event_object)
     source_short, source_long = event_formatter.GetSources(event_object)
 
@@ -52,8 +54,10 @@ class L2tCsvOutputFormatter(interface.FileLogOutputFormatter):
         event_object.timestamp, self.zone)
     extras = []
 
+    # The attributes are sorted, since the order in which they are defined
+    # depends on how the event object was created, e.g. by an output worker.
     format_variables = event_formatter.GetFormatStringAttributeNames()
-    for key in event_object.GetAttributes():
+    for key in sorted(event_object.GetAttributes()):
       if (key in definitions.RESERVED_VARIABLE_NAMES or
           key in format_variables):
         continue
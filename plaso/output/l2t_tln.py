@@ -30,6 +30,8 @@ class L2tTlnOutputFormatter(interface.FileLogOutputFormatter):
   DESCRIPTION = (
       u'Extended seven field pipe delimited TLN, used in legacy log2timeline.')
 
+  SUPPORTS_OUTPUT_WORKERS = True
+
   DELIMITER = u'|'
 
   def WriteEventBody(self, event_object):
@@ -57,7 +59,8 @@ class L2tTlnOutputFormatter(interface.FileLogOutputFormatter):
           u'Unable to find event formatter for: {0:s}.'.format(
               event_object.data_type))
 
-    msg, _ = event_formatter.GetMessages(self._formatter_mediator, event_object)
+    msg, _ = formatters_manager.FormattersManager.GetMessageStrings(
+        self._formatter_mediator, event_object)
     source_short, _ = event_formatter.GetSources(event_object)
 
     date_use = timelib.Timestamp.CopyToPosix(event_object.timestamp)
@@ -13,6 +13,8 @@ class NativePythonOutputFormatter(interface.FileLogOutputFormatter):
   NAME = u'rawpy'
   DESCRIPTION = u'Prints out a "raw" interpretation of the EventObject.'
 
+  SUPPORTS_OUTPUT_WORKERS = True
+
   def WriteEventBody(self, event_object):
     """Writes the body of an event object to the output.
 
@@ -226,7 +226,8 @@ class SQLite4n6OutputFormatter(interface.LogOutputFormatter):
       event_formatter.FORMAT_STRING = event_formatter.FORMAT_STRING.replace(
           '}', '}<|>')
 
-    msg, _ = event_formatter.GetMessages(self._formatter_mediator, event_object)
+    msg, _ = formatters_manager.FormattersManager.GetMessageStrings(
+        self._formatter_mediator, event_object)
     source_short, source_long = event_formatter.GetSources(event_object)
 
     date_use = timelib.Timestamp.CopyToDatetime(
@@ -26,6 +26,8 @@ class TlnOutputFormatter(interface.FileLogOutputFormatter):
   NAME = u'tln'
   DESCRIPTION = u'Five field TLN pipe delimited output formatter.'
 
+  SUPPORTS_OUTPUT_WORKERS = True
+
   DELIMITER = u'|'
 
   def WriteEventBody(self, event_object):
@@ -53,7 +55,8 @@ class TlnOutputFormatter(interface.FileLogOutputFormatter):
           u'Unable to find event formatter for: {0:s}.'.format(
               event_object.data_type))
 
-    msg, _ = event_formatter.GetMessages(self._formatter_mediator, event_object)
+    msg, _ = formatters_manager.FormattersManager.GetMessageStrings(
+        self._formatter_mediator, event_object)
     source_short, _ = event_formatter.GetSources(event_object)
 
     date_use = timelib.Timestamp.CopyToPosix(event_object.timestamp)
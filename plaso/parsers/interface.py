@@ -65,12 +65,15 @@ class BaseParser(object):
     This convenience method updates the parser chain object held by the
     mediator, transfers control to the parser-specific Parse() method,
     and updates the chain again once the parsing is complete. It provides a
-    simpler parser API in most cases.
+    simpler parser API in most cases. The parser is profiled if the mediator
+    has a parsers profile.
     """
     parser_mediator.AppendToParserChain(self)
+    parser_mediator.StartProfiling()
     try:
       self.Parse(parser_mediator, **kwargs)
     finally:
+      parser_mediator.StopProfiling()
       parser_mediator.PopFromParserChain()
 
 
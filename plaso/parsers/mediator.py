@@ -3,9 +3,11 @@
 
 import logging
 import os
+import time
 
 from dfvfs.lib import definitions as dfvfs_definitions
 
+from plaso.engine import block_cache
 from plaso.lib import event
 from plaso.lib import utils
 
@@ -30,13 +32,23 @@ class ParserMediator(object):
     self._abort = False
     self._event_queue_producer = event_queue_producer
     self._extra_event_attributes = {}
+    self._file_block_cache = None
     self._file_entry = None
+    self._file_entry_attributes = None
     self._filter_object = None
     self._knowledge_base = knowledge_base
     self._mount_path = None
     self._parse_error_queue_producer = parse_error_queue_producer
     self._parser_chain_components = []
+    self._parsers_profile = None
+    self._profiling_samples = []
     self._text_prepend = None
+    self._usernames = {}
+
+    # Counters that show the effect of caching the file entry attributes.
+    self.file_entry_attributes_time = 0.0
+    self.number_of_file_entry_attributes_cache_hits = 0
+    self.number_of_file_entry_attributes_cache_misses = 0
 
     self.number_of_events = 0
     self.number_of_parse_errors = 0
@@ -76,6 +88,53 @@ class ParserMediator(object):
     """The year."""
     return self._knowledge_base.year
 
+  def _GetFileEntryAttributes(self, file_entry):
+    """Retrieves the event attributes that are derived from a file entry.
+
+    The attributes are the same for every event produced from the file entry,
+    hence they are determined for the first event and cached for the events
+    that follow, until another file entry is used.
+
+    Args:
+      file_entry: the file entry object (instance of dfvfs.FileEntry).
+
+    Returns:
+      A tuple containing the path specification, the relative path,
+      the display name and the inode value of the file entry. The relative
+      path and the inode value are None if not available.
+    """
+    if self._file_entry_attributes is not None:
+      cached_file_entry, file_entry_attributes = self._file_entry_attributes
+      if cached_file_entry is file_entry:
+        self.number_of_file_entry_attributes_cache_hits += 1
+        return file_entry_attributes
+
+    start_time = time.time()
+
+    path_spec = getattr(file_entry, u'path_spec', None)
+    relative_path = self._GetRelativePath(path_spec)
+
+    # TODO: dfVFS refactor: move display name to output since the path
+    # specification contains the full information.
+    display_name = self.GetDisplayName(file_entry)
+
+    stat_object = file_entry.GetStat()
+    inode_number = getattr(stat_object, u'ino', None)
+    if inode_number:
+      # TODO: clean up the GetInodeValue function.
+      inode_value = utils.GetInodeValue(inode_number)
+    else:
+      inode_value = None
+
+    file_entry_attributes = (
+        file_entry.path_spec, relative_path, display_name, inode_value)
+    self._file_entry_attributes = (file_entry, file_entry_attributes)
+
+    self.file_entry_attributes_time += time.time() - start_time
+    self.number_of_file_entry_attributes_cache_misses += 1
+
+    return file_entry_attributes
+
   def _GetRelativePath(self, path_spec):
     """Retrieves the relative path.
 
@@ -193,7 +252,12 @@ class ParserMediator(object):
     if not self._file_entry:
       raise ValueError(u'Missing file entry')
 
-    file_object = self._file_entry.GetFileObject()
+    if self._file_block_cache:
+      file_object = block_cache.FileBlockCacheFileObject(
+          self._file_block_cache)
+    else:
+      file_object = self._file_entry.GetFileObject()
+
     if offset is not None:
       file_object.seek(offset, os.SEEK_SET)
     return file_object
@@ -242,22 +306,16 @@ class ParserMediator(object):
 
     display_name = None
     if file_entry:
-      event_object.pathspec = file_entry.path_spec
+      path_spec, relative_path, display_name, inode_value = (
+          self._GetFileEntryAttributes(file_entry))
 
-      if not getattr(event_object, u'filename', None):
-        path_spec = getattr(file_entry, u'path_spec', None)
-        event_object.filename = self._GetRelativePath(path_spec)
+      event_object.pathspec = path_spec
 
-      if not display_name:
-        # TODO: dfVFS refactor: move display name to output since the path
-        # specification contains the full information.
-        display_name = self.GetDisplayName(file_entry)
+      if not getattr(event_object, u'filename', None):
+        event_object.filename = relative_path
 
-      stat_object = file_entry.GetStat()
-      inode_number = getattr(stat_object, u'ino', None)
-      if not hasattr(event_object, u'inode') and inode_number:
-        # TODO: clean up the GetInodeValue function.
-        event_object.inode = utils.GetInodeValue(inode_number)
+      if not hasattr(event_object, u'inode') and inode_value is not None:
+        event_object.inode = inode_value
 
     if not getattr(event_object, u'display_name', None) and display_name:
       event_object.display_name = display_name
@@ -267,7 +325,12 @@ class ParserMediator(object):
 
     if not getattr(event_object, u'username', None):
       user_sid = getattr(event_object, u'user_sid', None)
-      username = self._knowledge_base.GetUsernameByIdentifier(user_sid)
+      if user_sid in self._usernames:
+        username = self._usernames[user_sid]
+      else:
+        username = self._knowledge_base.GetUsernameByIdentifier(user_sid)
+        self._usernames[user_sid] = username
+
       if username:
         event_object.username = username
 
@@ -341,12 +404,28 @@ class ParserMediator(object):
 
   def ResetCounters(self):
     """Resets the counters."""
+    self.file_entry_attributes_time = 0.0
     self.number_of_events = 0
+    self.number_of_file_entry_attributes_cache_hits = 0
+    self.number_of_file_entry_attributes_cache_misses = 0
     self.number_of_parse_errors = 0
 
+  def SetFileBlockCache(self, file_block_cache):
+    """Sets the file block cache of the file being parsed.
+
+    The file-like objects provided by the mediator read from the file block
+    cache, which must be of the file entry that is set in the mediator.
+
+    Args:
+      file_block_cache: the file block cache (instance of FileBlockCache)
+                        or None to read directly from the file entry.
+    """
+    self._file_block_cache = file_block_cache
+
   def SetFileEntry(self, file_entry):
     """Set the dfVFS FileEntry object for the file being parsed."""
     self._file_entry = file_entry
+    self._file_entry_attributes = None
 
   def SetFilterObject(self, filter_object):
     """Sets the filter object.
@@ -369,6 +448,20 @@ class ParserMediator(object):
 
     self._mount_path = mount_path
 
+    # The relative path and display name depend on the mount path.
+    self._file_entry_attributes = None
+
+  def SetParsersProfile(self, parsers_profile):
+    """Sets the parsers profile.
+
+    Args:
+      parsers_profile: the parsers profile (instance of ParsersProfile)
+                       the parsers and plugins are profiled in or None
+                       to disable profiling.
+    """
+    self._parsers_profile = parsers_profile
+    self._profiling_samples = []
+
   def SetTextPrepend(self, text_prepend):
     """Sets the text prepend.
 
@@ -380,3 +473,47 @@ class ParserMediator(object):
   def SignalAbort(self):
     """Signals the parsers to abort."""
     self._abort = True
+
+  def StartProfiling(self):
+    """Starts profiling the parser or plugin last added to the parser chain.
+
+    This function does nothing if no parsers profile is set.
+    """
+    if not self._parsers_profile:
+      return
+
+    if self._file_block_cache:
+      number_of_bytes_read = self._file_block_cache.number_of_bytes_read
+    else:
+      number_of_bytes_read = 0
+
+    cpu_times = os.times()
+    self._profiling_samples.append((
+        time.time(), cpu_times[0] + cpu_times[1], self.number_of_events,
+        number_of_bytes_read))
+
+  def StopProfiling(self):
+    """Stops profiling the parser or plugin last added to the parser chain.
+
+    The values are added to the parsers profile per parser chain. The number
+    of bytes read is only available when the file block cache is used.
+    """
+    if not self._parsers_profile or not self._profiling_samples:
+      return
+
+    wall_time, cpu_time, number_of_events, number_of_bytes_read = (
+        self._profiling_samples.pop())
+
+    # The file block cache is replaced when a parser opens another file
+    # entry, hence the difference can be negative.
+    if self._file_block_cache:
+      number_of_bytes_read = max(
+          0, self._file_block_cache.number_of_bytes_read - number_of_bytes_read)
+    else:
+      number_of_bytes_read = 0
+
+    cpu_times = os.times()
+    self._parsers_profile.AddParserChainTiming(
+        self.GetParserChain(), time.time() - wall_time,
+        cpu_times[0] + cpu_times[1] - cpu_time,
+        self.number_of_events - number_of_events, number_of_bytes_read)
@@ -9,6 +9,7 @@ from dfvfs.path import factory as path_spec_factory
 from dfvfs.resolver import resolver as path_spec_resolver
 
 from plaso.engine import single_process
+from plaso.lib import event
 from plaso.parsers import test_lib
 
 
@@ -47,6 +48,63 @@ class ParsersMediatorTest(test_lib.ParserTestCase):
 
     # TODO: add test with relative path.
 
+  def testProcessEvent(self):
+    """Tests the ProcessEvent function."""
+    event_queue = single_process.SingleProcessQueue()
+    parse_error_queue = single_process.SingleProcessQueue()
+
+    knowledge_base_values = {u'users': [
+        {u'name': u'joe', u'sid': u'S-1-5-21-1000'}]}
+    parsers_mediator = self._GetParserMediator(
+        event_queue, parse_error_queue,
+        knowledge_base_values=knowledge_base_values)
+
+    test_path = self._GetTestFilePath([u'syslog.gz'])
+    os_path_spec = path_spec_factory.Factory.NewPathSpec(
+        definitions.TYPE_INDICATOR_OS, location=test_path)
+    file_entry = path_spec_resolver.Resolver.OpenFileEntry(os_path_spec)
+    parsers_mediator.SetFileEntry(file_entry)
+
+    for user_sid in [u'S-1-5-21-1000', u'S-1-5-21-1000', u'S-1-5-21-1001']:
+      event_object = event.EventObject()
+      event_object.user_sid = user_sid
+      parsers_mediator.ProcessEvent(event_object, parser_chain=u'test')
+
+      self.assertEqual(event_object.pathspec, os_path_spec)
+      self.assertEqual(event_object.filename, test_path)
+      self.assertEqual(
+          event_object.display_name, u'OS:{0:s}'.format(test_path))
+      self.assertEqual(event_object.parser, u'test')
+
+    self.assertEqual(event_object.username, u'-')
+    self.assertEqual(
+        parsers_mediator.number_of_file_entry_attributes_cache_misses, 1)
+    self.assertEqual(
+        parsers_mediator.number_of_file_entry_attributes_cache_hits, 2)
+
+    # The attributes of another file entry are not taken from the cache.
+    gzip_path_spec = path_spec_factory.Factory.NewPathSpec(
+        definitions.TYPE_INDICATOR_GZIP, parent=os_path_spec)
+    file_entry = path_spec_resolver.Resolver.OpenFileEntry(gzip_path_spec)
+    parsers_mediator.SetFileEntry(file_entry)
+
+    event_object = event.EventObject()
+    event_object.user_sid = u'S-1-5-21-1000'
+    event_object.filename = u'/var/log/syslog'
+    parsers_mediator.ProcessEvent(event_object)
+
+    self.assertEqual(event_object.pathspec, gzip_path_spec)
+    self.assertEqual(event_object.filename, u'/var/log/syslog')
+    self.assertEqual(
+        event_object.display_name, u'GZIP:{0:s}'.format(test_path))
+    self.assertEqual(event_object.username, u'joe')
+    self.assertEqual(
+        parsers_mediator.number_of_file_entry_attributes_cache_misses, 2)
+
+    parsers_mediator.ResetCounters()
+    self.assertEqual(
+        parsers_mediator.number_of_file_entry_attributes_cache_misses, 0)
+
   # TODO: add more tests.
 
 
@@ -2,8 +2,11 @@
 """Parser for PCAP files."""
 
 import binascii
+import collections
+import io
 import operator
 import socket
+import struct
 
 import dpkt
 
@@ -69,6 +72,71 @@ def ParseDNS(dns_packet_data):
   return u' '.join(dns_data)
 
 
+def ParseHTTPRequest(stream_data):
+  """Parse the request line and headers of a HTTP request.
+
+  The body of the request is not parsed, since the stream data can be
+  truncated.
+
+  Args:
+    stream_data: The stream data that contains the HTTP request.
+
+  Returns:
+    A tuple of the method, URI, version and a dictionary of the headers.
+
+  Raises:
+    UnpackError: if the HTTP request cannot be parsed.
+  """
+  file_object = io.BytesIO(stream_data)
+  line = file_object.readline()
+  request_values = line.strip().split()
+  if len(request_values) < 2:
+    raise dpkt.UnpackError('invalid request: {0!r}'.format(line))
+
+  if len(request_values) == 2:
+    # HTTP/0.9 does not specify a version in the request line.
+    version = '0.9'
+  elif not request_values[2].startswith('HTTP'):
+    raise dpkt.UnpackError(
+        'invalid http version: {0!r}'.format(request_values[2]))
+  else:
+    version = request_values[2][5:]
+
+  headers = dpkt.http.parse_headers(file_object)
+  return request_values[0], request_values[1], version, headers
+
+
+def ParseHTTPResponse(stream_data):
+  """Parse the status line and headers of a HTTP response.
+
+  The body of the response is not parsed, since the stream data can be
+  truncated.
+
+  Args:
+    stream_data: The stream data that contains the HTTP response.
+
+  Returns:
+    A tuple of the status, reason, version and a dictionary of the headers.
+
+  Raises:
+    UnpackError: if the HTTP response cannot be parsed.
+  """
+  file_object = io.BytesIO(stream_data)
+  line = file_object.readline()
+  response_values = line.strip().split(None, 2)
+  if (len(response_values) < 2 or not response_values[0].startswith('HTTP') or
+      not response_values[1].isdigit()):
+    raise dpkt.UnpackError('invalid response: {0!r}'.format(line))
+
+  if len(response_values) > 2:
+    reason = response_values[2]
+  else:
+    reason = ''
+
+  headers = dpkt.http.parse_headers(file_object)
+  return response_values[1], reason, response_values[0][5:], headers
+
+
 def ParseNetBios(netbios_packet):
   """Parse the netBIOS stream details.
 
@@ -122,17 +190,16 @@ def TCPFlags(flag):
   return '|'.join(res)
 
 
-def ICMPTypes(packet):
+def ICMPTypes(icmp_type, icmp_code):
   """Parse the type information for the icmp packets.
 
   Args:
-    packet: ICMP packet data.
+    icmp_type: ICMP type value.
+    icmp_code: ICMP code value.
 
   Returns:
     Formatted ICMP details.
   """
-  icmp_type = packet.type
-  icmp_code = packet.code
   icmp_data = []
   icmp_data.append('ICMP')
 
@@ -266,50 +333,95 @@ def ICMPTypes(packet):
 
 
 class Stream(object):
-  """Used to store packet details on network streams parsed from a pcap file."""
+  """Used to store the summary of a network stream parsed from a pcap file.
 
-  def __init__(self, packet, prot_data, source_ip, dest_ip, prot):
+  Only the values needed to describe the stream are kept, which includes
+  at most the first 64 KiB of the stream data, hence the memory used by
+  a stream does not depend on the number of packets in the stream.
+  """
+
+  # The maximum size of the stream data that is kept.
+  MAXIMUM_STREAM_DATA_SIZE = 64 * 1024
+
+  def __init__(
+      self, packet_number, timestamp, size, source_ip, dest_ip, prot,
+      source_port=u'', dest_port=u''):
     """Initialize new stream.
 
     Args:
-      packet: Packet data.
-      prot_data: Protocol level data for ARP, UDP, RCP, ICMP.
-          other types of ether packets, this is just the ether.data.
+      packet_number: The number of the first packet, where 1 is the first
+                     packet in the pcap file.
+      timestamp: The timestamp of the first packet.
+      size: The size of the first packet.
       source_ip: Source IP.
       dest_ip: Dest IP.
       prot: Protocol (TCP, UDP, ICMP, ARP).
+      source_port: Optional source port. The default is an empty string.
+      dest_port: Optional dest port. The default is an empty string.
     """
-    self.packet_id = [packet[1]]
-    self.timestamps = [packet[0]]
-    self.size = packet[3]
-    self.start_time = packet[0]
-    self.all_data = [prot_data]
+    super(Stream, self).__init__()
+    self._stream_data = []
+    self.dest_ip = dest_ip
+    self.dest_port = dest_port
+    self.end_time = timestamp
+    self.first_packet_id = packet_number
+    self.has_truncated_packets = False
+    self.icmp_code = None
+    self.icmp_type = None
+    self.last_packet_id = packet_number
+    self.packet_count = 1
+    self.protocol = prot
     self.protocol_data = ''
-    self.stream_data = []
+    self.size = size
+    self.source_ip = source_ip
+    self.source_port = source_port
+    self.start_time = timestamp
+    self.stream_data_size = 0
 
-    if prot == 'TCP' or prot == 'UDP':
-      self.source_port = prot_data.sport
-      self.dest_port = prot_data.dport
-    else:
-      self.source_port = ''
-      self.dest_port = ''
+  @property
+  def stream_data(self):
+    """The stream data."""
+    if len(self._stream_data) > 1:
+      self._stream_data = [''.join(self._stream_data)]
 
-    self.source_ip = source_ip
-    self.dest_ip = dest_ip
-    self.protocol = prot
+    if not self._stream_data:
+      return ''
+    return self._stream_data[0]
 
-  def AddPacket(self, packet, prot_data):
+  def AddPacket(self, packet_number, timestamp, size):
     """Add another packet to an existing stream.
 
     Args:
-      packet: Packet data.
-      prot_data: Protocol level data for ARP, UDP, RCP, ICMP.
-          other types of ether packets, this is just the ether.data
+      packet_number: The number of the packet.
+      timestamp: The timestamp of the packet.
+      size: The size of the packet.
+    """
+    self.last_packet_id = packet_number
+    self.packet_count += 1
+    self.size += size
+
+    if timestamp < self.start_time:
+      self.start_time = timestamp
+    elif timestamp > self.end_time:
+      self.end_time = timestamp
+
+  def AddStreamData(self, packet_data):
+    """Adds the data of a packet to the stream data.
+
+    Data beyond the maximum stream data size is ignored.
+
+    Args:
+      packet_data: The data of the packet.
     """
-    self.packet_id.append(packet[1])
-    self.timestamps.append(packet[0])
-    self.all_data.append(prot_data)
-    self.size += packet[3]
+    maximum_size = self.MAXIMUM_STREAM_DATA_SIZE - self.stream_data_size
+    if maximum_size <= 0:
+      return
+
+    if len(packet_data) > maximum_size:
+      packet_data = packet_data[:maximum_size]
+
+    self._stream_data.append(packet_data)
+    self.stream_data_size += len(packet_data)
 
   def SpecialTypes(self):
     """Checks for some special types of packets.
@@ -321,102 +433,102 @@ class Stream(object):
       A tuple consisting of a basic desctiption of the stream
       (i.e. HTTP Request) and the prettyfied string for the protocols.
     """
+    stream_data = self.stream_data
     packet_details = []
-    if self.stream_data[:4] == 'HTTP':
+    if stream_data[:4] == 'HTTP':
       try:
-        http = dpkt.http.Response(self.stream_data)
+        status, reason, version, _ = ParseHTTPResponse(stream_data)
         packet_details.append('HTTP Response: status: ')
-        packet_details.append(http.status)
+        packet_details.append(status)
         packet_details.append(' reason: ')
-        packet_details.append(http.reason)
+        packet_details.append(reason)
         packet_details.append(' version: ')
-        packet_details.append(http.version)
+        packet_details.append(version)
         return 'HTTP Response', u' '.join(packet_details)
 
       except dpkt.UnpackError as exception:
         packet_details = (
             u'HTTP Response Unpack Error: {0:s}. '
             u'First 20 of data {1:s}').format(
-                exception, repr(self.stream_data[:20]))
+                exception, repr(stream_data[:20]))
         return 'HTTP Response', packet_details
 
       except IndexError as exception:
         packet_details = (
             u'HTTP Response Index Error: {0:s}. First 20 of data {1:s}').format(
-                exception, repr(self.stream_data[:20]))
+                exception, repr(stream_data[:20]))
         return 'HTTP Response', packet_details
 
       except ValueError as exception:
         packet_details = (
             u'HTTP Response parsing error: {0:s}. '
             u'First 20 of data {1:s}').format(
-                exception, repr(self.stream_data[:20]))
+                exception, repr(stream_data[:20]))
         return 'HTTP Response', packet_details
 
-    elif self.stream_data[:3] == 'GET' or self.stream_data[:4] == 'POST':
+    elif stream_data[:3] == 'GET' or stream_data[:4] == 'POST':
       try:
-        http = dpkt.http.Request(self.stream_data)
+        method, uri, version, headers = ParseHTTPRequest(stream_data)
         packet_details.append('HTTP Request: method: ')
-        packet_details.append(http.method)
+        packet_details.append(method)
         packet_details.append(' uri: ')
-        packet_details.append(http.uri)
+        packet_details.append(uri)
         packet_details.append(' version: ')
-        packet_details.append(http.version)
+        packet_details.append(version)
         packet_details.append(' headers: ')
-        packet_details.append(repr(http.headers))
+        packet_details.append(repr(headers))
         return 'HTTP Request', u' '.join(packet_details)
 
       except dpkt.UnpackError as exception:
         packet_details = (
             u'HTTP Request unpack error: {0:s}. First 20 of data {1:s}').format(
-                exception, repr(self.stream_data[:20]))
+                exception, repr(stream_data[:20]))
         return 'HTTP Request', packet_details
 
       except ValueError as exception:
         packet_details = (
             u'HTTP Request parsing error: {0:s}. '
             u'First 20 of data {1:s}').format(
-                exception, repr(self.stream_data[:20]))
+                exception, repr(stream_data[:20]))
         return 'HTTP Request', packet_details
 
     elif self.protocol == 'UDP' and (
         self.source_port == 53 or self.dest_port == 53):
       # DNS request/replies.
       # Check to see if the lengths are valid.
-      for packet in self.all_data:
-        if not packet.ulen == len(packet):
-          packet_details.append('Truncated DNS packets - unable to parse: ')
-          packet_details.append(repr(self.stream_data[15:40]))
-          return 'DNS', u' '.join(packet_details)
+      if self.has_truncated_packets:
+        packet_details.append('Truncated DNS packets - unable to parse: ')
+        packet_details.append(repr(stream_data[15:40]))
+        return 'DNS', u' '.join(packet_details)
 
-      return 'DNS', ParseDNS(self.stream_data)
+      return 'DNS', ParseDNS(stream_data)
 
     elif self.protocol == 'UDP' and (
         self.source_port == 137 or self.dest_port == 137):
-      return 'NetBIOS', ParseNetBios(dpkt.netbios.NS(self.stream_data))
+      return 'NetBIOS', ParseNetBios(dpkt.netbios.NS(stream_data))
 
     elif self.protocol == 'ICMP':
       # ICMP packets all end up as 1 stream, so they need to be
       #  processed 1 by 1.
-      return 'ICMP', ICMPTypes(self.all_data[0])
+      return 'ICMP', ICMPTypes(self.icmp_type, self.icmp_code)
 
-    elif '\x03\x01' in self.stream_data[1:3]:
+    elif '\x03\x01' in stream_data[1:3]:
       # Some form of ssl3 data.
       try:
-        ssl = dpkt.ssl.SSL2(self.stream_data)
+        ssl = dpkt.ssl.SSL2(stream_data)
         packet_details.append('SSL data. Length: ')
         packet_details.append(str(ssl.len))
         return 'SSL', u' '.join(packet_details)
       except dpkt.UnpackError as exception:
         packet_details = (
             u'SSL unpack error: {0:s}. First 20 of data {1:s}').format(
-                exception, repr(self.stream_data[:20]))
+                exception, repr(stream_data[:20]))
         return 'SSL', packet_details
 
-    elif '\x03\x00' in self.stream_data[1:3]:
+    elif '\x03\x00' in stream_data[1:3]:
        # Some form of ssl3 data.
       try:
-        ssl = dpkt.ssl.SSL2(self.stream_data)
+        ssl = dpkt.ssl.SSL2(stream_data)
         packet_details.append('SSL data. Length: ')
         packet_details.append(str(ssl.len))
         return 'SSL', u' '.join(packet_details)
@@ -424,22 +536,11 @@ class Stream(object):
       except dpkt.UnpackError as exception:
         packet_details = (
             u'SSL unpack error: {0:s}. First 20 of data {1:s}').format(
-                exception, repr(self.stream_data[:20]))
+                exception, repr(stream_data[:20]))
         return 'SSL', packet_details
 
     return 'other', self.protocol_data
 
-  def Clean(self):
-    """Clean up stream data."""
-    clean_data = []
-    for packet in self.all_data:
-      try:
-        clean_data.append(packet.data)
-      except AttributeError:
-        pass
-
-      self.stream_data = ''.join(clean_data)
-
 
 class PcapEvent(time_events.PosixTimeEvent):
   """Convenience class for a PCAP record event."""
@@ -463,251 +564,413 @@ class PcapEvent(time_events.PosixTimeEvent):
     self.protocol = stream_object.protocol
     self.size = stream_object.size
     self.stream_type, self.protocol_data = stream_object.SpecialTypes()
-    self.first_packet_id = min(stream_object.packet_id)
-    self.last_packet_id = max(stream_object.packet_id)
-    self.packet_count = len(stream_object.packet_id)
+    self.first_packet_id = stream_object.first_packet_id
+    self.last_packet_id = stream_object.last_packet_id
+    self.packet_count = stream_object.packet_count
     self.stream_data = repr(stream_object.stream_data[:50])
 
 
 class PcapParser(interface.SingleFileBaseParser):
-  """Parses PCAP files."""
+  """Parses PCAP files.
+
+  The PCAP file is parsed as a stream of packets. The IP packets are
+  grouped into streams, of which only a limited number is tracked at the
+  same time. A stream is considered complete and its event objects are
+  produced when no packets were added to the stream during the idle timeout,
+  or when the least recently used stream needs to make room for a new one.
+  Hence the memory used does not depend on the size of the PCAP file.
+  """
 
   NAME = 'pcap'
   DESCRIPTION = u'Parser for PCAP files.'
 
-  def _ParseIPPacket(
-      self, connections, trunc_list, packet_number, timestamp,
-      packet_data_size, ip_packet):
-    """Parses an IP packet.
+  # The default maximum number of streams that are tracked at the same time.
+  _DEFAULT_MAXIMUM_NUMBER_OF_STREAMS = 1024
+
+  # The default number of seconds after which a stream without new packets
+  # is considered complete.
+  _DEFAULT_STREAM_IDLE_TIMEOUT = 300
+
+  # The size of the blocks in which the PCAP file is read, which is 1 MiB.
+  _READ_BUFFER_SIZE = 1024 * 1024
+
+  # The header structures, of which only the values that are used are
+  # unpacked.
+  _FILE_HEADER_MAGIC = struct.Struct('>I20x')
+  _PACKET_HEADER = struct.Struct('>IIIxxxx')
+  _PACKET_HEADER_LITTLE_ENDIAN = struct.Struct('<IIIxxxx')
+  _ETHERNET_HEADER = struct.Struct('>6s6sH')
+  _SNAP_HEADER = struct.Struct('>6xH')
+  _ARP_HEADER = struct.Struct('>6xH6s4s6s4s')
+  _IPV4_HEADER = struct.Struct('>BxH5xB2x4s4s')
+  _IPV6_HEADER = struct.Struct('>8x16s16s')
+  _ICMP_HEADER = struct.Struct('>BB2x')
+  _TCP_HEADER = struct.Struct('>HH8xB7x')
+  _UDP_HEADER = struct.Struct('>HHH2x')
+
+  _ARP_OPERATIONS = {
+      dpkt.arp.ARP_OP_REQUEST: ('arp request: target IP = ', False),
+      dpkt.arp.ARP_OP_REPLY: ('arp reply: target IP = ', True),
+      dpkt.arp.ARP_OP_REVREQUEST: (
+          'arp protocol address request: target IP = ', False),
+      dpkt.arp.ARP_OP_REVREPLY: (
+          'arp protocol address reply: target IP = ', True)}
+
+  # The protocol and protocol data of the non-IP packets, other than
+  # ARP and IPv6.
+  _OTHER_ETHERNET_TYPES = {
+      dpkt.ethernet.ETH_TYPE_CDP: ('CDP', 'CDP'),
+      dpkt.ethernet.ETH_TYPE_DTP: ('DTP', 'DTP'),
+      dpkt.ethernet.ETH_TYPE_REVARP: ('RARP', 'Reverse ARP'),
+      dpkt.ethernet.ETH_TYPE_8021Q: ('8021Q packet', '8021Q packet'),
+      dpkt.ethernet.ETH_TYPE_IPX: ('IPX', 'IPX'),
+      dpkt.ethernet.ETH_TYPE_PPP: ('PPP', 'PPP'),
+      dpkt.ethernet.ETH_TYPE_MPLS: ('MPLS', 'MPLS'),
+      dpkt.ethernet.ETH_TYPE_MPLS_MCAST: ('MPLS', 'MPLS MCAST'),
+      dpkt.ethernet.ETH_TYPE_PPPoE_DISC: ('PPOE', 'PPoE Disc packet'),
+      dpkt.ethernet.ETH_TYPE_PPPoE: ('PPPoE', 'PPPoE'),
+      0x2452: ('802.11', '802.11')}
+
+  def __init__(
+      self, maximum_number_of_streams=_DEFAULT_MAXIMUM_NUMBER_OF_STREAMS,
+      stream_idle_timeout=_DEFAULT_STREAM_IDLE_TIMEOUT):
+    """Initializes a parser object.
 
     Args:
-      connections: A dictionary object to track the IP connections.
-      trunc_list: A list of packets that truncated strangely and could
-                  not be turned into a stream.
-      packet_number: The PCAP packet number, where 1 is the first packet.
-      timestamp: The PCAP packet timestamp.
-      packet_data_size: The packet data size.
-      ip_packet: The IP packet (instance of dpkt.ip.IP).
+      maximum_number_of_streams: optional maximum number of streams that
+                                 are tracked at the same time.
+      stream_idle_timeout: optional number of seconds after which a stream
+                           without new packets is considered complete.
     """
-    packet_values = [timestamp, packet_number, ip_packet, packet_data_size]
+    super(PcapParser, self).__init__()
+    self._maximum_number_of_streams = maximum_number_of_streams
+    self._stream_idle_timeout = stream_idle_timeout
 
-    source_ip_address = socket.inet_ntoa(ip_packet.src)
-    destination_ip_address = socket.inet_ntoa(ip_packet.dst)
+  def _FlushIdleStreams(self, parser_mediator, streams, timestamp):
+    """Produces the event objects of the streams that are idle.
 
-    if ip_packet.p == dpkt.ip.IP_PROTO_TCP:
-      # Later versions of dpkt seem to return a string instead of a TCP object.
-      if isinstance(ip_packet.data, str):
-        try:
-          tcp = dpkt.tcp.TCP(ip_packet.data)
-        except (dpkt.NeedData, dpkt.UnpackError):
-          trunc_list.append(packet_values)
-          return
+    Args:
+      parser_mediator: A parser mediator object (instance of ParserMediator).
+      streams: An ordered dictionary of the tracked streams, with the least
+               recently used stream first.
+      timestamp: The timestamp of the current packet.
+    """
+    while streams:
+      stream_key, stream_object = next(streams.iteritems())
+      if timestamp - stream_object.end_time <= self._stream_idle_timeout:
+        break
 
-      else:
-        tcp = ip_packet.data
+      del streams[stream_key]
+      self._ProduceStreamEvents(parser_mediator, stream_object)
 
-      stream_key = 'tcp: {0:s}:{1:d} > {2:s}:{3:d}'.format(
-          source_ip_address, tcp.sport, destination_ip_address, tcp.dport)
+  def _GetStream(
+      self, parser_mediator, streams, stream_key, packet_number, timestamp,
+      size, source_ip_address, destination_ip_address, protocol,
+      source_port=u'', destination_port=u''):
+    """Retrieves the stream of an IP packet and adds the packet to it.
 
-      if stream_key in connections:
-        connections[stream_key].AddPacket(packet_values, tcp)
-      else:
-        connections[stream_key] = Stream(
-            packet_values, tcp, source_ip_address, destination_ip_address,
-            'TCP')
-
-    elif ip_packet.p == dpkt.ip.IP_PROTO_UDP:
-      # Later versions of dpkt seem to return a string instead of an UDP object.
-      if isinstance(ip_packet.data, str):
-        try:
-          udp = dpkt.udp.UDP(ip_packet.data)
-        except (dpkt.NeedData, dpkt.UnpackError):
-          trunc_list.append(packet_values)
-          return
+    If the stream is not tracked a new stream is created, which can cause
+    the least recently used stream to be completed.
 
-      else:
-        udp = ip_packet.data
+    Args:
+      parser_mediator: A parser mediator object (instance of ParserMediator).
+      streams: An ordered dictionary of the tracked streams, with the least
+               recently used stream first.
+      stream_key: A tuple that identifies the stream.
+      packet_number: The PCAP packet number, where 1 is the first packet.
+      timestamp: The PCAP packet timestamp.
+      size: The packet size.
+      source_ip_address: The packed source IP address.
+      destination_ip_address: The packed destination IP address.
+      protocol: The protocol of the stream.
+      source_port: Optional source port. The default is an empty string.
+      destination_port: Optional destination port. The default is an empty
+                        string.
+
+    Returns:
+      A stream object (instance of Stream).
+    """
+    stream_object = streams.pop(stream_key, None)
+    if stream_object:
+      stream_object.AddPacket(packet_number, timestamp, size)
+    else:
+      stream_object = Stream(
+          packet_number, timestamp, size, socket.inet_ntoa(source_ip_address),
+          socket.inet_ntoa(destination_ip_address), protocol,
+          source_port=source_port, dest_port=destination_port)
 
-      stream_key = 'udp: {0:s}:{1:d} > {2:s}:{3:d}'.format(
-          source_ip_address, udp.sport, destination_ip_address, udp.dport)
+    # Re-insert the stream to mark it as the most recently used.
+    streams[stream_key] = stream_object
 
-      if stream_key in connections:
-        connections[stream_key].AddPacket(packet_values, udp)
-      else:
-        connections[stream_key] = Stream(
-            packet_values, udp, source_ip_address, destination_ip_address,
-            'UDP')
-
-    elif ip_packet.p == dpkt.ip.IP_PROTO_ICMP:
-      # Later versions of dpkt seem to return a string instead of
-      # an ICMP object.
-      if isinstance(ip_packet.data, str):
-        icmp = dpkt.icmp.ICMP(ip_packet.data)
-      else:
-        icmp = ip_packet.data
+    if len(streams) > self._maximum_number_of_streams:
+      _, evicted_stream_object = streams.popitem(last=False)
+      self._ProduceStreamEvents(parser_mediator, evicted_stream_object)
+
+    return stream_object
 
-      stream_key = 'icmp: {0:d} {1:s} > {2:s}'.format(
-          timestamp, source_ip_address, destination_ip_address)
+  def _ParseIPPacket(
+      self, parser_mediator, streams, packet_number, timestamp, packet_data,
+      ip_offset):
+    """Parses an IP packet.
 
-      if stream_key in connections:
-        connections[stream_key].AddPacket(packet_values, icmp)
-      else:
-        connections[stream_key] = Stream(
-            packet_values, icmp, source_ip_address, destination_ip_address,
-            'ICMP')
+    Args:
+      parser_mediator: A parser mediator object (instance of ParserMediator).
+      streams: An ordered dictionary of the tracked streams, with the least
+               recently used stream first.
+      packet_number: The PCAP packet number, where 1 is the first packet.
+      timestamp: The PCAP packet timestamp.
+      packet_data: The packet data, which contains an Ethernet frame.
+      ip_offset: The offset of the IP packet in the packet data.
+    """
+    if len(packet_data) < ip_offset + self._IPV4_HEADER.size:
+      return
+
+    (version_and_header_size, total_length, ip_protocol, source_ip_address,
+     destination_ip_address) = self._IPV4_HEADER.unpack_from(
+         packet_data, ip_offset)
+
+    # The packet data can contain padding after the IP packet.
+    packet_end = len(packet_data)
+    if total_length:
+      packet_end = min(packet_end, ip_offset + total_length)
+
+    data_offset = ip_offset + ((version_and_header_size & 0x0f) * 4)
+    data_size = packet_end - data_offset
+
+    if ip_protocol == dpkt.ip.IP_PROTO_TCP:
+      if data_size < self._TCP_HEADER.size:
+        self._ProduceTruncatedPacketEvents(
+            parser_mediator, packet_number, timestamp, packet_end,
+            source_ip_address, destination_ip_address)
+        return
+
+      source_port, destination_port, tcp_header_size = (
+          self._TCP_HEADER.unpack_from(packet_data, data_offset))
+
+      tcp_header_size = (tcp_header_size >> 4) * 4
+      if tcp_header_size < self._TCP_HEADER.size:
+        self._ProduceTruncatedPacketEvents(
+            parser_mediator, packet_number, timestamp, packet_end,
+            source_ip_address, destination_ip_address)
+        return
+
+      stream_key = (
+          'TCP', source_ip_address, source_port, destination_ip_address,
+          destination_port)
+      stream_object = self._GetStream(
+          parser_mediator, streams, stream_key, packet_number, timestamp,
+          packet_end, source_ip_address, destination_ip_address, 'TCP',
+          source_port=source_port, destination_port=destination_port)
+
+      data_offset += tcp_header_size
+
+    elif ip_protocol == dpkt.ip.IP_PROTO_UDP:
+      if data_size < self._UDP_HEADER.size:
+        self._ProduceTruncatedPacketEvents(
+            parser_mediator, packet_number, timestamp, packet_end,
+            source_ip_address, destination_ip_address)
+        return
+
+      source_port, destination_port, udp_length = (
+          self._UDP_HEADER.unpack_from(packet_data, data_offset))
+
+      stream_key = (
+          'UDP', source_ip_address, source_port, destination_ip_address,
+          destination_port)
+      stream_object = self._GetStream(
+          parser_mediator, streams, stream_key, packet_number, timestamp,
+          packet_end, source_ip_address, destination_ip_address, 'UDP',
+          source_port=source_port, destination_port=destination_port)
+
+      if udp_length != data_size:
+        stream_object.has_truncated_packets = True
+
+      data_offset += self._UDP_HEADER.size
+
+    elif ip_protocol == dpkt.ip.IP_PROTO_ICMP:
+      if data_size < self._ICMP_HEADER.size:
+        self._ProduceTruncatedPacketEvents(
+            parser_mediator, packet_number, timestamp, packet_end,
+            source_ip_address, destination_ip_address)
+        return
+
+      stream_key = (
+          'ICMP', timestamp, source_ip_address, destination_ip_address)
+      stream_object = self._GetStream(
+          parser_mediator, streams, stream_key, packet_number, timestamp,
+          packet_end, source_ip_address, destination_ip_address, 'ICMP')
+
+      if stream_object.icmp_type is None:
+        stream_object.icmp_type, stream_object.icmp_code = (
+            self._ICMP_HEADER.unpack_from(packet_data, data_offset))
+
+      # The ICMP stream data is not used.
+      return
+
+    else:
+      return
+
+    if (data_offset < packet_end and
+        stream_object.stream_data_size < Stream.MAXIMUM_STREAM_DATA_SIZE):
+      stream_object.AddStreamData(packet_data[data_offset:packet_end])
 
-  def _ParseOtherPacket(self, packet_values):
+  def _ParseOtherPacket(
+      self, packet_number, timestamp, packet_data, ethernet_type,
+      data_offset):
     """Parses a non-IP packet.
 
     Args:
-      packet_values: list of packet values
+      packet_number: The PCAP packet number, where 1 is the first packet.
+      timestamp: The PCAP packet timestamp.
+      packet_data: The packet data, which contains an Ethernet frame.
+      ethernet_type: The Ethernet type of the packet.
+      data_offset: The offset of the Ethernet payload in the packet data.
 
     Returns:
       A stream object (instance of Stream) or None if the packet data
       is not supported.
     """
-    ether = packet_values[2]
-    stream_object = None
-
-    if ether.type == dpkt.ethernet.ETH_TYPE_ARP:
-      arp = ether.data
-      arp_data = []
-      stream_object = Stream(
-          packet_values, arp, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'ARP')
-
-      if arp.op == dpkt.arp.ARP_OP_REQUEST:
-        arp_data.append('arp request: target IP = ')
-        arp_data.append(socket.inet_ntoa(arp.tpa))
-        stream_object.protocol_data = u' '.join(arp_data)
-
-      elif arp.op == dpkt.arp.ARP_OP_REPLY:
-        arp_data.append('arp reply: target IP = ')
-        arp_data.append(socket.inet_ntoa(arp.tpa))
-        arp_data.append(' target MAC = ')
-        arp_data.append(binascii.hexlify(arp.tha))
-        stream_object.protocol_data = u' '.join(arp_data)
-
-      elif arp.op == dpkt.arp.ARP_OP_REVREQUEST:
-        arp_data.append('arp protocol address request: target IP = ')
-        arp_data.append(socket.inet_ntoa(arp.tpa))
-        stream_object.protocol_data = u' '.join(arp_data)
-
-      elif arp.op == dpkt.arp.ARP_OP_REVREPLY:
-        arp_data.append('arp protocol address reply: target IP = ')
-        arp_data.append(socket.inet_ntoa(arp.tpa))
-        arp_data.append(' target MAC = ')
-        arp_data.append(binascii.hexlify(arp.tha))
-        stream_object.protocol_data = u' '.join(arp_data)
-
-    elif ether.type == dpkt.ethernet.ETH_TYPE_IP6:
-      ip6 = ether.data
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ip6.src),
-          binascii.hexlify(ip6.dst), 'IPv6')
-      stream_object.protocol_data = 'IPv6'
-
-    elif ether.type == dpkt.ethernet.ETH_TYPE_CDP:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'CDP')
-      stream_object.protocol_data = 'CDP'
+    destination_mac_address, source_mac_address, _ = (
+        self._ETHERNET_HEADER.unpack_from(packet_data))
 
-    elif ether.type == dpkt.ethernet.ETH_TYPE_DTP:
+    if ethernet_type == dpkt.ethernet.ETH_TYPE_ARP:
       stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'DTP')
-      stream_object.protocol_data = 'DTP'
+          packet_number, timestamp, len(packet_data),
+          binascii.hexlify(source_mac_address),
+          binascii.hexlify(destination_mac_address), 'ARP')
 
-    elif ether.type == dpkt.ethernet.ETH_TYPE_REVARP:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'RARP')
-      stream_object.protocol_data = 'Reverse ARP'
-
-    elif ether.type == dpkt.ethernet.ETH_TYPE_8021Q:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), '8021Q packet')
-      stream_object.protocol_data = '8021Q packet'
-
-    elif ether.type == dpkt.ethernet.ETH_TYPE_IPX:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'IPX')
-      stream_object.protocol_data = 'IPX'
-
-    elif ether.type == dpkt.ethernet.ETH_TYPE_PPP:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'PPP')
-      stream_object.protocol_data = 'PPP'
+      if len(packet_data) >= data_offset + self._ARP_HEADER.size:
+        (operation, _, _, target_mac_address, target_ip_address) = (
+            self._ARP_HEADER.unpack_from(packet_data, data_offset))
 
-    elif ether.type == dpkt.ethernet.ETH_TYPE_MPLS:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'MPLS')
-      stream_object.protocol_data = 'MPLS'
+        description, has_target_mac_address = self._ARP_OPERATIONS.get(
+            operation, (None, False))
+        if description:
+          arp_data = [description, socket.inet_ntoa(target_ip_address)]
+          if has_target_mac_address:
+            arp_data.append(' target MAC = ')
+            arp_data.append(binascii.hexlify(target_mac_address))
+          stream_object.protocol_data = u' '.join(arp_data)
 
-    elif ether.type == dpkt.ethernet.ETH_TYPE_MPLS_MCAST:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'MPLS')
-      stream_object.protocol_data = 'MPLS MCAST'
+      return stream_object
 
-    elif ether.type == dpkt.ethernet.ETH_TYPE_PPPoE_DISC:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'PPOE')
-      stream_object.protocol_data = 'PPoE Disc packet'
+    if ethernet_type == dpkt.ethernet.ETH_TYPE_IP6:
+      if len(packet_data) < data_offset + self._IPV6_HEADER.size:
+        return
 
-    elif ether.type == dpkt.ethernet.ETH_TYPE_PPPoE:
-      stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), 'PPPoE')
-      stream_object.protocol_data = 'PPPoE'
+      source_ip_address, destination_ip_address = (
+          self._IPV6_HEADER.unpack_from(packet_data, data_offset))
 
-    elif str(hex(ether.type)) == '0x2452':
       stream_object = Stream(
-          packet_values, ether.data, binascii.hexlify(ether.src),
-          binascii.hexlify(ether.dst), '802.11')
-      stream_object.protocol_data = '802.11'
-
+          packet_number, timestamp, len(packet_data),
+          binascii.hexlify(source_ip_address),
+          binascii.hexlify(destination_ip_address), 'IPv6')
+      stream_object.protocol_data = 'IPv6'
+      return stream_object
+
+    protocol, protocol_data = self._OTHER_ETHERNET_TYPES.get(
+        ethernet_type, (None, None))
+    if not protocol:
+      return
+
+    stream_object = Stream(
+        packet_number, timestamp, len(packet_data),
+        binascii.hexlify(source_mac_address),
+        binascii.hexlify(destination_mac_address), protocol)
+    stream_object.protocol_data = protocol_data
     return stream_object
 
-  def _ParseOtherStreams(self, other_list, trunc_list):
-    """Process PCAP packets that are not IP packets.
-
-    For all packets that were not IP packets, create stream containers
-    depending on the type of packet.
+  def _ProduceStreamEvents(self, parser_mediator, stream_object):
+    """Produces the event objects of a stream.
 
     Args:
-      other_list: List of non-ip packets.
-      trunc_list: A list of packets that truncated strangely and could
-                  not be turned into a stream.
+      parser_mediator: A parser mediator object (instance of ParserMediator).
+      stream_object: The stream object (instance of Stream).
+    """
+    event_objects = [
+        PcapEvent(
+            stream_object.start_time, eventdata.EventTimestamp.START_TIME,
+            stream_object),
+        PcapEvent(
+            stream_object.end_time, eventdata.EventTimestamp.END_TIME,
+            stream_object)]
+    parser_mediator.ProduceEvents(event_objects)
+
+  def _ProduceTruncatedPacketEvents(
+      self, parser_mediator, packet_number, timestamp, size,
+      source_ip_address, destination_ip_address):
+    """Produces the event objects of an IP packet that is truncated.
 
-    Returns:
-      A list of stream objects (instances of Stream).
+    Args:
+      parser_mediator: A parser mediator object (instance of ParserMediator).
+      packet_number: The PCAP packet number, where 1 is the first packet.
+      timestamp: The PCAP packet timestamp.
+      size: The packet size.
+      source_ip_address: The packed source IP address.
+      destination_ip_address: The packed destination IP address.
     """
-    other_streams = []
+    stream_object = Stream(
+        packet_number, timestamp, size, socket.inet_ntoa(source_ip_address),
+        socket.inet_ntoa(destination_ip_address), 'BAD')
+    stream_object.protocol_data = 'Bad truncated IP packet'
+    self._ProduceStreamEvents(parser_mediator, stream_object)
 
-    for packet_values in other_list:
-      stream_object = self._ParseOtherPacket(packet_values)
-      if stream_object:
-        other_streams.append(stream_object)
+  def _ReadPackets(self, parser_mediator, file_object, packet_header_struct):
+    """Reads the packets from a PCAP file-like object.
 
-    for packet_values in trunc_list:
-      ip_packet = packet_values[2]
+    The file-like object is read in large blocks, since reading the header
+    and data of every packet separately is slow.
 
-      source_ip_address = socket.inet_ntoa(ip_packet.src)
-      destination_ip_address = socket.inet_ntoa(ip_packet.dst)
-      stream_object = Stream(
-          packet_values, ip_packet.data, source_ip_address,
-          destination_ip_address, 'BAD')
-      stream_object.protocolData = 'Bad truncated IP packet'
-      other_streams.append(stream_object)
+    Args:
+      parser_mediator: A parser mediator object (instance of ParserMediator).
+      file_object: A file-like object.
+      packet_header_struct: The packet header structure (instance of
+                            struct.Struct).
+
+    Yields:
+      A tuple of the PCAP packet number, where 1 is the first packet,
+      the PCAP packet timestamp and the packet data.
+    """
+    buffer_data = ''
+    buffer_offset = 0
+    packet_number = 1
 
-    return other_streams
+    while True:
+      if len(buffer_data) - buffer_offset < packet_header_struct.size:
+        buffer_data = buffer_data[buffer_offset:] + file_object.read(
+            self._READ_BUFFER_SIZE)
+        buffer_offset = 0
+
+        if not buffer_data:
+          break
+
+        if len(buffer_data) < packet_header_struct.size:
+          parser_mediator.ProduceParseError(
+              u'truncated packet header of packet: {0:d}'.format(
+                  packet_number))
+          break
+
+      timestamp_seconds, timestamp_microseconds, packet_data_size = (
+          packet_header_struct.unpack_from(buffer_data, buffer_offset))
+      buffer_offset += packet_header_struct.size
+
+      packet_end = buffer_offset + packet_data_size
+      if packet_end > len(buffer_data):
+        buffer_data = buffer_data[buffer_offset:] + file_object.read(
+            max(self._READ_BUFFER_SIZE, packet_data_size))
+        buffer_offset = 0
+        packet_end = packet_data_size
+
+        if packet_end > len(buffer_data):
+          parser_mediator.ProduceParseError(
+              u'truncated packet data of packet: {0:d}'.format(packet_number))
+          break
+
+      timestamp = timestamp_seconds + (timestamp_microseconds / 1000000.0)
+      yield packet_number, timestamp, buffer_data[buffer_offset:packet_end]
+
+      buffer_offset = packet_end
+      packet_number += 1
 
   def ParseFileObject(self, parser_mediator, file_object, **kwargs):
     """Parses a PCAP file-like object.
@@ -719,83 +982,63 @@ class PcapParser(interface.SingleFileBaseParser):
     Raises:
       UnableToParseFile: when the file cannot be parsed.
     """
-    data = file_object.read(dpkt.pcap.FileHdr.__hdr_len__)
-
-    try:
-      file_header = dpkt.pcap.FileHdr(data)
-      packet_header_class = dpkt.pcap.PktHdr
-
-    except (dpkt.NeedData, dpkt.UnpackError) as exception:
+    data = file_object.read(self._FILE_HEADER_MAGIC.size)
+    if len(data) < self._FILE_HEADER_MAGIC.size:
       raise errors.UnableToParseFile(
           u'[{0:s}] unable to parse file: {1:s} with error: {2:s}'.format(
-              self.NAME, parser_mediator.GetDisplayName(), exception))
+              self.NAME, parser_mediator.GetDisplayName(),
+              u'file header too small'))
+
+    magic, = self._FILE_HEADER_MAGIC.unpack(data)
+    if magic == dpkt.pcap.PMUDPCT_MAGIC:
+      packet_header_struct = self._PACKET_HEADER_LITTLE_ENDIAN
+    elif magic == dpkt.pcap.TCPDUMP_MAGIC:
+      packet_header_struct = self._PACKET_HEADER
+    else:
+      raise errors.UnableToParseFile(u'Unsupported file signature')
 
-    if file_header.magic == dpkt.pcap.PMUDPCT_MAGIC:
-      try:
-        file_header = dpkt.pcap.LEFileHdr(data)
-        packet_header_class = dpkt.pcap.LEPktHdr
+    # The streams are kept in least recently used order.
+    streams = collections.OrderedDict()
 
-      except (dpkt.NeedData, dpkt.UnpackError) as exception:
-        raise errors.UnableToParseFile(
-            u'[{0:s}] unable to parse file: {1:s} with error: {2:s}'.format(
-                self.NAME, parser_mediator.GetDisplayName(), exception))
+    for packet_number, timestamp, packet_data in self._ReadPackets(
+        parser_mediator, file_object, packet_header_struct):
+      self._FlushIdleStreams(parser_mediator, streams, timestamp)
 
-    elif file_header.magic != dpkt.pcap.TCPDUMP_MAGIC:
-      raise errors.UnableToParseFile(u'Unsupported file signature')
+      if len(packet_data) < self._ETHERNET_HEADER.size:
+        continue
 
-    packet_number = 1
-    connections = {}
-    other_list = []
-    trunc_list = []
+      _, _, ethernet_type = self._ETHERNET_HEADER.unpack_from(packet_data)
+      data_offset = self._ETHERNET_HEADER.size
 
-    data = file_object.read(dpkt.pcap.PktHdr.__hdr_len__)
-    while data:
-      packet_header = packet_header_class(data)
-      timestamp = packet_header.tv_sec + (packet_header.tv_usec / 1000000.0)
-      packet_data = file_object.read(packet_header.caplen)
+      # An IEEE 802.3 frame contains the size of the data instead of
+      # the Ethernet type, the Ethernet type of a SNAP frame is stored
+      # in the SNAP header, which precedes the payload.
+      if ethernet_type <= 1500:
+        llc_header = packet_data[data_offset:data_offset + 2]
 
-      ethernet_frame = dpkt.ethernet.Ethernet(packet_data)
+        if llc_header == '\xaa\xaa' and len(packet_data) >= (
+            data_offset + self._SNAP_HEADER.size):
+          ethernet_type, = self._SNAP_HEADER.unpack_from(
+              packet_data, data_offset)
+          data_offset += self._SNAP_HEADER.size
+        elif llc_header == '\xff\xff':
+          ethernet_type = dpkt.ethernet.ETH_TYPE_IPX
 
-      if ethernet_frame.type == dpkt.ethernet.ETH_TYPE_IP:
+      if ethernet_type == dpkt.ethernet.ETH_TYPE_IP:
         self._ParseIPPacket(
-            connections, trunc_list, packet_number, timestamp,
-            len(ethernet_frame), ethernet_frame.data)
+            parser_mediator, streams, packet_number, timestamp, packet_data,
+            data_offset)
 
       else:
-        packet_values = [
-            timestamp, packet_number, ethernet_frame, len(ethernet_frame)]
-        other_list.append(packet_values)
-
-      packet_number += 1
-      data = file_object.read(dpkt.pcap.PktHdr.__hdr_len__)
-
-    other_streams = self._ParseOtherStreams(other_list, trunc_list)
+        # The non-IP packets are not grouped into streams.
+        stream_object = self._ParseOtherPacket(
+            packet_number, timestamp, packet_data, ethernet_type, data_offset)
+        if stream_object:
+          self._ProduceStreamEvents(parser_mediator, stream_object)
 
     for stream_object in sorted(
-        connections.values(), key=operator.attrgetter('start_time')):
-
-      if not stream_object.protocol == 'ICMP':
-        stream_object.Clean()
-
-      event_objects = [
-          PcapEvent(
-              min(stream_object.timestamps),
-              eventdata.EventTimestamp.START_TIME, stream_object),
-          PcapEvent(
-              max(stream_object.timestamps),
-              eventdata.EventTimestamp.END_TIME, stream_object)]
-
-      parser_mediator.ProduceEvents(event_objects)
-
-    for stream_object in other_streams:
-      event_objects = [
-          PcapEvent(
-              min(stream_object.timestamps),
-              eventdata.EventTimestamp.START_TIME, stream_object),
-          PcapEvent(
-              max(stream_object.timestamps),
-              eventdata.EventTimestamp.END_TIME, stream_object)]
-      parser_mediator.ProduceEvents(event_objects)
+        streams.itervalues(), key=operator.attrgetter('start_time')):
+      self._ProduceStreamEvents(parser_mediator, stream_object)
 
 
 manager.ParsersManager.RegisterParser(PcapParser)
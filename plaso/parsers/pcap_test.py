@@ -2,6 +2,10 @@
 # -*- coding: utf-8 -*-
 """Tests for the PCAP parser."""
 
+import os
+import shutil
+import struct
+import tempfile
 import unittest
 
 # pylint: disable=unused-import
@@ -10,6 +14,28 @@ from plaso.parsers import pcap
 from plaso.parsers import test_lib
 
 
+class StreamTest(unittest.TestCase):
+  """Tests for the stream object."""
+
+  def testSpecialTypesHTTPResponse(self):
+    """Tests the SpecialTypes function with a truncated HTTP response."""
+    stream_object = pcap.Stream(
+        1, 1374174709.003641, 1514, u'63.245.217.43', u'192.168.195.130',
+        'TCP', source_port=80, dest_port=1038)
+    stream_object.AddStreamData(
+        'HTTP/1.1 200 OK\r\nContent-Length: 100000\r\n\r\n')
+    stream_object.AddStreamData('A' * 100000)
+
+    self.assertEqual(
+        stream_object.stream_data_size, pcap.Stream.MAXIMUM_STREAM_DATA_SIZE)
+
+    expected_protocol_data = (
+        u'HTTP Response: status:  200  reason:  OK  version:  1.1')
+    self.assertEqual(
+        stream_object.SpecialTypes(),
+        ('HTTP Response', expected_protocol_data))
+
+
 class PcapParserTest(test_lib.ParserTestCase):
   """Tests for the PCAP parser."""
 
@@ -27,11 +53,12 @@ class PcapParserTest(test_lib.ParserTestCase):
     #    Number of streams: 96 (TCP: 47, UDP: 39, ICMP: 0, Other: 10)
     #
     # For each stream 2 event objects are generated one for the start
-    # and one for the end time.
+    # and one for the end time. The event objects of the other streams,
+    # which consist of a single packet, are generated first.
 
     self.assertEqual(len(event_objects), 192)
 
-    # Test stream 3 (event object 6).
+    # Test stream 3 (event object 26).
     #    Protocol:        TCP
     #    Source IP:       192.168.195.130
     #    Dest IP:         63.245.217.43
@@ -41,7 +68,7 @@ class PcapParserTest(test_lib.ParserTestCase):
     #    Starting Packet: 4
     #    Ending Packet:   6
 
-    event_object = event_objects[6]
+    event_object = event_objects[26]
     self.assertEqual(event_object.packet_count, 3)
     self.assertEqual(event_object.protocol, u'TCP')
     self.assertEqual(event_object.source_ip, u'192.168.195.130')
@@ -52,7 +79,7 @@ class PcapParserTest(test_lib.ParserTestCase):
     self.assertEqual(event_object.first_packet_id, 4)
     self.assertEqual(event_object.last_packet_id, 6)
 
-    # Test stream 6 (event object 12).
+    # Test stream 6 (event object 32).
     #    Protocol:        UDP
     #    Source IP:       192.168.195.130
     #    Dest IP:         192.168.195.2
@@ -63,7 +90,7 @@ class PcapParserTest(test_lib.ParserTestCase):
     #    Ending Packet:   6
     #    Protocol Data:   DNS Query for  wpad.localdomain
 
-    event_object = event_objects[12]
+    event_object = event_objects[32]
     self.assertEqual(event_object.packet_count, 5)
     self.assertEqual(event_object.protocol, u'UDP')
     self.assertEqual(event_object.source_ip, u'192.168.195.130')
@@ -97,6 +124,63 @@ class PcapParserTest(test_lib.ParserTestCase):
 
     self._TestGetMessageStrings(event_object, expected_msg, expected_msg_short)
 
+  def testParseWithMaximumNumberOfStreams(self):
+    """Tests the Parse function with a maximum number of tracked streams."""
+    parser_object = pcap.PcapParser(maximum_number_of_streams=4)
+    test_file = self._GetTestFilePath(['test.pcap'])
+    event_queue_consumer = self._ParseFile(parser_object, test_file)
+    event_objects = self._GetEventObjectsFromQueue(event_queue_consumer)
+
+    # Streams that are evicted from the tracked streams are completed,
+    # hence streams are split when they receive more packets afterwards.
+    self.assertEqual(len(event_objects), 322)
+
+    # The packets of a stream are counted in both its event objects.
+    number_of_packets = sum(
+        event_object.packet_count for event_object in event_objects)
+    self.assertEqual(number_of_packets, 2 * 1434)
+
+  def testParseSNAPFrame(self):
+    """Tests the Parse function with an IP packet in a SNAP frame."""
+    udp_data = b'\x00' * 12
+    ip_packet = struct.pack(
+        '>BBHHHBBH4s4s', 0x45, 0, 20 + 8 + len(udp_data), 1, 0, 64, 17, 0,
+        b'\xc0\xa8\xc3\x82', b'\xc0\xa8\xc3\x02')
+    ip_packet += struct.pack('>HHHH', 55679, 53, 8 + len(udp_data), 0)
+    ip_packet += udp_data
+
+    snap_header = b'\xaa\xaa\x03\x00\x00\x00\x08\x00'
+    frame = b''.join([
+        b'\x00\x0c\x29\x00\x00\x01', b'\x00\x0c\x29\x00\x00\x02',
+        struct.pack('>H', len(snap_header) + len(ip_packet)), snap_header,
+        ip_packet])
+
+    pcap_data = struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)
+    pcap_data += struct.pack('<IIII', 1374174706, 0, len(frame), len(frame))
+    pcap_data += frame
+
+    temporary_directory = tempfile.mkdtemp()
+    try:
+      test_file = os.path.join(temporary_directory, u'snap.pcap')
+      with open(test_file, 'wb') as file_object:
+        file_object.write(pcap_data)
+
+      event_queue_consumer = self._ParseFile(self._parser, test_file)
+      event_objects = self._GetEventObjectsFromQueue(event_queue_consumer)
+
+    finally:
+      shutil.rmtree(temporary_directory, True)
+
+    self.assertEqual(len(event_objects), 2)
+
+    event_object = event_objects[0]
+    self.assertEqual(event_object.protocol, u'UDP')
+    self.assertEqual(event_object.source_ip, u'192.168.195.130')
+    self.assertEqual(event_object.dest_ip, u'192.168.195.2')
+    self.assertEqual(event_object.source_port, 55679)
+    self.assertEqual(event_object.dest_port, 53)
+    self.assertEqual(event_object.size, len(frame))
+
 
 if __name__ == '__main__':
   unittest.main()
@@ -78,12 +78,15 @@ class BasePlugin(object):
     This convenience method updates the parser chain object held by the
     mediator, transfers control to the plugin-specific Process() method,
     and updates the chain again once the processing is complete. It provides a
-    simpler parser API in most cases.
+    simpler parser API in most cases. The plugin is profiled if the mediator
+    has a parsers profile.
     """
     parser_mediator.AppendToParserChain(self)
+    parser_mediator.StartProfiling()
     try:
       self.Process(parser_mediator, **kwargs)
     finally:
+      parser_mediator.StopProfiling()
       parser_mediator.PopFromParserChain()
 
 
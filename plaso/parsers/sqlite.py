@@ -4,9 +4,12 @@
 import logging
 import os
 import tempfile
+import urllib
 
 import sqlite3
 
+from dfvfs.lib import definitions as dfvfs_definitions
+
 from plaso.lib import errors
 from plaso.parsers import interface
 from plaso.parsers import manager
@@ -71,7 +74,13 @@ class SQLiteCache(plugins.BasePluginCache):
 
 
 class SQLiteDatabase(object):
-  """A simple wrapper for opening up a SQLite database."""
+  """A simple wrapper for opening up a SQLite database.
+
+  A database that is stored on the operating system is opened read-only
+  in place. Other databases, for example those stored in a storage media
+  image, are copied into a temporary file, since SQLite can only open
+  a database that is stored in a file.
+  """
 
   # Magic value for a SQLite database.
   MAGIC = 'SQLite format 3'
@@ -90,6 +99,7 @@ class SQLiteDatabase(object):
     self._open = False
     self._tables = []
     self._temp_file_name = ''
+    self._temp_file_size = 0
 
   def __exit__(self, unused_type, unused_value, unused_traceback):
     """Make usable with "with" statement."""
@@ -115,96 +125,164 @@ class SQLiteDatabase(object):
 
     return self._tables
 
-  def Close(self):
-    """Close the database connection and clean up the temporary file."""
-    if not self._open:
-      return
+  @property
+  def temporary_copy_size(self):
+    """The size of the temporary copy of the database or 0 if none."""
+    return self._temp_file_size
 
-    self._database.close()
+  def _Connect(self, database_name):
+    """Connects to the database and build a list of table names.
 
+    Args:
+      database_name: the name of the database, which is either a path or
+                     an URI.
+
+    Raises:
+      sqlite3.DatabaseError: if the database cannot be read.
+    """
+    database = sqlite3.connect(database_name)
     try:
-      os.remove(self._temp_file_name)
-    except (OSError, IOError) as exception:
-      logging.warning((
-          u'Unable to remove temporary copy: {0:s} of SQLite database: {1:s} '
-          u'with error: {2:s}').format(
-              self._temp_file_name, self._file_entry.name, exception))
+      database.row_factory = sqlite3.Row
+      cursor = database.cursor()
 
-    self._tables = []
-    self._database = None
-    self._temp_file_name = ''
-    self._open = False
+      # Verify the table by reading in all table names and compare it to
+      # the list of required tables.
+      sql_results = cursor.execute(
+          'SELECT name FROM sqlite_master WHERE type="table"')
+      tables = [row[0] for row in sql_results]
 
-  def Open(self):
-    """Opens up a database connection and build a list of table names."""
-    file_object = self._file_entry.GetFileObject()
+    except sqlite3.DatabaseError as exception:
+      database.close()
+      logging.debug(
+          u'Unable to parse SQLite database: {0:s} with error: {1:s}'.format(
+              self._file_entry.name, exception))
+      raise
 
-    # TODO: Remove this when the classifier gets implemented
-    # and used. As of now, there is no check made against the file
-    # to verify its signature, thus all files are sent here, meaning
-    # that this method assumes everything is a SQLite file and starts
-    # copying the content of the file into memory, which is not good
-    # for very large files.
-    file_object.seek(0, os.SEEK_SET)
+    self._cursor = cursor
+    self._database = database
+    self._tables = tables
 
-    data = file_object.read(len(self.MAGIC))
+  def _ConnectInPlace(self):
+    """Connects to a database that is stored on the operating system.
 
-    if data != self.MAGIC:
-      file_object.close()
-      raise IOError(
-          u'File {0:s} not a SQLite database. (invalid signature)'.format(
-              self._file_entry.name))
+    The database is opened read-only and immutable, which prevents SQLite
+    from creating or reading journal files and from locking the database.
+
+    Returns:
+      A boolean value indicating if the database was opened in place.
 
-    # TODO: Current design copies the entire file into a buffer
-    # that is parsed by each SQLite parser. This is not very efficient,
-    # especially when many SQLite parsers are ran against a relatively
-    # large SQLite database. This temporary file that is created should
-    # be usable by all SQLite parsers so the file should only be read
-    # once in memory and then deleted when all SQLite parsers have completed.
+    Raises:
+      sqlite3.DatabaseError: if the database cannot be read.
+    """
+    path_spec = self._file_entry.path_spec
+    if (path_spec.type_indicator != dfvfs_definitions.TYPE_INDICATOR_OS or
+        path_spec.HasParent()):
+      return False
+
+    location = getattr(path_spec, u'location', None)
+    if not location:
+      return False
+
+    if isinstance(location, unicode):
+      location = location.encode(u'utf-8')
+
+    database_uri = u'file:{0:s}?mode=ro&immutable=1'.format(
+        urllib.pathname2url(location))
+
+    # Note that if the SQLite library does not support URI filenames
+    # the database cannot be opened, since the URI is interpreted as
+    # a relative path within the non-existing directory "file:".
+    try:
+      self._Connect(database_uri)
+    except sqlite3.OperationalError:
+      return False
 
+    return True
+
+  def _ConnectToTemporaryCopy(self, file_object):
+    """Connects to a temporary copy of the database.
+
+    Args:
+      file_object: the file-like object of the database.
+
+    Raises:
+      sqlite3.DatabaseError: if the database cannot be read.
+    """
     # TODO: Change this into a proper implementation using APSW
     # and virtual filesystems when that will be available.
     # Info: http://apidoc.apsw.googlecode.com/hg/vfs.html#vfs and
     # http://apidoc.apsw.googlecode.com/hg/example.html#example-vfs
     # Until then, just copy the file into a tempfile and parse it.
 
-    # Note that data is filled here with the file header data and
-    # that with will explicitly close the temporary files and thus
+    # Note that with will explicitly close the temporary files and thus
     # making sure it is available for sqlite3.connect().
+    file_object.seek(0, os.SEEK_SET)
     with tempfile.NamedTemporaryFile(delete=False) as temp_file:
       self._temp_file_name = temp_file.name
+      data = file_object.read(self._READ_BUFFER_SIZE)
       while data:
         temp_file.write(data)
+        self._temp_file_size += len(data)
         data = file_object.read(self._READ_BUFFER_SIZE)
 
-    self._database = sqlite3.connect(self._temp_file_name)
     try:
-      self._database.row_factory = sqlite3.Row
-      self._cursor = self._database.cursor()
-    except sqlite3.DatabaseError as exception:
-      file_object.close()
-      logging.debug(
-          u'Unable to parse SQLite database: {0:s} with error: {1:s}'.format(
-              self._file_entry.name, exception))
+      self._Connect(self._temp_file_name)
+    except sqlite3.DatabaseError:
+      self._RemoveTemporaryCopy()
       raise
 
-    # Verify the table by reading in all table names and compare it to
-    # the list of required tables.
+  def _RemoveTemporaryCopy(self):
+    """Removes the temporary copy of the database if one was made."""
+    if not self._temp_file_name:
+      return
+
     try:
-      sql_results = self._cursor.execute(
-          'SELECT name FROM sqlite_master WHERE type="table"')
-    except sqlite3.DatabaseError as exception:
-      file_object.close()
-      logging.debug(
-          u'Unable to parse SQLite database: {0:s} with error: {1:s}'.format(
-              self._file_entry.name, exception))
-      raise
+      os.remove(self._temp_file_name)
+    except (OSError, IOError) as exception:
+      logging.warning((
+          u'Unable to remove temporary copy: {0:s} of SQLite database: {1:s} '
+          u'with error: {2:s}').format(
+              self._temp_file_name, self._file_entry.name, exception))
 
+    self._temp_file_name = ''
+    self._temp_file_size = 0
+
+  def Close(self):
+    """Close the database connection and clean up the temporary file."""
+    if not self._open:
+      return
+
+    self._database.close()
+    self._RemoveTemporaryCopy()
+
+    self._cursor = None
     self._tables = []
-    for row in sql_results:
-      self._tables.append(row[0])
+    self._database = None
+    self._open = False
+
+  def Open(self):
+    """Opens up a database connection and build a list of table names.
+
+    Raises:
+      IOError: if the file is not a SQLite database.
+      sqlite3.DatabaseError: if the database cannot be read.
+    """
+    file_object = self._file_entry.GetFileObject()
+    try:
+      file_object.seek(0, os.SEEK_SET)
+      data = file_object.read(len(self.MAGIC))
+
+      if data != self.MAGIC:
+        raise IOError(
+            u'File {0:s} not a SQLite database. (invalid signature)'.format(
+                self._file_entry.name))
+
+      if not self._ConnectInPlace():
+        self._ConnectToTemporaryCopy(file_object)
+
+    finally:
+      file_object.close()
 
-    file_object.close()
     self._open = True
 
 
@@ -4,12 +4,63 @@
 
 import unittest
 
+from dfvfs.lib import definitions as dfvfs_definitions
+from dfvfs.path import fake_path_spec
+from dfvfs.resolver import context
+from dfvfs.vfs import fake_file_system
+
 from plaso.parsers import sqlite
 from plaso.parsers import test_lib
 # Register plugins.
 from plaso.parsers import sqlite_plugins  # pylint: disable=unused-import
 
 
+class SQLiteDatabaseTest(test_lib.ParserTestCase):
+  """Tests for the SQLite database object."""
+
+  def testOpenInPlace(self):
+    """Tests the Open function on a database stored on the OS."""
+    file_entry = self._GetTestFileEntryFromPath([u'contacts2.db'])
+
+    with sqlite.SQLiteDatabase(file_entry) as database:
+      database.Open()
+
+      self.assertEqual(database.temporary_copy_size, 0)
+      self.assertTrue(u'calls' in database.tables)
+
+  def testOpenTemporaryCopy(self):
+    """Tests the Open function on a database that needs to be copied."""
+    test_file = self._GetTestFilePath([u'contacts2.db'])
+    with open(test_file, 'rb') as file_object:
+      file_data = file_object.read()
+
+    resolver_context = context.Context()
+    file_system = fake_file_system.FakeFileSystem(resolver_context)
+    file_system.AddFileEntry(
+        u'/', file_entry_type=dfvfs_definitions.FILE_ENTRY_TYPE_DIRECTORY)
+    file_system.AddFileEntry(u'/contacts2.db', file_data=file_data)
+
+    path_spec = fake_path_spec.FakePathSpec(location=u'/contacts2.db')
+    file_entry = file_system.GetFileEntryByPathSpec(path_spec)
+    file_size = len(file_data)
+
+    with sqlite.SQLiteDatabase(file_entry) as database:
+      database.Open()
+
+      self.assertEqual(database.temporary_copy_size, file_size)
+      self.assertTrue(u'calls' in database.tables)
+
+    self.assertEqual(database.temporary_copy_size, 0)
+
+  def testOpenInvalidSignature(self):
+    """Tests the Open function on a file that is not a database."""
+    file_entry = self._GetTestFileEntryFromPath([u'syslog'])
+
+    with self.assertRaises(IOError):
+      with sqlite.SQLiteDatabase(file_entry) as database:
+        database.Open()
+
+
 class SQLiteParserTest(test_lib.ParserTestCase):
   """Tests for the SQLite database parser."""
 
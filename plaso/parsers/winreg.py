@@ -192,6 +192,54 @@ class WinRegistryParser(interface.BasePluginsParser):
     super(WinRegistryParser, self).__init__()
     self._plugins = WinRegistryParser.GetPluginList()
 
+  def _GetPluginObjects(self, parser_mediator, registry_type, registry_cache):
+    """Retrieves the plugin objects for a specific Windows Registry type.
+
+    The key-based plugins that define key paths are indexed by their expanded
+    key paths, so that they are only invoked for the keys that they can
+    process, instead of for every key in the Windows Registry file.
+
+    Args:
+      parser_mediator: A parser mediator object (instance of ParserMediator).
+      registry_type: String containing the Windows Registry type,
+                     e.g. NTUSER, SOFTWARE.
+      registry_cache: A Windows Registry objects cache (instance of
+                      WinRegistryCache).
+
+    Returns:
+      A tuple containing a dictionary of the key-based plugin objects
+      (instances of KeyPlugin) per expanded key path and a list of the other
+      plugin objects (instances of RegistryPlugin) that need to be invoked
+      for every key, sorted by weight.
+    """
+    key_plugins_by_path = {}
+    generic_plugins = []
+    number_of_plugins = 0
+
+    for weight in sorted(self._plugins.GetWeights()):
+      for plugin_class in self._plugins.GetWeightPlugins(weight, registry_type):
+        plugin_object = plugin_class(reg_cache=registry_cache)
+        number_of_plugins += 1
+
+        # Cannot import the interface here otherwise this will create a cyclic
+        # dependency, hence key-based plugins are identified by their key
+        # paths.
+        if not getattr(plugin_object, u'REG_KEYS', None):
+          generic_plugins.append(plugin_object)
+          continue
+
+        plugin_object.ExpandKeys(parser_mediator)
+        for key_path in plugin_object.expanded_keys:
+          key_plugins = key_plugins_by_path.setdefault(key_path, [])
+          if plugin_object not in key_plugins:
+            key_plugins.append(plugin_object)
+
+    logging.debug(
+        u'Number of plugins for this Windows Registry file: {0:d}.'.format(
+            number_of_plugins))
+
+    return key_plugins_by_path, generic_plugins
+
   def _RecurseKey(self, key):
     """A generator that takes a key and yields every subkey of it."""
     # In the case of a Registry file not having a root key we will not be able
@@ -276,37 +324,29 @@ class WinRegistryParser(interface.BasePluginsParser):
     registry_cache = cache.WinRegistryCache()
     registry_cache.BuildCache(winreg_file, registry_type)
 
-    plugins = {}
-    number_of_plugins = 0
-    for weight in self._plugins.GetWeights():
-      plist = self._plugins.GetWeightPlugins(weight, registry_type)
-      plugins[weight] = []
-      for plugin in plist:
-        plugins[weight].append(plugin(reg_cache=registry_cache))
-        number_of_plugins += 1
-
-    logging.debug(
-        u'Number of plugins for this Windows Registry file: {0:d}.'.format(
-            number_of_plugins))
+    key_plugins_by_path, generic_plugins = self._GetPluginObjects(
+        parser_mediator, registry_type, registry_cache)
 
     # Recurse through keys in the file and apply the plugins in the order:
-    # 1. file type specific key-based plugins.
-    # 2. generic key-based plugins.
-    # 3. file type specific value-based plugins.
-    # 4. generic value-based plugins.
+    # 1. file type specific and generic key-based plugins that match the
+    #    key path.
+    # 2. file type specific and generic plugins that are not bound to
+    #    a key path, such as the value-based plugins, by weight.
     root_key = winreg_file.GetKeyByPath(u'\\')
 
     for key in self._RecurseKey(root_key):
-      for weight in plugins.iterkeys():
-        # TODO: determine if the plugin matches the key and continue
-        # to the next key.
-        for plugin in plugins[weight]:
-          if parser_mediator.abort:
-            break
-          plugin.UpdateChainAndProcess(
-              parser_mediator, key=key, registry_type=self._registry_type,
-              codepage=parser_mediator.codepage)
+      if parser_mediator.abort:
+        break
+
+      for plugin in key_plugins_by_path.get(key.path, []):
+        plugin.UpdateChainAndProcess(
+            parser_mediator, key=key, registry_type=self._registry_type,
+            codepage=parser_mediator.codepage)
 
+      for plugin in generic_plugins:
+        plugin.UpdateChainAndProcess(
+            parser_mediator, key=key, registry_type=self._registry_type,
+            codepage=parser_mediator.codepage)
 
     winreg_file.Close()
 
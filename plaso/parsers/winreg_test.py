@@ -4,8 +4,10 @@
 
 import unittest
 
+from plaso.engine import single_process
 from plaso.parsers import test_lib
 from plaso.parsers import winreg
+from plaso.winreg import cache
 
 
 class WinRegTest(test_lib.ParserTestCase):
@@ -34,6 +36,36 @@ class WinRegTest(test_lib.ParserTestCase):
     """Generate the correct parser chain for a given plugin."""
     return 'winreg/{0:s}'.format(plugin_name)
 
+  def testGetPluginObjects(self):
+    """Tests the _GetPluginObjects function."""
+    event_queue = single_process.SingleProcessQueue()
+    parse_error_queue = single_process.SingleProcessQueue()
+    parser_mediator = self._GetParserMediator(event_queue, parse_error_queue)
+
+    registry_cache = cache.WinRegistryCache()
+
+    # pylint: disable=protected-access
+    key_plugins_by_path, generic_plugins = self._parser._GetPluginObjects(
+        parser_mediator, u'NTUSER', registry_cache)
+
+    key_path = (
+        u'\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer'
+        u'\\UserAssist\\{FA99DFC7-6AC2-453A-A5E2-5E2AFF4507BD}')
+    plugin_names = [
+        plugin.NAME for plugin in key_plugins_by_path.get(key_path, [])]
+    self.assertEqual(plugin_names, [u'winreg_userassist'])
+
+    # The plugins of other Windows Registry types are not used.
+    plugin_names = [plugin.NAME for plugin in generic_plugins]
+    self.assertTrue(u'winreg_default' in plugin_names)
+    self.assertFalse(u'winreg_services' in plugin_names)
+
+    # The generic plugins are sorted by weight and do not contain plugins
+    # that are indexed by key path.
+    weights = [plugin.WEIGHT for plugin in generic_plugins]
+    self.assertEqual(weights, sorted(weights))
+    self.assertFalse(u'winreg_userassist' in plugin_names)
+
   def testNtuserParsing(self):
     """Parse a NTUSER.dat file and check few items."""
     knowledge_base_values = {'current_control_set': u'ControlSet001'}
@@ -2,6 +2,7 @@
 """The protobuf serializer object implementation."""
 
 import logging
+import uuid
 
 from dfvfs.serializer import protobuf_serializer as dfvfs_protobuf_serializer
 from google.protobuf import message
@@ -503,6 +504,173 @@ class ProtobufEventObjectSerializer(interface.EventObjectSerializer):
       logging.error(u'Unable to serialize event object.')
 
 
+class ProtobufLazyEventObject(event.EventObject):
+  """Class that defines a lazily decoded event object.
+
+  The attributes that are expensive to decode, such as the path
+  specification, the event tag and dict and list values, are decoded from
+  the protobuf when they are first accessed. The other attributes are
+  decoded when the event object is created.
+  """
+
+  def __init__(self):
+    """Initializes the lazily decoded event object."""
+    # The parent class is not initialized since that generates an UUID,
+    # which is read from the protobuf instead.
+    # pylint: disable=super-init-not-called
+    self._lazy_attributes = {}
+
+  def __getattr__(self, name):
+    """Retrieves an attribute that has not yet been decoded.
+
+    This method is only called when the attribute is not set.
+
+    Args:
+      name: the name of the attribute.
+
+    Returns:
+      The decoded attribute value.
+
+    Raises:
+      AttributeError: if the attribute is not defined.
+    """
+    # The lazy attributes are not available during unpickling, hence
+    # self.__dict__ is used to prevent recursion.
+    lazy_attributes = self.__dict__.get('_lazy_attributes', None)
+    if not lazy_attributes or name not in lazy_attributes:
+      raise AttributeError(
+          u'Event object has no attribute: {0:s}'.format(name))
+
+    read_function, proto_value = lazy_attributes.pop(name)
+    attribute_value = read_function(proto_value)
+    self.__dict__[name] = attribute_value
+    return attribute_value
+
+  def __getstate__(self):
+    """Retrieves the state of the event object for pickling.
+
+    All the attributes are decoded since the protobuf is not pickled.
+
+    Returns:
+      A dictionary containing the attributes.
+    """
+    return self.GetValues()
+
+  def __setstate__(self, state):
+    """Sets the state of the event object after unpickling.
+
+    Args:
+      state: a dictionary containing the attributes.
+    """
+    self.__dict__.update(state)
+    self._lazy_attributes = {}
+
+  def AddLazyAttribute(self, name, read_function, proto_value):
+    """Adds an attribute that is decoded when it is first accessed.
+
+    Args:
+      name: the name of the attribute.
+      read_function: the function that decodes the protobuf value.
+      proto_value: the protobuf value.
+    """
+    self._lazy_attributes[name] = (read_function, proto_value)
+
+  def GetAttributes(self):
+    """Return a list of all defined attributes."""
+    attributes = set(self.__dict__.keys())
+    attributes.discard('_lazy_attributes')
+    attributes.update(self._lazy_attributes.iterkeys())
+    return attributes
+
+
+class ProtobufLazyEventObjectSerializer(ProtobufEventObjectSerializer):
+  """Class that implements the protobuf lazy event object serializer.
+
+  The serializer reads event objects that decode attributes that are
+  expensive to decode only when they are accessed. This is useful when only
+  a small number of the attributes of most event objects is needed,
+  for example to sort and filter event objects.
+  """
+
+  @classmethod
+  def _ReadSerializedAttributeValue(cls, proto_attribute):
+    """Reads the value of an event attribute from serialized form.
+
+    Args:
+      proto_attribute: a protobuf attribute object containing the serialized
+                       form.
+
+    Returns:
+      The attribute value.
+    """
+    _, attribute_value = (
+        ProtobufEventAttributeSerializer.ReadSerializedObject(proto_attribute))
+    return attribute_value
+
+  @classmethod
+  def ReadSerializedObject(cls, proto):
+    """Reads an event object from serialized form.
+
+    Args:
+      proto: a protobuf object containing the serialized form (instance of
+             plaso_storage_pb2.EventObject).
+
+    Returns:
+      An event object (instance of ProtobufLazyEventObject).
+    """
+    event_object = ProtobufLazyEventObject()
+    event_object.data_type = proto.data_type
+
+    for proto_attribute, value in proto.ListFields():
+      if proto_attribute.name == 'source_short':
+        event_object.source_short = cls._SOURCE_SHORT_FROM_PROTO_MAP[value]
+
+      elif proto_attribute.name == 'pathspec':
+        event_object.AddLazyAttribute(
+            'pathspec', cls._path_spec_serializer.ReadSerialized, value)
+
+      elif proto_attribute.name == 'tag':
+        event_object.AddLazyAttribute(
+            'tag', ProtobufEventTagSerializer.ReadSerializedObject, value)
+
+      elif proto_attribute.name == 'attributes':
+        continue
+
+      elif isinstance(value, message.Message):
+        if value.DESCRIPTOR.full_name.endswith('.Dict'):
+          event_object.AddLazyAttribute(
+              proto_attribute.name,
+              ProtobufEventAttributeSerializer.ReadSerializedDictObject, value)
+        elif value.DESCRIPTOR.full_name.endswith('.Array'):
+          event_object.AddLazyAttribute(
+              proto_attribute.name,
+              ProtobufEventAttributeSerializer.ReadSerializedListObject, value)
+        else:
+          value = ProtobufEventAttributeSerializer.ReadSerializedObject(value)
+          setattr(event_object, proto_attribute.name, value)
+
+      else:
+        setattr(event_object, proto_attribute.name, value)
+
+    # The plaso_storage_pb2.EventObject protobuf contains a field named
+    # attributes which technically not a Dict but behaves similar.
+    for proto_attribute in proto.attributes:
+      if proto_attribute.HasField('dict') or proto_attribute.HasField('array'):
+        event_object.AddLazyAttribute(
+            proto_attribute.key, cls._ReadSerializedAttributeValue,
+            proto_attribute)
+      else:
+        attribute_name, attribute_value = (
+            ProtobufEventAttributeSerializer.ReadSerializedObject(
+                proto_attribute))
+        setattr(event_object, attribute_name, attribute_value)
+
+    if not proto.HasField('uuid'):
+      event_object.uuid = uuid.uuid4().get_hex()
+
+    return event_object
+
+
 class ProtobufEventTagSerializer(interface.EventTagSerializer):
   """Class that implements the protobuf event tag serializer."""
 
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 """Tests for the serializer object implementation using protobuf."""
 
+import pickle
 import unittest
 
 from plaso.lib import event
@@ -131,6 +132,53 @@ class ProtobufEventObjectSerializerTest(unittest.TestCase):
     self.assertFalse(hasattr(event_object, 'null_value'))
 
 
+class ProtobufLazyEventObjectSerializerTest(ProtobufEventObjectSerializerTest):
+  """Tests for the protobuf lazy event object serializer object."""
+
+  def testReadSerialized(self):
+    """Test the read serialized functionality."""
+    serializer = protobuf_serializer.ProtobufLazyEventObjectSerializer
+    event_object = serializer.ReadSerialized(self._proto_string)
+
+    expected_attributes = set([
+        'a_tuple', 'data_type', 'integer', 'my_dict', 'my_list', 'string',
+        'timestamp', 'timestamp_desc', 'unicode_string', 'uuid',
+        'zero_integer'])
+    self.assertEqual(event_object.GetAttributes(), expected_attributes)
+
+    # The dict and list attributes are decoded when accessed.
+    # pylint: disable=protected-access
+    self.assertEqual(
+        sorted(event_object._lazy_attributes.keys()),
+        ['a_tuple', 'my_dict', 'my_list'])
+
+    self.assertEqual(event_object.integer, 34)
+    self.assertEqual(event_object.uuid, '5a78777006de4ddb8d7bbe12ab92ccf8')
+    self.assertEqual(event_object.my_list, ['asf', 4234, 2, 54, 'asf'])
+    self.assertEqual(
+        sorted(event_object._lazy_attributes.keys()), ['a_tuple', 'my_dict'])
+
+    self.assertFalse(hasattr(event_object, 'pathspec'))
+
+    serializer = protobuf_serializer.ProtobufEventObjectSerializer
+    expected_event_object = serializer.ReadSerialized(self._proto_string)
+    self.assertEqual(
+        event_object.GetValues(), expected_event_object.GetValues())
+    self.assertEqual(
+        event_object.EqualityString(), expected_event_object.EqualityString())
+    self.assertEqual(event_object._lazy_attributes, {})
+
+  def testPickle(self):
+    """Test that the event object can be pickled."""
+    serializer = protobuf_serializer.ProtobufLazyEventObjectSerializer
+    event_object = serializer.ReadSerialized(self._proto_string)
+
+    event_object = pickle.loads(pickle.dumps(event_object, protocol=2))
+    self.assertEqual(event_object.my_dict[u'c'], 34)
+    self.assertEqual(len(event_object.a_tuple), 4)
+    self.assertEqual(len(event_object.GetAttributes()), 11)
+
+
 class ProtobufEventTagSerializerTest(unittest.TestCase):
   """Tests for the protobuf event tag serializer object."""
 
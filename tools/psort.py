@@ -117,6 +117,23 @@ def Main(arguments=None):
           u'the result set. The default value is 5]. See --slice or --slicer '
           u'for more details about this option.'))
 
+  tool_group.add_argument(
+      u'--merge_workers', dest=u'merge_workers', type=int, default=0,
+      action=u'store', help=(
+          u'The number of worker processes that read and deserialize the '
+          u'events of the stores ahead of merging them into a sorted '
+          u'timeline. The default is 0, which represents that the stores '
+          u'are read without worker processes.'))
+
+  tool_group.add_argument(
+      u'--workers', dest=u'workers', type=int, default=0, action=u'store',
+      help=(
+          u'The number of worker processes that write the events in batches '
+          u'to be reassembled in order by the output. The default is 0, '
+          u'which represents that the events are written without worker '
+          u'processes. Only supported by output modules that write lines of '
+          u'text, such as dynamic and l2tcsv.'))
+
   tool_group.add_argument(
       u'-v', u'--version', dest=u'version', action=u'version',
       version=u'log2timeline - psort version {0:s}'.format(plaso.GetVersion()),
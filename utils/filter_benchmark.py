@@ -0,0 +1,137 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the event object filter expressions.
+
+The benchmark matches synthetic syslog event objects against a number of
+filter expressions, both by evaluating the filter tree and by using
+the compiled filter, and reports the time it took and whether both
+matched the same event objects.
+"""
+
+import argparse
+import sys
+import time
+
+from plaso.formatters import syslog  # pylint: disable=unused-import
+from plaso.lib import event
+from plaso.lib import pfilter
+from plaso.lib import timelib
+
+
+_QUERIES = [
+    u'pid == 1234',
+    u'reporter is \'client\' and pid > 5000',
+    u'body contains \'failed\' or reporter inset \'sshd cron\'',
+    u'hostname regexp \'^host-1[0-9]$\' and pid < 100',
+    u'message contains \'Connection\' and reporter is \'sshd\'',
+    (u'date > \'2015-01-01 00:00:00\' and date < \'2015-06-01 00:00:00\' '
+     u'and filename contains \'syslog\'')]
+
+_REPORTERS = [u'client', u'cron', u'kernel', u'sshd']
+
+
+def GetEventObjects(number_of_event_objects):
+  """Retrieves synthetic syslog event objects.
+
+  Args:
+    number_of_event_objects: the number of event objects.
+
+  Returns:
+    A list of event objects (instances of EventObject).
+  """
+  timestamp = timelib.Timestamp.CopyFromString(u'2015-01-01 00:00:00')
+
+  event_objects = []
+  for index in xrange(number_of_event_objects):
+    event_object = event.EventObject()
+    event_object.data_type = u'syslog:line'
+    event_object.timestamp = timestamp + index * 60 * 1000000
+    event_object.timestamp_desc = u'Entry Written'
+    event_object.filename = u'/var/log/syslog.{0:d}'.format(index % 5)
+    event_object.hostname = u'host-{0:d}'.format(index % 20)
+    event_object.pid = index % 10000
+    event_object.reporter = _REPORTERS[index % len(_REPORTERS)]
+    if index % 7 == 0:
+      event_object.body = u'Connection from 10.0.0.{0:d} failed'.format(
+          index % 256)
+    else:
+      event_object.body = u'Connection from 10.0.0.{0:d} closed'.format(
+          index % 256)
+    event_objects.append(event_object)
+
+  return event_objects
+
+
+def MatchEventObjects(matcher, event_objects):
+  """Matches event objects against a filter.
+
+  Args:
+    matcher: the filter object (instance of objectfilter.Filter).
+    event_objects: a list of event objects (instances of EventObject).
+
+  Returns:
+    A tuple containing the number of seconds it took to match the event
+    objects and a list of booleans that indicate which event objects
+    matched.
+  """
+  start_time = time.time()
+  results = [bool(matcher.Matches(event_object))
+             for event_object in event_objects]
+  elapsed_time = time.time() - start_time
+
+  return elapsed_time, results
+
+
+def Main():
+  """The main program function.
+
+  Returns:
+    A boolean containing True if successful or False if not.
+  """
+  argument_parser = argparse.ArgumentParser(description=(
+      u'Micro-benchmark of the event object filter expressions.'))
+
+  argument_parser.add_argument(
+      '--events', dest='number_of_event_objects', type=int, action='store',
+      default=100000, help=u'The number of event objects to match.')
+
+  argument_parser.add_argument(
+      'queries', nargs='*', action='store', metavar='QUERY',
+      default=_QUERIES, help=u'A filter expression.')
+
+  options = argument_parser.parse_args()
+
+  event_objects = GetEventObjects(options.number_of_event_objects)
+
+  result = True
+  for query in options.queries:
+    matchers = []
+    for compiled in [False, True]:
+      matcher = pfilter.GetMatcher(query, compiled=compiled)
+      if not matcher:
+        print u'Invalid filter expression: {0:s}'.format(query)
+        return False
+      matchers.append(matcher)
+
+    tree_time, tree_results = MatchEventObjects(matchers[0], event_objects)
+    compiled_time, compiled_results = MatchEventObjects(
+        matchers[1], event_objects)
+
+    print u'{0:s}'.format(query)
+    print (
+        u'  {0:d} matches, tree: {1:.3f} seconds, compiled: {2:.3f} '
+        u'seconds').format(
+            sum(tree_results), tree_time, compiled_time)
+
+    if tree_results != compiled_results:
+      print u'  Compiled filter results differ from the filter tree results.'
+      result = False
+
+  return result
+
+
+if __name__ == '__main__':
+  if not Main():
+    sys.exit(1)
+  else:
+    sys.exit(0)
@@ -0,0 +1,188 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the event formatters.
+
+The benchmark formats the message strings of a synthetic event object for
+every registered event formatter and reports the time it took per formatter.
+"""
+
+import argparse
+import logging
+import string
+import sys
+import time
+
+# Register all the formatters.
+from plaso import formatters  # pylint: disable=unused-import
+from plaso.formatters import manager as formatters_manager
+from plaso.formatters import mediator as formatters_mediator
+from plaso.lib import event
+
+
+# The conversion types of the format specification that require a number.
+_NUMERIC_CONVERSION_TYPES = frozenset('bcdoxXneEfFgG%')
+
+# The number of attributes, that are not used by the formatter, that are
+# added to the synthetic event objects.
+_NUMBER_OF_UNUSED_ATTRIBUTES = 20
+
+
+def GetFormatStringValues(formatter_class):
+  """Retrieves synthetic values for the attributes in the format strings.
+
+  Args:
+    formatter_class: the class object of the formatter.
+
+  Returns:
+    A dictionary containing the synthetic values of the attributes in
+    the format strings.
+  """
+  format_strings = [
+      getattr(formatter_class, u'FORMAT_STRING', u''),
+      getattr(formatter_class, u'FORMAT_STRING_SHORT', u'')]
+  format_strings.extend(getattr(formatter_class, u'FORMAT_STRING_PIECES', []))
+  format_strings.extend(
+      getattr(formatter_class, u'FORMAT_STRING_SHORT_PIECES', []))
+
+  values = {}
+  string_formatter = string.Formatter()
+  for format_string in format_strings:
+    if not format_string:
+      continue
+
+    for _, field_name, format_spec, _ in string_formatter.parse(format_string):
+      if not field_name or field_name[0].isdigit():
+        continue
+
+      if format_spec and format_spec[-1] in _NUMERIC_CONVERSION_TYPES:
+        value = 1
+      else:
+        value = u'value of {0:s}'.format(field_name)
+
+      values[field_name] = value
+
+  return values
+
+
+def GetEventObject(data_type, values):
+  """Retrieves a synthetic event object.
+
+  Args:
+    data_type: the data type of the event object.
+    values: a dictionary containing the values of the attributes of the event
+            object.
+
+  Returns:
+    An event object (instance of EventObject).
+  """
+  event_object = event.EventObject()
+  event_object.data_type = data_type
+  event_object.timestamp = 1420070400000000
+  event_object.timestamp_desc = u'Benchmark Time'
+
+  for index in range(_NUMBER_OF_UNUSED_ATTRIBUTES):
+    setattr(event_object, u'unused_{0:d}'.format(index), index)
+
+  for attribute_name, attribute_value in values.iteritems():
+    setattr(event_object, attribute_name, attribute_value)
+
+  return event_object
+
+
+def FormatEventObject(formatter_mediator, event_object, iterations):
+  """Formats the message strings of an event object.
+
+  Args:
+    formatter_mediator: the formatter mediator object (instance of
+                        FormatterMediator).
+    event_object: the event object (instance of EventObject).
+    iterations: the number of times the message strings are formatted.
+
+  Returns:
+    A tuple containing the number of seconds it took to format the message
+    strings and the message strings.
+  """
+  start_time = time.time()
+  for _ in xrange(iterations):
+    message_strings = formatters_manager.FormattersManager.GetMessageStrings(
+        formatter_mediator, event_object)
+  elapsed_time = time.time() - start_time
+
+  return elapsed_time, message_strings
+
+
+def Main():
+  """The main program function.
+
+  Returns:
+    A boolean containing True if successful or False if not.
+  """
+  argument_parser = argparse.ArgumentParser(description=(
+      u'Micro-benchmark of the event formatters.'))
+
+  argument_parser.add_argument(
+      '--iterations', dest='iterations', type=int, action='store',
+      default=1000, help=(
+          u'The number of times the message strings of every formatter are '
+          u'formatted.'))
+
+  argument_parser.add_argument(
+      '-v', '--verbose', dest='verbose', action='store_true', default=False,
+      help=u'Print the time per formatter and the formatted message strings.')
+
+  options = argument_parser.parse_args()
+
+  # The formatters that cannot format the synthetic event objects log
+  # warnings, which are not of interest to the benchmark.
+  logging.disable(logging.WARNING)
+
+  formatter_mediator = formatters_mediator.FormatterMediator()
+
+  # pylint: disable=protected-access
+  formatter_classes = formatters_manager.FormattersManager._formatter_classes
+  # pylint: enable=protected-access
+
+  number_of_formatters = 0
+  total_elapsed_time = 0.0
+  unsupported_formatters = []
+  for data_type, formatter_class in sorted(formatter_classes.iteritems()):
+    values = GetFormatStringValues(formatter_class)
+    event_object = GetEventObject(formatter_class.DATA_TYPE, values)
+
+    try:
+      elapsed_time, message_strings = FormatEventObject(
+          formatter_mediator, event_object, options.iterations)
+    except Exception:  # pylint: disable=broad-except
+      # Formatters that expect specific attribute values cannot format
+      # the synthetic event objects.
+      unsupported_formatters.append(data_type)
+      continue
+
+    number_of_formatters += 1
+    total_elapsed_time += elapsed_time
+
+    if options.verbose:
+      print u'{0:s}: {1:.1f} us per message'.format(
+          data_type, elapsed_time * 1000000 / options.iterations)
+      print u'  {0:s}'.format(message_strings[0])
+      print u'  {0:s}'.format(message_strings[1])
+
+  print (
+      u'{0:d} formatters, {1:d} iterations: {2:.3f} seconds, {3:.1f} us per '
+      u'message').format(
+          number_of_formatters, options.iterations, total_elapsed_time,
+          total_elapsed_time * 1000000 / (
+              number_of_formatters * options.iterations))
+
+  if unsupported_formatters:
+    print u'Unsupported formatters: {0:s}'.format(
+        u', '.join(unsupported_formatters))
+
+  return True
+
+
+if __name__ == '__main__':
+  if not Main():
+    sys.exit(1)
+  else:
+    sys.exit(0)
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the queues used by the multi-process engine.
+
+The benchmark pushes items from a producer process onto a queue that are
+consumed by one or more consumer processes and reports the throughput of:
+  * the multiprocessing queue (MultiProcessingQueue);
+  * the shared memory queue (SharedMemoryQueue).
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+
+from plaso.engine import queue
+from plaso.multi_processing import multi_process
+from plaso.multi_processing import shared_memory_queue
+
+
+class BenchmarkQueueConsumer(queue.ItemQueueConsumer):
+  """Class that implements the benchmark queue consumer."""
+
+  def __init__(self, queue_object):
+    """Initializes the queue consumer.
+
+    Args:
+      queue_object: the queue object (instance of Queue).
+    """
+    super(BenchmarkQueueConsumer, self).__init__(queue_object)
+    self.number_of_items = 0
+
+  def _ConsumeItem(self, unused_item):
+    """Consumes an item callback for ConsumeItems."""
+    self.number_of_items += 1
+
+
+def ConsumeItems(queue_object, result_queue):
+  """Consumes the items of a queue.
+
+  Args:
+    queue_object: the queue object (instance of Queue).
+    result_queue: a multiprocessing queue to push the number of consumed
+                  items onto.
+  """
+  queue_consumer = BenchmarkQueueConsumer(queue_object)
+  queue_consumer.ConsumeItems()
+  result_queue.put(queue_consumer.number_of_items)
+
+
+def RunBenchmark(queue_object, number_of_items, number_of_consumers, item):
+  """Runs the benchmark for a queue.
+
+  Args:
+    queue_object: the queue object (instance of Queue).
+    number_of_items: the number of items to push onto the queue.
+    number_of_consumers: the number of consumer processes.
+    item: the item to push onto the queue.
+
+  Returns:
+    The number of seconds it took to transfer the items.
+  """
+  result_queue = multiprocessing.Queue()
+
+  consumer_processes = []
+  for _ in range(number_of_consumers):
+    consumer_process = multiprocessing.Process(
+        target=ConsumeItems, args=(queue_object, result_queue))
+    consumer_process.start()
+    consumer_processes.append(consumer_process)
+
+  start_time = time.time()
+
+  queue_producer = queue.ItemQueueProducer(queue_object)
+  for _ in xrange(number_of_items):
+    queue_producer.ProduceItem(item)
+  queue_producer.SignalEndOfInput()
+
+  number_of_consumed_items = 0
+  for _ in consumer_processes:
+    number_of_consumed_items += result_queue.get()
+
+  elapsed_time = time.time() - start_time
+
+  for consumer_process in consumer_processes:
+    consumer_process.join()
+
+  if number_of_consumed_items != number_of_items:
+    print u'Number of consumed items mismatch: {0:d} != {1:d}'.format(
+        number_of_consumed_items, number_of_items)
+
+  return elapsed_time
+
+
+def Main():
+  """The main program function.
+
+  Returns:
+    A boolean containing True if successful or False if not.
+  """
+  argument_parser = argparse.ArgumentParser(description=(
+      u'Micro-benchmark of the queues used by the multi-process engine.'))
+
+  argument_parser.add_argument(
+      '--consumers', dest='number_of_consumers', type=int, action='store',
+      default=2, help=u'The number of consumer processes.')
+
+  argument_parser.add_argument(
+      '--items', dest='number_of_items', type=int, action='store',
+      default=100000, help=u'The number of items to transfer.')
+
+  argument_parser.add_argument(
+      '--item_size', '--item-size', dest='item_size', type=int,
+      action='store', default=256, help=u'The size of an item in bytes.')
+
+  argument_parser.add_argument(
+      '--queue_size', '--queue-size', dest='queue_size', type=int,
+      action='store', default=0, help=(
+          u'The maximum number of queued items, where 0 represents no '
+          u'limit.'))
+
+  options = argument_parser.parse_args()
+
+  item = u'A' * options.item_size
+
+  for queue_name, queue_class in [
+      (u'MultiProcessingQueue', multi_process.MultiProcessingQueue),
+      (u'SharedMemoryQueue', shared_memory_queue.SharedMemoryQueue)]:
+    queue_object = queue_class(
+        maximum_number_of_queued_items=options.queue_size)
+
+    elapsed_time = RunBenchmark(
+        queue_object, options.number_of_items, options.number_of_consumers,
+        item)
+
+    if hasattr(queue_object, u'Close'):
+      queue_object.Close()
+
+    print u'{0:s}: {1:d} items in {2:.3f} seconds ({3:.0f} items/s)'.format(
+        queue_name, options.number_of_items, elapsed_time,
+        options.number_of_items / elapsed_time)
+
+  return True
+
+
+if __name__ == '__main__':
+  if not Main():
+    sys.exit(1)
+  else:
+    sys.exit(0)
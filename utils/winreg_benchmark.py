@@ -0,0 +1,141 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""Micro-benchmark of the Windows Registry (REGF) file parser.
+
+The benchmark parses one or more Windows Registry files with all
+the Windows Registry plugins and reports the time it took to parse each
+file and the number of event objects that were produced per plugin.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from dfvfs.lib import definitions as dfvfs_definitions
+from dfvfs.path import factory as path_spec_factory
+from dfvfs.resolver import resolver as path_spec_resolver
+
+from plaso.artifacts import knowledge_base
+from plaso.engine import queue
+from plaso.engine import single_process
+from plaso.parsers import mediator as parsers_mediator
+from plaso.parsers import winreg
+# Register the Windows Registry plugins.
+from plaso.parsers import winreg_plugins  # pylint: disable=unused-import
+
+
+class BenchmarkEventObjectQueueConsumer(queue.EventObjectQueueConsumer):
+  """Class that implements the benchmark event object queue consumer."""
+
+  def __init__(self, event_queue):
+    """Initializes the event object queue consumer.
+
+    Args:
+      event_queue: the event object queue (instance of Queue).
+    """
+    super(BenchmarkEventObjectQueueConsumer, self).__init__(event_queue)
+    self.parser_chains = {}
+
+  def _ConsumeEventObject(self, event_object, **unused_kwargs):
+    """Consumes an event object callback for ConsumeEventObjects."""
+    parser_chain = getattr(event_object, u'parser', u'N/A')
+    self.parser_chains.setdefault(parser_chain, 0)
+    self.parser_chains[parser_chain] += 1
+
+
+def ParseFile(path, current_control_set):
+  """Parses a Windows Registry file.
+
+  Args:
+    path: the path of the Windows Registry file.
+    current_control_set: the name of the current control set.
+
+  Returns:
+    A tuple containing the number of seconds it took to parse the file and
+    a dictionary containing the number of event objects per parser chain.
+  """
+  event_queue = single_process.SingleProcessQueue()
+  parse_error_queue = single_process.SingleProcessQueue()
+
+  knowledge_base_object = knowledge_base.KnowledgeBase()
+  knowledge_base_object.SetValue(
+      u'current_control_set', current_control_set)
+
+  parser_mediator = parsers_mediator.ParserMediator(
+      queue.ItemQueueProducer(event_queue),
+      queue.ItemQueueProducer(parse_error_queue), knowledge_base_object)
+
+  path_spec = path_spec_factory.Factory.NewPathSpec(
+      dfvfs_definitions.TYPE_INDICATOR_OS, location=path)
+  file_entry = path_spec_resolver.Resolver.OpenFileEntry(path_spec)
+  parser_mediator.SetFileEntry(file_entry)
+
+  parser_object = winreg.WinRegistryParser()
+
+  start_time = time.time()
+  parser_object.UpdateChainAndParse(parser_mediator)
+  elapsed_time = time.time() - start_time
+
+  event_queue_consumer = BenchmarkEventObjectQueueConsumer(event_queue)
+  event_queue_consumer.ConsumeEventObjects()
+
+  return elapsed_time, event_queue_consumer.parser_chains
+
+
+def Main():
+  """The main program function.
+
+  Returns:
+    A boolean containing True if successful or False if not.
+  """
+  argument_parser = argparse.ArgumentParser(description=(
+      u'Micro-benchmark of the Windows Registry (REGF) file parser.'))
+
+  argument_parser.add_argument(
+      '--current_control_set', '--current-control-set',
+      dest='current_control_set', type=str, action='store',
+      default=u'ControlSet001', help=u'The name of the current control set.')
+
+  argument_parser.add_argument(
+      '--iterations', dest='iterations', type=int, action='store',
+      default=3, help=u'The number of times each file is parsed.')
+
+  argument_parser.add_argument(
+      '-v', '--verbose', dest='verbose', action='store_true', default=False,
+      help=u'Print the number of event objects per parser chain.')
+
+  argument_parser.add_argument(
+      'paths', nargs='+', action='store', metavar='PATH',
+      help=u'The path of a Windows Registry file.')
+
+  options = argument_parser.parse_args()
+
+  for path in options.paths:
+    if not os.path.isfile(path):
+      print u'No such file: {0:s}'.format(path)
+      return False
+
+  for path in options.paths:
+    elapsed_times = []
+    for _ in range(options.iterations):
+      elapsed_time, parser_chains = ParseFile(
+          os.path.abspath(path), options.current_control_set)
+      elapsed_times.append(elapsed_time)
+
+    print u'{0:s}: {1:d} events, best of {2:d}: {3:.3f} seconds'.format(
+        path, sum(parser_chains.itervalues()), options.iterations,
+        min(elapsed_times))
+
+    if options.verbose:
+      for parser_chain, number_of_events in sorted(parser_chains.iteritems()):
+        print u'  {0:s}: {1:d}'.format(parser_chain, number_of_events)
+
+  return True
+
+
+if __name__ == '__main__':
+  if not Main():
+    sys.exit(1)
+  else:
+    sys.exit(0)